@@ -131,9 +131,8 @@ class BaseAgent(ABC):
                         yield {"type": "tool_call", "tool": tool_name, "args": tool_args}
 
                         try:
-                            tool = ToolRegistry.get_tool(tool_name)
-                            if tool:
-                                result = await tool.execute(**tool_args)
+                            if ToolRegistry.get_tool(tool_name):
+                                result = await ToolRegistry.execute(tool_name, tool_args)
                             else:
                                 result = f"工具不存在: {tool_name}"
                                 logger.error(f"工具不存在: {tool_name}")
@@ -0,0 +1,78 @@
+"""Benchmark: exact VectorIndex vs IVF-flat recall@k and query latency.
+
+Uses synthetic clustered vectors (real embeddings cluster by topic).
+
+    python benchmarks/bench_ann_recall.py --rows 100000 --nprobe 4 8 16 32
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+from memory.ann_index import IVFFlatIndex  # noqa: E402
+from memory.vector_index import VectorIndex  # noqa: E402
+
+
+def _clustered(
+    rng: np.random.Generator, count: int, centers: np.ndarray, spread: float
+) -> np.ndarray:
+    """Unit-norm centers plus isotropic noise of total norm ~``spread``."""
+    labels = rng.integers(0, len(centers), size=count)
+    noise = rng.normal(size=(count, centers.shape[1])) * (spread / np.sqrt(centers.shape[1]))
+    return (centers[labels] + noise).astype(np.float32)
+
+
+def _timed_search(index, queries: np.ndarray, k: int, **kwargs) -> tuple[list[set[str]], float]:
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        results.append({eid for eid, _ in index.search(query, limit=k, **kwargs)})
+    elapsed = time.perf_counter() - start
+    return results, elapsed / len(queries) * 1e3
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--spread", type=float, default=2.0, help="noise norm / center norm")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=0, help="0 = sqrt(rows)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(args.clusters, args.dim))
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    vectors = _clustered(rng, args.rows, centers, args.spread)
+    queries = _clustered(rng, args.queries, centers, args.spread)
+    rows = [(f"e{i}", "message", f"m{i}", vec) for i, vec in enumerate(vectors)]
+
+    exact = VectorIndex(args.dim, initial_capacity=args.rows)
+    exact.load(rows)
+
+    ann = IVFFlatIndex(args.dim, nlist=args.nlist, min_train_size=1)
+    start = time.perf_counter()
+    ann.load(rows)
+    train_s = time.perf_counter() - start
+
+    truth, exact_ms = _timed_search(exact, queries, args.k)
+    print(f"rows={args.rows} dim={args.dim} k={args.k} lists={len(ann._lists)} build={train_s:.2f}s")
+    print(f"{'mode':<12}{'recall@k':>10}{'ms/query':>12}")
+    print(f"{'exact':<12}{1.0:>10.3f}{exact_ms:>12.3f}")
+    for nprobe in args.nprobe:
+        found, ms = _timed_search(ann, queries, args.k, nprobe=nprobe)
+        recall = sum(len(t & f) for t, f in zip(truth, found)) / (len(truth) * args.k)
+        print(f"{f'nprobe={nprobe}':<12}{recall:>10.3f}{ms:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Benchmark: memory compaction - hot-table size and recall latency before/after folding old turns.
+
+Seeds a SQLite store with N embedded messages spread evenly over D days in
+sessions of S turns, measures p50 semantic (full-scan and resident index)
+and keyword recall, runs one compaction pass keeping the newest H messages
+hot, then measures again. Also reports the archive drill-down latency for a
+scoped history-recall query, which is the only path that reads the archive.
+
+    python benchmarks/bench_compaction.py --messages 20000 100000 --hot 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import closing
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+from memory.archive import MemoryArchive  # noqa: E402
+from memory.compaction import MemoryCompactor  # noqa: E402
+from memory.embeddings import EmbeddingConfig, LocalEmbeddingEngine  # noqa: E402
+from memory.retrieval_filter import RetrievalFilter  # noqa: E402
+from memory.storage import MemoryStorage  # noqa: E402
+from memory.vector_codec import pack_embedding  # noqa: E402
+
+_TOPICS = ["网关超时", "Redis 连接池", "asyncio 任务取消", "数据库迁移", "日志排查", "部署回滚"]
+
+
+def _seed(path: str, messages: int, days: int, per_session: int, now: datetime) -> None:
+    async def schema() -> None:
+        storage = MemoryStorage(db_path=path, use_vector_index=False)
+        await storage.initialize()
+        await storage.cleanup()
+
+    asyncio.run(schema())
+    engine = LocalEmbeddingEngine(EmbeddingConfig(dimension=128))
+    step = timedelta(days=days) / messages
+    start = now - timedelta(days=days)
+    topic_vectors = [np.asarray(engine.embed(t), dtype=np.float32) for t in _TOPICS]
+    rng = np.random.default_rng(0)
+    with closing(sqlite3.connect(path)) as db, db:
+        rows = []
+        for i in range(messages):
+            ts = str(start + step * i)
+            topic = (i // per_session) % len(_TOPICS)
+            role = "user" if i % 2 == 0 else "assistant"
+            content = f"{_TOPICS[topic]} 第 {i} 次排查记录。结论：第 {i % 97} 项配置需要调整。"
+            vector = topic_vectors[topic] + rng.normal(0, 0.05, 128).astype(np.float32)
+            rows.append((f"m{i:08d}", f"s{i // per_session:06d}", role, content, ts, pack_embedding(vector.tolist())))
+        db.executemany(
+            "INSERT INTO messages (id, session_id, role, content, timestamp, message_metadata) "
+            "VALUES (?, ?, ?, ?, ?, '{}')",
+            (row[:5] for row in rows),
+        )
+        db.executemany(
+            "INSERT INTO message_fts (message_id, session_id, content) VALUES (?, ?, ?)",
+            ((row[0], row[1], row[3]) for row in rows),
+        )
+        db.executemany(
+            "INSERT INTO memory_embeddings "
+            "(id, source_type, source_id, content, embedding, created_at, updated_at) "
+            "VALUES (?, 'message', ?, ?, ?, ?, ?)",
+            ((f"e{row[0]}", row[0], row[3], row[5], row[4], row[4]) for row in rows),
+        )
+
+
+def _counts(path: str) -> tuple[int, int]:
+    with closing(sqlite3.connect(path)) as db:
+        messages = db.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        embeddings = db.execute("SELECT COUNT(*) FROM memory_embeddings").fetchone()[0]
+    return messages, embeddings
+
+
+async def _recall_p50(path: str, queries: int) -> dict[str, float]:
+    engine = LocalEmbeddingEngine(EmbeddingConfig(dimension=128))
+    texts = [_TOPICS[i % len(_TOPICS)] for i in range(queries)]
+    vectors = [engine.embed(t) for t in texts]
+    result = {}
+    for label, use_index in (("scan", False), ("index", True)):
+        storage = MemoryStorage(db_path=path, use_vector_index=use_index)
+        await storage.initialize()
+        await storage.search_memory_embeddings(vectors[0], limit=20)  # 预热
+        latencies = []
+        for vector in vectors:
+            started = time.perf_counter()
+            await storage.search_memory_embeddings(vector, limit=20)
+            latencies.append((time.perf_counter() - started) * 1000)
+        result[f"semantic {label}"] = statistics.median(latencies)
+        if use_index:
+            latencies = []
+            for text in texts:
+                started = time.perf_counter()
+                await storage.search_messages_by_keyword(text, limit=20)
+                latencies.append((time.perf_counter() - started) * 1000)
+            result["keyword"] = statistics.median(latencies)
+        await storage.cleanup()
+    return result
+
+
+async def _compact(path: str, archive_path: str, hot: int, now: datetime) -> tuple[dict, float]:
+    storage = MemoryStorage(db_path=path, use_vector_index=False)
+    await storage.initialize()
+    archive = MemoryArchive(archive_path)
+    await archive.initialize()
+    engine = LocalEmbeddingEngine(EmbeddingConfig(dimension=128))
+    compactor = MemoryCompactor(storage, archive, engine.embed_batch, hot_messages=hot, min_age_days=1)
+    report = await compactor.run(now)
+
+    # 归档只在历史回忆时读取：带时间范围的下钻检索延迟
+    scope = RetrievalFilter(since=now - timedelta(days=60), until=now - timedelta(days=53))
+    vector = engine.embed(_TOPICS[1])
+    latencies = []
+    for _ in range(10):
+        started = time.perf_counter()
+        await archive.search(_TOPICS[1], vector, filters=scope, limit=20)
+        latencies.append((time.perf_counter() - started) * 1000)
+    await archive.close()
+    await storage.cleanup()
+    return report.to_dict(), statistics.median(latencies)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, nargs="+", default=[20000, 100000])
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--per-session", type=int, default=40)
+    parser.add_argument("--hot", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+
+    now = datetime.now()
+    for messages in args.messages:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / "sessions.db")
+            _seed(path, messages, args.days, args.per_session, now)
+            before_rows, before = _counts(path), asyncio.run(_recall_p50(path, args.queries))
+            report, archive_p50 = asyncio.run(_compact(path, str(Path(tmp) / "archive.db"), args.hot, now))
+            after_rows, after = _counts(path), asyncio.run(_recall_p50(path, args.queries))
+
+        print(f"\nmessages={messages} over {args.days} days, hot={args.hot}")
+        print(
+            f"compaction: {report['messages_archived']} archived -> {report['summaries_written']} summaries "
+            f"in {report['seconds']:.2f}s"
+        )
+        print(f"hot rows (messages / embeddings): {before_rows[0]} / {before_rows[1]} -> {after_rows[0]} / {after_rows[1]}")
+        print(f"{'recall p50 ms':>16} | {'before':>7} | {'after':>7}")
+        for name in before:
+            print(f"{name:>16} | {before[name]:>7.1f} | {after[name]:>7.1f}")
+        print(f"{'archive (scoped)':>16} | {'-':>7} | {archive_p50:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Benchmark: LocalEmbeddingEngine per-text embed vs embed_batch.
+
+    python benchmarks/bench_embedding_engine.py --texts 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.getcwd())
+from memory.embeddings import LocalEmbeddingEngine, _token_slot  # noqa: E402
+
+_WORDS = [
+    "网关", "超时", "报错", "Redis", "asyncio", "任务", "取消", "数据库", "连接池",
+    "Bad Gateway", "502", "部署", "回滚", "日志", "排查", "Python", "内存", "泄漏",
+]
+
+
+def _corpus(count: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(_WORDS) for _ in range(rng.randint(4, 24))) for _ in range(count)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", type=int, default=20_000)
+    parser.add_argument("--batch", type=int, default=32)
+    args = parser.parse_args()
+
+    texts = _corpus(args.texts)
+    engine = LocalEmbeddingEngine()
+
+    _token_slot.cache_clear()
+    start = time.perf_counter()
+    for text in texts:
+        engine.embed(text)
+    loop_s = time.perf_counter() - start
+
+    _token_slot.cache_clear()
+    start = time.perf_counter()
+    for offset in range(0, len(texts), args.batch):
+        engine.embed_batch(texts[offset : offset + args.batch])
+    batch_s = time.perf_counter() - start
+
+    info = _token_slot.cache_info()
+    print(f"texts={len(texts)} batch={args.batch}")
+    print(f"embed loop : {loop_s * 1e6 / len(texts):8.1f} us/text")
+    print(f"embed_batch: {batch_s * 1e6 / len(texts):8.1f} us/text")
+    print(f"token cache: hits={info.hits} misses={info.misses} size={info.currsize}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark: JSON-text vs packed float32 BLOB storage for memory_embeddings.
+
+Reports on-disk size and full-scan decode time for both formats.
+
+    python benchmarks/bench_embedding_storage.py --rows 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+from memory.vector_codec import pack_embedding, unpack_embedding  # noqa: E402
+
+
+def _build_db(path: Path, vectors: np.ndarray, encode) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE memory_embeddings (id TEXT PRIMARY KEY, embedding BLOB NOT NULL)")
+    conn.executemany(
+        "INSERT INTO memory_embeddings (id, embedding) VALUES (?, ?)",
+        ((f"e{i}", encode(vec)) for i, vec in enumerate(vectors)),
+    )
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+
+
+def _scan(path: Path, decode) -> tuple[float, float]:
+    conn = sqlite3.connect(path)
+    start = time.perf_counter()
+    rows = conn.execute("SELECT embedding FROM memory_embeddings").fetchall()
+    fetched = time.perf_counter()
+    decoded = [decode(row[0]) for row in rows]
+    done = time.perf_counter()
+    conn.close()
+    assert len(decoded) == len(rows)
+    return fetched - start, done - fetched
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=128)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    vectors = rng.standard_normal((args.rows, args.dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    formats = {
+        "json": (lambda v: json.dumps(v.tolist()), json.loads),
+        "float32_blob": (pack_embedding, unpack_embedding),
+    }
+
+    print(f"rows={args.rows} dim={args.dim}")
+    print(f"{'format':<14}{'db_size_MB':>12}{'fetch_ms':>12}{'decode_ms':>12}{'us/row':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, (encode, decode) in formats.items():
+            path = Path(tmp) / f"{name}.db"
+            _build_db(path, vectors, encode)
+            fetch_s, decode_s = _scan(path, decode)
+            size_mb = path.stat().st_size / (1024 * 1024)
+            print(
+                f"{name:<14}{size_mb:>12.2f}{fetch_s * 1000:>12.1f}"
+                f"{decode_s * 1000:>12.1f}{decode_s * 1e6 / args.rows:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Benchmark: scoped recall - time / session filters pushed into SQLite vs post-filtering global hits.
+
+Seeds a SQLite store with N messages spread evenly over D days (every
+message embedded, resident vector index on), then runs Q semantic +
+keyword queries scoped to the last day, the last week and one session.
+"pushdown" passes a ``RetrievalFilter`` to storage; "post-filter" fetches
+the global top 20 and drops out-of-scope hits afterwards, which is what
+callers had to do before. Reports p50 latency and how many of the 20
+requested hits each approach actually returns.
+
+    python benchmarks/bench_filtered_recall.py --messages 20000 100000 --days 90
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import closing
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+from memory.embeddings import EmbeddingConfig, LocalEmbeddingEngine  # noqa: E402
+from memory.retrieval_filter import RetrievalFilter  # noqa: E402
+from memory.storage import MemoryStorage  # noqa: E402
+from memory.vector_codec import pack_embedding  # noqa: E402
+
+_TOPICS = ["网关超时", "Redis 连接池", "asyncio 任务取消", "数据库迁移", "日志排查", "部署回滚"]
+_LIMIT = 20
+
+
+def _seed(path: str, messages: int, days: int, per_session: int, now: datetime) -> None:
+    async def schema() -> None:
+        storage = MemoryStorage(db_path=path, use_vector_index=False)
+        await storage.initialize()
+        await storage.cleanup()
+
+    asyncio.run(schema())
+    engine = LocalEmbeddingEngine(EmbeddingConfig(dimension=128))
+    step = timedelta(days=days) / messages
+    start = now - timedelta(days=days)
+    topic_vectors = [np.asarray(engine.embed(t), dtype=np.float32) for t in _TOPICS]
+    rng = np.random.default_rng(0)
+    with closing(sqlite3.connect(path)) as db, db:
+        rows = []
+        for i in range(messages):
+            ts = str(start + step * i)
+            content = f"{_TOPICS[i % len(_TOPICS)]} 第 {i} 次排查记录"
+            vector = topic_vectors[i % len(_TOPICS)] + rng.normal(0, 0.05, 128).astype(np.float32)
+            rows.append((f"m{i:08d}", f"s{i // per_session:06d}", "user", content, ts, pack_embedding(vector.tolist())))
+        db.executemany(
+            "INSERT INTO messages (id, session_id, role, content, timestamp, message_metadata) "
+            "VALUES (?, ?, ?, ?, ?, '{}')",
+            (row[:5] for row in rows),
+        )
+        db.executemany(
+            "INSERT INTO message_fts (message_id, session_id, content) VALUES (?, ?, ?)",
+            ((row[0], row[1], row[3]) for row in rows),
+        )
+        db.executemany(
+            "INSERT INTO memory_embeddings "
+            "(id, source_type, source_id, content, embedding, created_at, updated_at) "
+            "VALUES (?, 'message', ?, ?, ?, ?, ?)",
+            ((f"e{row[0]}", row[0], row[3], row[5], row[4], row[4]) for row in rows),
+        )
+
+
+async def _run(path: str, scopes: dict[str, RetrievalFilter], queries: int) -> dict:
+    storage = MemoryStorage(db_path=path)
+    await storage.initialize()
+    engine = LocalEmbeddingEngine(EmbeddingConfig(dimension=128))
+    texts = [_TOPICS[i % len(_TOPICS)] for i in range(queries)]
+    vectors = [engine.embed(t) for t in texts]
+
+    async def pushdown(i: int, scope: RetrievalFilter) -> int:
+        semantic, keyword = await asyncio.gather(
+            storage.search_memory_embeddings(vectors[i], limit=_LIMIT, filters=scope),
+            storage.search_messages_by_keyword(texts[i], limit=_LIMIT, filters=scope),
+        )
+        return len(semantic)
+
+    async def post_filter(i: int, scope: RetrievalFilter) -> int:
+        semantic, keyword = await asyncio.gather(
+            storage.search_memory_embeddings(vectors[i], limit=_LIMIT),
+            storage.search_messages_by_keyword(texts[i], limit=_LIMIT),
+        )
+        meta = await storage.get_messages_metadata_by_ids([h["source_id"] for h in semantic])
+        kept = [
+            h for h in semantic
+            if (m := meta.get(h["source_id"]))
+            and (not scope.session_ids or m["session_id"] in scope.session_ids)
+            and (scope.since is None or datetime.fromisoformat(m["timestamp"]) >= scope.since)
+        ]
+        return len(kept)
+
+    result = {}
+    for name, scope in scopes.items():
+        for label, search in (("pushdown", pushdown), ("post-filter", post_filter)):
+            await search(0, scope)  # 预热
+            latencies, returned = [], []
+            for i in range(queries):
+                started = time.perf_counter()
+                returned.append(await search(i, scope))
+                latencies.append((time.perf_counter() - started) * 1000)
+            result[(name, label)] = (statistics.median(latencies), statistics.mean(returned))
+    await storage.cleanup()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, nargs="+", default=[20000, 100000])
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--per-session", type=int, default=40)
+    parser.add_argument("--queries", type=int, default=30)
+    args = parser.parse_args()
+
+    now = datetime.now()
+    scopes = {
+        "last day": RetrievalFilter(since=now - timedelta(days=1)),
+        "last week": RetrievalFilter(since=now - timedelta(days=7)),
+        "one session": RetrievalFilter(session_ids=("s000010",)),
+    }
+    for messages in args.messages:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / "sessions.db")
+            _seed(path, messages, args.days, args.per_session, now)
+            result = asyncio.run(_run(path, scopes, args.queries))
+        print(f"\nmessages={messages} over {args.days} days")
+        print(f"{'scope':>12} | {'approach':>11} | {'p50 ms':>7} | {'hits/' + str(_LIMIT):>7}")
+        for (name, label), (p50, returned) in result.items():
+            print(f"{name:>12} | {label:>11} | {p50:>7.1f} | {returned:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
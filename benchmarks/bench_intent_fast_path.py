@@ -0,0 +1,112 @@
+"""Benchmark: intent routing fast path (query LRU + local classifier) versus always calling the LLM.
+
+Replays N turns drawn from templated queries (with Zipf-distributed repeats and
+short follow-ups such as "继续") through OrchestrationRouter.route_async. The
+stub LLM classifier sleeps --llm-ms per call and returns the ground-truth
+intent. Reports fast-path hit rate, estimated latency saved, mean routing
+latency and the agreement of fast-path answers with the ground truth.
+
+    python benchmarks/bench_intent_fast_path.py --turns 2000 --llm-ms 300
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+from loguru import logger
+
+sys.path.append(os.getcwd())
+from core.agent_orchestration import IntentType, OrchestrationRouter  # noqa: E402
+from core.intent_classifier import IntentRouteCache, LocalIntentClassifier  # noqa: E402
+
+_TEMPLATES = {
+    IntentType.REALTIME_INFO: ["查一下今天{}的天气", "{}最新的新闻", "{}股价今天怎么样", "{}房价最近涨了吗"],
+    IntentType.WORKSPACE_ACTION: ["帮我看下{}这个报错", "读取{}配置文件", "运行{}的测试脚本", "重构一下{}模块"],
+    IntentType.MEMORY: ["你还记得{}吗", "上次我说的{}是什么", "我之前提过{}对吧"],
+    IntentType.CHAT: ["你觉得{}有意思吗", "给我讲个关于{}的笑话", "聊聊{}吧"],
+}
+_WORDS = ["上海", "北京", "项目", "咖啡", "会议", "周末", "猫咪", "火锅", "深圳", "登录", "订单", "旅行",
+          "杭州", "支付", "音乐", "电影", "跑步", "数据库", "网关", "读书"]
+_FOLLOWUPS = ["继续", "好的", "嗯嗯", "然后呢"]
+
+
+def _workload(turns: int, seed: int) -> list[tuple[list[dict], IntentType]]:
+    rng = random.Random(seed)
+    pool = [(t.format(w), intent) for w in _WORDS for intent, ts in _TEMPLATES.items() for t in ts]
+    rng.shuffle(pool)
+    weights = [1.0 / (rank + 1) ** 0.8 for rank in range(len(pool))]
+    previous: tuple[str, IntentType] | None = None
+    items = []
+    for _ in range(turns):
+        if previous is not None and rng.random() < 0.15:
+            followup = rng.choice(_FOLLOWUPS)
+            items.append(([{"role": "user", "content": previous[0]}, {"role": "user", "content": followup}], previous[1]))
+            continue
+        previous = rng.choices(pool, weights)[0]
+        items.append(([{"role": "user", "content": previous[0]}], previous[1]))
+    return items
+
+
+class _StubEngine:
+    def __init__(self, latency_s: float, truth: dict[str, IntentType]):
+        self.latency_s = latency_s
+        self.truth = truth
+
+    async def chat_with_tools(self, messages, **_kwargs):
+        await asyncio.sleep(self.latency_s)
+        payload = {"intent": self.truth[messages[-1]["content"]].value, "reason": "stub", "confidence": 0.9}
+        return {"type": "tool_calls", "tool_calls": [{"id": "c", "name": "classify_intent", "arguments": json.dumps(payload)}]}
+
+
+async def _replay(router: OrchestrationRouter, engine: _StubEngine, workload) -> tuple[float, float]:
+    started = time.perf_counter()
+    agree = answered = 0
+    for messages, expected in workload:
+        # 追问的标注取上一轮意图，与真实 LLM 在完整上下文下的判断一致
+        engine.truth[messages[-1]["content"]] = expected
+        route = await router.route_async(messages)
+        if not route.reason.startswith("llm_structured"):
+            answered += 1
+            agree += route.intent == expected
+    return (time.perf_counter() - started) * 1000 / len(workload), (agree / answered if answered else 1.0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--llm-ms", type=float, default=300)
+    parser.add_argument("--threshold", type=float, default=0.85)
+    parser.add_argument("--min-samples", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logger.remove()
+    workload = _workload(args.turns, args.seed)
+    print(f"turns={args.turns} llm={args.llm_ms:.0f}ms threshold={args.threshold}")
+    print(f"{'mode':>12} | {'mean route':>10} | {'hit rate':>8} | {'cache':>5} | {'local':>5} | {'llm':>5} | {'saved':>8} | {'agree':>6}")
+    for mode in ("llm only", "fast path"):
+        engine = _StubEngine(args.llm_ms / 1000, {})
+        kwargs = {}
+        if mode == "fast path":
+            kwargs = {
+                "route_cache": IntentRouteCache(512),
+                "local_classifier": LocalIntentClassifier(min_samples=args.min_samples),
+                "local_threshold": args.threshold,
+            }
+        router = OrchestrationRouter(llm_engine=engine, **kwargs)
+        mean_ms, agree = asyncio.run(_replay(router, engine, workload))
+        stats = router.stats()
+        print(
+            f"{mode:>12} | {mean_ms:>8.1f}ms | {stats['fast_path_hit_rate']:>8.1%} | {stats['cache_hits']:>5} | "
+            f"{stats['local_hits']:>5} | {stats['llm_calls']:>5} | {stats['saved_ms_estimate'] / 1000:>7.1f}s | {agree:>6.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark: Kuzu mixed read/write load - read pool size vs search latency and throughput.
+
+Seeds N events, then runs C concurrent hybrid searches while a writer keeps
+appending events through ``KuzuWriter``. Each run reports search
+throughput, p50/p95 search latency and the write-queue backpressure counters
+from ``KuzuStore.stats()``.
+
+    python benchmarks/bench_kuzu_concurrency.py --events 5000 --readers 1 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.getcwd())
+from memory.kuzu_retriever import KuzuRetriever  # noqa: E402
+from memory.kuzu_store import KuzuStore  # noqa: E402
+from memory.kuzu_writer import KuzuWriter  # noqa: E402
+
+_TOPICS = ["网关超时", "Redis 连接池", "asyncio 任务取消", "数据库迁移", "日志排查", "部署回滚"]
+
+
+async def _run(db_path: str, events: int, readers: int, searches: int, clients: int) -> dict:
+    store = KuzuStore(db_path=db_path, vector_index=False, read_connections=readers)
+    await store.initialize()
+    writer = KuzuWriter(store)
+    retriever = KuzuRetriever(store)
+    await writer.ensure_session("bench")
+    if store.event_count < events:
+        await asyncio.gather(*(
+            writer.write_event("bench", "user", f"{_TOPICS[i % len(_TOPICS)]} 第 {i} 次记录")
+            for i in range(store.event_count, events)
+        ))
+
+    latencies: list[float] = []
+    stop = asyncio.Event()
+
+    async def client(idx: int) -> None:
+        for n in range(searches // clients):
+            started = time.perf_counter()
+            await retriever.search(_TOPICS[(idx + n) % len(_TOPICS)], mode="hybrid", top_k=5)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    async def background_writes() -> None:
+        n = 0
+        while not stop.is_set():
+            await writer.write_event("bench", "assistant", f"后台写入 {n}")
+            n += 1
+
+    baseline = store.stats()
+    write_task = asyncio.create_task(background_writes())
+    started = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await write_task
+    stats = store.stats()
+    await store.cleanup()
+
+    latencies.sort()
+    return {
+        "qps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "writes": stats["writes_done"] - baseline["writes_done"],
+        "waits": stats["backpressure_waits"] - baseline["backpressure_waits"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--readers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--searches", type=int, default=240)
+    parser.add_argument("--clients", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"{'readers':>7} | {'search qps':>10} | {'p50':>9} | {'p95':>9} | {'writes':>6} | {'bp waits':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "kuzu")
+        for readers in args.readers:
+            r = asyncio.run(_run(db_path, args.events, readers, args.searches, args.clients))
+            print(
+                f"{readers:>7} | {r['qps']:>10.1f} | {r['p50']:>6.1f} ms | {r['p95']:>6.1f} ms | "
+                f"{r['writes']:>6} | {r['waits']:>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
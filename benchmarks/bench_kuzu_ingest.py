@@ -0,0 +1,85 @@
+"""Benchmark: Kuzu event ingestion - per-message transactions vs the buffered UNWIND batches.
+
+Seeds a graph with N indexed events (COPY FROM CSV + text index backfill),
+then writes M chat messages two ways: the legacy path
+(``ensure_session`` + ``write_event`` per message, one transaction each)
+and ``KuzuWriter.ingest`` (buffered, one transaction per batch).
+Reports sustained events/s for both.
+
+    python benchmarks/bench_kuzu_ingest.py --events 0 20000 --messages 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.getcwd())
+from memory.kuzu_store import KuzuStore  # noqa: E402
+from memory.kuzu_text_index import KuzuTextIndex  # noqa: E402
+from memory.kuzu_writer import KuzuWriter  # noqa: E402
+
+_TOPICS = ["网关超时", "Redis 连接池", "asyncio 任务取消", "数据库迁移", "日志排查", "部署回滚"]
+
+
+def _text(i: int) -> str:
+    return f"{_TOPICS[i % len(_TOPICS)]} 第 {i} 次 排查记录 w{i % 997}x"
+
+
+async def _run(db_path: str, seed: int, messages: int, max_batch: int) -> tuple[float, float]:
+    store = KuzuStore(db_path=db_path, vector_index=False)
+    await store.initialize()
+    if seed:
+        staging = Path(db_path).with_suffix(".csv")
+        with staging.open("w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            for i in range(seed):
+                writer.writerow([f"seed{i}", "seed", i, "user", _text(i), "", ""])
+        await store.submit_write(
+            store.conn.execute, f"COPY Event FROM '{staging.as_posix()}' (HEADER=false)"
+        )
+    await store.submit_write(KuzuTextIndex(store).backfill_sync)
+
+    writer = KuzuWriter(store, max_batch=max_batch)
+    started = time.perf_counter()
+    for i in range(messages):
+        await writer.ensure_session("legacy")
+        await writer.write_event("legacy", "user", _text(i))
+    legacy = messages / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for i in range(messages):
+        writer.ingest.add_event("buffered", "user", _text(i))
+        if i % 16 == 0:
+            await asyncio.sleep(0)  # 让出事件循环，模拟消息陆续到达
+    await writer.ingest.close()
+    buffered = messages / (time.perf_counter() - started)
+
+    await store.cleanup()
+    return legacy, buffered
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, nargs="+", default=[0, 20000])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--max-batch", type=int, default=256)
+    args = parser.parse_args()
+
+    print(f"{'events':>8} | {'per-message':>12} | {'buffered':>10} | {'speedup':>7}")
+    for seed in args.events:
+        with tempfile.TemporaryDirectory() as tmp:
+            legacy, buffered = asyncio.run(
+                _run(str(Path(tmp) / "kuzu"), seed, args.messages, args.max_batch)
+            )
+        print(f"{seed:>8} | {legacy:>8.0f} ev/s | {buffered:>6.0f} ev/s | {buffered / legacy:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Benchmark: Kuzu rebuild from SQLite - CSV staging + COPY FROM vs replaying messages through the writer.
+
+Seeds a SQLite store with N messages spread over sessions (a fraction with
+stored embeddings), then rebuilds the Kuzu graph with ``KuzuRebuilder`` and
+prints stage timings. For comparison it replays the first M messages
+through ``KuzuWriter.ingest`` (the live write path) and extrapolates.
+
+    python benchmarks/bench_kuzu_rebuild.py --messages 100000 --replay 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import closing
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+from memory.kuzu_rebuild import KuzuRebuilder  # noqa: E402
+from memory.kuzu_store import KuzuStore  # noqa: E402
+from memory.kuzu_writer import KuzuWriter  # noqa: E402
+from memory.storage import MemoryStorage  # noqa: E402
+from memory.vector_codec import pack_embedding  # noqa: E402
+
+_TOPICS = ["网关超时", "Redis 连接池", "asyncio 任务取消", "数据库迁移", "日志排查", "部署回滚"]
+
+
+def _text(i: int) -> str:
+    return f"{_TOPICS[i % len(_TOPICS)]} 第 {i} 次 排查记录 w{i % 997}x"
+
+
+def _seed(path: str, messages: int, per_session: int, embedded: float) -> None:
+    async def schema() -> None:
+        storage = MemoryStorage(db_path=path, use_vector_index=False)
+        await storage.initialize()
+        await storage.cleanup()
+
+    asyncio.run(schema())
+    start = datetime(2025, 1, 1)
+    rng = np.random.default_rng(0)
+    with closing(sqlite3.connect(path)) as db, db:
+        db.executemany(
+            "INSERT INTO messages (id, session_id, role, content, timestamp, message_metadata) "
+            "VALUES (?, ?, ?, ?, ?, '{}')",
+            (
+                (
+                    f"m{i:08d}",
+                    f"s{i // per_session:06d}",
+                    "user" if i % 2 == 0 else "assistant",
+                    _text(i),
+                    str(start + timedelta(seconds=i)),
+                )
+                for i in range(messages)
+            ),
+        )
+        db.executemany(
+            "INSERT INTO memory_embeddings "
+            "(id, source_type, source_id, content, embedding, created_at, updated_at) "
+            "VALUES (?, 'message', ?, '', ?, ?, ?)",
+            (
+                (f"e{i:08d}", f"m{i:08d}", pack_embedding(rng.standard_normal(128).tolist()), str(start), str(start))
+                for i in range(0, messages, max(1, int(1 / embedded)) if embedded else messages + 1)
+            ),
+        )
+
+
+async def _replay(kuzu_path: str, messages: int, per_session: int) -> float:
+    store = KuzuStore(db_path=kuzu_path, vector_index=False)
+    await store.initialize()
+    writer = KuzuWriter(store)
+    started = time.perf_counter()
+    for i in range(messages):
+        writer.ingest.add_event(f"s{i // per_session:06d}", "user", _text(i))
+        if i % 16 == 0:
+            await asyncio.sleep(0)
+    await writer.ingest.close()
+    rate = messages / (time.perf_counter() - started)
+    await store.cleanup()
+    return rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--per-session", type=int, default=40)
+    parser.add_argument("--embedded", type=float, default=0.1, help="fraction with stored embeddings")
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    parser.add_argument("--replay", type=int, default=5000, help="messages replayed through the writer")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite_path = str(Path(tmp) / "sessions.db")
+        kuzu_path = str(Path(tmp) / "kuzu")
+        _seed(sqlite_path, args.messages, args.per_session, args.embedded)
+
+        report = KuzuRebuilder(
+            sqlite_path, kuzu_path, chunk_rows=args.chunk_rows, progress=print
+        ).run()
+        rebuild_rate = report.events / max(report.seconds, 1e-9)
+
+        replay_rate = asyncio.run(_replay(str(Path(tmp) / "replay"), args.replay, args.per_session))
+
+    print()
+    print(f"{'path':>10} | {'events/s':>9} | {'1M messages':>11}")
+    print(f"{'rebuild':>10} | {rebuild_rate:>9.0f} | {1_000_000 / rebuild_rate / 60:>8.1f} min")
+    print(f"{'replay':>10} | {replay_rate:>9.0f} | {1_000_000 / replay_rate / 60:>8.1f} min (fresh graph, optimistic)")
+
+
+if __name__ == "__main__":
+    main()
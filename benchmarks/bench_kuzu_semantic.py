@@ -0,0 +1,133 @@
+"""Benchmark: Kuzu semantic search - literal-embedding Cypher vs prepared statements vs HNSW.
+
+Bulk loads N Event nodes (COPY FROM a CSV staging file), then times
+``KuzuRetriever._semantic_search_sync`` three ways:
+
+  legacy    the old query with the vector formatted into the Cypher text
+  prepared  bound $q parameter, statement prepared once, full scan
+  hnsw      QUERY_VECTOR_INDEX on the Event.embedding vector index
+
+Recall@k of the HNSW path is measured against the exact full scan.
+
+    python benchmarks/bench_kuzu_semantic.py --events 100000 --queries 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.getcwd())
+from memory.embeddings import EmbeddingConfig, LocalEmbeddingEngine  # noqa: E402
+from memory.kuzu_retriever import KuzuRetriever  # noqa: E402
+from memory.kuzu_store import EMBEDDING_DIM, KuzuStore, execute_sync  # noqa: E402
+
+_TOPICS = ["网关超时", "Redis 连接池", "asyncio 任务取消", "数据库迁移", "日志排查", "部署回滚",
+           "向量索引", "消息队列", "权限校验", "缓存击穿"]
+_WORDS = ["nginx", "502", "timeout", "pool", "retry", "deploy", "schema", "index", "cursor",
+          "worker", "lock", "kafka", "token", "session", "vector", "graph", "batch", "latency"]
+
+
+def _legacy_semantic_search(conn, embedder: LocalEmbeddingEngine, query: str, top_k: int) -> list:
+    """The pre-change query: the vector is a Cypher literal, re-planned per call."""
+    emb_str = "[" + ", ".join(f"{v:.6f}" for v in embedder.embed(query)) + "]"
+    return execute_sync(
+        conn,
+        f"""
+        MATCH (e:Event)
+        WHERE e.embedding IS NOT NULL
+        RETURN e.id, e.content, e.role,
+               array_cosine_similarity(e.embedding, CAST({emb_str} AS FLOAT[{EMBEDDING_DIM}])) AS score
+        ORDER BY score DESC
+        LIMIT {top_k * 2}
+        """,
+    )
+
+
+def _text(rng: random.Random) -> str:
+    return f"{rng.choice(_TOPICS)} {' '.join(rng.sample(_WORDS, 4))} #{rng.randrange(10**6)}"
+
+
+def _load_events(store: KuzuStore, count: int, staging: Path, seed: int) -> None:
+    rng = random.Random(seed)
+    embedder = LocalEmbeddingEngine(EmbeddingConfig(dimension=EMBEDDING_DIM))
+    with staging.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        for start in range(0, count, 1000):
+            texts = [_text(rng) for _ in range(min(1000, count - start))]
+            matrix = embedder.embed_batch(texts)
+            for offset, (text, vector) in enumerate(zip(texts, matrix)):
+                idx = start + offset
+                writer.writerow([
+                    f"e{idx}", "bench", idx, "user", text, "",
+                    "[" + ",".join(f"{v:.6f}" for v in vector) + "]",
+                ])
+    store.conn.execute(f"COPY Event FROM '{staging.as_posix()}' (HEADER=false)")
+    store.event_count = count
+
+
+def _time(fn, queries: list[str]) -> tuple[float, float]:
+    samples = []
+    for query in queries:
+        started = time.perf_counter()
+        fn(query)
+        samples.append((time.perf_counter() - started) * 1000)
+    ordered = sorted(samples)
+    return statistics.median(ordered), ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed + 1)
+    queries = [_text(rng) for _ in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = KuzuStore(db_path=str(Path(tmp) / "kuzu"), vector_index=False, vector_index_min_events=0)
+        store._init_sync()
+        started = time.perf_counter()
+        _load_events(store, args.events, Path(tmp) / "events.csv", args.seed)
+        print(f"loaded {args.events} events in {time.perf_counter() - started:.1f}s")
+
+        retriever = KuzuRetriever(store)
+        legacy = _time(lambda q: _legacy_semantic_search(store.conn, retriever._embedder, q, args.top_k), queries)
+        exact = {q: [h.event_id for h in retriever._semantic_search_sync(q, args.top_k)] for q in queries}
+        prepared = _time(lambda q: retriever._semantic_search_sync(q, args.top_k), queries)
+
+        started = time.perf_counter()
+        store.vector_index_enabled = True
+        store._ensure_vector_index()
+        build_s = time.perf_counter() - started
+        if not store.use_vector_index:
+            print("vector index unavailable; skipping hnsw")
+            rows = [("legacy", legacy), ("prepared", prepared)]
+        else:
+            hnsw = _time(lambda q: retriever._semantic_search_sync(q, args.top_k), queries)
+            recalls = []
+            for q in queries:
+                expected = set(exact[q])
+                got = {h.event_id for h in retriever._semantic_search_sync(q, args.top_k)}
+                if expected:
+                    recalls.append(len(expected & got) / len(expected))
+            print(f"hnsw build {build_s:.1f}s, recall@{args.top_k} {statistics.mean(recalls):.3f}")
+            rows = [("legacy", legacy), ("prepared", prepared), ("hnsw", hnsw)]
+
+        print(f"{'mode':>9} | {'p50 ms':>8} | {'p95 ms':>8}")
+        for label, (p50, p95) in rows:
+            print(f"{label:>9} | {p50:>8.2f} | {p95:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Benchmark: one ReAct turn with several independent tool calls, serial versus concurrent execution.
+
+The stub model returns K tool calls (search_web / query_memory / read_file,
+each sleeping a random 50-400ms) in its first completion and answers in the
+second. Runs the same turns with max_parallel_tools=1 (the old serial loop)
+and with the configured cap, and reports the p50 turn latency.
+
+    python benchmarks/bench_parallel_tools.py --calls 3 6 --turns 20 --cap 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+from loguru import logger
+
+sys.path.append(os.getcwd())
+from core.agent_core import AgentCore  # noqa: E402
+from core.agent_orchestration import IntentRoute, IntentType  # noqa: E402
+from tools.registry import ToolRegistry  # noqa: E402
+
+_TOOLS = ["search_web", "query_memory", "read_file"]
+
+
+def _agent(cap: int, latencies: dict[str, float], calls: list[dict]) -> AgentCore:
+    config = SimpleNamespace(
+        llm={"api_base": "http://localhost/v1", "api_key": "x", "model": "stub", "system_prompt": ""},
+        agent={"max_tool_iterations": 4, "max_parallel_tools": cap},
+        memory=SimpleNamespace(memory_root="data/memory"),
+    )
+    agent = AgentCore(config)
+
+    async def route(messages):
+        return IntentRoute(intent=IntentType.WORKSPACE_ACTION, user_query="q", reason="stub", confidence=1.0)
+
+    async def stream(messages, tools=None):
+        if messages[-1]["role"] == "user":
+            yield {"type": "tool_calls", "tool_calls": calls}
+        else:
+            yield {"type": "text_delta", "content": "好"}
+
+    async def execute(tool_name, parameters):
+        await asyncio.sleep(latencies[parameters["key"]])
+        return "ok"
+
+    agent.router.route_async = route
+    agent.llm_engine.chat_with_tools_stream = stream
+    agent._execute_tool = execute
+    return agent
+
+
+async def _turn(agent: AgentCore) -> float:
+    started = time.perf_counter()
+    async for event in agent.process_message_stream([{"role": "user", "content": "q"}]):
+        if event["type"] == "error":
+            raise RuntimeError(event["error"])
+    return (time.perf_counter() - started) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, nargs="+", default=[3, 6])
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--cap", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logger.remove()
+    ToolRegistry.get_tool_definitions = classmethod(lambda cls: [{"function": {"name": n}} for n in _TOOLS])
+    rng = random.Random(args.seed)
+    print(f"{'calls':>5} | {'serial p50':>10} | {f'cap={args.cap} p50':>10} | {'speedup':>7}")
+    for count in args.calls:
+        results = {}
+        turns = []
+        for _ in range(args.turns):
+            keys = [f"k{i}" for i in range(count)]
+            latencies = {key: rng.uniform(0.05, 0.4) for key in keys}
+            calls = [
+                {"id": f"tc-{i}", "name": _TOOLS[i % len(_TOOLS)], "arguments": json.dumps({"key": key})}
+                for i, key in enumerate(keys)
+            ]
+            turns.append((latencies, calls))
+        for label, cap in (("serial", 1), ("parallel", args.cap)):
+            results[label] = statistics.median(
+                asyncio.run(_turn(_agent(cap, latencies, calls))) for latencies, calls in turns
+            )
+        print(
+            f"{count:>5} | {results['serial']:>8.0f}ms | {results['parallel']:>8.0f}ms | "
+            f"{results['serial'] / results['parallel']:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark: cold SessionManager.get_session latency versus session length.
+
+Seeds sessions of increasing size directly through MemoryStorage, then times
+cold loads (LRU cache cleared before every call). With tail-first keyset
+pagination the latency should stay flat as the session grows; the legacy
+full ``get_messages`` read is timed alongside for comparison.
+
+    python benchmarks/bench_session_load.py --sizes 100 1000 10000 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from uuid import uuid4
+
+sys.path.append(os.getcwd())
+from core.session_manager import SessionManager  # noqa: E402
+
+
+async def _seed(manager: SessionManager, size: int) -> str:
+    session_id = (await manager.create_session({})).session_id
+    start = datetime.now() - timedelta(seconds=size)
+    batch: list[dict] = []
+    for i in range(size):
+        batch.append(
+            {
+                "id": str(uuid4()),
+                "session_id": session_id,
+                "role": "user" if i % 2 == 0 else "assistant",
+                "content": f"第 {i} 条消息：网关超时排查记录",
+                "metadata": {},
+                "timestamp": start + timedelta(seconds=i),
+            }
+        )
+        if len(batch) >= 2000:
+            await manager.storage.save_messages_batch(batch, [])
+            batch = []
+    if batch:
+        await manager.storage.save_messages_batch(batch, [])
+    return session_id
+
+
+async def _time_ms(coro_factory, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await coro_factory()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+async def _run(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        config = SimpleNamespace(
+            sqlite_path=str(Path(tmp) / "sessions.db"),
+            memory_root=str(Path(tmp) / "memory"),
+            cache_size=10,
+            auto_flush_interval=3600,
+            embedding_poll_interval=3600,
+            session_page_size=args.page_size,
+        )
+        manager = SessionManager(config)
+        await manager.initialize()
+        try:
+            print(f"{'messages':>9} | {'cold get_session p50':>21} | {'full get_messages p50':>22}")
+            for size in args.sizes:
+                session_id = await _seed(manager, size)
+
+                async def cold_load():
+                    manager.cache.clear()
+                    await manager.get_session(session_id)
+
+                async def full_read():
+                    await manager.storage.get_messages(session_id, limit=size)
+
+                cold = await _time_ms(cold_load, args.repeats)
+                full = await _time_ms(full_read, args.repeats)
+                print(f"{size:>9} | {cold:>18.2f} ms | {full:>19.2f} ms")
+        finally:
+            await manager.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 50000])
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=20)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
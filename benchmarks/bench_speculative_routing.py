@@ -0,0 +1,93 @@
+"""Benchmark: time-to-first-token with sequential versus speculative intent routing.
+
+Drives AgentCore.process_message_stream against a stub LLM engine whose intent
+classifier takes --classify-ms and whose streaming completion takes
+--first-token-ms before its first delta. Sequential routing pays both latencies
+back to back; speculative routing overlaps them and only restarts the stream
+when the classifier changes the tool allowlist chosen by the rule router.
+Queries are a fixed mix where the rules and the classifier agree on roughly
+--agree of the turns.
+
+    python benchmarks/bench_speculative_routing.py --turns 40 --classify-ms 400 --first-token-ms 300
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+from loguru import logger
+
+sys.path.append(os.getcwd())
+from core.agent_core import AgentCore  # noqa: E402
+from tools.registry import ToolRegistry  # noqa: E402
+
+# (用户消息, LLM 分类结果)：前者规则路由与分类一致，后者规则判为闲聊但分类需要工具
+_AGREE = [("帮我查一下今天的汇率", "realtime_info"), ("你还记得上次聊的咖啡店吗", "memory"), ("早上好呀", "chat")]
+_DISAGREE = [("帮我看看那个东西", "workspace_action"), ("明年走势怎么样", "realtime_info")]
+_TOOLS = ["bash", "read_file", "write_file", "edit_file", "search_web", "super_search", "query_memory"]
+
+
+def _agent(speculative: bool, classify_s: float, first_token_s: float) -> AgentCore:
+    config = SimpleNamespace(
+        llm={"api_base": "http://localhost/v1", "api_key": "x", "model": "stub", "system_prompt": ""},
+        agent={"max_tool_iterations": 4, "orchestration": {"speculative_routing": speculative}},
+        memory=SimpleNamespace(memory_root="data/memory"),
+    )
+    agent = AgentCore(config)
+    intents: dict[str, str] = dict(_AGREE + _DISAGREE)
+
+    async def classify(messages, **_kwargs):
+        await asyncio.sleep(classify_s)
+        payload = {"intent": intents[messages[-1]["content"]], "reason": "stub", "confidence": 0.9}
+        return {"type": "tool_calls", "tool_calls": [{"id": "c", "name": "classify_intent", "arguments": json.dumps(payload)}]}
+
+    async def stream(messages, tools=None):
+        await asyncio.sleep(first_token_s)
+        for _ in range(8):
+            yield {"type": "text_delta", "content": "好"}
+            await asyncio.sleep(0.005)
+
+    agent.llm_engine.chat_with_tools = classify
+    agent.llm_engine.chat_with_tools_stream = stream
+    return agent
+
+
+async def _run(speculative: bool, queries: list[str], classify_s: float, first_token_s: float) -> dict:
+    agent = _agent(speculative, classify_s, first_token_s)
+    for query in queries:
+        async for event in agent.process_message_stream([{"role": "user", "content": query}]):
+            if event["type"] == "error":
+                raise RuntimeError(event["error"])
+    return agent.get_latency_stats()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--classify-ms", type=float, default=400)
+    parser.add_argument("--first-token-ms", type=float, default=300)
+    parser.add_argument("--agree", type=float, default=0.8, help="share of turns where rules match the classifier")
+    args = parser.parse_args()
+
+    logger.remove()
+    ToolRegistry.get_tool_definitions = classmethod(lambda cls: [{"function": {"name": n}} for n in _TOOLS])
+    agree_turns = round(args.turns * args.agree)
+    queries = [_AGREE[i % len(_AGREE)][0] for i in range(agree_turns)]
+    queries += [_DISAGREE[i % len(_DISAGREE)][0] for i in range(args.turns - agree_turns)]
+
+    classify_s, first_token_s = args.classify_ms / 1000, args.first_token_ms / 1000
+    print(f"turns={args.turns} classify={args.classify_ms:.0f}ms first_token={args.first_token_ms:.0f}ms agree={args.agree:.0%}")
+    print(f"{'mode':>12} | {'ttft p50':>9} | {'ttft max':>9} | {'reroutes':>8}")
+    for mode, speculative in (("sequential", False), ("speculative", True)):
+        stats = asyncio.run(_run(speculative, queries, classify_s, first_token_s))
+        ttft = stats[mode]
+        print(f"{mode:>12} | {ttft['ttft_p50_ms']:>7.0f}ms | {ttft['ttft_max_ms']:>7.0f}ms | {stats['reroutes']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Benchmark: MemoryStorage under concurrent API sessions plus the embedding worker.
+
+Each simulated session saves a user message, enqueues its embedding job,
+runs a keyword + semantic recall and saves an assistant reply. A worker
+drains the embedding queue in batches at the same time. Runs the default
+SQLite profile (WAL + read-only pool) against a legacy profile (rollback
+journal, synchronous=FULL, shared pool).
+
+    python benchmarks/bench_sqlite_concurrency.py --sessions 32 --turns 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.getcwd())
+from memory.embeddings import LocalEmbeddingEngine  # noqa: E402
+from memory.storage import MemoryStorage  # noqa: E402
+
+LEGACY_PROFILE = {
+    "journal_mode": "DELETE",
+    "synchronous": "FULL",
+    "mmap_size_mb": None,
+    "cache_size_mb": None,
+    "temp_store": None,
+    "busy_timeout_ms": 5000,
+    "read_pool_size": 0,
+}
+_TOPICS = ["网关超时", "Redis 连接池", "asyncio 任务取消", "数据库迁移", "日志排查", "部署回滚"]
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] if ordered else 0.0
+
+
+async def _session(storage: MemoryStorage, engine: LocalEmbeddingEngine, idx: int, turns: int,
+                   write_ms: list[float], read_ms: list[float]) -> None:
+    session_id = await storage.create_session({"channel": "bench"})
+    for turn in range(turns):
+        topic = _TOPICS[(idx + turn) % len(_TOPICS)]
+        start = time.perf_counter()
+        message_id = await storage.save_message(session_id, "user", f"{topic} 第 {turn} 轮问题")
+        await storage.enqueue_embedding_job("message", message_id, f"{topic} 第 {turn} 轮问题")
+        write_ms.append((time.perf_counter() - start) * 1e3)
+
+        start = time.perf_counter()
+        await storage.search_messages_by_keyword(topic.split()[0], limit=20)
+        await storage.search_memory_embeddings(engine.embed(topic), limit=20)
+        read_ms.append((time.perf_counter() - start) * 1e3)
+
+        start = time.perf_counter()
+        await storage.save_message(session_id, "assistant", f"关于{topic}的回答 {turn}")
+        write_ms.append((time.perf_counter() - start) * 1e3)
+
+
+async def _worker(storage: MemoryStorage, engine: LocalEmbeddingEngine, stop: asyncio.Event,
+                  batch_size: int) -> int:
+    done = 0
+    while True:
+        jobs = await storage.list_due_embedding_jobs(limit=batch_size, ignore_schedule=True)
+        if not jobs:
+            if stop.is_set():
+                return done
+            await asyncio.sleep(0.01)
+            continue
+        vectors = engine.embed_batch([job.content for job in jobs])
+        await storage.apply_embedding_batch(
+            [
+                {"source_type": j.source_type, "source_id": j.source_id,
+                 "content": j.content, "embedding": v}
+                for j, v in zip(jobs, vectors)
+            ],
+            [
+                {"job_id": j.id, "status": "completed", "retry_count": 0,
+                 "next_retry_at": None, "last_error": ""}
+                for j in jobs
+            ],
+            [],
+        )
+        done += len(jobs)
+
+
+async def _run(label: str, profile: dict | None, args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = MemoryStorage(str(Path(tmp) / "sessions.db"), sqlite_profile=profile)
+        await storage.initialize()
+        engine = LocalEmbeddingEngine()
+        write_ms: list[float] = []
+        read_ms: list[float] = []
+        stop = asyncio.Event()
+
+        start = time.perf_counter()
+        worker = asyncio.create_task(_worker(storage, engine, stop, args.batch))
+        await asyncio.gather(
+            *(_session(storage, engine, i, args.turns, write_ms, read_ms) for i in range(args.sessions))
+        )
+        stop.set()
+        embedded = await worker
+        elapsed = time.perf_counter() - start
+        await storage.cleanup()
+
+    turns = args.sessions * args.turns
+    print(
+        f"{label:<8} turns/s={turns / elapsed:8.1f}  "
+        f"write p50={statistics.median(write_ms):6.2f}ms p95={_percentile(write_ms, 0.95):7.2f}ms  "
+        f"read p50={statistics.median(read_ms):6.2f}ms p95={_percentile(read_ms, 0.95):7.2f}ms  "
+        f"embedded={embedded}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--batch", type=int, default=32)
+    args = parser.parse_args()
+
+    asyncio.run(_run("legacy", LEGACY_PROFILE, args))
+    asyncio.run(_run("tuned", None, args))
+
+
+if __name__ == "__main__":
+    main()
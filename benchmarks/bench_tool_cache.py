@@ -0,0 +1,124 @@
+"""Benchmark: shared tool-result cache - per-tool hit rate and time saved across turns and sessions.
+
+Replays N tool calls drawn Zipf-style from a pool of read_file paths (real
+files in a temp dir, a fraction rewritten between calls), search_web-style
+queries (stub tool sleeping --search-ms, with case/whitespace variants) and
+bash commands (never cached). Runs the same call sequence with the cache
+disabled and enabled through ToolRegistry.execute.
+
+    python benchmarks/bench_tool_cache.py --calls 2000 --search-ms 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from loguru import logger
+
+sys.path.append(os.getcwd())
+from tools.base import BaseTool, ToolDefinition  # noqa: E402
+from tools.builtin import read_file  # noqa: E402
+from tools.builtin import search_web  # noqa: E402
+from tools.registry import ToolRegistry  # noqa: E402
+from tools.result_cache import ToolResultCache  # noqa: E402
+
+
+class _StubSearch(BaseTool):
+    cache_policy = search_web.Tool.cache_policy
+
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+
+    @property
+    def definition(self) -> ToolDefinition:
+        return ToolDefinition(name="search_web", description="stub", parameters={})
+
+    async def execute(self, query: str, max_results: int = 5) -> str:
+        await asyncio.sleep(self.latency_s)
+        return f"results for {query}"
+
+
+class _StubBash(BaseTool):
+    parallel_safe = False
+
+    @property
+    def definition(self) -> ToolDefinition:
+        return ToolDefinition(name="bash", description="stub", parameters={})
+
+    async def execute(self, command: str) -> str:
+        await asyncio.sleep(0.001)
+        return command
+
+
+def _workload(calls: int, files: int, queries: int, seed: int) -> list[tuple[str, dict, str | None]]:
+    """(tool, arguments, path to rewrite before the call or None)."""
+    rng = random.Random(seed)
+    weight = lambda n: [1.0 / (i + 1) for i in range(n)]  # noqa: E731
+    items = []
+    for _ in range(calls):
+        roll = rng.random()
+        if roll < 0.5:
+            path = f"f{rng.choices(range(files), weight(files))[0]}.txt"
+            items.append(("read_file", {"path": path}, path if rng.random() < 0.05 else None))
+        elif roll < 0.9:
+            query = f"上海 {rng.choices(range(queries), weight(queries))[0]} 月房价"
+            if rng.random() < 0.3:
+                query = "  " + query.upper().replace(" ", "   ")
+            items.append(("search_web", {"query": query}, None))
+        else:
+            items.append(("bash", {"command": "git status"}, None))
+    return items
+
+
+async def _replay(workload, root: Path) -> float:
+    started = time.perf_counter()
+    for tool, arguments, rewrite in workload:
+        if rewrite:
+            (root / rewrite).write_text(f"rewritten {time.perf_counter()}", encoding="utf-8")
+        await ToolRegistry.execute(tool, arguments)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--search-ms", type=float, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logger.remove()
+    workload = _workload(args.calls, args.files, args.queries, args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        read_file._WORKDIR = root
+        for i in range(args.files):
+            (root / f"f{i}.txt").write_text("x" * 2000, encoding="utf-8")
+        ToolRegistry._tools = {}
+        ToolRegistry.register(read_file.Tool())
+        ToolRegistry.register(_StubSearch(args.search_ms / 1000))
+        ToolRegistry.register(_StubBash())
+
+        print(f"calls={args.calls} files={args.files} queries={args.queries} search={args.search_ms:.0f}ms")
+        for label, entries in (("no cache", 0), ("cache", 512)):
+            ToolRegistry._result_cache = ToolResultCache(max_entries=entries)
+            elapsed = asyncio.run(_replay(workload, root))
+            print(f"{label:>8}: {elapsed:.2f}s")
+        for tool, stats in sorted(ToolRegistry.cache_stats()["tools"].items()):
+            print(
+                f"{tool:>12}: hit rate {stats['hit_rate']:.1%} "
+                f"({stats['hits']} hits, {stats['misses']} misses, {stats['invalidations']} invalidated)"
+            )
+        print(f"{'bash':>12}: never cached")
+
+
+if __name__ == "__main__":
+    main()
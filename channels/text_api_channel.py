@@ -9,6 +9,8 @@ import json
 from loguru import logger
 
 from channels.base import BaseChannel
+from memory.retrieval_filter import RetrievalFilter
+from tools.registry import ToolRegistry
 
 
 class ChatRequest(BaseModel):
@@ -96,10 +98,8 @@ class TextAPIChannel(BaseChannel):
 
                 # Get context and process
                 # 获取上下文并处理请求
-                context = await self.session_manager.get_session(session_id)
-                messages = await self.session_manager.prepare_messages_for_agent(
-                    context.messages
-                )
+                history = await self.session_manager.get_context_messages(session_id)
+                messages = await self.session_manager.prepare_messages_for_agent(history)
 
                 # Collect full response
                 # 聚合完整回复
@@ -153,10 +153,8 @@ class TextAPIChannel(BaseChannel):
 
                 # Get context
                 # 获取会话上下文
-                context = await self.session_manager.get_session(session_id)
-                messages = await self.session_manager.prepare_messages_for_agent(
-                    context.messages
-                )
+                history = await self.session_manager.get_context_messages(session_id)
+                messages = await self.session_manager.prepare_messages_for_agent(history)
 
                 async def generate():
                     """Generate streaming response"""
@@ -238,6 +236,25 @@ class TextAPIChannel(BaseChannel):
                 logger.error(f"Create session error: {e}")
                 raise HTTPException(status_code=500, detail=str(e))
 
+        @self.app.get("/api/sessions/{session_id}/messages/older")
+        async def load_older_messages(session_id: str, limit: Optional[int] = None):
+            """Backfill the page before the oldest loaded message (scroll-up history)."""
+            try:
+                loaded = await self.session_manager.load_older_messages(session_id, limit=limit)
+                context = await self.session_manager.get_session(session_id)
+                if context is None:
+                    raise HTTPException(status_code=404, detail="Session not found")
+                return {
+                    "loaded": loaded,
+                    "has_older": context.has_older,
+                    "messages": context.messages[:loaded],
+                }
+            except HTTPException:
+                raise
+            except Exception as e:
+                logger.error(f"Load older messages error: {e}")
+                raise HTTPException(status_code=500, detail=str(e))
+
         @self.app.delete("/api/sessions/{session_id}")
         async def delete_session(session_id: str):
             """Delete a session"""
@@ -370,12 +387,28 @@ class TextAPIChannel(BaseChannel):
                 raise HTTPException(status_code=500, detail=str(e))
 
         @self.app.get("/api/memory/search")
-        async def search_memory(q: str, limit: int = 5, mode: str = "hybrid"):
-            """Search historical memory/messages with hybrid or keyword mode."""
+        async def search_memory(
+            q: str,
+            limit: int = 5,
+            mode: str = "hybrid",
+            since: Optional[str] = None,
+            until: Optional[str] = None,
+            session_id: Optional[str] = None,
+            role: Optional[str] = None,
+        ):
+            """Search historical memory/messages with hybrid or keyword mode.
+
+            since/until (ISO), session_id and role (comma-separated) scope the search;
+            without them hybrid mode infers a time range from the query.
+            """
+            try:
+                filters = RetrievalFilter.build(since, until, session_id, role)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
             try:
                 if mode == "keyword":
-                    return await self.session_manager.search_memory_by_keyword(q, limit=limit)
-                return await self.session_manager.search_memory_hybrid(q, limit=limit)
+                    return await self.session_manager.search_memory_by_keyword(q, limit=limit, filters=filters)
+                return await self.session_manager.search_memory_hybrid(q, limit=limit, filters=filters or None)
             except Exception as e:
                 logger.error(f"Search memory error: {e}")
                 raise HTTPException(status_code=500, detail=str(e))
@@ -389,6 +422,14 @@ class TextAPIChannel(BaseChannel):
                 logger.error(f"Get memory metrics error: {e}")
                 raise HTTPException(status_code=500, detail=str(e))
 
+        @self.app.get("/api/agent/metrics")
+        async def agent_metrics():
+            """Get routing latency and tool result cache metrics."""
+            return {
+                "latency": self.agent_core.get_latency_stats(),
+                "tool_cache": ToolRegistry.cache_stats(),
+            }
+
         @self.app.get("/api/memory/embedding-jobs")
         async def list_embedding_jobs(status: Optional[str] = None, limit: int = 50):
             """List async embedding jobs."""
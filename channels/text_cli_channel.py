@@ -62,10 +62,10 @@ class TextCLIChannel(BaseChannel):
 
                 # Get conversation context
                 # 获取会话上下文
-                context = await self.session_manager.get_session(self.current_session.session_id)
-                messages = await self.session_manager.prepare_messages_for_agent(
-                    context.messages
+                history = await self.session_manager.get_context_messages(
+                    self.current_session.session_id
                 )
+                messages = await self.session_manager.prepare_messages_for_agent(history)
 
                 # Stream response
                 # 流式输出回复
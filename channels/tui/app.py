@@ -227,12 +227,10 @@ class ShiYiApp(App):
             thinking_removed = False
 
             # Get conversation context
-            context = await self.session_manager.get_session(
+            history = await self.session_manager.get_context_messages(
                 self.current_session.session_id
             )
-            messages = await self.session_manager.prepare_messages_for_agent(
-                context.messages
-            )
+            messages = await self.session_manager.prepare_messages_for_agent(history)
 
             # Track timing
             t0 = time.monotonic()
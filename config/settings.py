@@ -68,23 +68,76 @@ class AudioConfig(BaseModel):
     input_channels: int = 1
 
 
+class ToolCacheConfig(BaseModel):
+    """跨轮次工具结果缓存配置（仅缓存声明了 cache_policy 的只读工具）"""
+    enabled: bool = True
+    max_entries: int = 512
+    max_chars: int = 4_000_000  # 缓存结果总字符数上限
+    ttl_seconds: dict[str, float] = {}  # 按工具覆盖 TTL，0 关闭该工具的缓存
+
+
 class ToolsConfig(BaseModel):
     """Tools configuration"""
     builtin: list[str] = []
     mcp: dict = {"enabled": False, "servers": []}
+    cache: ToolCacheConfig = Field(default_factory=ToolCacheConfig)
+
+
+class SQLiteProfileConfig(BaseModel):
+    """SQLite 连接参数（每个新连接执行 PRAGMA；null 表示保持 SQLite 默认）"""
+    journal_mode: Optional[str] = "WAL"
+    synchronous: Optional[str] = "NORMAL"
+    mmap_size_mb: Optional[int] = 256
+    cache_size_mb: Optional[int] = 64
+    temp_store: Optional[str] = "MEMORY"
+    busy_timeout_ms: Optional[int] = 5000
+    read_pool_size: int = 4  # 检索专用只读连接池大小，0 关闭（读写共用连接）
 
 
 class MemoryConfig(BaseModel):
     """Memory configuration"""
     sqlite_path: str = "data/sessions.db"
+    sqlite: SQLiteProfileConfig = Field(default_factory=SQLiteProfileConfig)
     memory_root: str = "data/memory"
     cache_size: int = 100
+    session_page_size: int = 50  # 冷加载会话时读取的最新消息条数（键集分页）
+    session_message_cap: int = 200  # 单会话内存中最多保留的消息数，0 不限制
+    context_history_messages: int = 100  # 构建模型上下文时至少带入的历史条数，冷加载不足时回填
     auto_flush_interval: int = 60
     embedding_dimension: int = 128
     embedding_retry_limit: int = 3
     embedding_retry_base_seconds: int = 10
     embedding_poll_interval: int = 5
+    embedding_batch_size: int = 32  # 每批向量化并单事务提交的任务数
+    retrieval_branch_timeout: float = 1.5  # 混合检索每路（语义/关键词）超时秒数
+    event_flush_interval: float = 1.0  # 记忆事件缓冲写入间隔（秒）
+    query_cache_size: int = 256  # 混合检索结果缓存条数，0 关闭
+    query_cache_ttl: float = 60.0  # 检索缓存过期秒数
+    write_behind_enabled: bool = True  # 消息写后合并提交（group commit）
+    write_behind_interval_ms: int = 5  # 合并提交的最长等待毫秒数
+    write_behind_max_batch: int = 64  # 累积到 N 条立即提交
+    vector_index_enabled: bool = True  # 常驻向量索引，False 回退全表扫描
+    # IVF 近似检索（召回率 vs 延迟）：nprobe 越大召回越高、越慢；nlist=0 自动取 sqrt(N)
+    ann_enabled: bool = False
+    ann_nlist: int = 0
+    ann_nprobe: int = 8
+    ann_min_train_size: int = 4096
     kuzu_path: str = "data/kuzu"  # Kuzu 图数据库路径
+    kuzu_vector_index: bool = True  # Event.embedding 建 HNSW 向量索引（VECTOR 扩展）
+    kuzu_vector_index_min_events: int = 20000  # 事件数达到阈值后语义检索才走 HNSW
+    kuzu_read_connections: int = 4  # Kuzu 读连接池大小（检索并行度）
+    kuzu_write_queue_size: int = 256  # Kuzu 写线程在途请求上限，满了写入方等待
+    kuzu_ingest_flush_interval_ms: int = 50  # 事件 / 实体写入缓冲的提交间隔
+    kuzu_ingest_max_batch: int = 256  # 缓冲条目达到该数量立即提交
+    # 记忆压缩：热集之外的旧消息按会话聚类成摘要，原始消息移入冷归档库
+    compaction_enabled: bool = False
+    compaction_interval: int = 3600  # 后台压缩间隔（秒）
+    compaction_hot_messages: int = 5000  # 始终保留在热库的最新原始消息数
+    compaction_min_age_days: float = 30  # 早于该天数的消息才会被压缩
+    compaction_cluster_gap_minutes: float = 30  # 同一会话内停顿超过该分钟数即切分为新片段
+    compaction_max_cluster: int = 40  # 单个摘要最多折叠的消息数
+    compaction_summary_max_chars: int = 400  # 摘要文本最大长度
+    archive_path: Optional[str] = None  # 冷归档 SQLite 路径，默认 sqlite_path 旁的 *.archive.db
 
 
 class TUIConfig(BaseModel):
@@ -116,12 +169,36 @@ class ComplexityDetectorConfig(BaseModel):
     ])
 
 
+class OrchestrationConfig(BaseModel):
+    """意图路由与执行策略配置"""
+    enabled: bool = True
+    use_llm_intent_classifier: bool = True  # LLM 结构化分类，失败回退规则路由
+    speculative_routing: bool = False  # 规则路由先行、LLM 分类与主回复并行
+    intent_cache_size: int = 512  # 归一化查询 → 意图结果 LRU（0 关闭）
+    local_classifier_enabled: bool = True  # 用 LLM 分类日志训练的本地逻辑回归分类器
+    local_classifier_threshold: float = 0.85  # 本地分类置信度达到该值才直接采用
+    local_classifier_min_samples: int = 50  # 积累到 N 条 LLM 决策后才启用本地分类
+    intent_log_path: Optional[str] = None  # LLM 意图决策日志（JSONL），启动时据此重新训练
+    max_plan_steps: int = 3
+    force_evidence_section: bool = True
+    tool_budget_by_intent: dict[str, int] = Field(default_factory=lambda: {
+        "chat": 0,
+        "memory": 2,
+        "realtime_info": 2,
+        "workspace_action": 3,
+    })
+
+
 class AgentConfig(BaseModel):
     """Agent 配置"""
     enable_sub_agents: bool = True
     max_tool_iterations: int = 5
+    max_parallel_tools: int = 4  # 同一轮多个工具调用的并发上限（1 = 串行）
+    tool_timeout: float = 60.0  # 单个工具调用超时秒数（0 不限）
+    tool_timeouts: dict[str, float] = Field(default_factory=lambda: {"bash": 0})  # 按工具覆盖超时
     context_budget: ContextBudgetConfig = Field(default_factory=ContextBudgetConfig)
     complexity_detector: ComplexityDetectorConfig = Field(default_factory=ComplexityDetectorConfig)
+    orchestration: OrchestrationConfig = Field(default_factory=OrchestrationConfig)
 
 
 class Settings(BaseModel):
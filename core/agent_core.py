@@ -2,19 +2,54 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
+import statistics
+import time
+from collections import deque
 from datetime import datetime
 from types import SimpleNamespace
 from typing import Any, AsyncIterator
 
 from loguru import logger
 
-from core.agent_orchestration import EvidenceCollector, OrchestrationRouter, PolicyScheduler
+from core.agent_orchestration import (
+    EvidenceCollector,
+    ExecutionPolicy,
+    IntentRoute,
+    OrchestrationRouter,
+    PolicyScheduler,
+)
 from core.complexity_detector import ComplexityDetector
 from core.context_builder import build_history_window, get_context_budget
+from core.intent_classifier import IntentRouteCache, LocalIntentClassifier
+from core.request_context import RequestContext
 from engines.llm.openai_compatible_engine import OpenAICompatibleEngine
 from tools.registry import ToolRegistry
 
+# 每种路由模式保留最近 N 轮的首字延迟样本
+# Keep the latest N time-to-first-token samples per routing mode
+_LATENCY_WINDOW = 200
+_STREAM_END = object()
+
+
+class _RouteCorrected(Exception):
+    """投机路由被 LLM 分类推翻：本次流式输出作废，按新的工具白名单重来。"""
+
+    def __init__(self, route: IntentRoute):
+        super().__init__(route.intent.value)
+        self.route = route
+
+
+async def _pump_stream(stream: AsyncIterator[dict], queue: asyncio.Queue) -> None:
+    """在单独任务里消费 LLM 流，取消该任务即关闭底层连接。"""
+    try:
+        async for chunk in stream:
+            queue.put_nowait(chunk)
+    except Exception as exc:
+        queue.put_nowait(exc)
+    queue.put_nowait(_STREAM_END)
+
 
 class AgentCore:
     """主 Agent 核心：精简 ReAct 循环，LLM 完全自主决策工具调用。"""
@@ -34,21 +69,42 @@ class AgentCore:
 
         agent_cfg = getattr(config, "agent", None)
         if isinstance(agent_cfg, dict):
-            self.max_tool_iterations = int(agent_cfg.get("max_tool_iterations", 5))
+            read_agent = agent_cfg.get
         elif agent_cfg is not None:
-            self.max_tool_iterations = int(getattr(agent_cfg, "max_tool_iterations", 5))
+            read_agent = lambda key, default: getattr(agent_cfg, key, default)  # noqa: E731
         else:
-            self.max_tool_iterations = 5
+            read_agent = lambda key, default: default  # noqa: E731
+        self.max_tool_iterations = int(read_agent("max_tool_iterations", 5))
+        # 同一轮多个工具调用的并发上限与超时（秒，0 表示不限）
+        self.max_parallel_tools = int(read_agent("max_parallel_tools", 4))
+        self.tool_timeout = float(read_agent("tool_timeout", 60.0))
+        self.tool_timeouts = dict(read_agent("tool_timeouts", None) or {"bash": 0})
 
         self.complexity_detector = ComplexityDetector(config)
         self._context_budget = get_context_budget(config)
         self.use_llm_intent_classifier = self._read_use_llm_intent_classifier(config)
+        self.speculative_routing = self._read_orchestration_flag(config, "speculative_routing", False)
+        local_classifier = None
+        if self._read_orchestration_flag(config, "local_classifier_enabled", True):
+            local_classifier = LocalIntentClassifier(
+                min_samples=int(self._read_orchestration_option(config, "local_classifier_min_samples", 50)),
+                log_path=self._read_orchestration_option(config, "intent_log_path", None),
+            )
         self.router = OrchestrationRouter(
             llm_engine=self.llm_engine,
             use_llm_classifier=self.use_llm_intent_classifier,
+            route_cache=IntentRouteCache(int(self._read_orchestration_option(config, "intent_cache_size", 512))),
+            local_classifier=local_classifier,
+            local_threshold=float(self._read_orchestration_option(config, "local_classifier_threshold", 0.85)),
         )
         self.policy_scheduler = PolicyScheduler()
-        self.evidence_collector = EvidenceCollector(max_items=5)
+        # 每轮的证据、工具去重缓存、用量都在 RequestContext 里，这里只保留跨请求共享的状态
+        self.evidence_max_items = 5
+        self._latency: dict[str, dict[str, deque]] = {
+            mode: {"ttft_ms": deque(maxlen=_LATENCY_WINDOW), "route_ms": deque(maxlen=_LATENCY_WINDOW)}
+            for mode in ("sequential", "speculative")
+        }
+        self._reroutes = 0
 
     @staticmethod
     def _normalize_llm_config(llm_config: Any) -> Any:
@@ -64,20 +120,28 @@ class AgentCore:
         return llm_config
 
     @staticmethod
-    def _read_use_llm_intent_classifier(config: Any) -> bool:
+    def _read_orchestration_option(config: Any, key: str, default: Any) -> Any:
         agent_cfg = getattr(config, "agent", None)
         if isinstance(agent_cfg, dict):
             orchestration = agent_cfg.get("orchestration", {})
             if isinstance(orchestration, dict):
-                return bool(orchestration.get("use_llm_intent_classifier", True))
-            return True
+                return orchestration.get(key, default)
+            return default
 
         orchestration = getattr(agent_cfg, "orchestration", None)
         if isinstance(orchestration, dict):
-            return bool(orchestration.get("use_llm_intent_classifier", True))
+            return orchestration.get(key, default)
         if orchestration is not None:
-            return bool(getattr(orchestration, "use_llm_intent_classifier", True))
-        return True
+            return getattr(orchestration, key, default)
+        return default
+
+    @classmethod
+    def _read_orchestration_flag(cls, config: Any, key: str, default: bool) -> bool:
+        return bool(cls._read_orchestration_option(config, key, default))
+
+    @classmethod
+    def _read_use_llm_intent_classifier(cls, config: Any) -> bool:
+        return cls._read_orchestration_flag(config, "use_llm_intent_classifier", True)
 
     @staticmethod
     def _filter_tool_definitions(tool_defs: list[dict], allowed_tools: list[str]) -> list[dict]:
@@ -90,6 +154,121 @@ class AgentCore:
             if str(tool.get("function", {}).get("name", "")).strip() in allowset
         ]
 
+    def _tools_for_policy(
+        self,
+        policy: ExecutionPolicy,
+        tool_defs: list[dict],
+        enable_tools: bool,
+    ) -> tuple[list[dict] | None, set[str]]:
+        """按策略过滤工具定义，返回 (传给 LLM 的工具列表, 允许调用的工具名集合)。"""
+        tools = None
+        if enable_tools and tool_defs and policy.allow_tools:
+            filtered = self._filter_tool_definitions(tool_defs, policy.allowed_tools)
+            tools = filtered if filtered else None
+        allowset = {
+            str(item.get("function", {}).get("name", "")).strip()
+            for item in (tools or [])
+            if str(item.get("function", {}).get("name", "")).strip()
+        }
+        return tools, allowset
+
+    @property
+    def _can_speculate(self) -> bool:
+        # 只有 LLM 分类才有延迟可以重叠；纯规则路由本来就是即时的
+        return self.speculative_routing and self.router.use_llm_classifier and self.router.llm_engine is not None
+
+    async def _timed_route(self, messages: list[dict], timings: dict) -> IntentRoute:
+        started = time.perf_counter()
+        try:
+            return await self.router.route_async(messages)
+        finally:
+            timings["route_ms"] = (time.perf_counter() - started) * 1000
+
+    async def _gate_on_route(
+        self,
+        stream: AsyncIterator[dict],
+        classifier: asyncio.Task,
+        keeps_allowlist,
+    ) -> AsyncIterator[dict]:
+        """投机阶段：主回复照常流式生成但先缓冲，直到 LLM 分类返回。
+
+        分类结果不改变工具白名单 → 放出缓冲并继续直通；改变白名单 → 取消流并抛出
+        ``_RouteCorrected``。缓冲保证了纠正前没有任何文本或工具调用泄露给调用方。
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        pump = asyncio.create_task(_pump_stream(stream, queue))
+        buffered: list[Any] = []
+        getter: asyncio.Future | None = None
+        try:
+            while not classifier.done():
+                if getter is None and (not buffered or buffered[-1] is not _STREAM_END):
+                    getter = asyncio.ensure_future(queue.get())
+                waiting = {classifier} if getter is None else {classifier, getter}
+                await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                if getter is not None and getter.done():
+                    buffered.append(getter.result())
+                    getter = None
+            if getter is not None:
+                getter.cancel()
+            route = classifier.result()
+            if not keeps_allowlist(route):
+                raise _RouteCorrected(route)
+        except BaseException:
+            if getter is not None:
+                getter.cancel()
+            pump.cancel()
+            await asyncio.gather(pump, return_exceptions=True)
+            raise
+
+        try:
+            for item in buffered:
+                if item is _STREAM_END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+            while True:
+                item = await queue.get()
+                if item is _STREAM_END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            if not pump.done():
+                pump.cancel()
+                await asyncio.gather(pump, return_exceptions=True)
+
+    def _record_timings(self, timings: dict) -> None:
+        samples = self._latency[timings["mode"]]
+        if timings["ttft_ms"] is not None:
+            samples["ttft_ms"].append(timings["ttft_ms"])
+        samples["route_ms"].append(timings["route_ms"])
+        if timings["rerouted"]:
+            self._reroutes += 1
+        logger.debug(
+            f"[Latency] mode={timings['mode']} ttft={timings['ttft_ms'] or 0:.0f}ms "
+            f"route={timings['route_ms']:.0f}ms rerouted={timings['rerouted']}"
+        )
+
+    def get_latency_stats(self) -> dict[str, Any]:
+        """首字延迟（TTFT）与意图分类耗时统计，按路由模式分开。"""
+        stats: dict[str, Any] = {
+            "speculative_routing": self.speculative_routing,
+            "reroutes": self._reroutes,
+            "routing": self.router.stats(),
+        }
+        for mode, samples in self._latency.items():
+            ttft = list(samples["ttft_ms"])
+            route = list(samples["route_ms"])
+            stats[mode] = {
+                "turns": len(route),
+                "ttft_p50_ms": round(statistics.median(ttft), 1) if ttft else None,
+                "ttft_max_ms": round(max(ttft), 1) if ttft else None,
+                "route_p50_ms": round(statistics.median(route), 1) if route else None,
+            }
+        return stats
+
     async def initialize(self):
         """初始化 Agent Core。"""
         await self.llm_engine.initialize()
@@ -152,32 +331,38 @@ class AgentCore:
         self,
         messages: list[dict],
         enable_tools: bool = True,
+        context: RequestContext | None = None,
     ) -> AsyncIterator[dict]:
-        """处理一轮对话，流式输出事件。LLM 自主决策何时调用工具。"""
+        """处理一轮对话，流式输出事件。LLM 自主决策何时调用工具。
+
+        本轮的可变状态（证据、工具去重缓存、用量、计时）全部放在 ``context`` 里，
+        同一个 AgentCore 可以同时服务多个会话的流式请求。
+
+        投机路由模式下，规则路由先给出临时策略并立即开始主回复，LLM 意图分类并行执行；
+        分类结果改变工具白名单时（此时尚未执行任何工具），取消本次流并按新白名单重来。
+        """
+        ctx = context or RequestContext(evidence=EvidenceCollector(max_items=self.evidence_max_items))
+        timings = ctx.timings
+        classifier: asyncio.Task | None = None
         try:
-            self.evidence_collector.reset()
+            tool_defs = ToolRegistry.get_tool_definitions() if enable_tools else []
             # ── 1. 意图路由 + 工具白名单 ────────────────────────────────
-            route = await self.router.route_async(messages)
+            if self._can_speculate:
+                timings["mode"] = "speculative"
+                route = self.router.route(messages)
+                classifier = asyncio.create_task(self._timed_route(messages, timings))
+            else:
+                route = await self._timed_route(messages, timings)
             policy = self.policy_scheduler.build(route.intent)
-
-            tool_defs = ToolRegistry.get_tool_definitions() if enable_tools else []
-            tools = None
-            if enable_tools and tool_defs and policy.allow_tools:
-                filtered = self._filter_tool_definitions(tool_defs, policy.allowed_tools)
-                tools = filtered if filtered else None
-
+            tools, active_allowset = self._tools_for_policy(policy, tool_defs, enable_tools)
             max_iterations = min(self.max_tool_iterations, max(policy.max_iterations, 1))
-            active_allowset = {
-                str(item.get("function", {}).get("name", "")).strip()
-                for item in (tools or [])
-                if str(item.get("function", {}).get("name", "")).strip()
-            }
 
             if tools:
                 logger.debug(f"已加载 {len(tools)} 个工具定义")
             logger.info(
                 f"[ToolPolicy] intent={route.intent.value}, reason={route.reason}, "
                 f"allow_tools={policy.allow_tools}, allowed={sorted(active_allowset)}"
+                + (" (provisional)" if classifier is not None else "")
             )
 
             # ── 2. 滑动窗口裁剪会话历史 ──────────────────────────────────
@@ -218,8 +403,6 @@ class AgentCore:
                 logger.debug(f"[Context] 注入[{i}]: {preview}")
 
             # ── 4. ReAct 工具循环 ─────────────────────────────────────────
-            total_usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
-            tool_call_cache: dict[str, Any] = {}
             iteration = 0
             full_text_fragments: list[str] = []
 
@@ -229,22 +412,54 @@ class AgentCore:
                     full_messages,
                     tools=(tools if (enable_tools and tools) else None),
                 )
+                if classifier is not None:
+                    allowset = active_allowset
+                    stream = self._gate_on_route(
+                        stream,
+                        classifier,
+                        lambda r: self._tools_for_policy(
+                            self.policy_scheduler.build(r.intent), tool_defs, enable_tools
+                        )[1] == allowset,
+                    )
 
                 current_content = ""
                 tool_calls: list[dict] = []
 
-                async for chunk in stream:
-                    if chunk["type"] == "usage":
-                        for key in total_usage:
-                            total_usage[key] += chunk["usage"].get(key, 0)
-                        yield chunk
-                    elif chunk["type"] == "text_delta":
-                        delta = chunk["content"]
-                        current_content += delta
-                        full_text_fragments.append(delta)
-                        yield {"type": "text", "content": delta}
-                    elif chunk["type"] == "tool_calls":
-                        tool_calls = chunk["tool_calls"]
+                try:
+                    async for chunk in stream:
+                        if chunk["type"] == "usage":
+                            ctx.add_usage(chunk["usage"])
+                            yield chunk
+                        elif chunk["type"] == "text_delta":
+                            delta = chunk["content"]
+                            current_content += delta
+                            full_text_fragments.append(delta)
+                            if timings["ttft_ms"] is None:
+                                timings["ttft_ms"] = ctx.elapsed_ms()
+                            yield {"type": "text", "content": delta}
+                        elif chunk["type"] == "tool_calls":
+                            tool_calls = chunk["tool_calls"]
+                except _RouteCorrected as corrected:
+                    # 分类推翻了临时路由：换白名单重跑本轮，不计入迭代次数
+                    classifier = None
+                    timings["rerouted"] = True
+                    route = corrected.route
+                    policy = self.policy_scheduler.build(route.intent)
+                    tools, active_allowset = self._tools_for_policy(policy, tool_defs, enable_tools)
+                    max_iterations = min(self.max_tool_iterations, max(policy.max_iterations, 1))
+                    iteration -= 1
+                    logger.info(
+                        f"[ToolPolicy] rerouted intent={route.intent.value}, reason={route.reason}, "
+                        f"allowed={sorted(active_allowset)}"
+                    )
+                    continue
+
+                if classifier is not None:
+                    # 分类确认了同一工具白名单：沿用本次输出，采用分类的迭代/证据策略
+                    route = classifier.result()
+                    policy = self.policy_scheduler.build(route.intent)
+                    max_iterations = min(self.max_tool_iterations, max(policy.max_iterations, 1))
+                    classifier = None
 
                 if tool_calls:
                     if current_content:
@@ -268,66 +483,21 @@ class AgentCore:
                         }
                     )
 
-                    for tc in tool_calls:
-                        tool_name = tc["name"]
-                        tool_args_str = tc["arguments"]
-                        tool_id = tc["id"]
-
-                        try:
-                            tool_args = json.loads(tool_args_str)
-
-                            if tool_name not in active_allowset:
-                                blocked_msg = f"策略限制：当前请求不允许调用工具 `{tool_name}`。"
-                                logger.warning(
-                                    f"[ToolPolicy] 已拦截工具调用: tool={tool_name}, intent={route.intent.value}"
-                                )
-                                yield {"type": "tool_result", "tool": tool_name, "result": blocked_msg}
-                                full_messages.append(
-                                    {
-                                        "role": "tool",
-                                        "tool_call_id": tool_id,
-                                        "name": tool_name,
-                                        "content": blocked_msg,
-                                    }
-                                )
-                                continue
-
-                            cache_key = f"{tool_name}:{tool_args_str}"
-
-                            if cache_key in tool_call_cache:
-                                logger.debug(f"工具调用去重: {tool_name}")
-                                result = tool_call_cache[cache_key]
-                            else:
-                                yield {"type": "tool_call", "tool": tool_name, "args": tool_args}
-                                result = await self._execute_tool(tool_name, tool_args)
-                                tool_call_cache[cache_key] = result
-
-                            self.evidence_collector.add_tool_evidence(
-                                tool_name=tool_name,
-                                tool_args=tool_args,
-                                tool_result=str(result),
-                            )
-                            yield {"type": "tool_result", "tool": tool_name, "result": str(result)}
-                            full_messages.append(
-                                {
-                                    "role": "tool",
-                                    "tool_call_id": tool_id,
-                                    "name": tool_name,
-                                    "content": str(result),
-                                }
-                            )
-                        except Exception as exc:
-                            error_msg = f"工具执行失败: {exc}"
-                            logger.error(f"执行工具 {tool_name} 失败: {exc}")
-                            yield {"type": "tool_result", "tool": tool_name, "result": error_msg}
-                            full_messages.append(
-                                {
-                                    "role": "tool",
-                                    "tool_call_id": tool_id,
-                                    "name": tool_name,
-                                    "content": error_msg,
-                                }
-                            )
+                    results: list[str] = [""] * len(tool_calls)
+                    async for event in self._run_tool_calls(
+                        tool_calls, active_allowset, route, results, ctx
+                    ):
+                        yield event
+                    # 无论完成先后，工具结果按调用顺序回填上下文
+                    for tc, content in zip(tool_calls, results):
+                        full_messages.append(
+                            {
+                                "role": "tool",
+                                "tool_call_id": tc["id"],
+                                "name": tc["name"],
+                                "content": content,
+                            }
+                        )
                     continue
 
                 # 没有工具调用，LLM 直接回复，循环结束
@@ -342,7 +512,7 @@ class AgentCore:
                 yield {"type": "text", "content": tail}
 
             final_text = "".join(full_text_fragments)
-            evidence_summary = self.evidence_collector.render_summary()
+            evidence_summary = ctx.evidence.render_summary()
             if (
                 policy.requires_evidence
                 and evidence_summary
@@ -350,19 +520,151 @@ class AgentCore:
             ):
                 yield {"type": "text", "content": f"\n\n{evidence_summary}"}
 
-            yield {"type": "done"}
+            self._record_timings(timings)
+            yield {
+                "type": "done",
+                "request_id": ctx.request_id,
+                "usage": dict(ctx.usage),
+                "timings": dict(timings),
+            }
 
         except Exception as exc:
-            logger.error(f"AgentCore 处理失败: {exc}")
+            logger.error(f"AgentCore 处理失败 [{ctx.request_id}]: {exc}")
             yield {"type": "error", "error": str(exc)}
+        finally:
+            if classifier is not None and not classifier.done():
+                classifier.cancel()
+
+    def _tool_timeout(self, tool_name: str) -> float | None:
+        timeout = self.tool_timeouts.get(tool_name, self.tool_timeout)
+        return float(timeout) if timeout and float(timeout) > 0 else None
+
+    async def _execute_tool_guarded(
+        self,
+        tool_name: str,
+        tool_args: dict,
+        semaphore: asyncio.Semaphore,
+    ) -> tuple[bool, Any]:
+        """在并发上限与超时保护下执行单个工具，返回 (是否成功, 结果或错误信息)。"""
+        timeout = self._tool_timeout(tool_name)
+        async with semaphore:
+            try:
+                return True, await asyncio.wait_for(self._execute_tool(tool_name, tool_args), timeout)
+            except asyncio.TimeoutError:
+                logger.error(f"执行工具 {tool_name} 超时 ({timeout:g}s)")
+                return False, f"工具执行超时（{timeout:g} 秒）"
+            except Exception as exc:
+                logger.error(f"执行工具 {tool_name} 失败: {exc}")
+                return False, f"工具执行失败: {exc}"
+
+    @staticmethod
+    def _parallel_batches(calls: list[tuple]) -> list[list[tuple]]:
+        """连续的可并发调用合成一批；不可并发的工具单独成批，保持与前后调用的先后顺序。"""
+        batches: list[list[tuple]] = []
+        for call in calls:
+            tool = ToolRegistry.get_tool(call[1])
+            if tool is not None and not getattr(tool, "parallel_safe", True):
+                batches.append([call])
+                batches.append([])
+            elif batches:
+                batches[-1].append(call)
+            else:
+                batches.append([call])
+        return [batch for batch in batches if batch]
+
+    async def _run_tool_calls(
+        self,
+        tool_calls: list[dict],
+        active_allowset: set[str],
+        route: IntentRoute,
+        results: list[str],
+        ctx: RequestContext,
+    ) -> AsyncIterator[dict]:
+        """执行一轮中的全部工具调用，tool_call / tool_result 事件按完成先后流式输出。
+
+        可并发的调用在 ``max_parallel_tools`` 上限内同时执行；结果按调用顺序写入
+        ``results``，证据也按调用顺序收集到 ``ctx.evidence``。
+        """
+        tool_call_cache = ctx.tool_call_cache
+        evidence: dict[int, tuple[str, dict, str]] = {}
+        pending: list[tuple[int, str, dict, str]] = []
+        duplicates: dict[int, int] = {}
+        first_by_key: dict[str, int] = {}
+
+        for index, tc in enumerate(tool_calls):
+            tool_name = tc["name"]
+            try:
+                tool_args = json.loads(tc["arguments"])
+            except Exception as exc:
+                results[index] = f"工具执行失败: {exc}"
+                logger.error(f"执行工具 {tool_name} 失败: {exc}")
+                yield {"type": "tool_result", "tool": tool_name, "result": results[index]}
+                continue
+
+            if tool_name not in active_allowset:
+                results[index] = f"策略限制：当前请求不允许调用工具 `{tool_name}`。"
+                logger.warning(
+                    f"[ToolPolicy] 已拦截工具调用: tool={tool_name}, intent={route.intent.value}"
+                )
+                yield {"type": "tool_result", "tool": tool_name, "result": results[index]}
+                continue
+
+            cache_key = f"{tool_name}:{tc['arguments']}"
+            if cache_key in tool_call_cache:
+                logger.debug(f"工具调用去重: {tool_name}")
+                results[index] = str(tool_call_cache[cache_key])
+                evidence[index] = (tool_name, tool_args, results[index])
+                yield {"type": "tool_result", "tool": tool_name, "result": results[index]}
+            elif cache_key in first_by_key:
+                # 同一轮里的重复调用复用第一次的结果
+                duplicates[index] = first_by_key[cache_key]
+            else:
+                first_by_key[cache_key] = index
+                pending.append((index, tool_name, tool_args, cache_key))
+
+        semaphore = asyncio.Semaphore(max(1, self.max_parallel_tools))
+        succeeded: set[int] = set()
+        for batch in self._parallel_batches(pending):
+            tasks: dict[asyncio.Task, tuple[int, str, dict, str]] = {}
+            try:
+                for call in batch:
+                    _, tool_name, tool_args, _ = call
+                    yield {"type": "tool_call", "tool": tool_name, "args": tool_args}
+                    tasks[asyncio.create_task(self._execute_tool_guarded(tool_name, tool_args, semaphore))] = call
+                while tasks:
+                    done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        index, tool_name, tool_args, cache_key = tasks.pop(task)
+                        ok, result = task.result()
+                        results[index] = str(result)
+                        if ok:
+                            tool_call_cache[cache_key] = result
+                            succeeded.add(index)
+                            evidence[index] = (tool_name, tool_args, results[index])
+                        yield {"type": "tool_result", "tool": tool_name, "result": results[index]}
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        for index, first in duplicates.items():
+            tool_name = tool_calls[index]["name"]
+            results[index] = results[first]
+            if first in succeeded:
+                evidence[index] = (tool_name, evidence[first][1], results[index])
+            yield {"type": "tool_result", "tool": tool_name, "result": results[index]}
+
+        for index in sorted(evidence):
+            tool_name, tool_args, result = evidence[index]
+            ctx.evidence.add_tool_evidence(
+                tool_name=tool_name,
+                tool_args=tool_args,
+                tool_result=result,
+            )
 
     async def _execute_tool(self, tool_name: str, parameters: dict) -> Any:
         """按名称执行工具。"""
-        tool = ToolRegistry.get_tool(tool_name)
-        if not tool:
-            raise ValueError(f"工具不存在: {tool_name}")
         logger.debug(f"执行工具: {tool_name} with {parameters}")
-        return await tool.execute(**parameters)
+        return await ToolRegistry.execute(tool_name, parameters)
 
     async def cleanup(self):
         """释放资源。"""
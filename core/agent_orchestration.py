@@ -4,8 +4,9 @@ from __future__ import annotations
 
 import json
 import re
+import time
 import uuid
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from datetime import datetime
 from enum import Enum
 from typing import Any
@@ -104,9 +105,25 @@ class OrchestrationRouter:
         self,
         llm_engine: Any | None = None,
         use_llm_classifier: bool = True,
+        route_cache: Any | None = None,
+        local_classifier: Any | None = None,
+        local_threshold: float = 0.85,
     ) -> None:
         self.llm_engine = llm_engine
         self.use_llm_classifier = use_llm_classifier
+        # Fast path in front of the LLM classifier (see core.intent_classifier)
+        # LLM 分类前的快速路径：查询缓存 + 本地分类器
+        self.route_cache = route_cache
+        self.local_classifier = local_classifier
+        self.local_threshold = float(local_threshold)
+        self._counters = {
+            "lookups": 0,
+            "cache_hits": 0,
+            "local_hits": 0,
+            "llm_calls": 0,
+            "llm_ms": 0.0,
+            "fast_path_ms": 0.0,
+        }
 
     @staticmethod
     def _extract_user_query(messages: list[dict]) -> str:
@@ -115,6 +132,11 @@ class OrchestrationRouter:
                 return str(item.get("content", "")).strip()
         return ""
 
+    @staticmethod
+    def _extract_previous_user_query(messages: list[dict]) -> str:
+        users = [item for item in messages if item.get("role") == "user"]
+        return str(users[-2].get("content", "")).strip() if len(users) >= 2 else ""
+
     @staticmethod
     def _coerce_intent(value: Any) -> IntentType | None:
         if value is None:
@@ -203,17 +225,85 @@ class OrchestrationRouter:
             confidence=confidence,
         )
 
+    def _route_by_local_classifier(self, user_query: str) -> IntentRoute | None:
+        if self.local_classifier is None or not user_query:
+            return None
+        prediction = self.local_classifier.predict(user_query)
+        if prediction is None or prediction[1] < self.local_threshold:
+            return None
+        intent, confidence = prediction
+        return IntentRoute(
+            intent=intent,
+            user_query=user_query,
+            reason="local_classifier",
+            confidence=confidence,
+        )
+
+    def _route_fast(self, messages: list[dict], user_query: str) -> tuple[IntentRoute | None, Any]:
+        """Cache of LLM decisions, then local classifier. Returns ``(route or None, cache key)``."""
+        started = time.perf_counter()
+        cache_key = None
+        route = None
+        if self.route_cache is not None and user_query:
+            cache_key = self.route_cache.key_for(user_query, self._extract_previous_user_query(messages))
+            cached = self.route_cache.get(cache_key)
+            if cached is not None:
+                self._counters["cache_hits"] += 1
+                route = replace(cached, user_query=user_query, reason=f"cache:{cached.reason}")
+        if route is None:
+            # Local guesses are never cached: the next identical query asks the
+            # classifier again, so once it stops being confident the LLM decides.
+            # 本地分类结果不入缓存，置信度下降后同一问题仍会回落到 LLM。
+            route = self._route_by_local_classifier(user_query)
+            if route is not None:
+                self._counters["local_hits"] += 1
+        if route is not None:
+            self._counters["fast_path_ms"] += (time.perf_counter() - started) * 1000
+        return route, cache_key
+
+    def _remember(self, cache_key: Any, user_query: str, route: IntentRoute) -> None:
+        if cache_key is not None:
+            self.route_cache.put(cache_key, route)
+        if self.local_classifier is not None:
+            self.local_classifier.observe(user_query, route.intent)
+
+    def stats(self) -> dict[str, Any]:
+        """Fast-path hit rate and the LLM latency it saved (estimated from the mean LLM call)."""
+        counters = self._counters
+        fast_hits = counters["cache_hits"] + counters["local_hits"]
+        llm_mean_ms = counters["llm_ms"] / counters["llm_calls"] if counters["llm_calls"] else 0.0
+        return {
+            "lookups": counters["lookups"],
+            "cache_hits": counters["cache_hits"],
+            "local_hits": counters["local_hits"],
+            "llm_calls": counters["llm_calls"],
+            "fast_path_hit_rate": round(fast_hits / counters["lookups"], 4) if counters["lookups"] else 0.0,
+            "llm_mean_ms": round(llm_mean_ms, 1),
+            "fast_path_mean_ms": round(counters["fast_path_ms"] / fast_hits, 3) if fast_hits else 0.0,
+            "saved_ms_estimate": round(fast_hits * llm_mean_ms - counters["fast_path_ms"], 1),
+            "local_samples": self.local_classifier.sample_count if self.local_classifier is not None else 0,
+        }
+
     async def route_async(self, messages: list[dict]) -> IntentRoute:
         user_query = self._extract_user_query(messages)
 
         if self.use_llm_classifier and self.llm_engine is not None:
+            self._counters["lookups"] += 1
+            route, cache_key = self._route_fast(messages, user_query)
+            if route is not None:
+                return route
+            started = time.perf_counter()
             try:
                 route = await self._route_by_llm(user_query)
                 if route is not None:
+                    self._remember(cache_key, user_query, route)
                     return route
                 logger.warning("[Orchestrator] LLM意图分类无效，回退规则路由")
             except Exception as exc:
                 logger.warning(f"[Orchestrator] LLM意图分类失败，回退规则路由: {exc}")
+            finally:
+                self._counters["llm_calls"] += 1
+                self._counters["llm_ms"] += (time.perf_counter() - started) * 1000
 
         return self._route_by_rules(user_query)
 
@@ -0,0 +1,319 @@
+"""Intent routing fast path: normalized-query LRU and a local logistic-regression classifier."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+from core.agent_orchestration import IntentRoute, IntentType
+from memory.embeddings import EmbeddingConfig, LocalEmbeddingEngine
+
+_STRIP_RE = re.compile(r"[\s\W_]+", re.UNICODE)
+
+# Queries this short ("继续", "好的") carry no intent of their own: they inherit
+# it from the previous turn, so they are cached per previous-turn context and
+# never fed to the local classifier.
+# 过短的追问（"继续"、"好的"）本身不含意图，按上一轮上下文缓存，且不参与本地分类
+FOLLOWUP_MAX_CHARS = 4
+
+_INTENTS = list(IntentType)
+_INTENT_INDEX = {intent: i for i, intent in enumerate(_INTENTS)}
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase and drop whitespace/punctuation so trivially different queries share a key."""
+    return _STRIP_RE.sub("", (text or "").lower())
+
+
+def is_followup(normalized: str) -> bool:
+    return len(normalized) <= FOLLOWUP_MAX_CHARS
+
+
+class IntentRouteCache:
+    """LRU of past routing decisions keyed by normalized query (plus context for follow-ups)."""
+
+    def __init__(self, max_size: int = 512):
+        self.max_size = max(0, int(max_size))
+        self._entries: OrderedDict[tuple[str, str], IntentRoute] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def key_for(self, query: str, previous_query: str = "") -> tuple[str, str]:
+        normalized = normalize_query(query)
+        if not is_followup(normalized):
+            return normalized, ""
+        # 追问的意图取决于上一轮：上一轮命中缓存则按其意图分组，否则按其原文
+        previous = normalize_query(previous_query)
+        previous_route = self._entries.get((previous, ""))
+        return normalized, previous_route.intent.value if previous_route else previous
+
+    def get(self, key: tuple[str, str]) -> IntentRoute | None:
+        route = self._entries.get(key)
+        if route is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return route
+
+    def put(self, key: tuple[str, str], route: IntentRoute) -> None:
+        if not self.enabled or not key[0]:
+            return
+        self._entries[key] = route
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class LocalIntentClassifier:
+    """Softmax regression over ``LocalEmbeddingEngine`` hashed bigram features.
+
+    Trained only from LLM classifier decisions. Every decision is appended to
+    an optional JSONL log so the model is rebuilt from the same data at start
+    up; between refits each new decision also takes one SGD step. The log is
+    trimmed to its newest ``max_samples`` lines whenever it grows past twice
+    that, since older lines would never be loaded anyway. ``predict`` abstains
+    until a fit has finished over ``min_samples`` decisions covering at least
+    two intents.
+
+    Full-batch fits (the startup fit from the log and every ``refit_every``-th
+    decision) run in a worker thread when an event loop is running, and the new
+    weights are swapped in when they finish. Feature rows are cached next to
+    their samples, so a refit only embeds rows loaded from the log.
+    """
+
+    def __init__(
+        self,
+        dimension: int = 256,
+        min_samples: int = 50,
+        log_path: str | None = None,
+        max_samples: int = 5000,
+        refit_every: int = 25,
+        learning_rate: float = 2.0,
+        l2: float = 1e-4,
+    ):
+        self.engine = LocalEmbeddingEngine(EmbeddingConfig(dimension=dimension))
+        self.dimension = self.engine.dimension
+        self.min_samples = max(1, int(min_samples))
+        self.log_path = Path(log_path) if log_path else None
+        self.refit_every = max(1, int(refit_every))
+        self.learning_rate = float(learning_rate)
+        self.l2 = float(l2)
+        self.max_samples = max(1, int(max_samples))
+        self._samples: deque[tuple[str, int]] = deque(maxlen=self.max_samples)
+        # Feature row per sample; None until a fit embeds rows loaded from the log
+        # 与样本一一对应的特征行；从日志加载的行在首次训练时才计算
+        self._features: deque[np.ndarray | None] = deque(maxlen=self.max_samples)
+        self._appended = 0
+        self._since_fit = 0
+        self._log_lines = 0
+        self._fitted = False
+        self._fit_task: asyncio.Task | None = None
+        self.weights = np.zeros((len(_INTENTS), self.dimension), dtype=np.float64)
+        self.bias = np.zeros(len(_INTENTS), dtype=np.float64)
+        self._load_log()
+
+    @property
+    def sample_count(self) -> int:
+        return len(self._samples)
+
+    @property
+    def ready(self) -> bool:
+        if not self._fitted or len(self._samples) < self.min_samples:
+            return False
+        return len({label for _, label in self._samples}) >= 2
+
+    def _load_log(self) -> None:
+        if self.log_path is None or not self.log_path.exists():
+            return
+        try:
+            with self.log_path.open(encoding="utf-8") as fh:
+                for line in fh:
+                    self._log_lines += 1
+                    try:
+                        record = json.loads(line)
+                        intent = IntentType(record["intent"])
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                    self._append(str(record.get("query", "")), _INTENT_INDEX[intent], None)
+        except OSError as exc:
+            logger.warning(f"[IntentClassifier] 读取意图日志失败: {exc}")
+            return
+        if self._log_lines > self.max_samples:
+            self._trim_log()
+        if self._samples:
+            # 启动训练推迟到首次 predict / wait_for_fit，在事件循环中转入工作线程
+            self._since_fit = self.refit_every
+            logger.info(f"[IntentClassifier] 已从日志加载意图样本: {len(self._samples)} 条")
+
+    def _trim_log(self) -> None:
+        """Rewrite the log with only its newest ``max_samples`` lines (atomic replace)."""
+        try:
+            with self.log_path.open(encoding="utf-8") as fh:
+                tail = deque(fh, maxlen=self.max_samples)
+            tmp_path = self.log_path.with_name(self.log_path.name + ".tmp")
+            tmp_path.write_text("".join(tail), encoding="utf-8")
+            tmp_path.replace(self.log_path)
+        except OSError as exc:
+            logger.warning(f"[IntentClassifier] 裁剪意图日志失败: {exc}")
+            return
+        self._log_lines = len(tail)
+
+    def _append(self, query: str, label: int, features: np.ndarray | None) -> None:
+        self._samples.append((query, label))
+        self._features.append(features)
+        self._appended += 1
+
+    @staticmethod
+    def _probabilities(features: np.ndarray, weights: np.ndarray, bias: np.ndarray) -> np.ndarray:
+        logits = features @ weights.T + bias
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def _step(
+        self, features: np.ndarray, labels: np.ndarray, weights: np.ndarray, bias: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        grad = self._probabilities(features, weights, bias)
+        grad[np.arange(len(labels)), labels] -= 1.0
+        grad /= len(labels)
+        weights = weights - self.learning_rate * (grad.T @ features + self.l2 * weights)
+        return weights, bias - self.learning_rate * grad.sum(axis=0)
+
+    def _train(self, snapshot: dict, epochs: int) -> tuple[np.ndarray, np.ndarray, list[np.ndarray]]:
+        """Pure full-batch gradient descent over a snapshot; safe to run off the loop."""
+        features = snapshot["features"]
+        missing = [i for i, row in enumerate(features) if row is None]
+        if missing:
+            rows = self.engine.embed_batch([snapshot["queries"][i] for i in missing])
+            for i, row in zip(missing, rows):
+                features[i] = row
+        matrix = np.vstack(features)
+        weights, bias = snapshot["weights"], snapshot["bias"]
+        for _ in range(epochs):
+            weights, bias = self._step(matrix, snapshot["labels"], weights, bias)
+        return weights, bias, features
+
+    def _snapshot(self) -> dict:
+        return {
+            "queries": [query for query, _ in self._samples],
+            "labels": np.fromiter((label for _, label in self._samples), dtype=np.int64),
+            "features": list(self._features),
+            "weights": self.weights.copy(),
+            "bias": self.bias.copy(),
+            "appended": self._appended,
+        }
+
+    def _install(self, snapshot: dict, result: tuple[np.ndarray, np.ndarray, list[np.ndarray]]) -> None:
+        """Swap in fitted weights and keep the feature rows embedded by the fit."""
+        self.weights, self.bias, features = result
+        self._fitted = True
+        # 训练期间新到的样本可能挤掉了快照里最旧的行
+        evicted = len(features) + (self._appended - snapshot["appended"]) - len(self._samples)
+        for i in range(max(0, len(features) - evicted)):
+            if self._features[i] is None:
+                self._features[i] = features[evicted + i]
+
+    def fit(self, epochs: int = 200) -> None:
+        """Full-batch gradient descent over every retained decision (warm-started), inline."""
+        if not self._samples:
+            return
+        snapshot = self._snapshot()
+        self._since_fit = 0
+        self._install(snapshot, self._train(snapshot, epochs))
+
+    def _start_fit(self, epochs: int) -> None:
+        """Refit in a worker thread when a loop is running, otherwise inline."""
+        if self._fit_task is not None and not self._fit_task.done():
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.fit(epochs)
+            return
+        snapshot = self._snapshot()
+        self._since_fit = 0
+        self._fit_task = asyncio.create_task(self._fit_in_thread(snapshot, epochs))
+
+    async def _fit_in_thread(self, snapshot: dict, epochs: int) -> None:
+        try:
+            result = await asyncio.to_thread(self._train, snapshot, epochs)
+        except Exception as exc:
+            logger.warning(f"[IntentClassifier] 后台训练失败: {exc}")
+            self._since_fit = self.refit_every
+            return
+        self._install(snapshot, result)
+
+    def _fit_due(self) -> bool:
+        return self._since_fit >= self.refit_every and len(self._samples) >= self.min_samples
+
+    def _start_due_fit(self) -> None:
+        if self._fit_due():
+            self._start_fit(50 if self._fitted else 200)
+
+    async def wait_for_fit(self) -> None:
+        """Start any pending fit (e.g. the startup fit from the log) and wait for it."""
+        self._start_due_fit()
+        if self._fit_task is not None:
+            await asyncio.shield(self._fit_task)
+
+    def observe(self, query: str, intent: IntentType) -> None:
+        """Record one LLM decision: log it, take an SGD step, refit periodically."""
+        if is_followup(normalize_query(query)):
+            return
+        label = _INTENT_INDEX[intent]
+        features = self.engine.embed_batch([query])
+        self._append(query, label, features[0])
+        if self.log_path is not None:
+            try:
+                self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                with self.log_path.open("a", encoding="utf-8") as fh:
+                    record = {"query": query, "intent": intent.value, "ts": int(time.time())}
+                    fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self._log_lines += 1
+            except OSError as exc:
+                logger.warning(f"[IntentClassifier] 写入意图日志失败: {exc}")
+            if self._log_lines > 2 * self.max_samples:
+                self._trim_log()
+
+        self._since_fit += 1
+        # An in-flight fit overwrites the weights when it lands; the sample is in the next refit
+        # 后台训练完成时会覆盖权重，本条样本会进入下一次重训
+        self.weights, self.bias = self._step(features, np.array([label]), self.weights, self.bias)
+        self._start_due_fit()
+
+    def predict(self, query: str) -> tuple[IntentType, float] | None:
+        """Return ``(intent, probability)``, or None when untrained, a follow-up, or featureless."""
+        if not self._fitted:
+            self._start_due_fit()
+        if not self.ready or is_followup(normalize_query(query)):
+            return None
+        features = self.engine.embed_batch([query])
+        if not features.any():
+            return None
+        probabilities = self._probabilities(features, self.weights, self.bias)[0]
+        best = int(probabilities.argmax())
+        return _INTENTS[best], float(probabilities[best])
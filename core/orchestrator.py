@@ -124,7 +124,19 @@ class Orchestrator:
         try:
             from memory import kuzu_manager
             kuzu_path = getattr(self.config.memory, "kuzu_path", "data/kuzu")
-            await kuzu_manager.initialize(db_path=kuzu_path)
+            await kuzu_manager.initialize(
+                db_path=kuzu_path,
+                vector_index=getattr(self.config.memory, "kuzu_vector_index", True),
+                vector_index_min_events=getattr(
+                    self.config.memory, "kuzu_vector_index_min_events", 20000
+                ),
+                read_connections=getattr(self.config.memory, "kuzu_read_connections", 4),
+                write_queue_size=getattr(self.config.memory, "kuzu_write_queue_size", 256),
+                ingest_flush_interval_ms=getattr(
+                    self.config.memory, "kuzu_ingest_flush_interval_ms", 50
+                ),
+                ingest_max_batch=getattr(self.config.memory, "kuzu_ingest_max_batch", 256),
+            )
 
             # 首次启动时从 SQLite memory_facts 迁移数据到 Kuzu
             await self._maybe_migrate_to_kuzu()
@@ -146,8 +158,8 @@ class Orchestrator:
         from memory import kuzu_manager
         from pathlib import Path
 
-        # 用 sentinel 文件标记是否已迁移
-        sentinel = Path(getattr(self.config.memory, "kuzu_path", "data/kuzu")) / ".migrated"
+        # 用 sentinel 文件标记是否已迁移（Kuzu 库路径是单个文件，sentinel 放在同级）
+        sentinel = Path(f"{getattr(self.config.memory, 'kuzu_path', 'data/kuzu')}.migrated")
         if sentinel.exists():
             return
 
@@ -0,0 +1,43 @@
+"""Request-scoped execution state for one AgentCore turn."""
+
+from __future__ import annotations
+
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any
+
+from core.agent_orchestration import EvidenceCollector
+
+
+def _empty_usage() -> dict[str, int]:
+    return {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+
+
+@dataclass(slots=True)
+class RequestContext:
+    """Everything a single ``process_message_stream`` call mutates.
+
+    ``AgentCore`` is one instance shared by the API, TUI and CLI channels, so
+    per-turn state cannot live on it: each call builds its own context and
+    threads it through the ReAct loop. Shared, intentionally cross-request
+    state (intent cache, tool result cache, latency stats) stays on the core.
+    """
+
+    evidence: EvidenceCollector = field(default_factory=lambda: EvidenceCollector(max_items=5))
+    # Per-turn dedupe of identical tool calls ("name:arguments" -> result)
+    # 本轮内相同工具调用的去重缓存
+    tool_call_cache: dict[str, Any] = field(default_factory=dict)
+    usage: dict[str, int] = field(default_factory=_empty_usage)
+    timings: dict[str, Any] = field(
+        default_factory=lambda: {"mode": "sequential", "route_ms": 0.0, "ttft_ms": None, "rerouted": False}
+    )
+    request_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    started: float = field(default_factory=time.perf_counter)
+
+    def add_usage(self, usage: dict) -> None:
+        for key in self.usage:
+            self.usage[key] += int(usage.get(key, 0) or 0)
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
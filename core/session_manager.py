@@ -5,15 +5,23 @@ from __future__ import annotations
 import asyncio
 import json
 import re
+import time
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Optional
 
 from loguru import logger
 
+from memory.archive import MemoryArchive
 from memory.cache import ConversationContext, LRUCache
+from memory.compaction import CompactionReport, MemoryCompactor
 from memory.documents import MemoryDocumentStore
 from memory.embeddings import EmbeddingConfig, LocalEmbeddingEngine
+from memory.event_sink import MemoryEventSink
 from memory.md_gate import MarkdownGatekeeper
+from memory.query_cache import QueryResultCache
+from memory.retrieval_filter import RetrievalFilter, infer_filter
+from memory.write_behind import MessageWriteBehind
 from memory.storage import MemoryStorage, SessionRecord
 
 # ── LLM memory extraction prompt ──────────────────────────
@@ -125,29 +133,102 @@ class SessionManager:
         self._llm_client = None  # lazy init
         # 懒加载初始化
 
-        self.storage = MemoryStorage(memory_config.sqlite_path)
+        dimension = int(getattr(memory_config, "embedding_dimension", 128))
+        ann_options = None
+        if getattr(memory_config, "ann_enabled", False):
+            ann_options = {
+                "nlist": int(getattr(memory_config, "ann_nlist", 0)),
+                "nprobe": int(getattr(memory_config, "ann_nprobe", 8)),
+                "min_train_size": int(getattr(memory_config, "ann_min_train_size", 4096)),
+            }
+        sqlite_profile = getattr(memory_config, "sqlite", None)
+        self.storage = MemoryStorage(
+            memory_config.sqlite_path,
+            embedding_dimension=dimension,
+            use_vector_index=bool(getattr(memory_config, "vector_index_enabled", True)),
+            ann_options=ann_options,
+            sqlite_profile=sqlite_profile.model_dump() if sqlite_profile is not None else None,
+        )
         memory_root = getattr(memory_config, "memory_root", "data/memory")
         self.documents = MemoryDocumentStore(memory_root)
         self.md_gatekeeper = MarkdownGatekeeper()
 
-        dimension = int(getattr(memory_config, "embedding_dimension", 128))
         self.embedding_engine = LocalEmbeddingEngine(EmbeddingConfig(dimension=dimension))
         self.embedding_retry_limit = int(getattr(memory_config, "embedding_retry_limit", 3))
         self.embedding_retry_base_seconds = int(
             getattr(memory_config, "embedding_retry_base_seconds", 10)
         )
         self.embedding_poll_interval = int(getattr(memory_config, "embedding_poll_interval", 5))
+        self.embedding_batch_size = max(1, int(getattr(memory_config, "embedding_batch_size", 32)))
+        self._embedding_stats = {"jobs": 0, "batches": 0, "seconds": 0.0}
+        # One pipeline pass at a time: the worker and explicit callers must not claim the same due jobs.
+        # 同一时间只跑一轮流水线，后台 worker 与显式调用不能领取同一批到期任务。
+        self._embedding_lock = asyncio.Lock()
+        # Per-branch budget for hybrid retrieval; a slow branch degrades instead of blocking.
+        # 混合检索每路超时预算：慢的一路降级而不是阻塞整轮。
+        self.retrieval_branch_timeout = float(getattr(memory_config, "retrieval_branch_timeout", 1.5))
+        self.query_cache = QueryResultCache(
+            max_size=int(getattr(memory_config, "query_cache_size", 256)),
+            ttl_seconds=float(getattr(memory_config, "query_cache_ttl", 60.0)),
+        )
+        # Group-commit messages + embedding jobs; None keeps one transaction per message.
+        # 消息与向量化任务合并提交；None 表示每条消息单独事务。
+        self.write_behind: MessageWriteBehind | None = None
+        if getattr(memory_config, "write_behind_enabled", True):
+            self.write_behind = MessageWriteBehind(
+                self.storage,
+                flush_interval_ms=int(getattr(memory_config, "write_behind_interval_ms", 5)),
+                max_batch=int(getattr(memory_config, "write_behind_max_batch", 64)),
+            )
+        self.event_sink = MemoryEventSink(
+            self.storage,
+            flush_interval=float(getattr(memory_config, "event_flush_interval", 1.0)),
+        )
+
+        # Compaction folds messages outside the hot set into summaries; the raw
+        # turns move to a separate archive file that only history recall reads.
+        # 压缩把热集之外的消息折叠成摘要，原始消息移入独立归档库，仅历史回忆时查询。
+        archive_path = getattr(memory_config, "archive_path", None)
+        if not archive_path:
+            sqlite_path = memory_config.sqlite_path
+            archive_path = (
+                ":memory:" if sqlite_path == ":memory:" else str(Path(sqlite_path).with_suffix(".archive.db"))
+            )
+        self.archive = MemoryArchive(archive_path)
+        self.compaction_enabled = bool(getattr(memory_config, "compaction_enabled", False))
+        self.compaction_interval = float(getattr(memory_config, "compaction_interval", 3600))
+        self.compactor = MemoryCompactor(
+            self.storage,
+            self.archive,
+            self.embedding_engine.embed_batch,
+            hot_messages=int(getattr(memory_config, "compaction_hot_messages", 5000)),
+            min_age_days=float(getattr(memory_config, "compaction_min_age_days", 30)),
+            cluster_gap_minutes=float(getattr(memory_config, "compaction_cluster_gap_minutes", 30)),
+            max_cluster=int(getattr(memory_config, "compaction_max_cluster", 40)),
+            summary_max_chars=int(getattr(memory_config, "compaction_summary_max_chars", 400)),
+        )
+        self._compaction_lock = asyncio.Lock()
+        self._compaction_stats = {"runs": 0, "messages_archived": 0, "summaries_written": 0, "last": None}
 
         self.cache = LRUCache(max_size=memory_config.cache_size)
+        # Cold loads read only the newest page; older pages are backfilled on demand.
+        # 冷加载只读最新一页，更早的消息按需回填。
+        self.session_page_size = max(1, int(getattr(memory_config, "session_page_size", 50)))
+        self.session_message_cap = max(0, int(getattr(memory_config, "session_message_cap", 200)))
+        # History handed to the model; cold sessions shorter than this backfill older pages.
+        # 交给模型的历史条数；冷加载不足时按需回填更早的页。
+        self.context_history_messages = max(0, int(getattr(memory_config, "context_history_messages", 100)))
 
         self._flush_task = None
         self._embedding_task = None
+        self._compaction_task = None
         self._extraction_tasks: set[asyncio.Task] = set()
         self._running = False
 
     async def initialize(self):
         """Initialize."""
         await self.storage.initialize()
+        await self.archive.initialize()
         await asyncio.to_thread(self.documents.ensure_initialized)
 
         # DB is the single source of truth for identity confirmation.
@@ -194,13 +275,19 @@ class SessionManager:
         self._running = True
         self._flush_task = asyncio.create_task(self._auto_flush_loop())
         self._embedding_task = asyncio.create_task(self._embedding_worker_loop())
+        if self.compaction_enabled:
+            self._compaction_task = asyncio.create_task(self._compaction_loop())
 
         logger.info("会话管理器初始化完成")
 
     async def create_session(self, metadata: dict = None) -> ConversationContext:
         """Create new session."""
         session_id = await self.storage.create_session(metadata or {})
-        context = ConversationContext(session_id=session_id, metadata=metadata or {})
+        context = ConversationContext(
+            session_id=session_id,
+            metadata=metadata or {},
+            max_messages=self.session_message_cap,
+        )
         self.cache.put(session_id, context)
         logger.info(f"创建会话: {session_id}")
         return context
@@ -211,28 +298,63 @@ class SessionManager:
         if context:
             return context
 
+        await self.flush()
         record = await self.storage.get_session(session_id)
         if not record:
             return None
 
-        messages = await self.storage.get_messages(session_id)
+        messages, has_older = await self.storage.get_recent_messages(
+            session_id, limit=self.session_page_size
+        )
         context = ConversationContext(
             session_id=session_id,
-            messages=[
-                {
-                    "role": msg.role,
-                    "content": msg.content,
-                    "metadata": msg.message_metadata,
-                }
-                for msg in messages
-            ],
+            messages=[self._message_to_dict(msg) for msg in messages],
             metadata=record.session_metadata,
             created_at=record.created_at,
             last_active=record.last_active,
+            max_messages=self.session_message_cap,
+            has_older=has_older,
         )
         self.cache.put(session_id, context)
         return context
 
+    async def load_older_messages(self, session_id: str, limit: int | None = None) -> int:
+        """Backfill the page before the oldest in-memory message; returns messages added."""
+        context = await self.get_session(session_id)
+        if context is None or not context.has_older:
+            return 0
+
+        await self.flush()
+        before_message_id = context.oldest_message_id()
+        if before_message_id is None:
+            return 0
+        messages, has_older = await self.storage.get_recent_messages(
+            session_id,
+            limit=limit or self.session_page_size,
+            before_message_id=before_message_id,
+        )
+        context.prepend_messages([self._message_to_dict(msg) for msg in messages], has_older)
+        return len(messages)
+
+    async def get_context_messages(self, session_id: str) -> list[dict]:
+        """Conversation history for the next model call, backfilled up to ``context_history_messages``."""
+        context = await self.get_session(session_id)
+        if context is None:
+            return []
+        budget = self.context_history_messages
+        if self.session_message_cap:
+            budget = min(budget, self.session_message_cap)
+        while context.has_older and len(context.messages) < budget:
+            if not await self.load_older_messages(session_id, limit=budget - len(context.messages)):
+                break
+        return context.messages
+
+    @staticmethod
+    def _message_to_dict(record) -> dict:
+        metadata = dict(record.message_metadata or {})
+        metadata.setdefault("message_id", record.id)
+        return {"role": record.role, "content": record.content, "metadata": metadata}
+
     def _get_llm_client(self):
         """Lazy-init a lightweight OpenAI client for memory extraction."""
         if self._llm_client is not None:
@@ -271,14 +393,6 @@ class SessionManager:
         if context:
             context.add_message(role, content, message_metadata)
 
-        message_id = await self.storage.save_message(session_id, role, content, message_metadata)
-        if context and context.messages:
-            last_message = context.messages[-1]
-            if last_message.get("role") == role and last_message.get("content") == content:
-                meta = dict(last_message.get("metadata") or {})
-                meta["message_id"] = message_id
-                last_message["metadata"] = meta
-
         # Prepare embedding content with context (QA-pair style)
         content_to_embed = content
         if context and len(context.messages) >= 2:
@@ -290,11 +404,28 @@ class SessionManager:
              if prev_content and len(prev_content) < 800:
                  content_to_embed = f"{prev_role}: {prev_content}\n{role}: {content}"
 
-        await self.enqueue_embedding_job(
-            source_type="message",
-            source_id=message_id,
-            content=content_to_embed,
-        )
+        if self.write_behind is not None:
+            message_id = self.write_behind.add_message(
+                session_id,
+                role,
+                content,
+                message_metadata,
+                embedding_content=content_to_embed,
+            )
+        else:
+            message_id = await self.storage.save_message(session_id, role, content, message_metadata)
+            await self.enqueue_embedding_job(
+                source_type="message",
+                source_id=message_id,
+                content=content_to_embed,
+            )
+
+        if context and context.messages:
+            last_message = context.messages[-1]
+            if last_message.get("role") == role and last_message.get("content") == content:
+                meta = dict(last_message.get("metadata") or {})
+                meta["message_id"] = message_id
+                last_message["metadata"] = meta
 
         if role == "user":
             # LLM extraction (async, fire-and-forget) — user messages only, no gate
@@ -316,23 +447,30 @@ class SessionManager:
         # 同步写 Event 节点到 Kuzu（立即，无 LLM）
         self._fire_kuzu_event(session_id, role, content)
 
+    async def flush(self):
+        """Read-your-writes barrier: commit buffered messages and embedding jobs.
+
+        A failing write never breaks the read that asked for the barrier; the
+        rows stay buffered and the read sees what is already committed.
+        """
+        if self.write_behind is None:
+            return
+        try:
+            await self.write_behind.flush()
+        except Exception as exc:
+            logger.warning(f"消息写入暂未完成，读取基于已提交数据: {exc}")
+
     # ── Kuzu Event 写入（fire-and-forget）──────────────────────────
     def _fire_kuzu_event(self, session_id: str, role: str, content: str) -> None:
-        """将消息写入 Kuzu Event 节点（无 LLM，立即入队）。"""
-        async def _write():
-            try:
-                from memory.kuzu_manager import get_writer
-                writer = get_writer()
-                if writer is None:
-                    return
-                await writer.ensure_session(session_id)
-                await writer.write_event(session_id, role, content)
-            except Exception as e:
-                logger.debug(f"Kuzu Event 写入失败（非致命）: {e}")
-
-        task = asyncio.create_task(_write())
-        self._extraction_tasks.add(task)
-        task.add_done_callback(self._extraction_tasks.discard)
+        """将消息放入 Kuzu 写入缓冲（无 LLM，按批提交）。"""
+        try:
+            from memory.kuzu_manager import get_writer
+            writer = get_writer()
+            if writer is None:
+                return
+            writer.ingest.add_event(session_id, role, content)
+        except Exception as e:
+            logger.debug(f"Kuzu Event 入队失败（非致命）: {e}")
 
     # ── 实体抽取（fire-and-forget）───────────────────────────────────
     def _fire_entity_extraction(self, messages: list[dict]) -> None:
@@ -409,21 +547,21 @@ class SessionManager:
             name = str(ent.get("name", "")).strip()
             etype = str(ent.get("type", "concept")).strip()
             if name and 1 < len(name) <= 30:
-                try:
-                    await writer.upsert_entity(name, etype)
-                    ec += 1
-                except Exception:
-                    pass
+                writer.ingest.add_entity(name, etype)
+                ec += 1
 
         for rel in data.get("relations", []):
             frm = str(rel.get("from", "")).strip()
             to = str(rel.get("to", "")).strip()
             rtype = str(rel.get("type", "related_to")).strip()
             if frm and to and frm != to:
-                try:
-                    await writer.upsert_entity_relation(frm, to, rtype)
-                except Exception:
-                    pass
+                writer.ingest.add_relation(frm, to, rtype)
+
+        # Fact 关联实体前先提交缓冲中的实体
+        try:
+            await writer.ingest.flush()
+        except Exception as e:
+            logger.debug(f"Kuzu 实体写入失败: {e}")
 
         for fact in data.get("facts", []):
             scope = str(fact.get("scope", "user"))
@@ -541,12 +679,15 @@ class SessionManager:
 
     async def list_sessions(self, limit: int = 50) -> list[SessionRecord]:
         """List all sessions."""
+        await self.flush()
         return await self.storage.list_sessions(limit=limit)
 
     async def delete_session(self, session_id: str):
         """Delete session."""
         self.cache.remove(session_id)
+        await self.flush()
         await self.storage.delete_session(session_id)
+        await self.archive.delete_session(session_id)
 
     async def get_global_user_state(self) -> dict:
         """Get singleton global user state."""
@@ -558,7 +699,10 @@ class SessionManager:
         Returns a status dict with keys: db_reset (bool), restored_files (list[str]),
         used_template (bool).
         """
+        await self.flush()
+        await self.event_sink.flush()
         await self.storage.reset_all_memory()
+        await self.archive.clear()
         self.cache.clear()
         has_tpl = await asyncio.to_thread(self.documents.has_template)
         restored = await asyncio.to_thread(self.documents.restore_from_template)
@@ -674,11 +818,40 @@ class SessionManager:
         limit: int = 100,
     ):
         """List memory pipeline events."""
+        await self.event_sink.flush()
         return await self.storage.list_memory_events(event_type=event_type, limit=limit)
 
     async def get_memory_metrics(self) -> dict:
         """Expose memory observability counters."""
-        return await self.storage.get_memory_metrics()
+        await self.event_sink.flush()
+        metrics = await self.storage.get_memory_metrics()
+        stats = self._embedding_stats
+        seconds = stats["seconds"]
+        metrics["embedding_pipeline"] = {
+            "batch_size": self.embedding_batch_size,
+            "jobs": stats["jobs"],
+            "batches": stats["batches"],
+            "seconds": round(seconds, 4),
+            "jobs_per_second": round(stats["jobs"] / seconds, 2) if seconds > 0 else 0.0,
+        }
+        metrics["query_cache"] = self.query_cache.stats()
+        metrics["compaction"] = {
+            "enabled": self.compaction_enabled,
+            "hot_messages": self.compactor.hot_messages,
+            **self._compaction_stats,
+            "archive": await self.archive.stats(),
+        }
+        from memory.kuzu_manager import get_store, get_writer
+
+        store = get_store()
+        if store is not None:
+            metrics["kuzu"] = store.stats()
+            writer = get_writer()
+            if writer is not None:
+                metrics["kuzu"]["ingest"] = writer.ingest.stats()
+                if writer.graph is not None:
+                    metrics["kuzu"]["graph"] = writer.graph.stats()
+        return metrics
 
     async def enqueue_embedding_job(
         self,
@@ -695,6 +868,7 @@ class SessionManager:
 
     async def list_embedding_jobs(self, status: str | None = None, limit: int = 100):
         """List embedding jobs."""
+        await self.flush()
         return await self.storage.list_embedding_jobs(status=status, limit=limit)
 
     async def run_embedding_pipeline(
@@ -702,79 +876,170 @@ class SessionManager:
         max_jobs: int = 20,
         ignore_schedule: bool = False,
     ) -> dict:
-        """Process due embedding jobs with retry/backoff/dead-letter handling."""
-        jobs = await self.storage.list_due_embedding_jobs(
-            limit=max_jobs,
-            now=datetime.now(),
-            ignore_schedule=ignore_schedule,
-        )
-        if not jobs:
-            return {"processed": 0, "failed": 0}
+        """Process due embedding jobs with retry/backoff/dead-letter handling.
+
+        Jobs are embedded ``embedding_batch_size`` at a time and each batch is
+        committed in a single transaction; retry state is still tracked per job.
+        """
+        async with self._embedding_lock:
+            await self.flush()
+            jobs = await self.storage.list_due_embedding_jobs(
+                limit=max_jobs,
+                now=datetime.now(),
+                ignore_schedule=ignore_schedule,
+            )
+            if not jobs:
+                return {"processed": 0, "failed": 0}
+
+            started = time.perf_counter()
+            processed = 0
+            failed = 0
+            batches = 0
+            for start in range(0, len(jobs), self.embedding_batch_size):
+                batch_processed, batch_failed = await self._run_embedding_batch(
+                    jobs[start : start + self.embedding_batch_size]
+                )
+                processed += batch_processed
+                failed += batch_failed
+                batches += 1
+
+        self._embedding_stats["jobs"] += len(jobs)
+        self._embedding_stats["batches"] += batches
+        self._embedding_stats["seconds"] += time.perf_counter() - started
+        return {"processed": processed, "failed": failed}
+
+    async def _run_embedding_batch(self, jobs: list) -> tuple[int, int]:
+        """Embed one batch of jobs and persist all outcomes together."""
+        outcomes = []
+        for job, result in zip(jobs, self._embed_job_contents(jobs)):
+            if isinstance(result, Exception):
+                outcomes.append((job, None, *self._embedding_failure(job, str(result))))
+                continue
+            outcomes.append(
+                (
+                    job,
+                    {
+                        "source_type": job.source_type,
+                        "source_id": job.source_id,
+                        "content": job.content,
+                        "embedding": result,
+                    },
+                    {
+                        "job_id": job.id,
+                        "status": "completed",
+                        "retry_count": job.retry_count or 0,
+                        "next_retry_at": None,
+                        "last_error": "",
+                    },
+                    (
+                        "embedding_job_completed",
+                        {"job_id": job.id, "source_type": job.source_type, "source_id": job.source_id},
+                    ),
+                )
+            )
 
+        try:
+            await self.storage.apply_embedding_batch(
+                [embedding for _, embedding, _, _ in outcomes if embedding is not None],
+                [update for _, _, update, _ in outcomes],
+                [event for _, _, _, event in outcomes],
+            )
+        except Exception as exc:
+            # One bad row (locked DB, constraint, bad vector) must not stall the
+            # whole batch forever: persist job by job so failures get their own
+            # retry/dead-letter bookkeeping.
+            # 整批提交失败时逐条落库，让出错的任务各自进入重试/死信，而不是整批无限重试。
+            logger.warning(f"Embedding 批量提交失败，改为逐条提交: {exc}")
+            return await self._persist_embedding_outcomes(outcomes)
+
+        processed = sum(1 for _, embedding, _, _ in outcomes if embedding is not None)
+        return processed, len(outcomes) - processed
+
+    async def _persist_embedding_outcomes(self, outcomes: list) -> tuple[int, int]:
+        """Commit each job's outcome on its own; a failing commit becomes that job's failure."""
         processed = 0
         failed = 0
-        for job in jobs:
+        for job, embedding, update, event in outcomes:
             try:
-                vector = self.embedding_engine.embed(job.content)
-                await self.storage.save_memory_embedding(
-                    source_type=job.source_type,
-                    source_id=job.source_id,
-                    content=job.content,
-                    embedding=vector,
-                )
-                await self.storage.update_embedding_job(
-                    job.id,
-                    status="completed",
-                    last_error="",
-                    next_retry_at=None,
+                await self.storage.apply_embedding_batch(
+                    [embedding] if embedding is not None else [], [update], [event]
                 )
-                await self.storage.save_memory_event(
-                    event_type="embedding_job_completed",
-                    payload={"job_id": job.id, "source_type": job.source_type, "source_id": job.source_id},
-                )
-                processed += 1
             except Exception as exc:
+                embedding = None
+                update, event = self._embedding_failure(job, f"persist failed: {exc}")
+                try:
+                    await self.storage.apply_embedding_batch([], [update], [event])
+                except Exception as retry_exc:
+                    logger.error(f"Embedding 任务状态写入失败: {job.id} | {retry_exc}")
+            if embedding is not None:
+                processed += 1
+            else:
                 failed += 1
-                retry_count = (job.retry_count or 0) + 1
-                if retry_count >= self.embedding_retry_limit:
-                    await self.storage.update_embedding_job(
-                        job.id,
-                        status="dead_letter",
-                        retry_count=retry_count,
-                        last_error=str(exc),
-                        next_retry_at=None,
-                    )
-                    await self.storage.save_memory_event(
-                        event_type="embedding_dead_letter",
-                        payload={"job_id": job.id, "error": str(exc), "retry_count": retry_count},
-                    )
-                    continue
+        return processed, failed
 
-                next_retry_at = datetime.now() + timedelta(
-                    seconds=self.embedding_retry_base_seconds * (2 ** (retry_count - 1))
-                )
-                await self.storage.update_embedding_job(
-                    job.id,
-                    status="pending",
-                    retry_count=retry_count,
-                    next_retry_at=next_retry_at,
-                    last_error=str(exc),
-                )
-                await self.storage.save_memory_event(
-                    event_type="embedding_retry_scheduled",
-                    payload={
-                        "job_id": job.id,
-                        "error": str(exc),
-                        "retry_count": retry_count,
-                        "next_retry_at": next_retry_at.isoformat(),
-                    },
-                )
+    def _embedding_failure(self, job, error: str) -> tuple[dict, tuple[str, dict]]:
+        """Job update and event for a failed attempt: back off, or dead-letter past the limit."""
+        retry_count = (job.retry_count or 0) + 1
+        if retry_count >= self.embedding_retry_limit:
+            return (
+                {
+                    "job_id": job.id,
+                    "status": "dead_letter",
+                    "retry_count": retry_count,
+                    "next_retry_at": None,
+                    "last_error": error,
+                },
+                (
+                    "embedding_dead_letter",
+                    {"job_id": job.id, "error": error, "retry_count": retry_count},
+                ),
+            )
 
-        return {"processed": processed, "failed": failed}
+        next_retry_at = datetime.now() + timedelta(
+            seconds=self.embedding_retry_base_seconds * (2 ** (retry_count - 1))
+        )
+        return (
+            {
+                "job_id": job.id,
+                "status": "pending",
+                "retry_count": retry_count,
+                "next_retry_at": next_retry_at,
+                "last_error": error,
+            },
+            (
+                "embedding_retry_scheduled",
+                {
+                    "job_id": job.id,
+                    "error": error,
+                    "retry_count": retry_count,
+                    "next_retry_at": next_retry_at.isoformat(),
+                },
+            ),
+        )
+
+    def _embed_job_contents(self, jobs: list) -> list:
+        """Return one vector or the raised exception per job."""
+        contents = [job.content for job in jobs]
+        try:
+            return list(self.embedding_engine.embed_batch(contents))
+        except Exception:
+            # One bad input fails the whole batch call; redo item by item so only
+            # the offending jobs enter retry/dead-letter.
+            # 批量调用中单条失败会拖垮整批，逐条重试，只让出错的任务进入重试/死信。
+            results = []
+            for content in contents:
+                try:
+                    results.append(self.embedding_engine.embed(content))
+                except Exception as exc:
+                    results.append(exc)
+            return results
 
-    async def search_memory_by_keyword(self, query: str, limit: int = 5) -> list[dict]:
+    async def search_memory_by_keyword(
+        self, query: str, limit: int = 5, filters: RetrievalFilter | None = None
+    ) -> list[dict]:
         """Keyword-only memory search."""
-        return await self.storage.search_messages_by_keyword(query=query, limit=limit)
+        await self.flush()
+        return await self.storage.search_messages_by_keyword(query=query, limit=limit, filters=filters)
 
     async def search_memory_hybrid(
         self,
@@ -782,11 +1047,37 @@ class SessionManager:
         limit: int = 5,
         excluded_sources: set[tuple[str, str]] | None = None,
         exclude_content: str | None = None,
+        filters: RetrievalFilter | None = None,
+    ) -> list[dict]:
+        """Hybrid search: semantic + keyword + freshness + relevance reranking.
+
+        ``filters`` scopes both branches by time / session / role inside storage.
+        When omitted, a time range is inferred from recall questions such as
+        "我昨天说过什么"; if that inferred range finds nothing, the search is
+        repeated unscoped.
+        """
+        inferred = filters is None
+        if inferred:
+            filters = infer_filter(query) or RetrievalFilter()
+        hits = await self._search_memory_hybrid(query, limit, excluded_sources, exclude_content, filters)
+        if not hits and inferred and filters:
+            logger.info(f"[RAG] 推断的时间范围无结果，取消过滤重试: {filters.describe()}")
+            hits = await self._search_memory_hybrid(
+                query, limit, excluded_sources, exclude_content, RetrievalFilter()
+            )
+        return hits
+
+    async def _search_memory_hybrid(
+        self,
+        query: str,
+        limit: int,
+        excluded_sources: set[tuple[str, str]] | None,
+        exclude_content: str | None,
+        filters: RetrievalFilter,
     ) -> list[dict]:
-        """Hybrid search: semantic + keyword + freshness + relevance reranking."""
-        logger.info(f"[RAG] 开始检索: query={query[:50]}...")
-        semantic_hits: list[dict] = []
-        keyword_hits: list[dict] = []
+        logger.info(f"[RAG] 开始检索: query={query[:50]}..." + (f" 范围={filters.describe()}" if filters else ""))
+        started = time.perf_counter()
+        timings: dict[str, float] = {}
         excluded = {
             (str(source_type), str(source_id))
             for source_type, source_id in (excluded_sources or set())
@@ -794,28 +1085,36 @@ class SessionManager:
         }
         normalized_exclude_content = self._normalize_text_for_match(exclude_content or "")
 
-        # 语义检索（跨会话）
-        try:
-            query_embedding = self.embedding_engine.embed(query)
-            semantic_hits = await self.storage.search_memory_embeddings(query_embedding, limit=20)
-            logger.debug(f"[RAG] 语义检索: {len(semantic_hits)} 条结果")
-        except Exception as exc:
-            logger.warning(f"[RAG] 语义检索失败: {exc}")
-            await self.storage.save_memory_event(
-                event_type="retrieval_fail",
-                payload={"query": query, "reason": "semantic_error", "error": str(exc)},
-            )
-
-        # 关键词检索（跨会话，从 FTS5 或 LIKE 回退）
-        try:
-            keyword_hits = await self.storage.search_messages_by_keyword(query=query, limit=20)
-            logger.debug(f"[RAG] 关键词检索: {len(keyword_hits)} 条结果")
-        except Exception as exc:
-            logger.warning(f"[RAG] 关键词检索失败: {exc}")
-            await self.storage.save_memory_event(
-                event_type="retrieval_fail",
-                payload={"query": query, "reason": "keyword_error", "error": str(exc)},
-            )
+        # 结果缓存：同一查询在无新写入时直接复用（重试、重新生成、重复追问）
+        cache_key = (
+            self._normalize_text_for_match(query),
+            limit,
+            frozenset(excluded),
+            normalized_exclude_content,
+            filters,
+        )
+        generation = self.storage.generation
+        cached = self.query_cache.get(cache_key, generation) if self.query_cache.enabled else None
+        if cached is not None:
+            logger.info(f"[RAG] 命中检索缓存: {len(cached)} 条结果")
+            return cached
+
+        # 语义检索 + 关键词检索并发执行（跨会话），每路独立超时
+        await self.flush()
+        semantic_hits, keyword_hits = await asyncio.gather(
+            self._run_retrieval_branch("semantic", query, self._semantic_branch(query, filters), timings),
+            self._run_retrieval_branch(
+                "keyword",
+                query,
+                self.storage.search_messages_by_keyword(query=query, limit=20, filters=filters),
+                timings,
+            ),
+        )
+        # A degraded (failed/timed-out) branch returns None; never cache partial results.
+        degraded = semantic_hits is None or keyword_hits is None
+        semantic_hits = semantic_hits or []
+        keyword_hits = keyword_hits or []
+        logger.debug(f"[RAG] 语义检索: {len(semantic_hits)} 条, 关键词检索: {len(keyword_hits)} 条")
 
         # 合并结果
         merged: dict[tuple[str, str], dict] = {}
@@ -849,9 +1148,23 @@ class SessionManager:
             for item in merged.values()
             if item.get("source_type") == "message" and item.get("source_id")
         ]
+        stage_started = time.perf_counter()
         message_meta = await self.storage.get_messages_metadata_by_ids(message_ids) if message_ids else {}
+        timings["metadata_ms"] = _elapsed_ms(stage_started)
+
+        # 冷归档只在明确的历史回忆意图（"还记得…"、带时间范围）下查询：
+        # 沿命中的压缩摘要下钻到原始消息，或在时间范围内扫描
+        if self._is_history_recall_query(query) or filters.since or filters.until:
+            summary_ids = [mid for mid, meta in message_meta.items() if meta.get("role") == "summary"]
+            archive_hits = await self._run_retrieval_branch(
+                "archive", query, self._archive_branch(query, summary_ids, filters), timings
+            )
+            degraded = degraded or archive_hits is None
+            for hit in archive_hits or []:
+                merged.setdefault(("archive", hit["source_id"]), hit)
 
         # 计算最终分数
+        stage_started = time.perf_counter()
         scored = []
         for item in merged.values():
             source_key = (str(item.get("source_type", "")), str(item.get("source_id", "")))
@@ -863,7 +1176,7 @@ class SessionManager:
                 if self._normalize_text_for_match(content) == normalized_exclude_content:
                     continue
 
-            role = None
+            role = item.get("message_role")
             if item.get("source_type") == "message" and item.get("source_id"):
                 meta = message_meta.get(str(item.get("source_id")), {})
                 role = meta.get("role")
@@ -903,6 +1216,10 @@ class SessionManager:
 
         scored.sort(key=lambda x: x["final_score"], reverse=True)
         top_hits = scored[:limit]
+        timings["rank_ms"] = _elapsed_ms(stage_started)
+        timings["total_ms"] = _elapsed_ms(started)
+        if not degraded:
+            self.query_cache.put(cache_key, generation, top_hits)
 
         # 详细日志
         if top_hits:
@@ -911,16 +1228,54 @@ class SessionManager:
         else:
             logger.info(f"[RAG] 检索完成: 无结果 (语义:{len(semantic_hits)}, 关键词:{len(keyword_hits)})")
 
-        await self.storage.save_memory_event(
-            event_type="retrieval_success" if top_hits else "retrieval_fail",
-            payload={
+        self.event_sink.emit(
+            "retrieval_success" if top_hits else "retrieval_fail",
+            {
                 "query": query,
                 "result_count": len(top_hits),
                 "reason": None if top_hits else "no_hits",
+                "timings_ms": timings,
             },
         )
         return top_hits
 
+    async def _semantic_branch(self, query: str, filters: RetrievalFilter | None = None) -> list[dict]:
+        query_embedding = self.embedding_engine.embed(query)
+        return await self.storage.search_memory_embeddings(query_embedding, limit=20, filters=filters)
+
+    async def _archive_branch(
+        self, query: str, summary_ids: list[str], filters: RetrievalFilter
+    ) -> list[dict]:
+        query_embedding = self.embedding_engine.embed(query)
+        return await self.archive.search(query, query_embedding, summary_ids, filters, limit=20)
+
+    async def _run_retrieval_branch(
+        self,
+        name: str,
+        query: str,
+        branch,
+        timings: dict[str, float],
+    ) -> list[dict] | None:
+        """Await one retrieval branch under the timeout; failures degrade to None."""
+        started = time.perf_counter()
+        try:
+            return await asyncio.wait_for(branch, timeout=self.retrieval_branch_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"[RAG] {name} 检索超时 ({self.retrieval_branch_timeout}s)")
+            self.event_sink.emit(
+                "retrieval_fail",
+                {"query": query, "reason": f"{name}_timeout"},
+            )
+        except Exception as exc:
+            logger.warning(f"[RAG] {name} 检索失败: {exc}")
+            self.event_sink.emit(
+                "retrieval_fail",
+                {"query": query, "reason": f"{name}_error", "error": str(exc)},
+            )
+        finally:
+            timings[f"{name}_ms"] = _elapsed_ms(started)
+        return None
+
     @staticmethod
     def _freshness_score(timestamp: str | None) -> float:
         if not timestamp:
@@ -1429,8 +1784,68 @@ class SessionManager:
                 break
             except Exception as exc:
                 logger.error(f"Embedding worker loop failed: {exc}")
+            if not self._running:
+                # A cancel that lands while waiting on the DB pool can be absorbed by
+                # the driver; don't go back to sleep once cleanup has started.
+                # 取消信号可能在等待连接池时被驱动吞掉，清理开始后不再进入休眠。
+                break
             await asyncio.sleep(self.embedding_poll_interval)
 
+    async def _compaction_loop(self):
+        """Background worker that compacts memory every ``compaction_interval`` seconds."""
+        while self._running:
+            await asyncio.sleep(self.compaction_interval)
+            if not self._running:
+                break
+            try:
+                await self.compact_memory()
+            except asyncio.CancelledError:
+                break
+            except Exception as exc:
+                logger.error(f"Memory compaction failed: {exc}")
+
+    async def compact_memory(self, now: datetime | None = None) -> dict:
+        """Run one compaction pass over SQLite (hot -> summaries + archive) and Kuzu.
+
+        Both stores share the same cutoff, so a turn is folded in Kuzu exactly
+        when its message is folded in SQLite. Returns the run report.
+        """
+        async with self._compaction_lock:
+            await self.flush()
+            report = await self.compactor.run(now)
+            if report.cutoff is not None:
+                await self._compact_kuzu(datetime.fromisoformat(report.cutoff), report)
+
+        stats = self._compaction_stats
+        stats["runs"] += 1
+        stats["messages_archived"] += report.messages_archived
+        stats["summaries_written"] += report.summaries_written
+        stats["last"] = report.to_dict()
+        self.event_sink.emit("memory_compaction", report.to_dict())
+        return report.to_dict()
+
+    async def _compact_kuzu(self, cutoff: datetime, report: CompactionReport) -> None:
+        from memory.kuzu_manager import get_writer
+
+        writer = get_writer()
+        if writer is None:
+            return
+        try:
+            removed, written = await writer.compact(
+                int(cutoff.timestamp() * 1000),
+                cluster_gap_minutes=self.compactor.cluster_gap.total_seconds() / 60,
+                max_cluster=self.compactor.max_cluster,
+                summary_max_chars=self.compactor.summary_max_chars,
+            )
+        except Exception as exc:
+            # SQLite already committed; Kuzu catches up on the next run.
+            # SQLite 已提交，Kuzu 在下一轮压缩时补上。
+            logger.warning(f"Kuzu 记忆压缩失败: {exc}")
+            report.errors.append(f"kuzu: {exc}")
+            return
+        report.kuzu_events_compacted = removed
+        report.kuzu_summaries_written = written
+
     async def cleanup(self):
         """Cleanup resources."""
         self._running = False
@@ -1438,15 +1853,25 @@ class SessionManager:
             self._flush_task.cancel()
         if self._embedding_task:
             self._embedding_task.cancel()
+        if self._compaction_task:
+            self._compaction_task.cancel()
         # Wait for background extraction tasks to finish
         # 等待后台提取任务结束
         if self._extraction_tasks:
             await asyncio.gather(*self._extraction_tasks, return_exceptions=True)
         await asyncio.gather(
-            *(task for task in [self._flush_task, self._embedding_task] if task),
+            *(task for task in [self._flush_task, self._embedding_task, self._compaction_task] if task),
             return_exceptions=True,
         )
         if self._llm_client:
             await self._llm_client.close()
+        if self.write_behind is not None:
+            await self.write_behind.close()
+        await self.event_sink.close()
         await self.storage.cleanup()
+        await self.archive.close()
         self.cache.clear()
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
@@ -125,11 +125,36 @@ def _parse_args() -> argparse.Namespace:
         action="store_true",
         help="启动前重置所有记忆数据（从模板恢复，如无模板则恢复默认值）",
     )
+    parser.add_argument(
+        "--rebuild-kuzu",
+        action="store_true",
+        help="从 SQLite 消息与记忆事实批量重建 Kuzu 图谱后退出（支持中断续跑，需先停止正在运行的实例）",
+    )
     return parser.parse_args()
 
 
+async def _rebuild_kuzu() -> None:
+    """--rebuild-kuzu：CSV 暂存 + COPY FROM 重建 Kuzu 图谱。"""
+    from memory.kuzu_rebuild import KuzuRebuilder
+
+    config = load_config()
+    setup_logger(config.system.log_level)
+    memory = config.memory
+    rebuilder = KuzuRebuilder(
+        sqlite_path=memory.sqlite_path,
+        kuzu_path=getattr(memory, "kuzu_path", "data/kuzu"),
+        vector_index=getattr(memory, "kuzu_vector_index", True),
+        progress=print,
+    )
+    await asyncio.to_thread(rebuilder.run)
+
+
 async def main(args: argparse.Namespace):
     """程序主函数"""
+    if args.rebuild_kuzu:
+        await _rebuild_kuzu()
+        return
+
     # 检查.env文件
     env_file = Path(".env")
     if not env_file.exists():
@@ -0,0 +1,368 @@
+"""IVF-flat approximate nearest neighbour index over numpy."""
+
+from __future__ import annotations
+
+import math
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Sequence
+
+import numpy as np
+
+from memory.vector_index import VectorIndex
+
+
+class IVFFlatIndex:
+    """Inverted-file index: spherical k-means centroids + one flat list per centroid.
+
+    Drop-in replacement for ``VectorIndex`` (same upsert/remove/search API).
+    A query scores the centroids, then scans only the ``nprobe`` closest lists,
+    so cost is roughly ``nlist + nprobe * N / nlist`` dot products instead of N.
+
+    Below ``min_train_size`` rows the index stays untrained and behaves as an
+    exact flat index. ``upsert`` never trains: once the row count reaches
+    ``min_train_size``, or has grown ``retrain_growth`` times past the size it
+    was last trained at, ``needs_training`` turns true and the owner retrains
+    in three steps so k-means can run off the event loop:
+    ``training_snapshot()`` (copy rows, start journaling writes),
+    ``build(rows)`` (pure CPU, thread-safe) and ``install(layout)`` (swap the
+    new lists in and replay the writes journaled meanwhile).
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        nlist: int = 0,
+        nprobe: int = 8,
+        min_train_size: int = 4096,
+        retrain_growth: float = 4.0,
+        kmeans_iterations: int = 12,
+        seed: int = 0,
+    ):
+        self.dimension = int(dimension)
+        self.nlist = int(nlist)
+        self.nprobe = max(1, int(nprobe))
+        self.min_train_size = max(1, int(min_train_size))
+        self.retrain_growth = max(1.5, float(retrain_growth))
+        self.kmeans_iterations = max(1, int(kmeans_iterations))
+        self._rng = np.random.default_rng(seed)
+
+        self._centroids: np.ndarray | None = None
+        self._lists: list[VectorIndex] = [VectorIndex(self.dimension)]
+        self._list_of: dict[tuple[str, str], int] = {}
+        self._trained_size = 0
+        # Writes made while a background build runs: key -> (embedding_id, vector) or None if removed.
+        # 后台训练期间的写入日志：key -> (embedding_id, vector)，删除记为 None。
+        self._journal: dict[tuple[str, str], tuple[str, np.ndarray] | None] | None = None
+
+    def __len__(self) -> int:
+        return len(self._list_of)
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    @property
+    def is_training(self) -> bool:
+        return self._journal is not None
+
+    @property
+    def needs_training(self) -> bool:
+        size = len(self)
+        if not self.is_trained:
+            return size >= self.min_train_size
+        return size >= self._trained_size * self.retrain_growth
+
+    def clear(self) -> None:
+        self._centroids = None
+        self._lists = [VectorIndex(self.dimension)]
+        self._list_of.clear()
+        self._trained_size = 0
+        # Drops any in-flight build: install() ignores layouts once the journal is gone.
+        # 清空时丢弃进行中的训练：日志不存在时 install() 忽略结果。
+        self._journal = None
+
+    def load(self, entries: Iterable[tuple[str, str, str, Sequence[float]]]) -> int:
+        """Bulk load rows, training once at the end instead of per insert."""
+        self.clear()
+        flat = self._lists[0]
+        for embedding_id, source_type, source_id, vector in entries:
+            if flat.upsert(embedding_id, source_type, source_id, vector):
+                self._list_of[(str(source_type), str(source_id))] = 0
+        if len(self) >= self.min_train_size:
+            self.train()
+        return len(self)
+
+    def upsert(
+        self,
+        embedding_id: str,
+        source_type: str,
+        source_id: str,
+        vector: Sequence[float],
+    ) -> bool:
+        key = (str(source_type), str(source_id))
+        target = self._assign_one(vector)
+        current = self._list_of.get(key)
+        if current is not None and current != target:
+            self._lists[current].remove(*key)
+            del self._list_of[key]
+
+        if not self._lists[target].upsert(embedding_id, source_type, source_id, vector):
+            self._list_of.pop(key, None)
+            return False
+        self._list_of[key] = target
+        if self._journal is not None:
+            self._journal[key] = (str(embedding_id), np.array(vector, dtype=np.float32))
+        return True
+
+    def remove(self, source_type: str, source_id: str) -> bool:
+        key = (str(source_type), str(source_id))
+        if self._journal is not None:
+            self._journal[key] = None
+        list_no = self._list_of.pop(key, None)
+        if list_no is None:
+            return False
+        return self._lists[list_no].remove(*key)
+
+    def contains(self, source_type: str, source_id: str) -> bool:
+        return (str(source_type), str(source_id)) in self._list_of
+
+    def items(self) -> Iterator[tuple[str, str, str, np.ndarray]]:
+        for inverted_list in self._lists:
+            yield from inverted_list.items()
+
+    def search(
+        self,
+        query: Sequence[float],
+        limit: int = 20,
+        nprobe: int | None = None,
+    ) -> list[tuple[str, float]]:
+        if not self.is_trained:
+            return self._lists[0].search(query, limit=limit)
+        if limit <= 0 or query is None or len(query) != self.dimension:
+            return []
+
+        probes = min(max(1, int(nprobe or self.nprobe)), len(self._lists))
+        centroid_scores = self._centroids @ np.asarray(query, dtype=np.float32)
+        if probes < len(self._lists):
+            probed = np.argpartition(-centroid_scores, probes - 1)[:probes]
+        else:
+            probed = np.arange(len(self._lists))
+
+        merged: list[tuple[str, float]] = []
+        for list_no in probed:
+            merged.extend(self._lists[int(list_no)].search(query, limit=limit))
+        merged.sort(key=lambda item: item[1], reverse=True)
+        return merged[:limit]
+
+    def search_keys(
+        self,
+        query: Sequence[float],
+        keys: Iterable[tuple[str, str]],
+        limit: int = 20,
+    ) -> list[tuple[str, float]]:
+        """Exact search over the given keys, regardless of which lists they live in."""
+        by_list: dict[int, list[tuple[str, str]]] = {}
+        for key in keys:
+            list_no = self._list_of.get(key)
+            if list_no is not None:
+                by_list.setdefault(list_no, []).append(key)
+        merged: list[tuple[str, float]] = []
+        for list_no, list_keys in by_list.items():
+            merged.extend(self._lists[list_no].search_keys(query, list_keys, limit=limit))
+        merged.sort(key=lambda item: item[1], reverse=True)
+        return merged[:limit]
+
+    def train(self) -> None:
+        """(Re)build centroids synchronously. Used for bulk load; live writers go through build()."""
+        self.install(self.build(self.training_snapshot()))
+
+    def training_snapshot(self) -> list[tuple[str, str, str, np.ndarray]]:
+        """Copy every row for build() and journal writes until install()."""
+        self._journal = {}
+        return [
+            (embedding_id, source_type, source_id, np.array(vector, dtype=np.float32))
+            for embedding_id, source_type, source_id, vector in self.items()
+        ]
+
+    def build(self, rows: list[tuple[str, str, str, np.ndarray]]) -> _Layout | None:
+        """Run spherical k-means over ``rows`` and lay them out into inverted lists.
+
+        Touches no index state besides the RNG, so it can run in a worker thread
+        while the owner keeps serving searches and writes.
+        """
+        if not rows:
+            return None
+        vectors = np.stack([row[3] for row in rows])
+        nlist = self.nlist or max(16, int(math.sqrt(len(rows))))
+        nlist = min(nlist, len(rows))
+        centroids = self._kmeans(vectors, nlist)
+        assignments = _nearest(vectors, centroids)
+
+        lists = [VectorIndex(self.dimension, initial_capacity=64) for _ in range(nlist)]
+        list_of: dict[tuple[str, str], int] = {}
+        for (embedding_id, source_type, source_id, vector), list_no in zip(rows, assignments):
+            lists[int(list_no)].upsert(embedding_id, source_type, source_id, vector)
+            list_of[(source_type, source_id)] = int(list_no)
+        return _Layout(centroids, lists, list_of, len(rows))
+
+    def install(self, layout: _Layout | None) -> bool:
+        """Swap in a built layout and replay writes journaled since its snapshot.
+
+        Returns False when the build was abandoned (``clear()`` ran meanwhile).
+        """
+        journal, self._journal = self._journal, None
+        if journal is None:
+            return False
+        if layout is None:
+            return True
+        self._centroids = layout.centroids
+        self._lists = layout.lists
+        self._list_of = layout.list_of
+        self._trained_size = layout.trained_size
+        for (source_type, source_id), change in journal.items():
+            if change is None:
+                self.remove(source_type, source_id)
+            else:
+                self.upsert(change[0], source_type, source_id, change[1])
+        return True
+
+    def abort_training(self) -> None:
+        """Stop journaling after a failed build; the current layout stays in use."""
+        self._journal = None
+
+    def save(self, path: str | Path, saved_at: float) -> None:
+        centroids = (
+            self._centroids
+            if self._centroids is not None
+            else np.zeros((0, self.dimension), dtype=np.float32)
+        )
+        _save_snapshot(
+            path,
+            saved_at,
+            list(self.items()),
+            self.dimension,
+            centroids=centroids,
+            trained_size=np.int64(self._trained_size),
+        )
+
+    def restore(self, path: str | Path) -> float | None:
+        """Restore rows and centroids without retraining."""
+        snapshot = _load_snapshot(path, self.dimension)
+        if snapshot is None:
+            return None
+        saved_at, rows, extra = snapshot
+        centroids = extra.get("centroids")
+        self.clear()
+        if centroids is None or len(centroids) == 0:
+            self.load(rows)
+            return saved_at
+
+        self._centroids = centroids.astype(np.float32)
+        self._lists = [VectorIndex(self.dimension, initial_capacity=64) for _ in centroids]
+        self._trained_size = int(extra.get("trained_size", len(rows)))
+        if rows:
+            assignments = _nearest(np.stack([row[3] for row in rows]), self._centroids)
+            for (embedding_id, source_type, source_id, vector), list_no in zip(rows, assignments):
+                self._lists[int(list_no)].upsert(embedding_id, source_type, source_id, vector)
+                self._list_of[(source_type, source_id)] = int(list_no)
+        return saved_at
+
+    def _assign_one(self, vector: Sequence[float]) -> int:
+        if self._centroids is None or vector is None or len(vector) != self.dimension:
+            return 0
+        return int(np.argmax(self._centroids @ np.asarray(vector, dtype=np.float32)))
+
+    def _kmeans(self, vectors: np.ndarray, k: int) -> np.ndarray:
+        sample_size = min(len(vectors), max(k * 64, 8192))
+        sample = vectors[self._rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = sample[self._rng.choice(sample_size, k, replace=False)].copy()
+
+        for _ in range(self.kmeans_iterations):
+            assignments = _nearest(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            counts = np.bincount(assignments, minlength=k)
+            empty = counts == 0
+            if empty.any():
+                # Re-seed empty clusters from random sample points.
+                # 空簇用随机样本点重新播种。
+                sums[empty] = sample[self._rng.choice(sample_size, int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+        return centroids
+
+
+class _Layout(NamedTuple):
+    centroids: np.ndarray
+    lists: list[VectorIndex]
+    list_of: dict[tuple[str, str], int]
+    trained_size: int
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray, chunk: int = 16384) -> np.ndarray:
+    """Index of the highest-cosine centroid per row, computed in chunks."""
+    out = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk):
+        block = vectors[start : start + chunk]
+        out[start : start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return out
+
+
+_SNAPSHOT_FIELDS = {"saved_at", "dimension", "vectors", "embedding_ids", "source_types", "source_ids"}
+
+
+def _save_snapshot(
+    path: str | Path,
+    saved_at: float,
+    rows: list[tuple[str, str, str, np.ndarray]],
+    dimension: int,
+    **extra: np.ndarray,
+) -> None:
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    vectors = (
+        np.stack([row[3] for row in rows]).astype(np.float32)
+        if rows
+        else np.zeros((0, dimension), dtype=np.float32)
+    )
+    tmp_path = target.with_name(target.name + ".tmp")
+    with open(tmp_path, "wb") as fh:
+        np.savez(
+            fh,
+            saved_at=np.float64(saved_at),
+            dimension=np.int64(dimension),
+            vectors=vectors,
+            embedding_ids=np.array([row[0] for row in rows], dtype=str),
+            source_types=np.array([row[1] for row in rows], dtype=str),
+            source_ids=np.array([row[2] for row in rows], dtype=str),
+            **extra,
+        )
+    tmp_path.replace(target)
+
+
+def _load_snapshot(
+    path: str | Path,
+    dimension: int,
+) -> tuple[float, list[tuple[str, str, str, np.ndarray]], dict[str, np.ndarray]] | None:
+    target = Path(path)
+    if not target.exists():
+        return None
+    with np.load(target, allow_pickle=False) as data:
+        if int(data["dimension"]) != dimension:
+            return None
+        vectors = data["vectors"]
+        rows = list(
+            zip(
+                data["embedding_ids"].tolist(),
+                data["source_types"].tolist(),
+                data["source_ids"].tolist(),
+                vectors,
+            )
+        )
+        extra = {
+            key: data[key]
+            for key in data.files
+            if key not in _SNAPSHOT_FIELDS
+        }
+        return float(data["saved_at"]), rows, extra
@@ -0,0 +1,236 @@
+"""Cold archive for compacted messages - a separate SQLite file read only on explicit recall."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable, Sequence
+
+import numpy as np
+from loguru import logger
+
+from memory.kuzu_text_index import tokenize
+from memory.retrieval_filter import RetrievalFilter
+from memory.vector_codec import unpack_embedding
+
+# Most rows scored per archive query; the archive is cold, but a recall must stay bounded.
+# 每次归档检索最多打分的行数；归档是冷数据，但单次回忆的开销仍要有上限。
+ARCHIVE_SCAN_MAX = 20_000
+_TIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS archived_messages ("
+    "id TEXT PRIMARY KEY, session_id TEXT NOT NULL, role TEXT NOT NULL, content TEXT NOT NULL, "
+    "timestamp TEXT NOT NULL, metadata TEXT, embedding BLOB, summary_id TEXT NOT NULL, "
+    "archived_at TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_archived_summary ON archived_messages (summary_id)",
+    "CREATE INDEX IF NOT EXISTS ix_archived_timestamp ON archived_messages (timestamp)",
+    "CREATE INDEX IF NOT EXISTS ix_archived_session_ts ON archived_messages (session_id, timestamp)",
+)
+
+
+class MemoryArchive:
+    """Raw messages folded away by compaction, keyed back to their summary message.
+
+    Lives in its own SQLite file so the hot database (and its vector index)
+    only carries summaries. Rows keep their packed embeddings, so recall over
+    the archive is a cosine scan of a bounded candidate set: the rows behind
+    the summaries the hot search found, or the rows inside an explicit time /
+    session / role scope. Calls run on a worker thread behind one lock.
+    """
+
+    def __init__(self, path: str = "data/archive.db"):
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    async def initialize(self) -> None:
+        await asyncio.to_thread(self._open)
+
+    def _open(self) -> None:
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+        self._conn = conn
+        logger.debug(f"记忆归档库已打开: {self.path}")
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+                self._conn = None
+
+    # ── 写入 ─────────────────────────────────────────────────────────────────
+
+    async def add(self, rows: Sequence[dict]) -> int:
+        """Archive raw message dicts (id/session_id/role/content/timestamp/metadata/embedding/summary_id)."""
+        if not rows:
+            return 0
+        return await asyncio.to_thread(self._add_sync, rows)
+
+    def _add_sync(self, rows: Sequence[dict]) -> int:
+        archived_at = datetime.now().strftime(_TIME_FORMAT)
+        with self._lock, self._conn:
+            # OR REPLACE: a run interrupted after archiving re-archives the same rows.
+            # OR REPLACE：归档后中断的压缩重跑时会再次写入同样的行。
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO archived_messages "
+                "(id, session_id, role, content, timestamp, metadata, embedding, summary_id, archived_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        row["id"],
+                        row["session_id"],
+                        row["role"],
+                        row["content"],
+                        row["timestamp"].strftime(_TIME_FORMAT),
+                        _metadata_text(row.get("metadata")),
+                        row.get("embedding"),
+                        row["summary_id"],
+                        archived_at,
+                    )
+                    for row in rows
+                ),
+            )
+        return len(rows)
+
+    async def delete_session(self, session_id: str) -> None:
+        await asyncio.to_thread(
+            self._execute_sync, "DELETE FROM archived_messages WHERE session_id = ?", (session_id,)
+        )
+
+    async def clear(self) -> None:
+        await asyncio.to_thread(self._execute_sync, "DELETE FROM archived_messages")
+
+    def _execute_sync(self, statement: str, params: tuple = ()) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(statement, params)
+
+    # ── 检索 ─────────────────────────────────────────────────────────────────
+
+    async def search(
+        self,
+        query: str,
+        query_embedding: Sequence[float],
+        summary_ids: Iterable[str] = (),
+        filters: RetrievalFilter | None = None,
+        limit: int = 5,
+    ) -> list[dict]:
+        """Score archived rows inside ``filters``, or else the rows behind ``summary_ids``.
+
+        With neither, the newest ``ARCHIVE_SCAN_MAX`` rows are scanned. Hits
+        use the hybrid-search hit shape with ``source_type`` "archive".
+        """
+        return await asyncio.to_thread(
+            self._search_sync, query, query_embedding, tuple(summary_ids), filters, limit
+        )
+
+    def _search_sync(
+        self,
+        query: str,
+        query_embedding: Sequence[float],
+        summary_ids: tuple[str, ...],
+        filters: RetrievalFilter | None,
+        limit: int,
+    ) -> list[dict]:
+        columns = "a.id, a.session_id, a.role, a.content, a.timestamp, a.embedding, a.summary_id"
+        if filters:
+            predicate, params = filters.sql_predicate("a")
+            sql = f"SELECT {columns} FROM archived_messages a WHERE {predicate} "
+        elif summary_ids:
+            sql = (
+                f"SELECT {columns} FROM archived_messages a "
+                "WHERE a.summary_id IN (SELECT value FROM json_each(:summary_ids)) "
+            )
+            params = {"summary_ids": json.dumps(list(summary_ids))}
+        else:
+            sql, params = f"SELECT {columns} FROM archived_messages a ", {}
+        with self._lock:
+            rows = self._conn.execute(
+                sql + "ORDER BY a.timestamp DESC LIMIT :cap", {**params, "cap": ARCHIVE_SCAN_MAX}
+            ).fetchall()
+        if not rows:
+            return []
+
+        semantic = np.zeros(len(rows), dtype=np.float32)
+        embedded = [i for i, row in enumerate(rows) if row[5]]
+        if embedded:
+            query_vec = np.asarray(query_embedding, dtype=np.float32)
+            norm = float(np.linalg.norm(query_vec))
+            if norm > 0:
+                matrix = np.stack([unpack_embedding(rows[i][5]) for i in embedded])
+                norms = np.linalg.norm(matrix, axis=1)
+                norms[norms == 0] = 1.0
+                semantic[embedded] = matrix @ (query_vec / norm) / norms
+        query_terms = set(tokenize(query))
+        hits = []
+        for i, row in enumerate(rows):
+            terms = set(tokenize(row[3])) if query_terms else set()
+            keyword = len(query_terms & terms) / len(query_terms) if query_terms else 0.0
+            if semantic[i] <= 0 and keyword <= 0:
+                continue
+            hits.append(
+                {
+                    "source_type": "archive",
+                    "source_id": row[0],
+                    "session_id": row[1],
+                    "message_role": row[2],
+                    "content": row[3],
+                    "timestamp": datetime.fromisoformat(row[4]).isoformat(),
+                    "summary_id": row[6],
+                    "semantic_score": float(semantic[i]),
+                    "keyword_score": keyword,
+                    "retrieval_type": "archive",
+                }
+            )
+        hits.sort(key=lambda hit: max(hit["semantic_score"], hit["keyword_score"]), reverse=True)
+        return hits[:limit]
+
+    async def get_by_summary(self, summary_id: str) -> list[dict]:
+        """Raw messages folded into one summary, oldest first."""
+        return await asyncio.to_thread(self._get_by_summary_sync, summary_id)
+
+    def _get_by_summary_sync(self, summary_id: str) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, session_id, role, content, timestamp FROM archived_messages "
+                "WHERE summary_id = ? ORDER BY timestamp, id",
+                (summary_id,),
+            ).fetchall()
+        return [
+            {"id": row[0], "session_id": row[1], "role": row[2], "content": row[3], "timestamp": row[4]}
+            for row in rows
+        ]
+
+    async def stats(self) -> dict[str, Any]:
+        return await asyncio.to_thread(self._stats_sync)
+
+    def _stats_sync(self) -> dict[str, Any]:
+        with self._lock:
+            messages, summaries, sessions = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT summary_id), COUNT(DISTINCT session_id) "
+                "FROM archived_messages"
+            ).fetchone()
+        size = Path(self.path).stat().st_size if self.path != ":memory:" and Path(self.path).exists() else 0
+        return {
+            "path": self.path,
+            "messages": int(messages),
+            "summaries": int(summaries),
+            "sessions": int(sessions),
+            "bytes": size,
+        }
+
+
+def _metadata_text(metadata: Any) -> str | None:
+    if metadata is None or isinstance(metadata, str):
+        return metadata
+    return json.dumps(metadata, ensure_ascii=False)
@@ -13,6 +13,10 @@ class ConversationContext:
     metadata: dict = field(default_factory=dict)
     created_at: datetime = field(default_factory=datetime.now)
     last_active: datetime = field(default_factory=datetime.now)
+    # Keep at most this many messages in memory (0 = unlimited); older ones stay in DB
+    # 内存中最多保留的消息数（0 不限制），更早的消息留在数据库按需回填
+    max_messages: int = 0
+    has_older: bool = False
 
     def add_message(self, role: str, content: str, metadata: dict = None):
         """Add message"""
@@ -22,6 +26,22 @@ class ConversationContext:
             "metadata": metadata or {}
         })
         self.last_active = datetime.now()
+        if self.max_messages and len(self.messages) > self.max_messages:
+            del self.messages[: len(self.messages) - self.max_messages]
+            self.has_older = True
+
+    def prepend_messages(self, older: list[dict], has_older: bool):
+        """Prepend an older page loaded on demand (not subject to max_messages)."""
+        self.messages[:0] = older
+        self.has_older = has_older
+
+    def oldest_message_id(self) -> Optional[str]:
+        """Keyset cursor for backfill: ID of the oldest message held in memory."""
+        for message in self.messages:
+            message_id = (message.get("metadata") or {}).get("message_id")
+            if message_id:
+                return str(message_id)
+        return None
 
     def to_dict(self) -> dict:
         """Convert to dict"""
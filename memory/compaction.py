@@ -0,0 +1,232 @@
+"""Memory compaction - fold old conversation turns into summaries and move the raw turns to the archive."""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import re
+import time
+import uuid
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Callable, Sequence
+
+from loguru import logger
+
+from memory.kuzu_text_index import tokenize
+
+if TYPE_CHECKING:
+    from memory.archive import MemoryArchive
+    from memory.storage import MemoryStorage
+
+SUMMARY_ROLE = "summary"
+# Raw messages folded per hot-store transaction; each batch costs one scan of message_fts.
+# 每个热库事务折叠的原始消息数；每批需要扫描一次 message_fts。
+COMPACTION_BATCH_MESSAGES = 2000
+
+_ROLE_LABELS = {"user": "用户", "assistant": "助手"}
+_SENTENCE_RE = re.compile(r"[^。！？!?；;\n]+[。！？!?；;]?")
+_MIN_SENTENCE_CHARS = 4
+
+
+def cluster_messages(
+    rows: Sequence[dict],
+    gap: timedelta,
+    max_size: int,
+) -> list[list[dict]]:
+    """Split one session's time-ordered rows into episodes.
+
+    A new cluster starts after a pause longer than ``gap`` or once the current
+    one holds ``max_size`` rows. Rows carry a ``timestamp`` datetime.
+    """
+    clusters: list[list[dict]] = []
+    current: list[dict] = []
+    for row in rows:
+        if current and (
+            row["timestamp"] - current[-1]["timestamp"] > gap or len(current) >= max_size
+        ):
+            clusters.append(current)
+            current = []
+        current.append(row)
+    if current:
+        clusters.append(current)
+    return clusters
+
+
+def summarize_cluster(rows: Sequence[dict], max_chars: int = 400) -> str:
+    """Extractive summary of one episode, no LLM involved.
+
+    Sentences are scored by how many of their terms recur across the episode
+    (length-normalised), the opening user sentence is always kept because it
+    usually names the topic, and the picked sentences are emitted in their
+    original order with speaker labels under a header giving the time span.
+    """
+    start, end = rows[0]["timestamp"], rows[-1]["timestamp"]
+    end_format = "%H:%M" if start.date() == end.date() else "%Y-%m-%d %H:%M"
+    header = f"对话摘要（{start:%Y-%m-%d %H:%M} ~ {end:{end_format}}，{len(rows)} 条）"
+
+    sentences: list[tuple[int, str, str, set[str]]] = []
+    for row in rows:
+        for match in _SENTENCE_RE.finditer(str(row.get("content") or "")):
+            sentence = match.group().strip()
+            if len(sentence) < _MIN_SENTENCE_CHARS:
+                continue
+            sentences.append((len(sentences), row.get("role") or "", sentence, set(tokenize(sentence))))
+    if not sentences:
+        return header
+
+    doc_freq = Counter(term for *_, terms in sentences for term in terms)
+
+    def centrality(item: tuple[int, str, str, set[str]]) -> float:
+        terms = item[3]
+        if not terms:
+            return 0.0
+        return sum(doc_freq[term] - 1 for term in terms) / math.sqrt(len(terms))
+
+    budget = max(0, max_chars - len(header))
+    picked: list[tuple[int, str, str, set[str]]] = []
+    seen: set[str] = set()
+    opener = next((item for item in sentences if item[1] == "user"), None)
+    ranked = ([opener] if opener else []) + sorted(sentences, key=centrality, reverse=True)
+    for item in ranked:
+        if item[2] in seen:
+            continue
+        cost = len(_summary_line(item[1], item[2])) + 1
+        if cost > budget:
+            if not picked:
+                # Nothing fits: keep a truncated opener rather than a bare header.
+                # 一句都放不下时保留截断的开场句，而不是只有标题。
+                picked.append((item[0], item[1], item[2][: max(0, budget - 4)], item[3]))
+                break
+            continue
+        picked.append(item)
+        seen.add(item[2])
+        budget -= cost
+
+    picked.sort(key=lambda item: item[0])
+    return "\n".join([header, *(_summary_line(role, sentence) for _, role, sentence, _ in picked)])
+
+
+def _summary_line(role: str, sentence: str) -> str:
+    return f"{_ROLE_LABELS.get(role, role or '?')}：{sentence}"
+
+
+@dataclass
+class CompactionReport:
+    """Counters of one compaction run (also kept as the manager's last report)."""
+
+    cutoff: str | None = None
+    sessions: int = 0
+    clusters: int = 0
+    messages_archived: int = 0
+    summaries_written: int = 0
+    kuzu_events_compacted: int = 0
+    kuzu_summaries_written: int = 0
+    seconds: float = 0.0
+    errors: list[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class MemoryCompactor:
+    """Fold messages outside the hot set into per-episode summaries.
+
+    The hot set is the newest ``hot_messages`` raw messages plus anything
+    younger than ``min_age_days``. Older messages are clustered per session,
+    each cluster becomes one ``summary`` message (with FTS row and embedding)
+    in the hot store, and the raw rows, embeddings included, move to the
+    cold ``archive``. Archive rows are written before the hot rows are
+    deleted, so an interrupted run can only leave duplicates, never gaps.
+    """
+
+    def __init__(
+        self,
+        storage: MemoryStorage,
+        archive: MemoryArchive,
+        embed_batch: Callable[[list[str]], Sequence[Sequence[float]]],
+        hot_messages: int = 5000,
+        min_age_days: float = 30.0,
+        cluster_gap_minutes: float = 30.0,
+        max_cluster: int = 40,
+        summary_max_chars: int = 400,
+    ):
+        self.storage = storage
+        self.archive = archive
+        self.embed_batch = embed_batch
+        self.hot_messages = max(0, int(hot_messages))
+        self.min_age = timedelta(days=float(min_age_days))
+        self.cluster_gap = timedelta(minutes=float(cluster_gap_minutes))
+        self.max_cluster = max(2, int(max_cluster))
+        self.summary_max_chars = max(80, int(summary_max_chars))
+
+    async def cutoff(self, now: datetime | None = None) -> datetime | None:
+        """Messages strictly older than this are compacted; None when the hot set holds everything."""
+        return await self.storage.get_compaction_cutoff(
+            self.hot_messages, (now or datetime.now()) - self.min_age
+        )
+
+    async def run(self, now: datetime | None = None) -> CompactionReport:
+        started = time.perf_counter()
+        report = CompactionReport()
+        cutoff = await self.cutoff(now)
+        if cutoff is None:
+            report.seconds = round(time.perf_counter() - started, 3)
+            return report
+        report.cutoff = cutoff.isoformat()
+
+        pending: list[dict] = []
+        pending_messages = 0
+        for session_id in await self.storage.list_compactable_sessions(cutoff):
+            rows = await self.storage.get_compactable_messages(session_id, cutoff)
+            if not rows:
+                continue
+            report.sessions += 1
+            for cluster in cluster_messages(rows, self.cluster_gap, self.max_cluster):
+                pending.append(self._summary_for(session_id, cluster))
+                pending_messages += len(cluster)
+                if pending_messages >= COMPACTION_BATCH_MESSAGES:
+                    await self._commit(pending, report)
+                    pending, pending_messages = [], 0
+        if pending:
+            await self._commit(pending, report)
+
+        report.seconds = round(time.perf_counter() - started, 3)
+        logger.info(
+            f"记忆压缩完成: {report.sessions} 个会话, {report.messages_archived} 条消息归档为 "
+            f"{report.summaries_written} 条摘要, 用时 {report.seconds}s"
+        )
+        return report
+
+    def _summary_for(self, session_id: str, cluster: list[dict]) -> dict:
+        return {
+            "id": str(uuid.uuid4()),
+            "session_id": session_id,
+            "content": summarize_cluster(cluster, self.summary_max_chars),
+            "timestamp": cluster[-1]["timestamp"],
+            "metadata": {
+                "compaction": {
+                    "messages": len(cluster),
+                    "start": cluster[0]["timestamp"].isoformat(),
+                    "end": cluster[-1]["timestamp"].isoformat(),
+                }
+            },
+            "raw": cluster,
+        }
+
+    async def _commit(self, summaries: list[dict], report: CompactionReport) -> None:
+        vectors = await asyncio.to_thread(self.embed_batch, [item["content"] for item in summaries])
+        for item, vector in zip(summaries, vectors):
+            item["embedding"] = list(vector)
+        await self.archive.add(
+            [
+                {**row, "session_id": item["session_id"], "summary_id": item["id"]}
+                for item in summaries
+                for row in item["raw"]
+            ]
+        )
+        archived = await self.storage.apply_compaction(summaries)
+        report.clusters += len(summaries)
+        report.summaries_written += len(summaries)
+        report.messages_archived += archived
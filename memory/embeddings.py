@@ -6,6 +6,9 @@ import hashlib
 import math
 import re
 from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
 
 
 _SYNONYM_MAP = {
@@ -20,6 +23,64 @@ _SYNONYM_MAP = {
     "bad gateway": "gateway error",
 }
 
+_NON_WORD_RE = re.compile(r"[^\w\u4e00-\u9fff+#.-]+")
+_SPACE_RE = re.compile(r"\s+")
+_ASCII_TOKEN_RE = re.compile(r"[a-z0-9_+#.-]{2,}")
+_CHINESE_CHAR_RE = re.compile(r"[\u4e00-\u9fff]")
+
+# Bounded memo of token -> (index, sign, weight); shared by every engine instance.
+# 有界的 token 哈希缓存，所有引擎实例共享。
+_TOKEN_CACHE_SIZE = 65536
+
+
+def _build_synonym_passes(mapping: dict[str, str]) -> list[tuple[re.Pattern, dict[str, str]]]:
+    """Compile the synonym map into as few regex passes as possible.
+
+    The historical implementation applied ``str.replace`` once per key, in
+    order. One alternation regex gives the same result unless a key can match
+    text produced by an earlier replacement (``"bad" + " gateway "``), or a
+    later key can start inside an earlier key's match. Those keys open a new
+    pass so output stays identical.
+    """
+    passes: list[list[str]] = []
+    current: list[str] = []
+    produced_chars: set[str] = set()
+    for key in mapping:
+        overlaps_earlier = any(
+            earlier.startswith(key[-size:])
+            for earlier in current
+            for size in range(1, min(len(key), len(earlier)))
+        )
+        if current and (produced_chars & set(key) or overlaps_earlier):
+            passes.append(current)
+            current = []
+            produced_chars = set()
+        current.append(key)
+        produced_chars |= set(f" {mapping[key]} ")
+    if current:
+        passes.append(current)
+
+    return [
+        (
+            re.compile("|".join(re.escape(key) for key in keys)),
+            {key: f" {mapping[key]} " for key in keys},
+        )
+        for keys in passes
+    ]
+
+
+_SYNONYM_PASSES = _build_synonym_passes(_SYNONYM_MAP)
+
+
+@lru_cache(maxsize=_TOKEN_CACHE_SIZE)
+def _token_slot(token: str, dimension: int) -> tuple[int, float]:
+    """Hash one token to ``(index, signed_weight)``."""
+    digest = hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+    index = int.from_bytes(digest[:4], "big") % dimension
+    sign = 1.0 if digest[4] % 2 == 0 else -1.0
+    weight = 1.0 + (digest[5] / 255.0) * 0.5
+    return index, sign * weight
+
 
 @dataclass(slots=True)
 class EmbeddingConfig:
@@ -35,29 +96,44 @@ class LocalEmbeddingEngine:
 
     def embed(self, text: str) -> list[float]:
         """Generate a normalized dense vector from text."""
-        raw_text = (text or "").strip()
-        if not raw_text:
-            return [0.0] * self.dimension
-        if "[[force_embedding_error]]" in raw_text:
-            raise ValueError("forced embedding error")
-
-        normalized = self._normalize_text(raw_text)
-        tokens = self._tokenize(normalized)
-        if not tokens:
-            return [0.0] * self.dimension
-
-        vec = [0.0] * self.dimension
-        for token in tokens:
-            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
-            index = int.from_bytes(digest[:4], "big") % self.dimension
-            sign = 1.0 if digest[4] % 2 == 0 else -1.0
-            weight = 1.0 + (digest[5] / 255.0) * 0.5
-            vec[index] += sign * weight
-
-        norm = math.sqrt(sum(v * v for v in vec))
-        if norm == 0:
-            return vec
-        return [v / norm for v in vec]
+        return self.embed_batch([text])[0].tolist()
+
+    def embed_batch(self, texts: list[str]) -> np.ndarray:
+        """Embed several texts into a ``(len(texts), dimension)`` float64 matrix.
+
+        Raises if any single text fails. Rows are bit-identical to what the
+        per-text loop produced before, so stored vectors remain comparable.
+        """
+        matrix = np.zeros((len(texts), self.dimension), dtype=np.float64)
+        rows: list[int] = []
+        cols: list[int] = []
+        values: list[float] = []
+        for row, text in enumerate(texts):
+            raw_text = (text or "").strip()
+            if not raw_text:
+                continue
+            if "[[force_embedding_error]]" in raw_text:
+                raise ValueError("forced embedding error")
+            for token in self._tokenize(self._normalize_text(raw_text)):
+                index, value = _token_slot(token, self.dimension)
+                rows.append(row)
+                cols.append(index)
+                values.append(value)
+
+        if values:
+            # add.at is unbuffered and applies updates in order, matching the
+            # old per-token `vec[index] += ...` accumulation exactly.
+            # add.at 按顺序逐个累加，与旧实现的逐 token 累加结果一致。
+            np.add.at(matrix, (rows, cols), values)
+
+        for row in range(len(texts)):
+            vector = matrix[row]
+            # Builtin sum keeps the interpreter's float summation semantics.
+            # 使用内置 sum，保持与旧实现相同的浮点求和方式。
+            norm = math.sqrt(sum((vector * vector).tolist()))
+            if norm != 0:
+                vector /= norm
+        return matrix
 
     @staticmethod
     def cosine_similarity(left: list[float], right: list[float]) -> float:
@@ -75,15 +151,15 @@ class LocalEmbeddingEngine:
 
     def _normalize_text(self, text: str) -> str:
         lowered = text.lower()
-        for key, replacement in _SYNONYM_MAP.items():
-            lowered = lowered.replace(key, f" {replacement} ")
-        lowered = re.sub(r"[^\w\u4e00-\u9fff+#.-]+", " ", lowered)
-        return re.sub(r"\s+", " ", lowered).strip()
+        for pattern, replacements in _SYNONYM_PASSES:
+            lowered = pattern.sub(lambda match: replacements[match.group(0)], lowered)
+        lowered = _NON_WORD_RE.sub(" ", lowered)
+        return _SPACE_RE.sub(" ", lowered).strip()
 
     @staticmethod
     def _tokenize(text: str) -> list[str]:
-        ascii_tokens = re.findall(r"[a-z0-9_+#.-]{2,}", text)
-        chinese_chars = re.findall(r"[\u4e00-\u9fff]", text)
+        ascii_tokens = _ASCII_TOKEN_RE.findall(text)
+        chinese_chars = _CHINESE_CHAR_RE.findall(text)
         # Merge individual Chinese chars into bi-grams for slightly richer semantics.
         # 将单个中文字符合并为二元组，以获得稍丰富的语义表达。
         chinese_bigrams = [
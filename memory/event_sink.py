@@ -0,0 +1,81 @@
+"""Buffered async sink for memory observability events."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from memory.storage import MemoryStorage
+
+
+class MemoryEventSink:
+    """Collect ``memory_events`` rows off the hot path and bulk-insert them.
+
+    ``emit`` only appends to an in-memory buffer. A background task flushes
+    after ``flush_interval`` seconds, or immediately once ``max_pending``
+    events are buffered. Readers that need the events (metrics, event
+    listings) call ``flush`` first.
+    """
+
+    def __init__(
+        self,
+        storage: MemoryStorage,
+        flush_interval: float = 1.0,
+        max_pending: int = 256,
+    ):
+        self._storage = storage
+        self.flush_interval = max(0.0, float(flush_interval))
+        self.max_pending = max(1, int(max_pending))
+        self._buffer: list[tuple[str, dict]] = []
+        self._lock = asyncio.Lock()
+        self._timer: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.written = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def emit(self, event_type: str, payload: dict) -> None:
+        """Buffer one event (non-blocking)."""
+        self._buffer.append((event_type, payload))
+        if len(self._buffer) >= self.max_pending:
+            self._spawn(self.flush())
+        elif self._timer is None or self._timer.done():
+            self._timer = self._spawn(self._flush_later())
+
+    async def flush(self) -> int:
+        """Write every buffered event in one transaction; returns rows written."""
+        async with self._lock:
+            if not self._buffer:
+                return 0
+            batch, self._buffer = self._buffer, []
+            try:
+                await self._storage.save_memory_events(batch)
+            except Exception as exc:
+                self.dropped += len(batch)
+                logger.warning(f"记忆事件批量写入失败，丢弃 {len(batch)} 条: {exc}")
+                return 0
+            self.written += len(batch)
+            return len(batch)
+
+    async def close(self) -> None:
+        """Stop the timer and write whatever is still buffered."""
+        if self._timer and not self._timer.done():
+            self._timer.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
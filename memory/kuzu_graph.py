@@ -0,0 +1,297 @@
+"""Kuzu graph cache - in-memory CSR adjacency and personalized PageRank for multi-hop recall."""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from loguru import logger
+
+from memory.kuzu_store import KuzuStore, execute_sync
+
+# 节点类型编码
+EVENT, ENTITY, FACT = 0, 1, 2
+
+# 边类型 → (起点类型, 终点类型, 默认权重)；RELATED_TO 用边上的 weight
+EDGE_KINDS: dict[str, tuple[int, int, float]] = {
+    "MENTIONS": (EVENT, ENTITY, 1.0),
+    "ABOUT": (FACT, ENTITY, 1.0),
+    "RELATED_TO": (ENTITY, ENTITY, 1.0),
+    # 时间链只是弱关联，权重低于实体边，避免 PPR 沿会话一路走下去
+    "NEXT": (EVENT, EVENT, 0.5),
+}
+
+_LOAD_QUERIES = {
+    "MENTIONS": "MATCH (a:Event)-[:MENTIONS]->(b:Entity) RETURN a.id, b.name, 1.0",
+    "ABOUT": "MATCH (a:Fact)-[:ABOUT]->(b:Entity) RETURN a.id, b.name, 1.0",
+    "RELATED_TO": "MATCH (a:Entity)-[r:RELATED_TO]->(b:Entity) RETURN a.name, b.name, r.weight",
+    "NEXT": "MATCH (a:Event)-[:NEXT]->(b:Event) RETURN a.id, b.id, 1.0",
+}
+
+# 增量边累计超过该条数时并入 CSR（重建一次 O(E log E)）
+DELTA_MERGE_EDGES = 20_000
+
+PPR_ALPHA = 0.15  # 每一步回到种子的概率
+PPR_HOPS = 6  # 截断的传播步数
+# 质量低于 tolerance × 加权度的节点不再向外传播（局部 push 的判据，hub 节点不会反复铺开）
+PPR_TOLERANCE = 1e-4
+
+
+@dataclass(frozen=True)
+class _Adjacency:
+    """一份不可变的邻接快照：CSR 基础部分 + 尚未合并的增量边（均为无向，双向存储）。"""
+
+    indptr: np.ndarray
+    indices: np.ndarray
+    weights: np.ndarray
+    delta_src: np.ndarray
+    delta_dst: np.ndarray
+    delta_w: np.ndarray
+    degree: np.ndarray  # 每个节点的加权度（基础 + 增量）
+    kinds: np.ndarray
+
+    @property
+    def size(self) -> int:
+        return len(self.kinds)
+
+    def push(self, nodes: np.ndarray, mass: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """把 nodes 上的质量按边权比例推给邻居，返回合并后的 (节点, 质量)。"""
+        share = mass / self.degree[nodes]
+        base = nodes < len(self.indptr) - 1
+        src = nodes[base]
+        starts = self.indptr[src]
+        counts = self.indptr[src + 1] - starts
+        total = int(counts.sum())
+        if total:
+            # 把每个节点的 [start, start+count) 区间展开成一维边下标
+            offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+            dst = self.indices[offsets]
+            val = np.repeat(share[base], counts) * self.weights[offsets]
+        else:
+            dst = np.empty(0, dtype=np.int64)
+            val = np.empty(0)
+        if len(self.delta_src):
+            hit = np.isin(self.delta_src, nodes)
+            if hit.any():
+                order = np.argsort(nodes)
+                pos = np.searchsorted(nodes, self.delta_src[hit], sorter=order)
+                dst = np.concatenate([dst, self.delta_dst[hit]])
+                val = np.concatenate([val, share[order[pos]] * self.delta_w[hit]])
+        if not len(dst):
+            return dst, val
+        # 稠密累加比 np.unique 排序快得多（hub 节点一步就能铺开十几万条边）
+        dense = np.bincount(dst, weights=val, minlength=self.size)
+        reached = np.flatnonzero(dense)
+        return reached, dense[reached]
+
+    def neighbors(self, node: int) -> np.ndarray:
+        parts = []
+        if node < len(self.indptr) - 1:
+            parts.append(self.indices[self.indptr[node]:self.indptr[node + 1]])
+        if len(self.delta_src):
+            parts.append(self.delta_dst[self.delta_src == node])
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+
+def _build(src: np.ndarray, dst: np.ndarray, w: np.ndarray, kinds: np.ndarray) -> _Adjacency:
+    n = len(kinds)
+    order = np.argsort(src, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    empty_i, empty_f = np.empty(0, dtype=np.int64), np.empty(0)
+    return _Adjacency(
+        indptr=indptr,
+        indices=dst[order].astype(np.int64),
+        weights=w[order].astype(np.float64),
+        delta_src=empty_i,
+        delta_dst=empty_i,
+        delta_w=empty_f,
+        degree=np.bincount(src, weights=w, minlength=n),
+        kinds=kinds,
+    )
+
+
+class KuzuGraphCache:
+    """
+    Event / Entity / Fact 及其边（MENTIONS、ABOUT、RELATED_TO、NEXT）的内存邻接缓存。
+
+    首次使用时在写线程上从 Kuzu 一次性读出全部边建 CSR（与写入串行，不会漏边）；
+    之后 KuzuWriter 在事务提交后把新建的边推进来，先记为增量边，累计到
+    ``DELTA_MERGE_EDGES`` 条再并入 CSR。读线程每次拿一份不可变快照计算，不持锁。
+    """
+
+    def __init__(self, store: KuzuStore, merge_threshold: int = DELTA_MERGE_EDGES):
+        self._store = store
+        self.merge_threshold = max(1, int(merge_threshold))
+        self._lock = threading.Lock()
+        self._index: dict[tuple[int, str], int] = {}
+        self._keys: list[str] = []
+        # 节点类型按容量倍增的数组存放，快照取前缀视图（已有节点的类型不会再变）
+        self._kinds = np.zeros(1024, dtype=np.int8)
+        self._entity_names: list[str] = []
+        self._pending: list[tuple[int, int, float]] = []
+        self._adjacency: _Adjacency | None = None
+        self.loaded = False
+        self.load_ms = 0.0
+        self.merges = 0
+
+    # ── 加载与增量刷新（写线程）──────────────────────────────────────────────
+
+    def load_sync(self) -> None:
+        """从 Kuzu 读出全部边建 CSR；须在写线程上调用，已加载时直接返回。"""
+        if self.loaded:
+            return
+        started = time.perf_counter()
+        edges: list[tuple[int, int, float]] = []
+        for kind, query in _LOAD_QUERIES.items():
+            src_kind, dst_kind, _ = EDGE_KINDS[kind]
+            for a, b, w in execute_sync(self._store.conn, query):
+                edges.append((self._node(src_kind, a), self._node(dst_kind, b), float(w or 1.0)))
+        with self._lock:
+            self._adjacency = self._rebuild(edges, None)
+            self.loaded = True
+        self.load_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(
+            f"Kuzu 图缓存加载完成: {len(self._keys)} 个节点, {len(edges)} 条边, {self.load_ms}ms"
+        )
+
+    def reset_sync(self) -> None:
+        """事件被删除（压缩）后丢弃整个缓存；已加载时在写线程上立即重新加载。"""
+        was_loaded = self.loaded
+        with self._lock:
+            self._index = {}
+            self._keys = []
+            self._kinds = np.zeros(1024, dtype=np.int8)
+            self._entity_names = []
+            self._pending = []
+            self._adjacency = None
+            self.loaded = False
+        if was_loaded:
+            self.load_sync()
+
+    def add_edges_sync(self, edges: list[tuple[str, str, str, float | None]]) -> None:
+        """写入器提交后推入新建的边 (kind, src, dst, weight)；未加载时忽略（加载会读到）。"""
+        if not self.loaded or not edges:
+            return
+        with self._lock:
+            for kind, src, dst, weight in edges:
+                src_kind, dst_kind, default = EDGE_KINDS[kind]
+                self._pending.append((
+                    self._node(src_kind, src),
+                    self._node(dst_kind, dst),
+                    default if weight is None else float(weight),
+                ))
+
+    def _node(self, kind: int, key: str) -> int:
+        idx = self._index.get((kind, key))
+        if idx is None:
+            idx = self._index[(kind, key)] = len(self._keys)
+            self._keys.append(key)
+            if idx == len(self._kinds):
+                self._kinds = np.concatenate([self._kinds, np.zeros_like(self._kinds)])
+            self._kinds[idx] = kind
+            if kind == ENTITY:
+                self._entity_names.append(key)
+        return idx
+
+    def snapshot(self) -> _Adjacency | None:
+        """当前邻接快照；有待合并的增量边时先并入。"""
+        with self._lock:
+            if self._pending:
+                self._adjacency = self._rebuild(self._pending, self._adjacency)
+                self._pending = []
+            return self._adjacency
+
+    def _rebuild(self, edges: list[tuple[int, int, float]], base: _Adjacency | None) -> _Adjacency:
+        n = len(self._keys)
+        kinds = self._kinds[:n]
+        arr = np.asarray(edges, dtype=np.float64).reshape(-1, 3)
+        a, b, w = arr[:, 0].astype(np.int64), arr[:, 1].astype(np.int64), arr[:, 2]
+        # 无向：两个方向各存一条
+        src, dst, w = np.concatenate([a, b]), np.concatenate([b, a]), np.concatenate([w, w])
+        if base is None:
+            return _build(src, dst, w, kinds)
+        delta_src = np.concatenate([base.delta_src, src])
+        delta_dst = np.concatenate([base.delta_dst, dst])
+        delta_w = np.concatenate([base.delta_w, w])
+        if len(delta_src) >= 2 * self.merge_threshold:
+            base_src = np.repeat(np.arange(len(base.indptr) - 1), np.diff(base.indptr))
+            self.merges += 1
+            return _build(
+                np.concatenate([base_src, delta_src]),
+                np.concatenate([base.indices, delta_dst]),
+                np.concatenate([base.weights, delta_w]),
+                kinds,
+            )
+        degree = np.zeros(n)
+        degree[:len(base.degree)] = base.degree
+        degree += np.bincount(src, weights=w, minlength=n)
+        return _Adjacency(
+            indptr=base.indptr,
+            indices=base.indices,
+            weights=base.weights,
+            delta_src=delta_src,
+            delta_dst=delta_dst,
+            delta_w=delta_w,
+            degree=degree,
+            kinds=kinds,
+        )
+
+    # ── 查询（读线程）────────────────────────────────────────────────────────
+
+    def lookup(self, kind: int, key: str) -> int | None:
+        return self._index.get((kind, key))
+
+    def key(self, node: int) -> str:
+        return self._keys[node]
+
+    def entity_names(self) -> list[str]:
+        return list(self._entity_names)
+
+    def personalized_pagerank(
+        self,
+        seeds: dict[int, float],
+        alpha: float = PPR_ALPHA,
+        hops: int = PPR_HOPS,
+        tolerance: float = PPR_TOLERANCE,
+    ) -> tuple[np.ndarray, np.ndarray, _Adjacency] | None:
+        """
+        截断的个性化 PageRank：score = Σ_t α(1-α)^t · P^t · s。种子总会传播一步，
+        之后只从质量不低于 ``tolerance`` × 加权度的节点继续传播。返回 (节点, 分数, 快照)，
+        按分数降序。
+        """
+        adjacency = self.snapshot()
+        # 快照之后才出现的节点不在本次计算范围内
+        seeds = {node: weight for node, weight in seeds.items() if adjacency and node < adjacency.size}
+        if not seeds:
+            return None
+        nodes = np.fromiter(seeds.keys(), dtype=np.int64)
+        mass = np.fromiter(seeds.values(), dtype=np.float64)
+        mass /= mass.sum()
+        scores = np.zeros(adjacency.size)
+        for hop in range(hops + 1):
+            scores[nodes] += alpha * mass  # push 的结果已按节点去重
+            if hop == hops:
+                break
+            degree = adjacency.degree[nodes]
+            keep = (degree > 0) & ((mass * (1 - alpha) >= tolerance * degree) | (hop == 0))
+            if not keep.any():
+                break
+            nodes, mass = adjacency.push(nodes[keep], mass[keep] * (1 - alpha))
+        reached = np.flatnonzero(scores)
+        order = np.argsort(-scores[reached])
+        return reached[order], scores[reached][order], adjacency
+
+    def stats(self) -> dict:
+        adjacency = self._adjacency
+        return {
+            "loaded": self.loaded,
+            "nodes": len(self._keys),
+            "edges": int(len(adjacency.indices) + len(adjacency.delta_src)) // 2 if adjacency else 0,
+            "delta_edges": int(len(adjacency.delta_src)) // 2 if adjacency else 0,
+            "pending_edges": len(self._pending),
+            "merges": self.merges,
+            "load_ms": self.load_ms,
+        }
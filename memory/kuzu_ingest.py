@@ -0,0 +1,251 @@
+"""Kuzu ingest buffer - batch events, entities and relations into one transaction per flush."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from memory.kuzu_writer import KuzuWriter
+
+
+@dataclass
+class IngestBatch:
+    """一次 flush 要写入的内容（按写入顺序：会话 → 事件 → 实体 → 边）。"""
+
+    events: list[dict] = field(default_factory=list)
+    entities: dict[str, str] = field(default_factory=dict)
+    mentions: list[tuple[str, str]] = field(default_factory=list)
+    relations: list[tuple[str, str, str, float]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return (
+            len(self.events) + len(self.entities) + len(self.mentions) + len(self.relations)
+        )
+
+    def extend(self, newer: IngestBatch) -> None:
+        """把另一个批次追加到本批次之后。"""
+        self.events.extend(newer.events)
+        self.entities.update(newer.entities)
+        self.mentions.extend(newer.mentions)
+        self.relations.extend(newer.relations)
+
+    def split_rows(self) -> list[tuple[tuple, IngestBatch]]:
+        """拆成按依赖顺序提交的单行批次：实体 → 事件（连同其提及边）→ 剩余提及边 → 关系。
+
+        每行带一个稳定的 key，用于跨 flush 统计该行的失败次数。
+        """
+        rows: list[tuple[tuple, IngestBatch]] = [
+            (("entity", name), IngestBatch(entities={name: entity_type}))
+            for name, entity_type in self.entities.items()
+        ]
+        mentions_by_event: dict[str, list[tuple[str, str]]] = {}
+        for mention in self.mentions:
+            mentions_by_event.setdefault(mention[0], []).append(mention)
+        for event in self.events:
+            rows.append(
+                (("event", event["id"]), IngestBatch(events=[event], mentions=mentions_by_event.pop(event["id"], [])))
+            )
+        for mentions in mentions_by_event.values():
+            rows.extend((("mention", *mention), IngestBatch(mentions=[mention])) for mention in mentions)
+        rows.extend((("relation", *relation[:3]), IngestBatch(relations=[relation])) for relation in self.relations)
+        return rows
+
+    def extend_front(self, older: IngestBatch) -> None:
+        """把提交失败的旧批次放回当前缓冲区之前（重试时保持顺序）。"""
+        self.events[:0] = older.events
+        self.entities = {**older.entities, **self.entities}
+        self.mentions[:0] = older.mentions
+        self.relations[:0] = older.relations
+
+
+class KuzuIngestBuffer:
+    """
+    Kuzu 写入缓冲：事件、实体、提及/实体关系先进内存，由写线程按批
+    在一个事务内写入（UNWIND 建节点、主键查找建边、倒排批量写入）。
+    同会话相邻事件的 NEXT 链由写入器自动维护。
+
+    ``add_event`` 立即返回 event_id；缓冲在首条写入 ``flush_interval_ms`` 后、
+    或累计 ``max_batch`` 条时提交。``flush`` 是读己之写的屏障。整批提交失败时
+    逐行重试，单行仍失败的留在缓冲区下次重试，累计失败 ``max_row_attempts`` 次
+    后丢弃并记录日志，避免一条坏数据（如含孤立代理字符的内容）卡住后续所有写入。
+    """
+
+    def __init__(
+        self,
+        writer: KuzuWriter,
+        flush_interval_ms: int = 50,
+        max_batch: int = 256,
+        max_row_attempts: int = 3,
+    ):
+        self._writer = writer
+        self.flush_interval = max(0, int(flush_interval_ms)) / 1000.0
+        self.max_batch = max(1, int(max_batch))
+        self.max_row_attempts = max(1, int(max_row_attempts))
+        self._batch = IngestBatch()
+        # 各行单独提交失败的次数
+        self._row_failures: dict[tuple, int] = {}
+        self._lock = asyncio.Lock()
+        self._timer: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.committed_events = 0
+        self.commits = 0
+        self.dropped_rows = 0
+
+    def __len__(self) -> int:
+        return len(self._batch)
+
+    def add_event(
+        self,
+        session_id: str,
+        role: str,
+        content: str,
+        event_id: str | None = None,
+        summary: str = "",
+        timestamp: int | None = None,
+    ) -> str:
+        """缓冲一条 Event（连同所属 Session），返回 event_id。"""
+        eid = event_id or uuid.uuid4().hex
+        self._batch.events.append({
+            "id": eid,
+            "sid": session_id,
+            "ts": timestamp or int(time.time() * 1000),
+            "role": role,
+            "content": content[:2000],  # 截断超长内容
+            "summary": summary[:500],
+        })
+        self._schedule()
+        return eid
+
+    def add_entity(self, name: str, entity_type: str) -> None:
+        self._batch.entities[name] = entity_type
+        self._schedule()
+
+    def add_mention(self, event_id: str, entity_name: str) -> None:
+        self._batch.mentions.append((event_id, entity_name))
+        self._schedule()
+
+    def add_relation(self, from_entity: str, to_entity: str, rel_type: str, weight: float = 1.0) -> None:
+        self._batch.relations.append((from_entity, to_entity, rel_type, weight))
+        self._schedule()
+
+    async def flush(self) -> int:
+        """提交缓冲区中的全部内容；返回写入的条目数。"""
+        async with self._lock:
+            if not self._batch:
+                return 0
+            batch, self._batch = self._batch, IngestBatch()
+            write = asyncio.ensure_future(self._commit(batch))
+            try:
+                await asyncio.shield(write)
+            except asyncio.CancelledError:
+                # 调用方被取消时仍等待事务的真实结果，避免已提交的内容被重复写入
+                await asyncio.wait({write})
+                raise
+            finally:
+                if write.done() and not write.cancelled() and write.exception() is None:
+                    retry, committed, error = write.result()
+                else:
+                    retry, committed, error = batch, 0, None
+                self._batch.extend_front(retry)
+            if error is not None:
+                raise error
+            return committed
+
+    async def _commit(self, batch: IngestBatch) -> tuple[IngestBatch, int, Exception | None]:
+        """整批提交，失败时逐行提交。
+
+        返回 (需要重新缓冲的内容, 写入的条目数, 一行都没写入时的错误)。
+        """
+        rows = batch.split_rows()
+        if len(rows) > 1:
+            try:
+                await self._submit(batch)
+            except Exception as e:
+                logger.warning(f"Kuzu 批量写入失败，改为逐行写入: {e}")
+            else:
+                self.committed_events += len(batch.events)
+                return IngestBatch(), len(batch), None
+
+        retry = IngestBatch()
+        committed = 0
+        last_error: Exception | None = None
+        for key, row in rows:
+            try:
+                await self._submit(row)
+            except Exception as e:
+                last_error = e
+                if self._keep_failed_row(key, e):
+                    retry.extend(row)
+                continue
+            self._row_failures.pop(key, None)
+            self.committed_events += len(row.events)
+            committed += len(row)
+        stalled = not committed and len(retry) > 0
+        return retry, committed, last_error if stalled else None
+
+    async def _submit(self, batch: IngestBatch) -> None:
+        await self._writer._store.submit_write(self._writer.ingest_batch_sync, batch)
+        self.commits += 1
+
+    def _keep_failed_row(self, key: tuple, error: Exception) -> bool:
+        """单行失败是否留待下次重试；累计 ``max_row_attempts`` 次后丢弃。"""
+        failures = self._row_failures.get(key, 0) + 1
+        if failures < self.max_row_attempts:
+            self._row_failures[key] = failures
+            return True
+        self._row_failures.pop(key, None)
+        self.dropped_rows += 1
+        logger.error(f"Kuzu 写入多次失败，已丢弃: {key[0]} {key[1]!r} | {error}")
+        return False
+
+    async def close(self) -> None:
+        """停止定时器并提交剩余内容（关闭前调用）。"""
+        if self._timer and not self._timer.done():
+            self._timer.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        # 每轮失败的行各记一次，最多 max_row_attempts 轮后坏行都已丢弃
+        for attempt in range(self.max_row_attempts):
+            try:
+                await self.flush()
+            except Exception:
+                if attempt == self.max_row_attempts - 1:
+                    raise
+            if not self._batch:
+                break
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._batch),
+            "committed_events": self.committed_events,
+            "commits": self.commits,
+            "dropped_rows": self.dropped_rows,
+        }
+
+    def _schedule(self) -> None:
+        if len(self._batch) >= self.max_batch:
+            self._spawn(self._flush_quietly())
+        elif self._timer is None or self._timer.done():
+            self._timer = self._spawn(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        await self._flush_quietly()
+
+    async def _flush_quietly(self) -> None:
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.warning(f"Kuzu 批量写入失败，将在下次 flush 重试: {e}")
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
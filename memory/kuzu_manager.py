@@ -2,26 +2,49 @@
 
 from __future__ import annotations
 
+
 from loguru import logger
 
+from memory.kuzu_graph import KuzuGraphCache
 from memory.kuzu_store import KuzuStore
 from memory.kuzu_writer import KuzuWriter
 from memory.kuzu_retriever import KuzuRetriever
+from memory.kuzu_text_index import KuzuTextIndex
 
 _store: KuzuStore | None = None
 _writer: KuzuWriter | None = None
 _retriever: KuzuRetriever | None = None
 
 
-async def initialize(db_path: str = "data/kuzu") -> None:
+async def initialize(
+    db_path: str = "data/kuzu",
+    vector_index: bool = True,
+    vector_index_min_events: int = 20000,
+    read_connections: int = 4,
+    write_queue_size: int = 256,
+    ingest_flush_interval_ms: int = 50,
+    ingest_max_batch: int = 256,
+) -> None:
     """初始化 Kuzu 全局单例，应在应用启动时调用一次。"""
     global _store, _writer, _retriever
 
-    _store = KuzuStore(db_path=db_path)
+    _store = KuzuStore(
+        db_path=db_path,
+        vector_index=vector_index,
+        vector_index_min_events=vector_index_min_events,
+        read_connections=read_connections,
+        write_queue_size=write_queue_size,
+    )
     await _store.initialize()
+    # 旧图首次启用文本索引时回填（须在任何写入之前）
+    await _store.submit_write(KuzuTextIndex(_store).backfill_sync)
 
-    _writer = KuzuWriter(_store)
-    _retriever = KuzuRetriever(_store)
+    # PPR 用的内存邻接缓存：writer 提交后增量推边，retriever 首次 ppr 查询时加载
+    graph = KuzuGraphCache(_store)
+    _writer = KuzuWriter(
+        _store, flush_interval_ms=ingest_flush_interval_ms, max_batch=ingest_max_batch, graph=graph
+    )
+    _retriever = KuzuRetriever(_store, graph=graph)
 
     logger.info(f"Kuzu 记忆层初始化完成: {db_path}")
 
@@ -29,8 +52,15 @@ async def initialize(db_path: str = "data/kuzu") -> None:
 async def cleanup() -> None:
     """清理 Kuzu 资源，应在应用关闭时调用。"""
     global _store, _writer, _retriever
-    if _store:
-        await _store.cleanup()
+    try:
+        if _writer:
+            # 先提交缓冲中的事件 / 实体，再关闭写线程
+            await _writer.ingest.close()
+    except Exception as e:
+        logger.error(f"Kuzu 关闭前提交缓冲失败，未写入的内容将丢失: {e}")
+    finally:
+        if _store:
+            await _store.cleanup()
     _store = None
     _writer = None
     _retriever = None
@@ -0,0 +1,397 @@
+"""Kuzu rebuild - bulk reload the graph from SQLite via CSV staging and COPY FROM."""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+import shutil
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+import kuzu
+import numpy as np
+from loguru import logger
+
+from memory.embeddings import EmbeddingConfig, LocalEmbeddingEngine
+from memory.kuzu_store import EMBEDDING_DIM, KuzuStore, execute_sync
+from memory.kuzu_text_index import KuzuTextIndex
+from memory.vector_codec import unpack_embedding
+
+# 每个 CSV 分片的消息条数（也是断点续跑的粒度）
+REBUILD_CHUNK_ROWS = 100_000
+
+_MANIFEST_VERSION = 1
+
+# 含自由文本（可能有换行）的文件须用串行 CSV 解析
+_TEXT_FILES = ("Event", "Fact")
+
+
+@dataclass
+class RebuildReport:
+    """一次重建的结果统计。"""
+
+    events: int = 0
+    sessions: int = 0
+    facts: int = 0
+    entities: int = 0
+    embeddings_reused: int = 0
+    resumed: bool = False
+    seconds: float = 0.0
+
+
+class KuzuRebuilder:
+    """
+    从 SQLite L0 数据重建 Kuzu 图：messages → Event / IN_SESSION / NEXT，
+    memory_facts → Fact，已有 memory_embeddings 直接复用为 Event.embedding。
+
+    流程：按 (session_id, timestamp, id) 键集分页把数据流式导出为 CSV 分片，
+    在暂存目录里新建 Kuzu 库用 COPY FROM 批量导入，回填文本索引，最后把新库
+    换到 kuzu_path（旧库保留为 ``<kuzu_path>.bak``）。
+
+    每一步完成后写入 manifest.json；中断后再次运行会跳过已导出的分片和已导入
+    的文件。SQLite 源数据有变化（条数 / 最新时间戳不同）时从头开始。旧图中的
+    Entity / RELATED_TO / ABOUT 可读时一并迁移（MENTIONS 指向的旧事件 id 已
+    不存在，无法保留）。
+    """
+
+    def __init__(
+        self,
+        sqlite_path: str,
+        kuzu_path: str,
+        staging_dir: str | None = None,
+        chunk_rows: int = REBUILD_CHUNK_ROWS,
+        vector_index: bool = False,
+        progress: Callable[[str], None] | None = None,
+    ):
+        self.sqlite_path = sqlite_path
+        self.kuzu_path = Path(kuzu_path)
+        self.staging = Path(staging_dir) if staging_dir else Path(f"{kuzu_path}.rebuild")
+        self.chunk_rows = max(1, int(chunk_rows))
+        self.vector_index = vector_index
+        self._progress = progress or (lambda msg: logger.info(msg))
+        self._manifest: dict = {}
+        self._started = 0.0
+
+    # ── 入口 ─────────────────────────────────────────────────────────────────
+
+    def run(self) -> RebuildReport:
+        """执行（或续跑）一次完整重建，返回统计。"""
+        self._started = time.perf_counter()
+        source = self._fingerprint()
+        resumed = self._open_manifest(source)
+        if resumed:
+            self._report(f"续跑上次未完成的重建（已导出 {self._manifest['events']} 条事件）")
+
+        if not self._manifest["events_exported"]:
+            self._export_events(source["messages"])
+        if not self._manifest["facts_exported"]:
+            self._export_facts()
+        if not self._manifest["graph_exported"]:
+            self._export_graph_layer()
+        self._load()
+        self._swap()
+
+        report = RebuildReport(
+            events=self._manifest["events"],
+            sessions=self._manifest["sessions"],
+            facts=self._manifest["facts"],
+            entities=self._manifest["entities"],
+            embeddings_reused=self._manifest["embeddings_reused"],
+            resumed=resumed,
+            seconds=round(time.perf_counter() - self._started, 1),
+        )
+        shutil.rmtree(self.staging, ignore_errors=True)
+        self._report(f"重建完成: {asdict(report)}")
+        return report
+
+    # ── 导出 ─────────────────────────────────────────────────────────────────
+
+    def _export_events(self, total: int) -> None:
+        """流式导出 messages：每个分片写 Event / IN_SESSION / NEXT 三个 CSV。"""
+        embedder = LocalEmbeddingEngine(EmbeddingConfig(dimension=EMBEDDING_DIM))
+        m = self._manifest
+        with self._sqlite() as db:
+            # Without ANALYZE stats SQLite picks the low-selectivity source_type index and
+            # scans every embedding per message; pin the per-message source_id lookup.
+            # 无统计信息时 SQLite 会选 source_type 索引、每条消息扫一遍全部向量，这里固定走 source_id
+            while True:
+                cursor = m["cursor"]
+                rows = db.execute(
+                    """
+                    SELECT m.id, m.session_id, m.role, m.content, m.timestamp,
+                           (SELECT e.embedding
+                              FROM memory_embeddings e INDEXED BY ix_memory_embeddings_source_id
+                             WHERE e.source_id = m.id AND e.source_type = 'message'
+                             LIMIT 1)
+                    FROM messages m
+                    WHERE (m.session_id, m.timestamp, m.id) > (?, ?, ?)
+                    ORDER BY m.session_id, m.timestamp, m.id
+                    LIMIT ?
+                    """,
+                    (*(cursor or ("", "", "")), self.chunk_rows),
+                ).fetchall()
+                if not rows:
+                    break
+                part = len(m["chunks"])
+                m["sessions"] += self._write_event_chunk(part, rows, embedder)
+                m["chunks"].append(part)
+                m["events"] += len(rows)
+                m["cursor"] = [rows[-1][1], rows[-1][4], rows[-1][0]]
+                self._save_manifest()
+                self._report(f"导出事件 {m['events']}/{total} ({m['events'] * 100 // max(total, 1)}%)")
+        m["events_exported"] = True
+        self._save_manifest()
+
+    def _write_event_chunk(self, part: int, rows: list[tuple], embedder: LocalEmbeddingEngine) -> int:
+        """写一个分片；返回分片中新出现的会话数。NEXT 链跨分片由 manifest 中的上一条接续。"""
+        m = self._manifest
+        vectors = np.zeros((len(rows), EMBEDDING_DIM), dtype=np.float32)
+        missing = []
+        for i, row in enumerate(rows):
+            stored = _stored_embedding(row[5])
+            if stored is None:
+                missing.append(i)
+            else:
+                vectors[i] = stored
+        if missing:
+            vectors[missing] = embedder.embed_batch([rows[i][3] or "" for i in missing])
+        m["embeddings_reused"] += len(rows) - len(missing)
+
+        new_sessions = 0
+        prev_session, prev_id = m["last_event"] or (None, None)
+        with self._csv(f"Event-{part}") as events, self._csv(f"IN_SESSION-{part}") as in_session, \
+                self._csv(f"NEXT-{part}") as chain, self._csv(f"Session-{part}") as sessions:
+            for (msg_id, session_id, role, content, ts, _), vector in zip(rows, _vector_literals(vectors)):
+                if session_id != prev_session:
+                    sessions.writerow((session_id, session_id, _epoch_ms(ts) // 1000))
+                    new_sessions += 1
+                else:
+                    chain.writerow((prev_id, msg_id))
+                # 压缩生成的摘要消息同时写入 Event.summary
+                summary = (content or "")[:500] if role == "summary" else ""
+                events.writerow((msg_id, session_id, _epoch_ms(ts), role, (content or "")[:2000], summary, vector))
+                in_session.writerow((msg_id, session_id))
+                prev_session, prev_id = session_id, msg_id
+        m["last_event"] = [prev_session, prev_id]
+        return new_sessions
+
+    def _export_facts(self) -> None:
+        """导出 active 的 memory_facts（同一 scope:key 取最新一条，与 upsert_fact 的 id 一致）。"""
+        latest: dict[str, tuple] = {}
+        with self._sqlite() as db:
+            for scope, key, value, confidence, updated_at in db.execute(
+                "SELECT scope, fact_key, fact_value, confidence, updated_at FROM memory_facts "
+                "WHERE status = 'active' ORDER BY updated_at"
+            ):
+                fact_id = f"{scope}:{key}"
+                latest[fact_id] = (fact_id, scope, key, value, confidence, _epoch_ms(updated_at) // 1000)
+        with self._csv("Fact") as writer:
+            writer.writerows(latest.values())
+        self._manifest["facts"] = len(latest)
+        self._manifest["fact_ids"] = sorted(latest)
+        self._manifest["facts_exported"] = True
+        self._save_manifest()
+        self._report(f"导出事实 {len(latest)} 条")
+
+    def _export_graph_layer(self) -> None:
+        """旧图可读时导出 LLM 抽取的实体层；旧库损坏则跳过。"""
+        entities: list[list] = []
+        relations: list[list] = []
+        about: list[list] = []
+        if self.kuzu_path.exists():
+            try:
+                db = kuzu.Database(str(self.kuzu_path), read_only=True)
+                conn = kuzu.Connection(db)
+                entities = execute_sync(conn, "MATCH (e:Entity) RETURN e.name, e.type")
+                relations = execute_sync(
+                    conn,
+                    "MATCH (a:Entity)-[r:RELATED_TO]->(b:Entity) "
+                    "RETURN a.name, b.name, r.rel_type, r.weight",
+                )
+                fact_ids = set(self._manifest["fact_ids"])
+                about = [
+                    row for row in execute_sync(
+                        conn, "MATCH (f:Fact)-[:ABOUT]->(e:Entity) RETURN f.id, e.name"
+                    )
+                    if row[0] in fact_ids
+                ]
+                del conn, db
+            except Exception as e:
+                logger.warning(f"旧 Kuzu 图不可读，实体层不迁移: {e}")
+                entities, relations, about = [], [], []
+        with self._csv("Entity") as writer:
+            writer.writerows(entities)
+        with self._csv("RELATED_TO") as writer:
+            writer.writerows(relations)
+        with self._csv("ABOUT") as writer:
+            writer.writerows(about)
+        self._manifest["entities"] = len(entities)
+        self._manifest["graph_exported"] = True
+        self._save_manifest()
+
+    # ── 导入 ─────────────────────────────────────────────────────────────────
+
+    def _load(self) -> None:
+        """在暂存目录新建库并按依赖顺序 COPY：节点表 → 关系表 → 文本索引 → 向量索引。"""
+        m = self._manifest
+        chunks = m["chunks"]
+        order = (
+            [f"Session-{p}" for p in chunks] + [f"Event-{p}" for p in chunks]
+            + ["Fact", "Entity"]
+            + [f"IN_SESSION-{p}" for p in chunks] + [f"NEXT-{p}" for p in chunks]
+            + ["RELATED_TO", "ABOUT"]
+        )
+        store = KuzuStore(db_path=str(self.staging / "kuzu"), vector_index=False)
+        store._init_sync()
+        try:
+            for name in order:
+                if name in m["loaded"]:
+                    continue
+                path = self.staging / f"{name}.csv"
+                if path.stat().st_size:
+                    table = name.split("-")[0]
+                    options = "HEADER=false, PARALLEL=false" if table in _TEXT_FILES else "HEADER=false"
+                    store.conn.execute(f"COPY {table} FROM '{path.as_posix()}' ({options})")
+                m["loaded"].append(name)
+                self._save_manifest()
+                self._report(f"导入 {name} ({len(m['loaded'])}/{len(order)})")
+
+            if not m["indexed"]:
+                KuzuTextIndex(store).backfill_sync()
+                m["indexed"] = True
+                self._save_manifest()
+                self._report("文本索引回填完成")
+            if self.vector_index:
+                store.event_count = m["events"]
+                store.vector_index_enabled = True
+                store._ensure_vector_index()
+                self._report("向量索引就绪" if store.vector_index_ready else "向量索引创建失败，启动时重试")
+        finally:
+            store._conn = None
+            store._db = None
+
+    def _swap(self) -> None:
+        """旧库（含 .wal 等附属文件）移到 ``<kuzu_path>.bak``，新库换入。"""
+        target = self.kuzu_path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        backup = f"{target.name}.bak"
+        for old in target.parent.glob(f"{backup}*"):
+            _remove(old)
+        for old in [target, *target.parent.glob(f"{target.name}.*")]:
+            if old.exists() and old != self.staging and not old.name.startswith(backup):
+                old.rename(old.with_name(backup + old.name[len(target.name):]))
+        for new in self.staging.glob("kuzu*"):
+            new.rename(target.with_name(target.name + new.name[len("kuzu"):]))
+        # 事实已随重建导入，启动时不再重复迁移
+        Path(f"{target}.migrated").touch()
+
+    # ── 内部 ─────────────────────────────────────────────────────────────────
+
+    def _fingerprint(self) -> dict:
+        with self._sqlite() as db:
+            messages, latest = db.execute("SELECT count(*), max(timestamp) FROM messages").fetchone()
+            facts = db.execute("SELECT count(*) FROM memory_facts WHERE status = 'active'").fetchone()[0]
+        return {"messages": messages, "latest": latest, "facts": facts}
+
+    def _open_manifest(self, source: dict) -> bool:
+        path = self.staging / "manifest.json"
+        if path.exists():
+            manifest = json.loads(path.read_text(encoding="utf-8"))
+            if manifest.get("version") == _MANIFEST_VERSION and manifest.get("source") == source:
+                self._manifest = manifest
+                return True
+            self._report("SQLite 数据已变化，丢弃上次的暂存文件")
+        shutil.rmtree(self.staging, ignore_errors=True)
+        self.staging.mkdir(parents=True)
+        self._manifest = {
+            "version": _MANIFEST_VERSION,
+            "source": source,
+            "cursor": None,
+            "last_event": None,
+            "chunks": [],
+            "events": 0,
+            "sessions": 0,
+            "embeddings_reused": 0,
+            "events_exported": False,
+            "facts": 0,
+            "fact_ids": [],
+            "facts_exported": False,
+            "entities": 0,
+            "graph_exported": False,
+            "loaded": [],
+            "indexed": False,
+        }
+        self._save_manifest()
+        return False
+
+    def _save_manifest(self) -> None:
+        path = self.staging / "manifest.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._manifest, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(path)
+
+    def _sqlite(self) -> closing[sqlite3.Connection]:
+        return closing(sqlite3.connect(f"file:{self.sqlite_path}?mode=ro", uri=True))
+
+    def _csv(self, name: str) -> _CsvFile:
+        return _CsvFile(self.staging / f"{name}.csv")
+
+    def _report(self, message: str) -> None:
+        self._progress(f"[kuzu rebuild {time.perf_counter() - self._started:6.1f}s] {message}")
+
+
+class _CsvFile:
+    """写完整个文件后再改名，半截文件不会被当成已导出。"""
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._tmp = path.with_suffix(".csv.tmp")
+
+    def __enter__(self):
+        self._file = self._tmp.open("w", newline="", encoding="utf-8")
+        return csv.writer(self._file)
+
+    def __exit__(self, exc_type, exc, tb):
+        self._file.close()
+        if exc_type is None:
+            self._tmp.replace(self._path)
+        else:
+            self._tmp.unlink(missing_ok=True)
+
+
+def _stored_embedding(blob) -> np.ndarray | None:
+    if blob is None:
+        return None
+    try:
+        vector = unpack_embedding(blob)
+    except ValueError:
+        return None
+    return vector if vector.shape[0] == EMBEDDING_DIM else None
+
+
+def _vector_literals(vectors: np.ndarray) -> list[str]:
+    """批量格式化为 Kuzu 列表字面量 "[v1,...]"（savetxt 比逐元素 f-string 快约 3 倍）。"""
+    buffer = io.StringIO()
+    np.savetxt(buffer, vectors, fmt="%.6g", delimiter=",")
+    return [f"[{line}]" for line in buffer.getvalue().splitlines()]
+
+
+def _epoch_ms(value) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value)
+    return int(datetime.fromisoformat(str(value)).timestamp() * 1000)
+
+
+def _remove(path: Path) -> None:
+    if path.is_dir():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path.unlink(missing_ok=True)
@@ -1,16 +1,22 @@
-"""Kuzu retriever - semantic / graph / hybrid memory search."""
+"""Kuzu retriever - semantic / graph / hybrid / ppr memory search."""
 
 from __future__ import annotations
 
-import asyncio
 import re
+import time
 from dataclasses import dataclass, field
 from typing import Any
 
 from loguru import logger
 
 from memory.embeddings import EmbeddingConfig, LocalEmbeddingEngine
-from memory.kuzu_store import EMBEDDING_DIM, KuzuStore, execute_sync
+from memory.kuzu_graph import ENTITY, EVENT, FACT, PPR_ALPHA, KuzuGraphCache
+from memory.kuzu_store import EMBEDDING_DIM, EVENT_VECTOR_INDEX, KuzuStore, execute_sync
+from memory.kuzu_text_index import KuzuTextIndex, tokenize
+from memory.retrieval_filter import RetrievalFilter
+
+# 带过滤条件时 HNSW 先多取这么多倍再按谓词过滤，不够再退回带谓词的全表扫描
+FILTER_OVERFETCH = 10
 
 
 @dataclass
@@ -21,7 +27,7 @@ class MemoryHit:
     content: str = ""
     role: str = ""
     score: float = 0.0
-    source: str = "semantic"  # semantic | graph | fact
+    source: str = "semantic"  # semantic | graph | keyword | ppr
     entities: list[str] = field(default_factory=list)
     facts: list[dict] = field(default_factory=list)
 
@@ -33,62 +39,94 @@ class MemoryHit:
         return text
 
 
+class MemoryHitList(list):
+    """检索结果列表，附带各阶段耗时 ``timings_ms``（毫秒）。"""
+
+    def __init__(self, hits=(), timings_ms: dict[str, float] | None = None):
+        super().__init__(hits)
+        self.timings_ms: dict[str, float] = timings_ms or {}
+
+
 class KuzuRetriever:
     """
-    三种记忆检索模式：
+    四种记忆检索模式：
       - semantic：向量相似度搜索 Event 节点
       - graph：从实体出发图遍历，返回关联 Fact 和关系
       - hybrid（默认）：semantic 初筛 → 取涉及实体 → 图遍历扩展 → 融合排序
+      - ppr：semantic 命中 + query 中的实体作种子，在内存邻接缓存上跑个性化
+        PageRank，多跳召回 Event / Fact
+
+    所有模式都接受 ``RetrievalFilter``（时间 / 会话 / 角色），作为 Event 上的谓词
+    下推进各自的 Cypher；带过滤时只返回 Event，不再返回没有时间属性的 Fact。
     """
 
-    def __init__(self, store: KuzuStore):
+    def __init__(self, store: KuzuStore, graph: KuzuGraphCache | None = None):
         self._store = store
         self._embedder = LocalEmbeddingEngine(EmbeddingConfig(dimension=EMBEDDING_DIM))
+        self._text_index = KuzuTextIndex(store)
+        # 与 KuzuWriter 共用同一个缓存时才能增量刷新；单独构造的只反映加载时的图
+        self._graph = graph or KuzuGraphCache(store)
 
     # ── Public async API ─────────────────────────────────────────────────────
 
+    @property
+    def data_version(self) -> tuple[int, int]:
+        """图数据版本（每次写入都会变化），供 query_memory 的结果缓存失效。"""
+        return self._store.data_version
+
     async def search(
         self,
         query: str,
         mode: str = "hybrid",
         top_k: int = 5,
-    ) -> list[MemoryHit]:
-        """统一入口，mode: semantic | graph | hybrid。"""
+        filters: RetrievalFilter | None = None,
+    ) -> MemoryHitList:
+        """统一入口，mode: semantic | graph | hybrid | ppr；结果附带 timings_ms。"""
         mode = mode.strip().lower()
+        filters = filters or None  # 空过滤条件等同于不过滤
+        started = time.perf_counter()
         if mode == "semantic":
-            return await asyncio.to_thread(self._semantic_search_sync, query, top_k)
-        if mode == "graph":
+            hits = await self._store.submit_read(self._semantic_search_sync, query, top_k, filters)
+        elif mode == "graph":
             entities = _extract_entity_hints(query)
-            return await asyncio.to_thread(self._graph_search_sync, entities, top_k)
-        return await asyncio.to_thread(self._hybrid_search_sync, query, top_k)
+            hits = await self._store.submit_read(self._graph_search_sync, entities, top_k, filters)
+        elif mode == "ppr":
+            if not self._graph.loaded:
+                # 在写线程上加载，与写入串行，加载期间提交的边不会遗漏
+                await self._store.submit_write(self._graph.load_sync)
+            hits = await self._store.submit_read(self._ppr_search_sync, query, top_k, filters)
+        else:
+            hits = await self._store.submit_read(self._hybrid_search_sync, query, top_k, filters)
+        if not isinstance(hits, MemoryHitList):
+            hits = MemoryHitList(hits, timings_ms={f"{mode}_ms": _elapsed_ms(started)})
+        hits.timings_ms["total_ms"] = _elapsed_ms(started)
+        return hits
 
     async def get_top_facts(self, top_k: int = 5, min_confidence: float = 0.75) -> list[dict]:
         """获取高置信度 Fact 节点列表（用于 kuzu_prefetch 注入）。"""
-        return await asyncio.to_thread(self._get_top_facts_sync, top_k, min_confidence)
+        return await self._store.submit_read(self._get_top_facts_sync, top_k, min_confidence)
 
     async def keyword_prefetch(self, query: str, top_k: int = 2) -> list[dict]:
         """关键词匹配高置信 Fact，零 LLM，用于 context_builder 预注入。"""
-        return await asyncio.to_thread(self._keyword_prefetch_sync, query, top_k)
+        return await self._store.submit_read(self._keyword_prefetch_sync, query, top_k)
+
+    def _run(self, query: str, params: dict[str, Any] | None = None) -> list[list]:
+        """执行一条固定的 Cypher（预编译并缓存）。"""
+        return execute_sync(self._store.conn, self._store.prepare(query), params)
 
     # ── Semantic search ──────────────────────────────────────────────────────
 
-    def _semantic_search_sync(self, query: str, top_k: int) -> list[MemoryHit]:
-        conn = self._store.conn
+    def _semantic_search_sync(
+        self, query: str, top_k: int, filters: RetrievalFilter | None = None
+    ) -> list[MemoryHit]:
         query_emb = self._embedder.embed(query)
-        emb_str = _format_embedding(query_emb)
-        dim = EMBEDDING_DIM
-
-        rows = execute_sync(
-            conn,
-            f"""
-            MATCH (e:Event)
-            WHERE e.embedding IS NOT NULL
-            RETURN e.id, e.content, e.role,
-                   array_cosine_similarity(e.embedding, CAST({emb_str} AS FLOAT[{dim}])) AS score
-            ORDER BY score DESC
-            LIMIT {top_k * 2}
-            """,
-        )
+        # The vector is a bound parameter so the statement is planned once.
+        # 向量作为绑定参数传入，语句只编译一次。
+        if not filters:
+            statement = _SEMANTIC_HNSW_QUERY if self._store.use_vector_index else _SEMANTIC_SCAN_QUERY
+            rows = self._run(statement, {"q": query_emb, "k": top_k * 2})
+        else:
+            rows = self._filtered_semantic_rows(query_emb, top_k * 2, filters)
 
         hits = []
         for row in rows:
@@ -104,159 +142,268 @@ class KuzuRetriever:
             ))
         return hits[:top_k]
 
+    def _filtered_semantic_rows(self, query_emb: list[float], k: int, filters: RetrievalFilter) -> list[list]:
+        """
+        带过滤的向量检索。HNSW 不支持先过滤再搜索，先多取 ``FILTER_OVERFETCH`` 倍候选
+        再在 WITH 之后按谓词过滤；过滤太严、剩下不足 k 条时改用带谓词的扫描——
+        时间戳随写入单调增长，Kuzu 列存的 zone map 能跳过范围外的数据块。
+        """
+        if self._store.use_vector_index:
+            predicate, params = filters.cypher_predicate("node")
+            rows = self._run(
+                _SEMANTIC_HNSW_FILTERED_QUERY.format(predicate=predicate),
+                {"q": query_emb, "k": k * FILTER_OVERFETCH, **params},
+            )[:k]
+            if len(rows) >= k:
+                return rows
+        predicate, params = filters.cypher_predicate("e")
+        return self._run(
+            _SEMANTIC_SCAN_FILTERED_QUERY.format(predicate=predicate),
+            {"q": query_emb, "k": k, **params},
+        )
+
     # ── Graph search ─────────────────────────────────────────────────────────
 
-    def _graph_search_sync(self, entity_names: list[str], top_k: int) -> list[MemoryHit]:
-        if not entity_names:
+    def _graph_search_sync(
+        self, entity_names: list[str], top_k: int, filters: RetrievalFilter | None = None
+    ) -> list[MemoryHit]:
+        """实体 → Fact / 最近提及事件，所有实体合并为 3 次集合查询。"""
+        names = list(dict.fromkeys(entity_names))[:3]  # 最多遍历 3 个实体
+        if not names:
             return []
 
-        conn = self._store.conn
-        hits = []
+        # 每个实体一个带 LIMIT 的 UNION ALL 分支，热门实体也只读 top-N，而不是全部关联行
+        name_params = {f"name_{i}": name for i, name in enumerate(names)}
 
-        for entity_name in entity_names[:3]:  # 最多遍历 3 个实体
-            # 1. 从实体出发，找关联 Fact
-            fact_rows = execute_sync(
-                conn,
-                """
-                MATCH (f:Fact)-[:ABOUT]->(e:Entity {name: $name})
-                RETURN f.key, f.value, f.confidence, f.scope
-                ORDER BY f.confidence DESC
-                LIMIT 5
-                """,
-                {"name": entity_name},
-            )
-            facts = [
-                {"key": r[0], "value": r[1], "confidence": float(r[2]), "scope": r[3]}
-                for r in fact_rows
-            ]
-
-            # 2. 从实体出发，找 2 跳内的相关实体
-            related_rows = execute_sync(
-                conn,
-                """
-                MATCH (a:Entity {name: $name})-[:RELATED_TO]->(b:Entity)
-                OPTIONAL MATCH (f:Fact)-[:ABOUT]->(b)
-                RETURN b.name, b.type, f.key, f.value
-                LIMIT 8
-                """,
-                {"name": entity_name},
-            )
+        # 1. 所有实体的关联 Fact（每个实体保留置信度最高的 5 条）
+        fact_rows = self._run(_per_entity_union(_ENTITY_FACTS_BRANCH, len(names)), name_params)
+        facts_by_entity: dict[str, list[dict]] = {name: [] for name in names}
+        for r in fact_rows:
+            facts_by_entity[r[0]].append({"key": r[1], "value": r[2], "confidence": float(r[3]), "scope": r[4]})
 
-            # 3. 找 mention 这个实体的最近事件
-            event_rows = execute_sync(
-                conn,
-                """
-                MATCH (e:Event)-[:MENTIONS]->(en:Entity {name: $name})
-                RETURN e.id, e.content, e.role, e.timestamp
-                ORDER BY e.timestamp DESC
-                LIMIT 3
-                """,
-                {"name": entity_name},
+        # 2. 每个实体最近 3 条提及事件：先只取 id 选出，再一次性取内容
+        predicate, predicate_params = (filters or RetrievalFilter()).cypher_predicate("e")
+        mention_rows = self._run(
+            _per_entity_union(_ENTITY_MENTIONS_BRANCH, len(names), predicate=predicate),
+            {**name_params, **predicate_params},
+        )
+        events_by_entity: dict[str, list[str]] = {name: [] for name in names}
+        for r in mention_rows:
+            events_by_entity[r[0]].append(r[1])
+        event_ids = list({eid for ids in events_by_entity.values() for eid in ids})
+        events = {
+            r[0]: r
+            for r in self._run(
+                "MATCH (e:Event) WHERE e.id IN $ids RETURN e.id, e.content, e.role",
+                {"ids": event_ids},
             )
+        } if event_ids else {}
 
-            if facts or event_rows:
-                if event_rows:
-                    for er in event_rows:
-                        hits.append(MemoryHit(
-                            event_id=er[0],
-                            content=er[1] or "",
-                            role=er[2] or "",
-                            score=0.8,
-                            source="graph",
-                            entities=[entity_name],
-                            facts=facts,
-                        ))
-                else:
-                    # 只有 Fact，无对应 Event，构造虚拟 hit
-                    facts_text = "; ".join(f"{f['key']}: {f['value']}" for f in facts)
-                    hits.append(MemoryHit(
-                        event_id=f"fact:{entity_name}",
-                        content=f"关于 {entity_name}: {facts_text}",
-                        role="memory",
-                        score=0.75,
-                        source="graph",
-                        entities=[entity_name],
-                        facts=facts,
-                    ))
+        hits = []
+        for entity_name in names:
+            facts = facts_by_entity[entity_name]
+            ids = [eid for eid in events_by_entity[entity_name] if eid in events]
+            for eid in ids:
+                row = events[eid]
+                hits.append(MemoryHit(
+                    event_id=eid,
+                    content=row[1] or "",
+                    role=row[2] or "",
+                    score=0.8,
+                    source="graph",
+                    entities=[entity_name],
+                    facts=facts,
+                ))
+            if facts and not ids and not filters:
+                # 只有 Fact，无对应 Event，构造虚拟 hit（Fact 没有时间/会话，过滤时不返回）
+                facts_text = "; ".join(f"{f['key']}: {f['value']}" for f in facts)
+                hits.append(MemoryHit(
+                    event_id=f"fact:{entity_name}",
+                    content=f"关于 {entity_name}: {facts_text}",
+                    role="memory",
+                    score=0.75,
+                    source="graph",
+                    entities=[entity_name],
+                    facts=facts,
+                ))
 
         return hits[:top_k]
 
     # ── Hybrid search ─────────────────────────────────────────────────────────
 
-    def _hybrid_search_sync(self, query: str, top_k: int) -> list[MemoryHit]:
+    def _hybrid_search_sync(
+        self, query: str, top_k: int, filters: RetrievalFilter | None = None
+    ) -> MemoryHitList:
+        timings: dict[str, float] = {}
+        started = time.perf_counter()
+
         # Step 1: 语义检索
-        semantic_hits = self._semantic_search_sync(query, top_k)
+        stage = time.perf_counter()
+        semantic_hits = self._semantic_search_sync(query, top_k, filters)
+        timings["semantic_ms"] = _elapsed_ms(stage)
 
-        # Step 2: 从语义命中中提取实体
+        # Step 2: 语义命中涉及的实体（一次 IN 查询） + query 中的实体线索
+        stage = time.perf_counter()
         entity_names: list[str] = []
+        if semantic_hits:
+            rows = self._run(
+                "MATCH (e:Event)-[:MENTIONS]->(en:Entity) WHERE e.id IN $ids RETURN e.id, en.name",
+                {"ids": [hit.event_id for hit in semantic_hits]},
+            )
+            # 保持语义命中的排名顺序
+            rank = {hit.event_id: i for i, hit in enumerate(semantic_hits)}
+            rows.sort(key=lambda r: rank.get(r[0], len(rank)))
+            entity_names.extend(r[1] for r in rows)
+        entity_names.extend(_extract_entity_hints(query))
+        entity_names = list(dict.fromkeys(entity_names))
+        timings["entities_ms"] = _elapsed_ms(stage)
+
+        # Step 3: 图遍历扩展
+        stage = time.perf_counter()
+        graph_hits = self._graph_search_sync(entity_names, top_k, filters) if entity_names else []
+        timings["graph_ms"] = _elapsed_ms(stage)
+
+        # Step 4: Event 内容关键词搜索（兜底，弥补向量弱语义的缺陷）
+        stage = time.perf_counter()
+        keyword_hits = self._event_keyword_search_sync(query, top_k, filters)
+        timings["keyword_ms"] = _elapsed_ms(stage)
+
+        # Step 5: 单遍融合去重（先到先得：semantic > graph > keyword），按 score 排序
+        stage = time.perf_counter()
+        merged: dict[str, MemoryHit] = {}
+        for h in (*semantic_hits, *graph_hits, *keyword_hits):
+            merged.setdefault(h.event_id, h)
+        ranked = sorted(merged.values(), key=lambda h: h.score, reverse=True)[:top_k]
+        timings["fuse_ms"] = _elapsed_ms(stage)
+        timings["total_ms"] = _elapsed_ms(started)
+        return MemoryHitList(ranked, timings_ms=timings)
+
+    # ── Personalized PageRank ─────────────────────────────────────────────────
+
+    def _ppr_search_sync(
+        self, query: str, top_k: int, filters: RetrievalFilter | None = None
+    ) -> MemoryHitList:
+        timings: dict[str, float] = {}
+        started = time.perf_counter()
+        graph = self._graph
+
+        # Step 1: 语义命中作为 Event 种子（按相似度加权）
+        stage = time.perf_counter()
+        semantic_hits = self._semantic_search_sync(query, top_k * 2, filters)
+        timings["semantic_ms"] = _elapsed_ms(stage)
+
+        # Step 2: query 中出现的已知实体作为 Entity 种子
+        stage = time.perf_counter()
+        seeds: dict[int, float] = {}
+        isolated: list[MemoryHit] = []  # 没有任何边的语义命中，不参与传播
         for hit in semantic_hits:
-            conn = self._store.conn
-            rows = execute_sync(
-                conn,
-                "MATCH (e:Event {id: $eid})-[:MENTIONS]->(en:Entity) RETURN en.name",
-                {"eid": hit.event_id},
+            node = graph.lookup(EVENT, hit.event_id)
+            if node is None:
+                isolated.append(hit)
+            else:
+                seeds[node] = seeds.get(node, 0.0) + hit.score
+        top_semantic = max((hit.score for hit in semantic_hits), default=1.0)
+        for name in self._query_entities(query):
+            node = graph.lookup(ENTITY, name)
+            if node is not None:
+                seeds[node] = seeds.get(node, 0.0) + top_semantic
+        timings["seeds_ms"] = _elapsed_ms(stage)
+
+        # Step 3: 截断 PPR
+        stage = time.perf_counter()
+        result = graph.personalized_pagerank(seeds)
+        timings["ppr_ms"] = _elapsed_ms(stage)
+        if result is None:
+            timings["total_ms"] = _elapsed_ms(started)
+            return MemoryHitList(semantic_hits[:top_k], timings_ms=timings)
+
+        # Step 4: 取分数最高的 Event / Fact，按主键取内容（带过滤时多取候选，取回时按谓词筛掉）
+        stage = time.perf_counter()
+        nodes, scores, adjacency = result
+        kinds = adjacency.kinds[nodes]
+        seed_total = sum(seeds.values()) + sum(hit.score for hit in isolated)
+        in_graph = sum(seeds.values()) / seed_total
+        scored: list[tuple[float, str, int | None, MemoryHit | None]] = []
+        limits = ((EVENT, top_k * FILTER_OVERFETCH),) if filters else ((EVENT, top_k), (FACT, 3))
+        for kind, limit in limits:
+            picked = kinds == kind
+            for node, score in zip(nodes[picked][:limit].tolist(), scores[picked][:limit].tolist()):
+                scored.append((score * in_graph, graph.key(node), node, None))
+        for hit in isolated:
+            # 孤立种子的 PPR 分数就是它自己的重启质量
+            scored.append((PPR_ALPHA * hit.score / seed_total, hit.event_id, None, hit))
+        scored.sort(key=lambda item: item[0], reverse=True)
+
+        hits, best = [], 1.0
+        for score, key, node, hit in scored:
+            if len(hits) == top_k:
+                break
+            if hit is None:
+                hit = self._ppr_hit(key, node, adjacency, filters)
+                if hit is None:
+                    continue
+            if not hits:
+                best = score
+            hit.score = round(score / best, 4)
+            hit.source = "ppr"
+            hits.append(hit)
+        timings["fetch_ms"] = _elapsed_ms(stage)
+        timings["total_ms"] = _elapsed_ms(started)
+        return MemoryHitList(hits, timings_ms=timings)
+
+    def _ppr_hit(
+        self, key: str, node: int, adjacency, filters: RetrievalFilter | None = None
+    ) -> MemoryHit | None:
+        """PPR 命中的节点 → MemoryHit（Event 带上相邻实体，Fact 构造虚拟 hit）；不满足过滤条件返回 None。"""
+        if adjacency.kinds[node] == FACT:
+            rows = self._run(
+                "MATCH (f:Fact {id: $id}) RETURN f.key, f.value, f.confidence, f.scope", {"id": key}
             )
-            for r in rows:
-                if r[0] not in entity_names:
-                    entity_names.append(r[0])
-
-        # Step 3: 提取 query 中的实体线索
-        hint_entities = _extract_entity_hints(query)
-        for e in hint_entities:
-            if e not in entity_names:
-                entity_names.append(e)
-
-        # Step 4: 图遍历扩展
-        graph_hits = self._graph_search_sync(entity_names, top_k) if entity_names else []
-
-        # Step 5: Event 内容关键词搜索（兜底，弥补向量弱语义的缺陷）
-        keyword_hits = self._event_keyword_search_sync(query, top_k)
-
-        # Step 6: 融合去重，按 score 排序
-        seen_ids = set()
-        merged: list[MemoryHit] = []
-        for h in semantic_hits + graph_hits + keyword_hits:
-            if h.event_id not in seen_ids:
-                seen_ids.add(h.event_id)
-                merged.append(h)
-
-        merged.sort(key=lambda h: h.score, reverse=True)
-        return merged[:top_k]
-
-    def _event_keyword_search_sync(self, query: str, top_k: int) -> list[MemoryHit]:
-        """在 Event.content 上做关键词 CONTAINS 搜索，弥补向量弱语义。"""
-        conn = self._store.conn
-        # 提取 2 字以上中文词 + 英文词
-        keywords = [w for w in re.findall(r"[\u4e00-\u9fff]{2,}|[a-zA-Z]{3,}", query)][:4]
-        if not keywords:
+            if not rows:
+                return None
+            fact = {"key": rows[0][0], "value": rows[0][1], "confidence": float(rows[0][2]), "scope": rows[0][3]}
+            return MemoryHit(
+                event_id=f"fact:{key}",
+                content=f"{fact['key']}: {fact['value']}",
+                role="memory",
+                facts=[fact],
+            )
+        predicate, predicate_params = (filters or RetrievalFilter()).cypher_predicate("e")
+        rows = self._run(
+            f"MATCH (e:Event {{id: $id}}) WHERE {predicate} RETURN e.content, e.role",
+            {"id": key, **predicate_params},
+        )
+        if not rows:
+            return None
+        neighbors = adjacency.neighbors(node)
+        entities = [self._graph.key(n) for n in neighbors[adjacency.kinds[neighbors] == ENTITY][:3].tolist()]
+        return MemoryHit(event_id=key, content=rows[0][0] or "", role=rows[0][1] or "", entities=entities)
+
+    def _query_entities(self, query: str) -> list[str]:
+        """query 中出现的已知实体名（不区分大小写子串匹配），长的优先。"""
+        text = query.lower()
+        names = {name for name in self._graph.entity_names() if len(name) >= 2 and name.lower() in text}
+        return sorted(names, key=len, reverse=True)[:8]
+
+    def _event_keyword_search_sync(
+        self, query: str, top_k: int, filters: RetrievalFilter | None = None
+    ) -> list[MemoryHit]:
+        """Event.content 倒排索引 BM25 检索（兜底，弥补向量弱语义）。"""
+        rows = self._text_index.search_events_sync(query, top_k, filters)
+        if not rows:
             return []
-
-        hits: list[MemoryHit] = []
-        seen_ids: set[str] = set()
-        for kw in keywords:
-            rows = execute_sync(
-                conn,
-                """
-                MATCH (e:Event)
-                WHERE e.content CONTAINS $kw AND e.role IN ['user', 'assistant']
-                RETURN e.id, e.content, e.role
-                ORDER BY e.timestamp DESC
-                LIMIT 5
-                """,
-                {"kw": kw},
+        # BM25 分值没有上界；映射到 0.45~0.65，保持与语义/图谱分数可比
+        best = max(float(row[3]) for row in rows) or 1.0
+        return [
+            MemoryHit(
+                event_id=row[0],
+                content=row[1] or "",
+                role=row[2] or "",
+                score=0.45 + 0.2 * float(row[3]) / best,
+                source="keyword",
             )
-            for row in rows:
-                eid = row[0]
-                if eid not in seen_ids:
-                    seen_ids.add(eid)
-                    hits.append(MemoryHit(
-                        event_id=eid,
-                        content=row[1] or "",
-                        role=row[2] or "",
-                        score=0.55,
-                        source="keyword",
-                    ))
-        return hits[:top_k]
+            for row in rows
+        ]
 
     # ── Fact prefetch ─────────────────────────────────────────────────────────
 
@@ -279,43 +426,74 @@ class KuzuRetriever:
         ]
 
     def _keyword_prefetch_sync(self, query: str, top_k: int) -> list[dict]:
-        """简单关键词匹配 Fact.key 或 Fact.value，不调 LLM。"""
-        conn = self._store.conn
-        # 提取 2 字以上的词作为关键词
-        keywords = [w for w in re.findall(r"[\u4e00-\u9fff]{2,}|[a-zA-Z]{3,}", query)][:5]
-        if not keywords:
+        """倒排索引 BM25 匹配 Fact.key / Fact.value，不调 LLM。"""
+        if not tokenize(query):
             return self._get_top_facts_sync(top_k, 0.75)
 
-        results: list[dict] = []
-        seen_keys: set[str] = set()
-        for kw in keywords:
-            rows = execute_sync(
-                conn,
-                """
-                MATCH (f:Fact)
-                WHERE f.key CONTAINS $kw OR f.value CONTAINS $kw
-                RETURN f.scope, f.key, f.value, f.confidence
-                ORDER BY f.confidence DESC
-                LIMIT 3
-                """,
-                {"kw": kw},
-            )
-            for r in rows:
-                fact_key = f"{r[0]}:{r[1]}"
-                if fact_key not in seen_keys:
-                    seen_keys.add(fact_key)
-                    results.append({
-                        "scope": r[0], "key": r[1], "value": r[2], "confidence": float(r[3])
-                    })
-
-        return results[:top_k]
+        return [
+            {"scope": r[0], "key": r[1], "value": r[2], "confidence": float(r[3])}
+            for r in self._text_index.search_facts_sync(query, top_k)
+        ]
 
 
 # ── 工具函数 ──────────────────────────────────────────────────────────────────
 
-def _format_embedding(emb: list[float]) -> str:
-    """格式化 embedding 为 Kuzu CAST 表达式所需的字面量字符串。"""
-    return "[" + ", ".join(f"{v:.6f}" for v in emb) + "]"
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+_SEMANTIC_SCAN_QUERY = f"""
+    MATCH (e:Event)
+    WHERE e.embedding IS NOT NULL
+    RETURN e.id, e.content, e.role,
+           array_cosine_similarity(e.embedding, CAST($q AS FLOAT[{EMBEDDING_DIM}])) AS score
+    ORDER BY score DESC
+    LIMIT $k
+"""
+
+# 过滤版本：{predicate} 由 RetrievalFilter.cypher_predicate 生成（只含绑定参数）
+_SEMANTIC_SCAN_FILTERED_QUERY = _SEMANTIC_SCAN_QUERY.replace(
+    "WHERE e.embedding IS NOT NULL", "WHERE e.embedding IS NOT NULL AND {predicate}"
+)
+
+# QUERY_VECTOR_INDEX returns cosine distance; convert back to similarity.
+# QUERY_VECTOR_INDEX 返回余弦距离，转换为相似度。
+_SEMANTIC_HNSW_QUERY = f"""
+    CALL QUERY_VECTOR_INDEX('Event', '{EVENT_VECTOR_INDEX}', $q, $k)
+    RETURN node.id, node.content, node.role, 1.0 - distance AS score
+    ORDER BY score DESC
+"""
+
+_SEMANTIC_HNSW_FILTERED_QUERY = f"""
+    CALL QUERY_VECTOR_INDEX('Event', '{EVENT_VECTOR_INDEX}', $q, $k)
+    WITH node, distance
+    WHERE {{predicate}}
+    RETURN node.id, node.content, node.role, 1.0 - distance AS score
+    ORDER BY score DESC
+"""
+
+
+# 图扩展的单实体分支；Kuzu 不支持 CALL {} 子查询，用 UNION ALL 拼接以便每个实体各自 LIMIT
+_ENTITY_FACTS_BRANCH = """
+    MATCH (f:Fact)-[:ABOUT]->(en:Entity)
+    WHERE en.name = $name_{i}
+    RETURN en.name, f.key, f.value, f.confidence, f.scope
+    ORDER BY f.confidence DESC
+    LIMIT 5
+"""
+
+_ENTITY_MENTIONS_BRANCH = """
+    MATCH (e:Event)-[:MENTIONS]->(en:Entity)
+    WHERE en.name = $name_{i} AND {predicate}
+    RETURN en.name, e.id
+    ORDER BY e.timestamp DESC
+    LIMIT 3
+"""
+
+
+def _per_entity_union(branch: str, count: int, **fields: str) -> str:
+    """One branch per entity name (``$name_0`` … ``$name_{count-1}``), joined by UNION ALL."""
+    return "\nUNION ALL\n".join(branch.format(i=i, **fields) for i in range(count))
 
 
 def _extract_entity_hints(query: str) -> list[str]:
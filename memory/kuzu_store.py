@@ -3,8 +3,13 @@
 from __future__ import annotations
 
 import asyncio
+import itertools
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, TypeVar
 
 import kuzu
 from loguru import logger
@@ -12,17 +17,61 @@ from loguru import logger
 # embedding 维度，与 LocalEmbeddingEngine 保持一致
 EMBEDDING_DIM = 128
 
+# Event.embedding 上的 HNSW 向量索引名（Kuzu VECTOR 扩展）
+EVENT_VECTOR_INDEX = "event_embedding_idx"
+
+T = TypeVar("T")
+_STORE_EPOCHS = itertools.count(1)
+
 
 class KuzuStore:
     """
     Kuzu 图数据库初始化与连接管理。
-    Kuzu 是同步 API，所有阻塞操作通过 asyncio.to_thread() 包装。
+
+    Kuzu 是同步 API，执行模型为：
+      - 写：一个专用写线程持有写连接，submit_write() 串行执行所有写操作；
+        在途写请求数受 write_queue_size 限制，满了调用方 await 等待（背压）
+      - 读：read_connections 个读线程，每个线程持有自己的连接与预编译语句，
+        submit_read() 并行执行检索
+    同步方法内部统一通过 ``store.conn`` / ``store.prepare()`` 取当前线程的连接。
     """
 
-    def __init__(self, db_path: str = "data/kuzu"):
+    def __init__(
+        self,
+        db_path: str = "data/kuzu",
+        vector_index: bool = True,
+        vector_index_min_events: int = 20000,
+        read_connections: int = 4,
+        write_queue_size: int = 256,
+    ):
         self.db_path = db_path
         self._db: kuzu.Database | None = None
         self._conn: kuzu.Connection | None = None
+        # HNSW only pays off on large graphs; below the threshold a prepared
+        # full scan is faster, so the retriever switches on event_count.
+        # HNSW 只在大图上更快；小于阈值时预编译的全表扫描更快。
+        self.vector_index_enabled = vector_index
+        self.vector_index_min_events = max(0, int(vector_index_min_events))
+        self.vector_index_ready = False
+        self.event_count = 0
+        # 每个 store 实例唯一的编号：与 write_generation 组成数据版本，重开数据库后不会与旧版本撞号
+        self.epoch = next(_STORE_EPOCHS)
+        self._prepared: dict[str, Any] = {}
+        self.read_connections = max(1, int(read_connections))
+        self.write_queue_size = max(1, int(write_queue_size))
+        # 读线程的连接与预编译缓存（写线程 / 直接同步调用使用 _conn 与 _prepared）
+        self._local = threading.local()
+        self._read_caches: list[dict[str, Any]] = []
+        self._writer: ThreadPoolExecutor | None = None
+        self._readers: ThreadPoolExecutor | None = None
+        self._write_slots: asyncio.Semaphore | None = None
+        self._writes_pending = 0
+        self._writes_peak = 0
+        self._writes_done = 0
+        self._backpressure_waits = 0
+        self._backpressure_wait_s = 0.0
+        self._reads_active = 0
+        self._reads_done = 0
 
     def _init_sync(self) -> None:
         """同步初始化：建 DB、建表。"""
@@ -30,18 +79,145 @@ class KuzuStore:
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
         self._db = kuzu.Database(self.db_path)
         self._conn = kuzu.Connection(self._db)
+        self._prepared = {}
         self._create_schema()
+        rows = execute_sync(self._conn, "MATCH (e:Event) RETURN count(e)")
+        self.event_count = int(rows[0][0]) if rows else 0
+        if self.vector_index_enabled:
+            self._ensure_vector_index()
         logger.info(f"KuzuStore 初始化完成: {self.db_path}")
 
     async def initialize(self) -> None:
-        await asyncio.to_thread(self._init_sync)
+        """在写线程上建库建表，然后启动读连接池。"""
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kuzu-writer")
+        self._write_slots = asyncio.Semaphore(self.write_queue_size)
+        await asyncio.get_running_loop().run_in_executor(self._writer, self._init_sync)
+        self._readers = ThreadPoolExecutor(
+            max_workers=self.read_connections,
+            thread_name_prefix="kuzu-reader",
+            initializer=self._open_read_connection,
+        )
+
+    def _open_read_connection(self) -> None:
+        """读线程初始化：每个线程一个独立连接和预编译缓存。"""
+        self._local.conn = kuzu.Connection(self._db)
+        self._local.prepared = {}
+        self._read_caches.append(self._local.prepared)
 
     @property
     def conn(self) -> kuzu.Connection:
+        """当前线程的连接：读线程用自己的读连接，其余（写线程、同步调用）用写连接。"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
         if self._conn is None:
             raise RuntimeError("KuzuStore 尚未初始化，请先调用 initialize()")
         return self._conn
 
+    # ── 执行模型 ─────────────────────────────────────────────────────────────
+
+    async def submit_write(self, fn: Callable[..., T], *args: Any) -> T:
+        """在专用写线程上串行执行 ``fn(*args)``；在途写满 write_queue_size 时等待。"""
+        if self._writer is None or self._write_slots is None:
+            raise RuntimeError("KuzuStore 尚未初始化，请先调用 initialize()")
+        slots = self._write_slots
+        if slots.locked():
+            self._backpressure_waits += 1
+            started = time.perf_counter()
+            await slots.acquire()
+            self._backpressure_wait_s += time.perf_counter() - started
+        else:
+            await slots.acquire()
+        self._writes_pending += 1
+        self._writes_peak = max(self._writes_peak, self._writes_pending)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._writer, fn, *args)
+        finally:
+            self._writes_pending -= 1
+            self._writes_done += 1
+            slots.release()
+
+    async def submit_read(self, fn: Callable[..., T], *args: Any) -> T:
+        """在读连接池中执行只读的 ``fn(*args)``，多个检索可并行。"""
+        if self._readers is None:
+            raise RuntimeError("KuzuStore 尚未初始化，请先调用 initialize()")
+        self._reads_active += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._readers, fn, *args)
+        finally:
+            self._reads_active -= 1
+            self._reads_done += 1
+
+    def stats(self) -> dict:
+        """写队列背压与读连接池指标。"""
+        return {
+            "write_queue_size": self.write_queue_size,
+            "writes_pending": self._writes_pending,
+            "writes_peak": self._writes_peak,
+            "writes_done": self._writes_done,
+            "backpressure_waits": self._backpressure_waits,
+            "backpressure_wait_ms": round(self._backpressure_wait_s * 1000, 2),
+            "read_connections": self.read_connections,
+            "reads_active": self._reads_active,
+            "reads_done": self._reads_done,
+            "prepared_statements": len(self._prepared) + sum(len(c) for c in self._read_caches),
+        }
+
+    @property
+    def write_generation(self) -> int:
+        """已完成的写任务数；上层结果缓存据此判断图是否发生变化。"""
+        return self._writes_done
+
+    @property
+    def data_version(self) -> tuple[int, int]:
+        return self.epoch, self._writes_done
+
+    @property
+    def use_vector_index(self) -> bool:
+        """检索是否走 HNSW 索引（索引可用且事件数达到阈值）。"""
+        return self.vector_index_ready and self.event_count >= self.vector_index_min_events
+
+    def prepare(self, query: str):
+        """Return a prepared statement for ``query``, compiled once per connection.
+
+        Kuzu 0.11 marks the separate prepare API as deprecated in favour of
+        ``execute(query, params)``, but the latter re-parses and re-plans on
+        every call, so the cached statement is still the cheaper path.
+        """
+        cache = getattr(self._local, "prepared", None)
+        if cache is None:
+            cache = self._prepared
+        statement = cache.get(query)
+        if statement is None:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", DeprecationWarning)
+                statement = self.conn.prepare(query)
+            cache[query] = statement
+        return statement
+
+    def _ensure_vector_index(self) -> None:
+        """Load the VECTOR extension and create the Event.embedding HNSW index if missing.
+
+        Building the index over an existing large graph is a one-off cost at
+        startup; new events are indexed incrementally on insert. Any failure
+        leaves the prepared full-scan path in place.
+        """
+        c = self._conn
+        assert c is not None
+        try:
+            c.execute("LOAD VECTOR")
+            rows = execute_sync(c, "CALL SHOW_INDEXES() RETURN *")
+            if not any(row[1] == EVENT_VECTOR_INDEX for row in rows):
+                c.execute(
+                    f"CALL CREATE_VECTOR_INDEX('Event', '{EVENT_VECTOR_INDEX}', 'embedding', "
+                    "metric := 'cosine')"
+                )
+                logger.info(f"已创建 Event 向量索引 {EVENT_VECTOR_INDEX}（{self.event_count} 条事件）")
+            self.vector_index_ready = True
+        except Exception as e:
+            logger.warning(f"Kuzu 向量索引不可用，语义检索回退为全表扫描: {e}")
+            self.vector_index_ready = False
+
     def _create_schema(self) -> None:
         """建表（幂等，已存在则跳过）。"""
         c = self._conn
@@ -111,8 +287,40 @@ class KuzuStore:
             CREATE REL TABLE ABOUT(FROM Fact TO Entity)
         """)
 
+        # ── 文本倒排索引（见 memory/kuzu_text_index.py）─────────────────────
+        _exec_if_not_exists(c, "Term", """
+            CREATE NODE TABLE Term(
+                token STRING,
+                PRIMARY KEY(token)
+            )
+        """)
+
+        _exec_if_not_exists(c, "TextIndexStats", """
+            CREATE NODE TABLE TextIndexStats(
+                name      STRING,
+                docs      INT64,
+                total_len INT64,
+                PRIMARY KEY(name)
+            )
+        """)
+
+        _exec_rel_if_not_exists(c, "EVENT_TERM", """
+            CREATE REL TABLE EVENT_TERM(FROM Event TO Term, tf INT64, dl INT64)
+        """)
+
+        _exec_rel_if_not_exists(c, "FACT_TERM", """
+            CREATE REL TABLE FACT_TERM(FROM Fact TO Term, tf INT64, dl INT64)
+        """)
+
     async def cleanup(self) -> None:
-        """关闭连接（Kuzu 连接无显式 close，GC 自动处理）。"""
+        """排空写队列、停止读写线程并关闭连接（Kuzu 连接无显式 close，GC 自动处理）。"""
+        executors = [ex for ex in (self._readers, self._writer) if ex is not None]
+        self._readers = None
+        self._writer = None
+        for executor in executors:
+            await asyncio.to_thread(executor.shutdown, True)
+        self._read_caches = []
+        self._prepared = {}
         self._conn = None
         self._db = None
 
@@ -139,8 +347,8 @@ def _exec_rel_if_not_exists(conn: kuzu.Connection, rel_name: str, ddl: str) -> N
             logger.warning(f"建关系表 {rel_name} 时出现非预期错误: {e}")
 
 
-def execute_sync(conn: kuzu.Connection, query: str, params: dict[str, Any] | None = None) -> list[list]:
-    """执行查询并返回所有行（同步）。"""
+def execute_sync(conn: kuzu.Connection, query: Any, params: dict[str, Any] | None = None) -> list[list]:
+    """执行查询并返回所有行（同步）；query 可为字符串或 KuzuStore.prepare() 的预编译语句。"""
     result = conn.execute(query, params or {})
     rows = []
     while result.has_next():
@@ -0,0 +1,69 @@
+"""LRU + TTL cache for hybrid retrieval results."""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+
+class QueryResultCache:
+    """Cache retrieval hits per query key, invalidated by a storage generation.
+
+    Each entry remembers the ``MemoryStorage.generation`` it was computed at;
+    a lookup with a different generation is a miss, so writes that change
+    recall invalidate precisely. The TTL bounds staleness from inputs the
+    generation does not track (freshness scores, newly saved messages).
+    """
+
+    def __init__(
+        self,
+        max_size: int = 256,
+        ttl_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max(0, int(max_size))
+        self.ttl_seconds = float(ttl_seconds)
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[int, float, list[dict]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, key: Hashable, generation: int) -> list[dict] | None:
+        """Return a copy of cached hits, or None on miss/expiry/stale generation."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        entry_generation, stored_at, hits = entry
+        if entry_generation != generation or self._clock() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return [dict(hit) for hit in hits]
+
+    def put(self, key: Hashable, generation: int, hits: list[dict]) -> None:
+        if not self.enabled:
+            return
+        self._entries[key] = (generation, self._clock(), [dict(hit) for hit in hits])
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
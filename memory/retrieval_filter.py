@@ -0,0 +1,273 @@
+"""Retrieval filters - time / session / role scoping pushed down into SQLite and Kuzu."""
+
+from __future__ import annotations
+
+import calendar
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Iterable
+
+# SQLAlchemy 在 SQLite 里把 DateTime 存成该格式的文本，按字符串比较即按时间比较
+_SQL_TIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+@dataclass(frozen=True)
+class RetrievalFilter:
+    """
+    检索范围：``since`` ≤ 时间 < ``until``，会话 id 与角色白名单。空字段表示不限制。
+
+    同一个过滤条件可以渲染成 SQL WHERE 片段（``sql_predicate``）或 Cypher
+    谓词（``cypher_predicate``），由各存储在自己的查询里下推执行。
+    """
+
+    since: datetime | None = None
+    until: datetime | None = None
+    session_ids: tuple[str, ...] = ()
+    roles: tuple[str, ...] = ()
+
+    @classmethod
+    def build(
+        cls,
+        since: datetime | str | None = None,
+        until: datetime | str | None = None,
+        session_ids: Iterable[str] | str | None = None,
+        roles: Iterable[str] | str | None = None,
+    ) -> "RetrievalFilter":
+        """从工具 / API 参数构造；时间接受 datetime 或 ISO 字符串（仅日期时按整天处理）。"""
+        since_dt = _coerce_time(since)
+        until_dt = _coerce_time(until)
+        if isinstance(until, str) and _is_date_only(until) and until_dt is not None:
+            # "until=2025-03-01" 包含当天
+            until_dt += timedelta(days=1)
+        return cls(
+            since=since_dt,
+            until=until_dt,
+            session_ids=_as_tuple(session_ids),
+            roles=_as_tuple(roles),
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self.since or self.until or self.session_ids or self.roles)
+
+    def sql_predicate(self, alias: str = "m") -> tuple[str, dict[str, Any]]:
+        """``messages`` 表上的 WHERE 片段（不含 WHERE），参数名以 ``f_`` 开头。"""
+        clauses: list[str] = []
+        params: dict[str, Any] = {}
+        if self.since is not None:
+            clauses.append(f"{alias}.timestamp >= :f_since")
+            params["f_since"] = self.since.strftime(_SQL_TIME_FORMAT)
+        if self.until is not None:
+            clauses.append(f"{alias}.timestamp < :f_until")
+            params["f_until"] = self.until.strftime(_SQL_TIME_FORMAT)
+        for column, values, prefix in (
+            ("session_id", self.session_ids, "f_s"),
+            ("role", self.roles, "f_r"),
+        ):
+            if values:
+                names = [f"{prefix}{i}" for i in range(len(values))]
+                clauses.append(f"{alias}.{column} IN ({', '.join(':' + n for n in names)})")
+                params.update(zip(names, values))
+        return " AND ".join(clauses) or "1 = 1", params
+
+    def cypher_predicate(self, alias: str = "e") -> tuple[str, dict[str, Any]]:
+        """Event 节点上的 Cypher 谓词；只返回实际用到的参数（Kuzu 不接受多余参数）。"""
+        clauses: list[str] = []
+        params: dict[str, Any] = {}
+        if self.since is not None:
+            clauses.append(f"{alias}.timestamp >= $f_since")
+            params["f_since"] = _epoch_ms(self.since)
+        if self.until is not None:
+            clauses.append(f"{alias}.timestamp < $f_until")
+            params["f_until"] = _epoch_ms(self.until)
+        if self.session_ids:
+            clauses.append(f"{alias}.session_id IN $f_sessions")
+            params["f_sessions"] = list(self.session_ids)
+        if self.roles:
+            clauses.append(f"{alias}.role IN $f_roles")
+            params["f_roles"] = list(self.roles)
+        return " AND ".join(clauses) or "true", params
+
+    def describe(self) -> str:
+        parts = []
+        if self.since or self.until:
+            start = self.since.strftime("%Y-%m-%d %H:%M") if self.since else "…"
+            end = self.until.strftime("%Y-%m-%d %H:%M") if self.until else "now"
+            parts.append(f"{start} ~ {end}")
+        if self.session_ids:
+            parts.append(f"sessions={','.join(self.session_ids)}")
+        if self.roles:
+            parts.append(f"roles={','.join(self.roles)}")
+        return " ".join(parts) or "all"
+
+
+# ── 日期短语解析 ─────────────────────────────────────────────────────────────
+
+# 只有带回忆意图的问题才自动加时间过滤（"今天天气怎么样" 不该只查今天的消息）
+_RECALL_CUE_RE = re.compile(
+    r"(说过|聊过|聊了|聊的|谈过|提到|提过|讨论|问过|记得|之前|上次|那次|当时|"
+    r"\b(?:did (?:i|we)|have (?:i|we)|we (?:talked|discussed)|i (?:said|mentioned|asked)|"
+    r"remember|mentioned|discussed|talked about)\b)",
+    re.IGNORECASE,
+)
+
+_CN_DIGITS = {"零": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+_NUMBER = r"(\d{1,3}|[零一二两三四五六七八九十]{1,3}|几)"
+_UNIT_DAYS = {"天": 1, "日": 1, "周": 7, "星期": 7, "礼拜": 7, "day": 1, "week": 7}
+
+_FULL_DATE_RE = re.compile(r"(\d{4})[年\-/\.](\d{1,2})[月\-/\.](\d{1,2})[日号]?")
+_YEAR_MONTH_RE = re.compile(r"(\d{4})[年\-/](\d{1,2})(?:月|(?![\d\-/]))")
+_MONTH_DAY_RE = re.compile(r"(\d{1,2})月(\d{1,2})[日号]")
+_RECENT_RE = re.compile(rf"(?:最近|近|过去|这)\s*{_NUMBER}\s*(?:个)?\s*(天|日|周|星期|礼拜|月)")
+_AGO_RE = re.compile(rf"{_NUMBER}\s*(?:个)?\s*(天|日|周|星期|礼拜|月)(?:前|以前|之前)")
+_EN_RECENT_RE = re.compile(r"\b(?:last|past)\s+(\d{1,3})\s+(day|week|month)s?\b", re.IGNORECASE)
+_EN_AGO_RE = re.compile(r"\b(\d{1,3})\s+(day|week|month)s?\s+ago\b", re.IGNORECASE)
+
+# 固定短语 → (单位, 偏移)；day/week/month/year 表示相对当前的那一整段
+_FIXED_PHRASES: list[tuple[re.Pattern, str, int]] = [
+    (re.compile(r"大前天"), "day", -3),
+    (re.compile(r"前天"), "day", -2),
+    (re.compile(r"昨天|昨日|昨晚|\byesterday\b", re.IGNORECASE), "day", -1),
+    (re.compile(r"今天|今日|今早|今晚|\btoday\b", re.IGNORECASE), "day", 0),
+    (re.compile(r"上周|上个?星期|上个?礼拜|\blast week\b", re.IGNORECASE), "week", -1),
+    (re.compile(r"本周|这周|这个?星期|这个?礼拜|\bthis week\b", re.IGNORECASE), "week", 0),
+    (re.compile(r"上个?月|\blast month\b", re.IGNORECASE), "month", -1),
+    (re.compile(r"本月|这个月|\bthis month\b", re.IGNORECASE), "month", 0),
+    (re.compile(r"去年|\blast year\b", re.IGNORECASE), "year", -1),
+    (re.compile(r"今年|\bthis year\b", re.IGNORECASE), "year", 0),
+]
+
+
+def parse_time_range(text: str, now: datetime | None = None) -> tuple[datetime | None, datetime | None] | None:
+    """
+    从文本里解析第一个可识别的时间短语，返回 [since, until) 区间；"本周"、"最近 3 天"
+    这类截至当前的区间 until 为 None。识别不到返回 None。
+    """
+    if not text:
+        return None
+    now = now or datetime.now()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    matched = _FULL_DATE_RE.search(text)
+    if matched:
+        day = _safe_date(*map(int, matched.groups()))
+        return (day, day + timedelta(days=1)) if day else None
+    matched = _YEAR_MONTH_RE.search(text)
+    if matched:
+        start = _safe_date(int(matched.group(1)), int(matched.group(2)), 1)
+        return (start, _add_months(start, 1)) if start else None
+    matched = _MONTH_DAY_RE.search(text)
+    if matched:
+        day = _safe_date(now.year, int(matched.group(1)), int(matched.group(2)))
+        if day and day > now:
+            # "12月30日" 在一月份问起时指的是去年
+            day = _safe_date(now.year - 1, day.month, day.day)
+        return (day, day + timedelta(days=1)) if day else None
+
+    for pattern, kind in ((_RECENT_RE, "recent"), (_EN_RECENT_RE, "recent"), (_AGO_RE, "ago"), (_EN_AGO_RE, "ago")):
+        matched = pattern.search(text)
+        if not matched:
+            continue
+        amount = _parse_number(matched.group(1))
+        unit = matched.group(2).lower()
+        if amount is None:
+            continue
+        if unit in ("月", "month"):
+            start = _add_months(today, -amount)
+            if kind == "recent":
+                return start, None
+            return start.replace(day=1), _add_months(start.replace(day=1), 1)
+        days = amount * _UNIT_DAYS[unit]
+        if kind == "recent":
+            # "最近 3 天" 含今天
+            return today - timedelta(days=max(days - 1, 0)), None
+        start = today - timedelta(days=days)
+        return start, start + timedelta(days=_UNIT_DAYS[unit])
+
+    for pattern, unit, offset in _FIXED_PHRASES:
+        if not pattern.search(text):
+            continue
+        if unit == "day":
+            start = today + timedelta(days=offset)
+            return start, start + timedelta(days=1)
+        if unit == "week":
+            start = today - timedelta(days=today.weekday()) + timedelta(weeks=offset)
+            return start, (start + timedelta(weeks=1) if offset else None)
+        if unit == "month":
+            start = _add_months(today.replace(day=1), offset)
+            return start, (_add_months(start, 1) if offset else None)
+        start = today.replace(month=1, day=1, year=today.year + offset)
+        return start, (start.replace(year=start.year + 1) if offset else None)
+    return None
+
+
+def infer_filter(query: str, now: datetime | None = None, require_cue: bool = True) -> RetrievalFilter | None:
+    """
+    根据查询里的时间短语推断过滤条件。``require_cue`` 时只有带回忆意图
+    （"说过"、"聊了"、"did I" …）的查询才生效；识别不到返回 None。
+    """
+    if require_cue and not _RECALL_CUE_RE.search(query or ""):
+        return None
+    window = parse_time_range(query, now)
+    if window is None:
+        return None
+    return RetrievalFilter(since=window[0], until=window[1])
+
+
+# ── 工具函数 ──────────────────────────────────────────────────────────────────
+
+def _parse_number(token: str) -> int | None:
+    if token.isdigit():
+        return int(token)
+    if token == "几":
+        return 3
+    if token == "十":
+        return 10
+    if "十" in token:
+        tens, _, ones = token.partition("十")
+        return _CN_DIGITS.get(tens, 1) * 10 + (_CN_DIGITS.get(ones, 0) if ones else 0)
+    if len(token) == 1 and token in _CN_DIGITS:
+        return _CN_DIGITS[token]
+    return None
+
+
+def _safe_date(year: int, month: int, day: int) -> datetime | None:
+    try:
+        return datetime(year, month, day)
+    except ValueError:
+        return None
+
+
+def _add_months(value: datetime, months: int) -> datetime:
+    year, month = divmod(value.year * 12 + value.month - 1 + months, 12)
+    # 目标月没有这一天时（3 月 31 日往前一个月）落到月末
+    day = min(value.day, calendar.monthrange(year, month + 1)[1])
+    return value.replace(year=year, month=month + 1, day=day)
+
+
+def _coerce_time(value: datetime | str | None) -> datetime | None:
+    if value is None or isinstance(value, datetime):
+        return value
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        return datetime.fromisoformat(text.replace("Z", ""))
+    except ValueError as exc:
+        raise ValueError(f"无法解析的时间: {value!r}（应为 ISO 格式，如 2025-03-01 或 2025-03-01T08:00）") from exc
+
+
+def _is_date_only(value: str) -> bool:
+    return bool(re.fullmatch(r"\s*\d{4}-\d{2}-\d{2}\s*", value))
+
+
+def _as_tuple(values: Iterable[str] | str | None) -> tuple[str, ...]:
+    if not values:
+        return ()
+    if isinstance(values, str):
+        values = values.split(",")
+    return tuple(dict.fromkeys(str(v).strip() for v in values if str(v).strip()))
+
+
+def _epoch_ms(value: datetime) -> int:
+    return int(value.timestamp() * 1000)
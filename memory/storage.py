@@ -2,22 +2,30 @@
 
 from __future__ import annotations
 
+import asyncio
+import json
 import uuid
 from datetime import datetime
-from typing import Optional
+from pathlib import Path
+from typing import Any, Mapping, Optional
 
 from loguru import logger
 from sqlalchemy import (
     JSON,
+    event,
     Boolean,
     Column,
     DateTime,
     Float,
+    Index,
     Integer,
+    LargeBinary,
     String,
     Text,
+    and_,
     delete,
     func,
+    or_,
     select,
     text,
     update,
@@ -25,10 +33,31 @@ from sqlalchemy import (
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
 
+from memory.ann_index import IVFFlatIndex
 from memory.embeddings import LocalEmbeddingEngine
+from memory.retrieval_filter import RetrievalFilter
+from memory.vector_codec import pack_embedding, unpack_embedding
+from memory.vector_index import VectorIndex
 
 Base = declarative_base()
 GLOBAL_USER_ID = "global"
+# Filtered recall scores candidates exactly up to this many matching messages;
+# beyond that the vector index is over-fetched and hits are re-checked in SQL.
+# 过滤检索命中的消息不超过该数量时精确打分，更多时向量索引超取后再用 SQL 复核。
+FILTERED_EXACT_MAX = 20_000
+FILTERED_OVERFETCH = 10
+
+# Connection profile applied on every new SQLite connection (None = leave SQLite default).
+# 每个新 SQLite 连接上应用的参数（None 表示保持 SQLite 默认值）。
+DEFAULT_SQLITE_PROFILE: dict[str, Any] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size_mb": 256,
+    "cache_size_mb": 64,
+    "temp_store": "MEMORY",
+    "busy_timeout_ms": 5000,
+    "read_pool_size": 4,
+}
 
 
 class SessionRecord(Base):
@@ -57,6 +86,15 @@ class MessageRecord(Base):
     timestamp = Column(DateTime, nullable=False)
     message_metadata = Column(JSON, default=dict)
 
+    # Keyset pagination over a session's history (tail-first loading).
+    # 会话历史按 (session_id, timestamp, id) 键集分页（从尾部加载）。
+    # Time-scoped recall across sessions filters on timestamp alone.
+    # 跨会话按时间范围检索只按 timestamp 过滤。
+    __table_args__ = (
+        Index("ix_messages_session_ts_id", "session_id", "timestamp", "id"),
+        Index("ix_messages_timestamp", "timestamp"),
+    )
+
 
 class UserRecord(Base):
     """Global user state."""
@@ -124,7 +162,9 @@ class MemoryEmbeddingRecord(Base):
     source_type = Column(String(30), nullable=False, index=True)
     source_id = Column(String(64), nullable=False, index=True)
     content = Column(Text, nullable=False)
-    embedding = Column(JSON, nullable=False)
+    # Packed float32 blob, see memory.vector_codec.
+    # 打包的 float32 二进制，格式见 memory.vector_codec。
+    embedding = Column(LargeBinary, nullable=False)
     created_at = Column(DateTime, nullable=False)
     updated_at = Column(DateTime, nullable=False)
 
@@ -146,13 +186,57 @@ class EmbeddingJobRecord(Base):
     updated_at = Column(DateTime, nullable=False)
 
 
+def _event_records(events: list[tuple[str, dict]], now: datetime) -> list[MemoryEventRecord]:
+    return [
+        MemoryEventRecord(
+            id=str(uuid.uuid4()),
+            event_type=event_type,
+            operation_id=None,
+            payload=payload,
+            created_at=now,
+        )
+        for event_type, payload in events
+    ]
+
+
 class MemoryStorage:
     """SQLite storage manager."""
 
-    def __init__(self, db_path: str = "data/sessions.db"):
+    def __init__(
+        self,
+        db_path: str = "data/sessions.db",
+        embedding_dimension: int = 128,
+        use_vector_index: bool = True,
+        ann_options: dict | None = None,
+        sqlite_profile: Mapping[str, Any] | None = None,
+    ):
         self.db_path = db_path
         self.engine = None
         self.session_factory = None
+        # Retrieval reads go through a separate read-only pool when the DB is a file,
+        # so they never queue behind the writer; otherwise it aliases the writer.
+        # 文件库时检索读走独立只读连接池，不排在写连接之后；否则与写连接共用。
+        self.read_engine = None
+        self.read_session_factory = None
+        self.sqlite_profile = {**DEFAULT_SQLITE_PROFILE, **(sqlite_profile or {})}
+        # Resident index for semantic recall; False falls back to the full-table scan.
+        # With ann_options the index is IVF-flat and snapshotted next to the DB file.
+        # 常驻向量索引；关闭时回退到全表扫描。启用 ann_options 时使用 IVF 并落盘到 DB 旁。
+        self.vector_index: VectorIndex | IVFFlatIndex | None = None
+        self.vector_index_path: Path | None = None
+        # IVF (re)training runs in a worker thread so k-means never blocks the event loop.
+        # IVF 训练在工作线程中执行，k-means 不阻塞事件循环。
+        self._index_training: asyncio.Task | None = None
+        # Bumped on every write that can change retrieval results; read-side
+        # caches compare it to invalidate exactly.
+        # 每次影响检索结果的写入都会递增，读侧缓存据此精确失效。
+        self.generation = 0
+        if use_vector_index and ann_options:
+            self.vector_index = IVFFlatIndex(embedding_dimension, **ann_options)
+            if db_path != ":memory:":
+                self.vector_index_path = Path(db_path).with_suffix(".vecindex.npz")
+        elif use_vector_index:
+            self.vector_index = VectorIndex(embedding_dimension)
 
     async def initialize(self):
         """Initialize database and run lightweight migrations."""
@@ -161,7 +245,18 @@ class MemoryStorage:
         if self.db_path != ":memory:":
             Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
 
-        self.engine = create_async_engine(f"sqlite+aiosqlite:///{self.db_path}", echo=False)
+        engine_options: dict[str, Any] = {}
+        if self.db_path != ":memory:":
+            # One writer connection: SQLite serializes writers anyway, and in WAL a
+            # second writer that read first fails with SQLITE_BUSY instead of waiting.
+            # 单写连接：SQLite 本就串行写；WAL 下多个写连接读后升级写会直接 BUSY 而非等待。
+            engine_options.update(pool_size=1, max_overflow=0)
+        self.engine = create_async_engine(
+            f"sqlite+aiosqlite:///{self.db_path}",
+            echo=False,
+            **engine_options,
+        )
+        self._apply_sqlite_profile(self.engine, read_only=False)
 
         async with self.engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
@@ -173,10 +268,56 @@ class MemoryStorage:
             class_=AsyncSession,
             expire_on_commit=False,
         )
+        self.read_session_factory = self.session_factory
+        read_pool_size = int(self.sqlite_profile.get("read_pool_size") or 0)
+        if self.db_path != ":memory:" and read_pool_size > 0:
+            self.read_engine = create_async_engine(
+                f"sqlite+aiosqlite:///file:{Path(self.db_path).resolve()}?mode=ro&uri=true",
+                echo=False,
+                pool_size=read_pool_size,
+                max_overflow=0,
+            )
+            self._apply_sqlite_profile(self.read_engine, read_only=True)
+            self.read_session_factory = async_sessionmaker(
+                self.read_engine,
+                class_=AsyncSession,
+                expire_on_commit=False,
+            )
 
         await self._ensure_global_user()
+        await self._load_vector_index()
         logger.info(f"数据库初始化完成: {self.db_path}")
 
+    def _apply_sqlite_profile(self, engine, read_only: bool):
+        """Register a connect hook that applies the configured PRAGMAs."""
+        profile = self.sqlite_profile
+        pragmas: list[str] = []
+        if not read_only and profile.get("journal_mode"):
+            # journal_mode is persistent and needs write access; set it from the writer only.
+            pragmas.append(f"journal_mode={profile['journal_mode']}")
+        if profile.get("synchronous"):
+            pragmas.append(f"synchronous={profile['synchronous']}")
+        if profile.get("mmap_size_mb") is not None:
+            pragmas.append(f"mmap_size={int(profile['mmap_size_mb']) * 1024 * 1024}")
+        if profile.get("cache_size_mb"):
+            # Negative cache_size is in KiB.
+            pragmas.append(f"cache_size={-int(profile['cache_size_mb']) * 1024}")
+        if profile.get("temp_store"):
+            pragmas.append(f"temp_store={profile['temp_store']}")
+        if profile.get("busy_timeout_ms") is not None:
+            pragmas.append(f"busy_timeout={int(profile['busy_timeout_ms'])}")
+        if read_only:
+            pragmas.append("query_only=ON")
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def _on_connect(dbapi_connection, _record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for pragma in pragmas:
+                    cursor.execute(f"PRAGMA {pragma}")
+            finally:
+                cursor.close()
+
     async def _migrate_existing_schema(self, conn):
         """Run lightweight migrations for existing SQLite deployments."""
         columns_result = await conn.execute(text("PRAGMA table_info(sessions)"))
@@ -211,6 +352,42 @@ class MemoryStorage:
                 )
             )
 
+        await conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_messages_session_ts_id "
+                "ON messages (session_id, timestamp, id)"
+            )
+        )
+        await conn.execute(
+            text("CREATE INDEX IF NOT EXISTS ix_messages_timestamp ON messages (timestamp)")
+        )
+        await self._migrate_json_embeddings(conn)
+
+    async def _migrate_json_embeddings(self, conn, batch_size: int = 1000):
+        """Convert legacy JSON-text embeddings to packed float32 blobs (one-shot)."""
+        converted = 0
+        while True:
+            result = await conn.execute(
+                text(
+                    "SELECT id, embedding FROM memory_embeddings "
+                    "WHERE typeof(embedding) = 'text' LIMIT :limit"
+                ),
+                {"limit": batch_size},
+            )
+            rows = result.fetchall()
+            if not rows:
+                break
+            await conn.execute(
+                text("UPDATE memory_embeddings SET embedding = :embedding WHERE id = :id"),
+                [
+                    {"id": row[0], "embedding": pack_embedding(json.loads(row[1] or "[]"))}
+                    for row in rows
+                ],
+            )
+            converted += len(rows)
+        if converted:
+            logger.info(f"memory_embeddings 已迁移为二进制格式: {converted} 条")
+
     async def _ensure_message_fts(self, conn):
         """Create and backfill FTS5 index for message keyword retrieval."""
         await conn.execute(
@@ -231,6 +408,95 @@ class MemoryStorage:
             )
         )
 
+    async def _load_vector_index(self):
+        """Load stored embeddings into the resident vector index.
+
+        When an on-disk ANN snapshot exists it is restored first and reconciled
+        against the table: rows deleted since the snapshot are dropped and rows
+        updated after it are re-read, so only the delta is decoded.
+        """
+        if self.vector_index is None:
+            return
+
+        embedding_columns = (
+            MemoryEmbeddingRecord.id,
+            MemoryEmbeddingRecord.source_type,
+            MemoryEmbeddingRecord.source_id,
+            MemoryEmbeddingRecord.embedding,
+        )
+        saved_at = None
+        if self.vector_index_path is not None and self.vector_index_path.exists():
+            try:
+                saved_at = self.vector_index.restore(self.vector_index_path)
+            except Exception as exc:
+                logger.warning(f"向量索引快照损坏，将全量重建: {exc}")
+                saved_at = None
+
+        async with self.session_factory() as session:
+            if saved_at is None:
+                result = await session.execute(select(*embedding_columns))
+                self.vector_index.load(
+                    (row[0], row[1], row[2], unpack_embedding(row[3])) for row in result.all()
+                )
+            else:
+                key_rows = await session.execute(
+                    select(MemoryEmbeddingRecord.source_type, MemoryEmbeddingRecord.source_id)
+                )
+                live_keys = {(row[0], row[1]) for row in key_rows.all()}
+                stale_keys = [
+                    (item[1], item[2])
+                    for item in self.vector_index.items()
+                    if (item[1], item[2]) not in live_keys
+                ]
+                for source_type, source_id in stale_keys:
+                    self.vector_index.remove(source_type, source_id)
+
+                # 1s margin guards against clock granularity around the snapshot write.
+                # 预留 1 秒余量，避免快照写入时刻附近的时间精度问题。
+                changed = await session.execute(
+                    select(*embedding_columns).where(
+                        MemoryEmbeddingRecord.updated_at
+                        >= datetime.fromtimestamp(saved_at - 1.0)
+                    )
+                )
+                for row in changed.all():
+                    self.vector_index.upsert(row[0], row[1], row[2], unpack_embedding(row[3]))
+        self._schedule_index_training()
+        logger.debug(f"向量索引加载完成: {len(self.vector_index)} 条")
+
+    def _schedule_index_training(self) -> None:
+        """Start a background IVF rebuild when the index has outgrown its centroids."""
+        index = self.vector_index
+        if not isinstance(index, IVFFlatIndex) or index.is_training or not index.needs_training:
+            return
+        rows = index.training_snapshot()
+        self._index_training = asyncio.create_task(self._train_vector_index(index, rows))
+
+    async def _train_vector_index(self, index: IVFFlatIndex, rows: list) -> None:
+        try:
+            layout = await asyncio.to_thread(index.build, rows)
+        except Exception as exc:
+            index.abort_training()
+            logger.warning(f"向量索引训练失败，继续使用旧索引: {exc}")
+            return
+        if index.install(layout):
+            logger.debug(f"向量索引训练完成: {len(rows)} 条")
+
+    async def wait_for_index_training(self) -> None:
+        """Wait for an in-flight IVF rebuild (tests, shutdown)."""
+        task = self._index_training
+        if task is not None and not task.done():
+            await asyncio.shield(task)
+
+    def _save_vector_index(self):
+        """Snapshot the ANN index next to the SQLite file."""
+        if self.vector_index is None or self.vector_index_path is None:
+            return
+        try:
+            self.vector_index.save(self.vector_index_path, saved_at=datetime.now().timestamp())
+        except Exception as exc:
+            logger.warning(f"向量索引快照写入失败: {exc}")
+
     async def _ensure_global_user(self):
         """Guarantee a singleton global user record exists."""
         async with self.session_factory() as session:
@@ -325,24 +591,135 @@ class MemoryStorage:
 
         return message_id
 
+    async def save_messages_batch(self, messages: list[dict], jobs: list[dict] | None = None) -> int:
+        """Group-commit messages, their FTS rows, session counters and embedding jobs.
+
+        ``messages`` items carry id/session_id/role/content/metadata/timestamp;
+        ``jobs`` items carry id/source_type/source_id/content/created_at.
+        """
+        if not messages and not jobs:
+            return 0
+
+        session_updates: dict[str, tuple[int, datetime]] = {}
+        for item in messages:
+            count, last_active = session_updates.get(item["session_id"], (0, item["timestamp"]))
+            session_updates[item["session_id"]] = (count + 1, max(last_active, item["timestamp"]))
+
+        async with self.session_factory() as session:
+            session.add_all(
+                MessageRecord(
+                    id=item["id"],
+                    session_id=item["session_id"],
+                    role=item["role"],
+                    content=item["content"],
+                    timestamp=item["timestamp"],
+                    message_metadata=item.get("metadata") or {},
+                )
+                for item in messages
+            )
+            if messages:
+                await session.execute(
+                    text(
+                        "INSERT INTO message_fts(message_id, session_id, content) "
+                        "VALUES (:message_id, :session_id, :content)"
+                    ),
+                    [
+                        {
+                            "message_id": item["id"],
+                            "session_id": item["session_id"],
+                            "content": item["content"],
+                        }
+                        for item in messages
+                    ],
+                )
+            for session_id, (count, last_active) in session_updates.items():
+                await session.execute(
+                    update(SessionRecord)
+                    .where(SessionRecord.session_id == session_id)
+                    .values(
+                        last_active=last_active,
+                        message_count=SessionRecord.message_count + count,
+                    )
+                )
+            session.add_all(
+                EmbeddingJobRecord(
+                    id=job["id"],
+                    source_type=job["source_type"],
+                    source_id=job["source_id"],
+                    content=job["content"],
+                    status="pending",
+                    retry_count=0,
+                    next_retry_at=None,
+                    last_error=None,
+                    created_at=job["created_at"],
+                    updated_at=job["created_at"],
+                )
+                for job in jobs or []
+            )
+            await session.commit()
+        return len(messages)
+
     async def get_messages(self, session_id: str, limit: int = 100) -> list[MessageRecord]:
         """Get ordered message list for a session."""
-        async with self.session_factory() as session:
+        async with self.read_session_factory() as session:
             result = await session.execute(
                 select(MessageRecord)
-                .where(MessageRecord.session_id == session_id)
+                .where(MessageRecord.session_id == session_id, MessageRecord.role != "summary")
                 .order_by(MessageRecord.timestamp.asc())
                 .limit(limit)
             )
             return list(result.scalars().all())
 
+    async def get_recent_messages(
+        self,
+        session_id: str,
+        limit: int = 50,
+        before_message_id: str | None = None,
+    ) -> tuple[list[MessageRecord], bool]:
+        """Load the newest page of a session (optionally older than a message), oldest first.
+
+        Keyset pagination on ``(timestamp, id)``, so the cost does not grow with
+        session length. Returns ``(messages, has_older)``.
+        """
+        async with self.read_session_factory() as session:
+            # Compaction summaries stand in for archived turns in recall only, never in history.
+            # 压缩摘要只替代归档消息参与检索，不出现在会话历史里。
+            query = select(MessageRecord).where(
+                MessageRecord.session_id == session_id, MessageRecord.role != "summary"
+            )
+            if before_message_id:
+                cursor = (
+                    await session.execute(
+                        select(MessageRecord.timestamp, MessageRecord.id).where(
+                            MessageRecord.id == before_message_id
+                        )
+                    )
+                ).one_or_none()
+                if cursor is None:
+                    return [], False
+                query = query.where(
+                    or_(
+                        MessageRecord.timestamp < cursor[0],
+                        and_(MessageRecord.timestamp == cursor[0], MessageRecord.id < cursor[1]),
+                    )
+                )
+            result = await session.execute(
+                query.order_by(MessageRecord.timestamp.desc(), MessageRecord.id.desc()).limit(limit + 1)
+            )
+            rows = list(result.scalars().all())
+
+        has_older = len(rows) > limit
+        page = rows[:limit]
+        page.reverse()
+        return page, has_older
+
     async def get_messages_metadata_by_ids(self, message_ids: list[str]) -> dict[str, dict]:
         """Get lightweight metadata for a list of messages."""
         ids = [str(mid).strip() for mid in (message_ids or []) if str(mid).strip()]
         if not ids:
             return {}
 
-        async with self.session_factory() as session:
+        async with self.read_session_factory() as session:
             result = await session.execute(
                 select(
                     MessageRecord.id,
@@ -362,13 +739,23 @@ class MemoryStorage:
             for row in rows
         }
 
-    async def search_messages_by_keyword(self, query: str, limit: int = 5) -> list[dict]:
-        """Search messages by keyword using SQLite FTS5 (with LIKE fallback)."""
+    async def search_messages_by_keyword(
+        self,
+        query: str,
+        limit: int = 5,
+        filters: RetrievalFilter | None = None,
+    ) -> list[dict]:
+        """Search messages by keyword using SQLite FTS5 (with LIKE fallback).
+
+        ``filters`` restricts hits by time / session / role inside the same query.
+        """
         query = (query or "").strip()
         if not query:
             return []
+        scope = filters or RetrievalFilter()
+        predicate, predicate_params = scope.sql_predicate("m")
 
-        async with self.session_factory() as session:
+        async with self.read_session_factory() as session:
             try:
                 result = await session.execute(
                     text(
@@ -376,11 +763,11 @@ class MemoryStorage:
                         "bm25(message_fts) AS bm25_score "
                         "FROM message_fts "
                         "JOIN messages m ON m.id = message_fts.message_id "
-                        "WHERE message_fts MATCH :query "
+                        f"WHERE message_fts MATCH :query AND {predicate} "
                         "ORDER BY bm25_score "
                         "LIMIT :limit"
                     ),
-                    {"query": query, "limit": limit},
+                    {"query": query, "limit": limit, **predicate_params},
                 )
                 rows = result.fetchall()
                 return [
@@ -398,11 +785,14 @@ class MemoryStorage:
                 ]
             except Exception:
                 like_query = f"%{query}%"
+                like_predicate, like_params = scope.sql_predicate("messages")
                 result = await session.execute(
                     select(MessageRecord)
                     .where(MessageRecord.content.like(like_query))
+                    .where(text(like_predicate))
                     .order_by(MessageRecord.timestamp.desc())
-                    .limit(limit)
+                    .limit(limit),
+                    like_params,
                 )
                 rows = list(result.scalars().all())
                 return [
@@ -437,12 +827,171 @@ class MemoryStorage:
             return list(result.scalars().all())
 
     async def delete_session(self, session_id: str):
-        """Delete session and messages."""
+        """Delete session, its messages and their embeddings/jobs."""
         async with self.session_factory() as session:
+            id_rows = await session.execute(
+                select(MessageRecord.id).where(MessageRecord.session_id == session_id)
+            )
+            message_ids = [row[0] for row in id_rows.all()]
+            if message_ids:
+                await session.execute(
+                    delete(MemoryEmbeddingRecord).where(
+                        MemoryEmbeddingRecord.source_type == "message",
+                        MemoryEmbeddingRecord.source_id.in_(message_ids),
+                    )
+                )
+                await session.execute(
+                    delete(EmbeddingJobRecord).where(
+                        EmbeddingJobRecord.source_type == "message",
+                        EmbeddingJobRecord.source_id.in_(message_ids),
+                    )
+                )
             await session.execute(delete(MessageRecord).where(MessageRecord.session_id == session_id))
             await session.execute(delete(SessionRecord).where(SessionRecord.session_id == session_id))
             await session.commit()
 
+        if self.vector_index is not None:
+            for message_id in message_ids:
+                self.vector_index.remove("message", message_id)
+        self.generation += 1
+
+    async def get_compaction_cutoff(self, hot_messages: int, older_than: datetime) -> datetime | None:
+        """Boundary of the hot set: the earlier of ``older_than`` and the Nth newest raw message.
+
+        Returns None when fewer than ``hot_messages`` raw messages exist.
+        """
+        if hot_messages <= 0:
+            return older_than
+        async with self.read_session_factory() as session:
+            result = await session.execute(
+                select(MessageRecord.timestamp)
+                .where(MessageRecord.role != "summary")
+                .order_by(MessageRecord.timestamp.desc())
+                .limit(1)
+                .offset(hot_messages - 1)
+            )
+            boundary = result.scalar_one_or_none()
+        if boundary is None:
+            return None
+        return min(boundary, older_than)
+
+    async def list_compactable_sessions(self, cutoff: datetime) -> list[str]:
+        """Sessions holding raw messages older than ``cutoff``."""
+        async with self.read_session_factory() as session:
+            result = await session.execute(
+                select(MessageRecord.session_id)
+                .where(MessageRecord.timestamp < cutoff, MessageRecord.role != "summary")
+                .distinct()
+            )
+            return [row[0] for row in result.all()]
+
+    async def get_compactable_messages(self, session_id: str, cutoff: datetime) -> list[dict]:
+        """A session's raw messages older than ``cutoff``, oldest first, with their packed embeddings."""
+        async with self.read_session_factory() as session:
+            result = await session.execute(
+                text(
+                    "SELECT m.id, m.role, m.content, m.timestamp, m.message_metadata, e.embedding "
+                    "FROM messages m "
+                    "LEFT JOIN memory_embeddings e INDEXED BY ix_memory_embeddings_source_id "
+                    "ON e.source_id = m.id AND e.source_type = 'message' "
+                    "WHERE m.session_id = :session_id AND m.timestamp < :cutoff "
+                    "AND m.role != 'summary' "
+                    "ORDER BY m.timestamp, m.id"
+                ),
+                {"session_id": session_id, "cutoff": cutoff.strftime("%Y-%m-%d %H:%M:%S.%f")},
+            )
+            rows = result.all()
+        return [
+            {
+                "id": row[0],
+                "role": row[1],
+                "content": row[2],
+                # Raw text() rows come back as SQLite's stored string.
+                # text() 查询返回的是 SQLite 中存储的字符串。
+                "timestamp": datetime.fromisoformat(row[3]),
+                "metadata": row[4],
+                "embedding": row[5],
+            }
+            for row in rows
+        ]
+
+    async def apply_compaction(self, summaries: list[dict]) -> int:
+        """Replace raw messages by their summaries in one transaction; returns messages removed.
+
+        ``summaries`` items carry id/session_id/content/timestamp/metadata/embedding
+        and ``raw`` (the folded message dicts). Each summary is stored as a
+        ``summary`` message with its FTS row and embedding; the raw messages lose
+        their FTS rows, embeddings and embedding jobs.
+        """
+        if not summaries:
+            return 0
+        raw_ids = [row["id"] for item in summaries for row in item["raw"]]
+        now = datetime.now()
+        embedding_ids = [str(uuid.uuid4()) for _ in summaries]
+        async with self.session_factory() as session:
+            session.add_all(
+                MessageRecord(
+                    id=item["id"],
+                    session_id=item["session_id"],
+                    role="summary",
+                    content=item["content"],
+                    timestamp=item["timestamp"],
+                    message_metadata=item.get("metadata") or {},
+                )
+                for item in summaries
+            )
+            session.add_all(
+                MemoryEmbeddingRecord(
+                    id=embedding_id,
+                    source_type="message",
+                    source_id=item["id"],
+                    content=item["content"],
+                    embedding=pack_embedding(item["embedding"]),
+                    created_at=now,
+                    updated_at=now,
+                )
+                for embedding_id, item in zip(embedding_ids, summaries)
+            )
+            await session.execute(
+                text(
+                    "INSERT INTO message_fts(message_id, session_id, content) "
+                    "VALUES (:message_id, :session_id, :content)"
+                ),
+                [
+                    {"message_id": item["id"], "session_id": item["session_id"], "content": item["content"]}
+                    for item in summaries
+                ],
+            )
+            # message_id is UNINDEXED, so this is one scan of the FTS table per batch.
+            # message_id 列不建索引，每批整体扫描一次 FTS 表。
+            await session.execute(
+                text("DELETE FROM message_fts WHERE message_id IN (SELECT value FROM json_each(:ids))"),
+                {"ids": json.dumps(raw_ids)},
+            )
+            await session.execute(
+                delete(MemoryEmbeddingRecord).where(
+                    MemoryEmbeddingRecord.source_type == "message",
+                    MemoryEmbeddingRecord.source_id.in_(raw_ids),
+                )
+            )
+            await session.execute(
+                delete(EmbeddingJobRecord).where(
+                    EmbeddingJobRecord.source_type == "message",
+                    EmbeddingJobRecord.source_id.in_(raw_ids),
+                )
+            )
+            await session.execute(delete(MessageRecord).where(MessageRecord.id.in_(raw_ids)))
+            await session.commit()
+
+        if self.vector_index is not None:
+            for message_id in raw_ids:
+                self.vector_index.remove("message", message_id)
+            for embedding_id, item in zip(embedding_ids, summaries):
+                self.vector_index.upsert(embedding_id, "message", item["id"], item["embedding"])
+            self._schedule_index_training()
+        self.generation += 1
+        return len(raw_ids)
+
     async def get_global_user_state(self) -> dict:
         """Get global user onboarding state."""
         async with self.session_factory() as session:
@@ -592,6 +1141,7 @@ class MemoryStorage:
                 record.source_message_id = source_message_id
                 record.updated_at = now
                 await session.commit()
+                self.generation += 1
                 return record.id
 
             fact_id = str(uuid.uuid4())
@@ -610,6 +1160,7 @@ class MemoryStorage:
                 )
             )
             await session.commit()
+            self.generation += 1
             return fact_id
 
     async def list_memory_facts(
@@ -665,6 +1216,15 @@ class MemoryStorage:
             await session.commit()
             return event_id
 
+    async def save_memory_events(self, events: list[tuple[str, dict]]) -> int:
+        """Bulk-append ``(event_type, payload)`` events in one transaction."""
+        if not events:
+            return 0
+        async with self.session_factory() as session:
+            session.add_all(_event_records(events, datetime.now()))
+            await session.commit()
+        return len(events)
+
     async def list_memory_events(
         self,
         event_type: Optional[str] = None,
@@ -687,6 +1247,7 @@ class MemoryStorage:
     ) -> str:
         """Upsert embedding for a source object."""
         now = datetime.now()
+        packed = pack_embedding(embedding)
         async with self.session_factory() as session:
             result = await session.execute(
                 select(MemoryEmbeddingRecord).where(
@@ -697,35 +1258,261 @@ class MemoryStorage:
             record = result.scalar_one_or_none()
             if record:
                 record.content = content
-                record.embedding = embedding
+                record.embedding = packed
                 record.updated_at = now
                 await session.commit()
-                return record.id
+                embedding_id = record.id
+            else:
+                embedding_id = str(uuid.uuid4())
+                session.add(
+                    MemoryEmbeddingRecord(
+                        id=embedding_id,
+                        source_type=source_type,
+                        source_id=source_id,
+                        content=content,
+                        embedding=packed,
+                        created_at=now,
+                        updated_at=now,
+                    )
+                )
+                await session.commit()
 
-            embedding_id = str(uuid.uuid4())
-            session.add(
-                MemoryEmbeddingRecord(
-                    id=embedding_id,
-                    source_type=source_type,
-                    source_id=source_id,
-                    content=content,
-                    embedding=embedding,
-                    created_at=now,
-                    updated_at=now,
+        if self.vector_index is not None:
+            self.vector_index.upsert(embedding_id, source_type, source_id, embedding)
+            self._schedule_index_training()
+        self.generation += 1
+        return embedding_id
+
+    async def apply_embedding_batch(
+        self,
+        embeddings: list[dict],
+        job_updates: list[dict],
+        events: list[tuple[str, dict]],
+    ) -> list[str]:
+        """Upsert embeddings, update job states and append events in one transaction.
+
+        ``embeddings`` items carry source_type/source_id/content/embedding;
+        ``job_updates`` items carry job_id/status/retry_count/next_retry_at/last_error.
+        """
+        now = datetime.now()
+        embedding_ids: list[str] = []
+        async with self.session_factory() as session:
+            existing: dict[tuple[str, str], MemoryEmbeddingRecord] = {}
+            source_ids = list({item["source_id"] for item in embeddings})
+            if source_ids:
+                result = await session.execute(
+                    select(MemoryEmbeddingRecord).where(
+                        MemoryEmbeddingRecord.source_id.in_(source_ids)
+                    )
                 )
-            )
+                existing = {
+                    (record.source_type, record.source_id): record
+                    for record in result.scalars().all()
+                }
+
+            for item in embeddings:
+                key = (item["source_type"], item["source_id"])
+                packed = pack_embedding(item["embedding"])
+                record = existing.get(key)
+                if record is None:
+                    record = MemoryEmbeddingRecord(
+                        id=str(uuid.uuid4()),
+                        source_type=item["source_type"],
+                        source_id=item["source_id"],
+                        content=item["content"],
+                        embedding=packed,
+                        created_at=now,
+                        updated_at=now,
+                    )
+                    session.add(record)
+                    existing[key] = record
+                else:
+                    record.content = item["content"]
+                    record.embedding = packed
+                    record.updated_at = now
+                embedding_ids.append(record.id)
+
+            if job_updates:
+                await session.execute(
+                    update(EmbeddingJobRecord),
+                    [
+                        {
+                            "id": item["job_id"],
+                            "status": item["status"],
+                            "retry_count": item["retry_count"],
+                            "next_retry_at": item["next_retry_at"],
+                            "last_error": item["last_error"],
+                            "updated_at": now,
+                        }
+                        for item in job_updates
+                    ],
+                )
+
+            session.add_all(_event_records(events, now))
             await session.commit()
-            return embedding_id
 
-    async def search_memory_embeddings(self, query_embedding: list[float], limit: int = 20) -> list[dict]:
-        """Semantic search over stored embeddings using cosine similarity."""
-        async with self.session_factory() as session:
+        if self.vector_index is not None:
+            for embedding_id, item in zip(embedding_ids, embeddings):
+                self.vector_index.upsert(
+                    embedding_id, item["source_type"], item["source_id"], item["embedding"]
+                )
+            self._schedule_index_training()
+        if embeddings:
+            self.generation += 1
+        return embedding_ids
+
+    async def search_memory_embeddings(
+        self,
+        query_embedding: list[float],
+        limit: int = 20,
+        filters: RetrievalFilter | None = None,
+    ) -> list[dict]:
+        """Semantic search over stored embeddings using cosine similarity.
+
+        With ``filters`` only message embeddings whose message matches the
+        time / session / role predicate are scored; see ``_search_filtered_embeddings``.
+        """
+        if filters:
+            return await self._search_filtered_embeddings(query_embedding, limit, filters)
+        if self.vector_index is None:
+            return await self._scan_memory_embeddings(query_embedding, limit=limit)
+
+        ranked = self.vector_index.search(query_embedding, limit=limit)
+        return await self._embedding_hits(ranked)
+
+    async def _embedding_hits(self, ranked: list[tuple[str, float]]) -> list[dict]:
+        """Hydrate ``(embedding_id, score)`` pairs from the vector index into hit dicts."""
+        if not ranked:
+            return []
+
+        async with self.read_session_factory() as session:
+            result = await session.execute(
+                select(
+                    MemoryEmbeddingRecord.id,
+                    MemoryEmbeddingRecord.source_type,
+                    MemoryEmbeddingRecord.source_id,
+                    MemoryEmbeddingRecord.content,
+                    MemoryEmbeddingRecord.updated_at,
+                ).where(MemoryEmbeddingRecord.id.in_([embedding_id for embedding_id, _ in ranked]))
+            )
+            rows = {row[0]: row for row in result.all()}
+
+        hits = []
+        for embedding_id, score in ranked:
+            row = rows.get(embedding_id)
+            if row is None:
+                continue
+            hits.append(
+                {
+                    "embedding_id": row[0],
+                    "source_type": row[1],
+                    "source_id": row[2],
+                    "content": row[3],
+                    "timestamp": row[4].isoformat() if row[4] else None,
+                    "semantic_score": score,
+                    "retrieval_type": "semantic",
+                }
+            )
+        return hits
+
+    async def _search_filtered_embeddings(
+        self,
+        query_embedding: list[float],
+        limit: int,
+        filters: RetrievalFilter,
+    ) -> list[dict]:
+        """Filtered semantic search: SQL picks the candidate messages, only those are scored.
+
+        The predicate runs on ``messages`` (timestamp / session indexes). Narrow
+        candidate sets are scored exactly against the resident index; when more
+        than ``FILTERED_EXACT_MAX`` messages match, the index is over-fetched and
+        hits outside the filter are dropped.
+        """
+        predicate, params = filters.sql_predicate("m")
+        if self.vector_index is None:
+            return await self._scan_filtered_embeddings(query_embedding, limit, predicate, params)
+
+        async with self.read_session_factory() as session:
+            result = await session.execute(
+                text(f"SELECT m.id FROM messages m WHERE {predicate} LIMIT :cap"),
+                {**params, "cap": FILTERED_EXACT_MAX + 1},
+            )
+            message_ids = [row[0] for row in result.all()]
+        if len(message_ids) <= FILTERED_EXACT_MAX:
+            ranked = self.vector_index.search_keys(
+                query_embedding, (("message", message_id) for message_id in message_ids), limit=limit
+            )
+            return await self._embedding_hits(ranked)
+
+        ranked = self.vector_index.search(query_embedding, limit=limit * FILTERED_OVERFETCH)
+        hits = [hit for hit in await self._embedding_hits(ranked) if hit["source_type"] == "message"]
+        if not hits:
+            return []
+        ids = {hit["source_id"] for hit in hits}
+        placeholders = ", ".join(f":id{i}" for i in range(len(ids)))
+        async with self.read_session_factory() as session:
+            result = await session.execute(
+                text(f"SELECT m.id FROM messages m WHERE m.id IN ({placeholders}) AND {predicate}"),
+                {**{f"id{i}": message_id for i, message_id in enumerate(ids)}, **params},
+            )
+            matched = {row[0] for row in result.all()}
+        return [hit for hit in hits if hit["source_id"] in matched][:limit]
+
+    async def _scan_filtered_embeddings(
+        self,
+        query_embedding: list[float],
+        limit: int,
+        predicate: str,
+        params: dict[str, Any],
+    ) -> list[dict]:
+        """Cosine scan over the embeddings of messages matching ``predicate`` only."""
+        async with self.read_session_factory() as session:
+            result = await session.execute(
+                text(
+                    "SELECT e.id, e.source_id, e.content, e.embedding, e.updated_at "
+                    "FROM messages m "
+                    "JOIN memory_embeddings e INDEXED BY ix_memory_embeddings_source_id "
+                    "ON e.source_id = m.id AND e.source_type = 'message' "
+                    f"WHERE {predicate}"
+                ),
+                params,
+            )
+            rows = result.all()
+
+        scored = []
+        for embedding_id, source_id, content, embedding, updated_at in rows:
+            score = LocalEmbeddingEngine.cosine_similarity(
+                query_embedding, unpack_embedding(embedding).tolist()
+            )
+            if score <= 0:
+                continue
+            scored.append(
+                {
+                    "embedding_id": embedding_id,
+                    "source_type": "message",
+                    "source_id": source_id,
+                    "content": content,
+                    # Raw text() rows come back as SQLite's stored string.
+                    # text() 查询返回的是 SQLite 中存储的字符串。
+                    "timestamp": datetime.fromisoformat(updated_at).isoformat() if updated_at else None,
+                    "semantic_score": score,
+                    "retrieval_type": "semantic",
+                }
+            )
+        scored.sort(key=lambda x: x["semantic_score"], reverse=True)
+        return scored[:limit]
+
+    async def _scan_memory_embeddings(self, query_embedding: list[float], limit: int = 20) -> list[dict]:
+        """Full-table cosine scan, kept as the fallback when the vector index is disabled."""
+        async with self.read_session_factory() as session:
             result = await session.execute(select(MemoryEmbeddingRecord))
             items = list(result.scalars().all())
 
         scored = []
         for item in items:
-            score = LocalEmbeddingEngine.cosine_similarity(query_embedding, item.embedding or [])
+            score = LocalEmbeddingEngine.cosine_similarity(
+                query_embedding, unpack_embedding(item.embedding).tolist()
+            )
             if score <= 0:
                 continue
             scored.append(
@@ -888,9 +1675,18 @@ class MemoryStorage:
                         updated_at=datetime.now(),
                     )
                 )
+        if self.vector_index is not None:
+            self.vector_index.clear()
+        if self.vector_index_path is not None:
+            self.vector_index_path.unlink(missing_ok=True)
+        self.generation += 1
         logger.info("DB 已全量重置")
 
     async def cleanup(self):
         """Cleanup resources."""
+        await self.wait_for_index_training()
+        self._save_vector_index()
+        if self.read_engine:
+            await self.read_engine.dispose()
         if self.engine:
             await self.engine.dispose()
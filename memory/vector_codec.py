@@ -0,0 +1,44 @@
+"""Packed float32 encoding for stored embedding vectors."""
+
+from __future__ import annotations
+
+import json
+import struct
+from typing import Sequence
+
+import numpy as np
+
+# Header: format version (u8), dtype code (u8), dimension (u16), little-endian.
+# 4 bytes keeps the float32 payload aligned for zero-copy numpy views.
+# 头部：版本(u8) + 数据类型(u8) + 维度(u16)，小端；4 字节保证 float32 负载对齐。
+_HEADER = struct.Struct("<BBH")
+FORMAT_VERSION = 1
+DTYPE_FLOAT32 = 1
+_FLOAT32_LE = np.dtype("<f4")
+
+
+def pack_embedding(vector: Sequence[float] | np.ndarray) -> bytes:
+    """Encode a vector as header + little-endian float32 payload."""
+    array = np.asarray(vector, dtype=_FLOAT32_LE).reshape(-1)
+    return _HEADER.pack(FORMAT_VERSION, DTYPE_FLOAT32, array.shape[0]) + array.tobytes()
+
+
+def unpack_embedding(value: bytes | memoryview | str | Sequence[float] | None) -> np.ndarray:
+    """Decode a stored vector.
+
+    Packed blobs are returned as a read-only zero-copy view over the buffer.
+    Legacy JSON text/lists (rows written before the BLOB migration) are parsed.
+    """
+    if value is None:
+        return np.zeros(0, dtype=_FLOAT32_LE)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        buffer = memoryview(value)
+        if buffer.nbytes < _HEADER.size:
+            raise ValueError("embedding blob too short")
+        version, dtype_code, dimension = _HEADER.unpack_from(buffer)
+        if version != FORMAT_VERSION or dtype_code != DTYPE_FLOAT32:
+            raise ValueError(f"unsupported embedding blob: version={version}, dtype={dtype_code}")
+        return np.frombuffer(buffer, dtype=_FLOAT32_LE, count=dimension, offset=_HEADER.size)
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=_FLOAT32_LE)
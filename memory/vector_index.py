@@ -0,0 +1,173 @@
+"""Resident float32 vector index for semantic memory recall."""
+
+from __future__ import annotations
+
+from typing import Iterable, Iterator, Sequence
+
+import numpy as np
+
+
+class VectorIndex:
+    """Contiguous in-memory matrix of L2-normalized embeddings.
+
+    Rows are keyed by ``(source_type, source_id)`` so upserts from
+    ``MemoryStorage.save_memory_embedding`` replace vectors in place.
+    Scoring is a single matmul against the normalized query followed by
+    ``argpartition`` for top-k, which keeps recall latency flat in Python
+    overhead no matter how many embeddings are stored.
+    """
+
+    def __init__(self, dimension: int, initial_capacity: int = 1024):
+        self.dimension = int(dimension)
+        self._matrix = np.zeros((max(16, initial_capacity), self.dimension), dtype=np.float32)
+        self._size = 0
+        self._keys: list[tuple[str, str]] = []
+        self._embedding_ids: list[str] = []
+        self._row_of: dict[tuple[str, str], int] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def clear(self) -> None:
+        """Drop all rows but keep the allocated buffer."""
+        self._size = 0
+        self._keys.clear()
+        self._embedding_ids.clear()
+        self._row_of.clear()
+
+    def load(self, entries: Iterable[tuple[str, str, str, Sequence[float]]]) -> int:
+        """Bulk load ``(embedding_id, source_type, source_id, vector)`` tuples."""
+        self.clear()
+        for embedding_id, source_type, source_id, vector in entries:
+            self.upsert(embedding_id, source_type, source_id, vector)
+        return self._size
+
+    def upsert(
+        self,
+        embedding_id: str,
+        source_type: str,
+        source_id: str,
+        vector: Sequence[float],
+    ) -> bool:
+        """Insert or replace one vector. Returns False when the vector is unusable."""
+        row_vector = self._normalize(vector)
+        key = (str(source_type), str(source_id))
+        row = self._row_of.get(key)
+
+        if row_vector is None:
+            # Same as the scan path: zero or mismatched vectors never score.
+            # 与全表扫描一致：零向量或维度不符的向量不参与打分。
+            if row is not None:
+                self.remove(*key)
+            return False
+
+        if row is None:
+            self._ensure_capacity(self._size + 1)
+            row = self._size
+            self._size += 1
+            self._keys.append(key)
+            self._embedding_ids.append(str(embedding_id))
+            self._row_of[key] = row
+        else:
+            self._embedding_ids[row] = str(embedding_id)
+
+        self._matrix[row] = row_vector
+        return True
+
+    def remove(self, source_type: str, source_id: str) -> bool:
+        """Remove one row by swapping the last row into its slot."""
+        key = (str(source_type), str(source_id))
+        row = self._row_of.pop(key, None)
+        if row is None:
+            return False
+
+        last = self._size - 1
+        if row != last:
+            self._matrix[row] = self._matrix[last]
+            moved_key = self._keys[last]
+            self._keys[row] = moved_key
+            self._embedding_ids[row] = self._embedding_ids[last]
+            self._row_of[moved_key] = row
+        self._keys.pop()
+        self._embedding_ids.pop()
+        self._size = last
+        return True
+
+    def items(self) -> Iterator[tuple[str, str, str, np.ndarray]]:
+        """Yield ``(embedding_id, source_type, source_id, normalized_vector)`` rows."""
+        for row in range(self._size):
+            source_type, source_id = self._keys[row]
+            yield self._embedding_ids[row], source_type, source_id, self._matrix[row]
+
+    def search(self, query: Sequence[float], limit: int = 20) -> list[tuple[str, float]]:
+        """Return ``(embedding_id, cosine_score)`` pairs with positive scores, best first."""
+        if self._size == 0 or limit <= 0:
+            return []
+        query_vector = self._normalize(query)
+        if query_vector is None:
+            return []
+
+        scores = self._matrix[: self._size] @ query_vector
+        if limit < self._size:
+            candidates = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            candidates = np.arange(self._size)
+        ordered = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        results = []
+        for row in ordered:
+            score = float(scores[row])
+            if score <= 0:
+                break
+            results.append((self._embedding_ids[row], score))
+        return results
+
+    def search_keys(
+        self,
+        query: Sequence[float],
+        keys: Iterable[tuple[str, str]],
+        limit: int = 20,
+    ) -> list[tuple[str, float]]:
+        """Exact search restricted to ``(source_type, source_id)`` keys; unknown keys are skipped.
+
+        Used by filtered recall: the candidate set comes from a SQL predicate,
+        so only those rows are gathered and scored.
+        """
+        query_vector = self._normalize(query)
+        if query_vector is None or limit <= 0:
+            return []
+        rows = np.fromiter(
+            (row for row in map(self._row_of.get, keys) if row is not None), dtype=np.int64
+        )
+        if not len(rows):
+            return []
+        scores = self._matrix[rows] @ query_vector
+        if limit < len(rows):
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            (self._embedding_ids[rows[i]], float(scores[i]))
+            for i in top
+            if scores[i] > 0
+        ]
+
+    def _normalize(self, vector: Sequence[float]) -> np.ndarray | None:
+        if vector is None or len(vector) != self.dimension:
+            return None
+        array = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(array))
+        if norm == 0.0 or not np.isfinite(norm):
+            return None
+        return array / norm
+
+    def _ensure_capacity(self, needed: int) -> None:
+        capacity = self._matrix.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        grown = np.zeros((new_capacity, self.dimension), dtype=np.float32)
+        grown[: self._size] = self._matrix[: self._size]
+        self._matrix = grown
+
@@ -0,0 +1,231 @@
+"""Write-behind queue that group-commits messages and their embedding jobs."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import uuid
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from loguru import logger
+from sqlalchemy.exc import OperationalError
+
+if TYPE_CHECKING:
+    from memory.storage import MemoryStorage
+
+
+class MessageWriteBehind:
+    """Buffer ``save_message`` + ``enqueue_embedding_job`` pairs and commit them together.
+
+    ``add_message`` returns the message ID immediately. Buffered rows are
+    written by ``MemoryStorage.save_messages_batch`` in one transaction,
+    either ``flush_interval_ms`` after the first buffered row or as soon as
+    ``max_batch`` messages are pending. ``flush`` is the read-your-writes
+    barrier: when it returns, everything submitted before the call is
+    committed or was rejected. A failed batch is retried row by row, so one
+    bad row cannot block the rows behind it; rows that keep failing on their
+    own are dropped after ``max_row_attempts`` flushes. If no row commits at
+    all (DB down or locked) the batch stays buffered and ``flush`` raises.
+    """
+
+    def __init__(
+        self,
+        storage: MemoryStorage,
+        flush_interval_ms: int = 5,
+        max_batch: int = 64,
+        max_row_attempts: int = 3,
+    ):
+        self._storage = storage
+        self.flush_interval = max(0, int(flush_interval_ms)) / 1000.0
+        self.max_batch = max(1, int(max_batch))
+        self.max_row_attempts = max(1, int(max_row_attempts))
+        self._messages: list[dict] = []
+        self._jobs: list[dict] = []
+        # Failed single-row commits per message ID.
+        # 每条消息单独提交失败的次数。
+        self._row_failures: dict[str, int] = {}
+        self._lock = asyncio.Lock()
+        self._timer: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.committed_messages = 0
+        self.commits = 0
+        self.dropped_messages = 0
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def add_message(
+        self,
+        session_id: str,
+        role: str,
+        content: str,
+        metadata: dict | None = None,
+        embedding_content: str | None = None,
+    ) -> str:
+        """Buffer one message (and optionally its embedding job); returns its ID."""
+        message_id = str(uuid.uuid4())
+        now = datetime.now()
+        self._messages.append(
+            {
+                "id": message_id,
+                "session_id": session_id,
+                "role": role,
+                "content": content,
+                "metadata": _json_safe(metadata or {}),
+                "timestamp": now,
+            }
+        )
+        if embedding_content is not None:
+            self._jobs.append(
+                {
+                    "id": str(uuid.uuid4()),
+                    "source_type": "message",
+                    "source_id": message_id,
+                    "content": embedding_content,
+                    "created_at": now,
+                }
+            )
+
+        if len(self._messages) >= self.max_batch:
+            self._spawn(self._flush_quietly())
+        elif self._timer is None or self._timer.done():
+            self._timer = self._spawn(self._flush_later())
+        return message_id
+
+    async def flush(self) -> int:
+        """Commit everything buffered so far; returns the number of messages written."""
+        async with self._lock:
+            if not self._messages and not self._jobs:
+                return 0
+            messages, self._messages = self._messages, []
+            jobs, self._jobs = self._jobs, []
+            write = asyncio.ensure_future(self._commit(messages, jobs))
+            try:
+                await asyncio.shield(write)
+            except asyncio.CancelledError:
+                # A cancelled caller must not split a commit: rows that did
+                # commit would otherwise be re-buffered and inserted twice.
+                # 调用方被取消时仍等待提交的真实结果，避免已提交的行被重复写入。
+                await asyncio.wait({write})
+                raise
+            finally:
+                if write.done() and not write.cancelled() and write.exception() is None:
+                    retry_messages, retry_jobs, error = write.result()
+                else:
+                    retry_messages, retry_jobs, error = messages, jobs, None
+                # Put rows back in front of anything buffered meanwhile.
+                # 未提交的行放回缓冲区头部，下一次 flush 重试。
+                self._messages[:0] = retry_messages
+                self._jobs[:0] = retry_jobs
+            if error is not None:
+                raise error
+            return len(messages) - len(retry_messages)
+
+    async def _commit(
+        self, messages: list[dict], jobs: list[dict]
+    ) -> tuple[list[dict], list[dict], Exception | None]:
+        """Write one batch, falling back to one row at a time if the batch fails.
+
+        Returns the rows to re-buffer, plus the error when nothing could be
+        committed and rows remain (the caller raises it).
+        """
+        try:
+            await self._storage.save_messages_batch(messages, jobs)
+        except Exception as exc:
+            logger.warning(f"消息批量写入失败，改为逐条写入: {exc}")
+        else:
+            self.committed_messages += len(messages)
+            self.commits += 1
+            return [], [], None
+
+        jobs_by_message: dict[str, list[dict]] = {}
+        for job in jobs:
+            jobs_by_message.setdefault(job["source_id"], []).append(job)
+        groups = [(message, jobs_by_message.pop(message["id"], [])) for message in messages]
+        # Jobs whose message was committed by an earlier flush.
+        # 消息已在之前提交、仅剩 embedding 任务的行。
+        groups.extend((None, row_jobs) for row_jobs in jobs_by_message.values())
+
+        retry_messages: list[dict] = []
+        retry_jobs: list[dict] = []
+        committed = 0
+        last_error: Exception | None = None
+        for message, row_jobs in groups:
+            row = [message] if message is not None else []
+            try:
+                await self._storage.save_messages_batch(row, row_jobs)
+            except Exception as exc:
+                last_error = exc
+                if not self._keep_failed_row(message, exc):
+                    continue
+                retry_messages.extend(row)
+                retry_jobs.extend(row_jobs)
+                continue
+            if message is not None:
+                self._row_failures.pop(message["id"], None)
+            committed += len(row)
+            self.commits += 1
+
+        self.committed_messages += committed
+        stalled = not committed and (retry_messages or retry_jobs)
+        return retry_messages, retry_jobs, last_error if stalled else None
+
+    def _keep_failed_row(self, message: dict | None, exc: Exception) -> bool:
+        """Whether a row that failed on its own should be retried on the next flush.
+
+        Operational errors (locked or unavailable DB) are transient and never
+        count against the row; anything else is a bad row and is dropped after
+        ``max_row_attempts`` failures.
+        """
+        if message is None or isinstance(exc, OperationalError):
+            return True
+        failures = self._row_failures.get(message["id"], 0) + 1
+        if failures < self.max_row_attempts:
+            self._row_failures[message["id"]] = failures
+            return True
+        self._row_failures.pop(message["id"], None)
+        self.dropped_messages += 1
+        logger.error(f"消息多次写入失败，已丢弃: {message['id']} | {exc}")
+        return False
+
+    async def close(self) -> None:
+        """Durable shutdown: stop the timer and commit whatever is buffered."""
+        if self._timer and not self._timer.done():
+            self._timer.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._messages),
+            "committed_messages": self.committed_messages,
+            "commits": self.commits,
+            "dropped_messages": self.dropped_messages,
+        }
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        await self._flush_quietly()
+
+    async def _flush_quietly(self) -> None:
+        try:
+            await self.flush()
+        except Exception as exc:
+            logger.warning(f"消息批量写入失败，将在下次 flush 重试: {exc}")
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+
+def _json_safe(metadata: dict) -> dict:
+    """Coerce metadata to JSON-serializable values (datetimes etc. become strings)."""
+    try:
+        json.dumps(metadata, ensure_ascii=False)
+        return metadata
+    except (TypeError, ValueError):
+        return json.loads(json.dumps(metadata, ensure_ascii=False, default=str))
@@ -0,0 +1,97 @@
+"""Load test: one shared AgentCore serving 50 concurrent sessions against a stub LLM."""
+
+import asyncio
+import json
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from core.agent_core import AgentCore
+from core.agent_orchestration import IntentRoute, IntentType
+from tools.registry import ToolRegistry
+
+SESSIONS = 50
+
+
+class _MockConfig:
+    llm = {
+        "api_base": "https://example.com/v1",
+        "api_key": "test-key",
+        "model": "test-model",
+        "system_prompt": "system model={model} time={datetime}",
+        "temperature": 0.0,
+        "max_tokens": 200,
+    }
+    memory = SimpleNamespace(memory_root="data/memory")
+    agent = SimpleNamespace(max_tool_iterations=3, complexity_detector={"enabled": False})
+
+
+@pytest.mark.asyncio
+async def test_shared_agent_core_keeps_evidence_and_usage_per_session(monkeypatch):
+    agent = AgentCore(_MockConfig())
+    rng = random.Random(7)
+
+    async def fake_route_async(messages):
+        return IntentRoute(
+            intent=IntentType.REALTIME_INFO,
+            user_query=messages[-1]["content"],
+            reason="test",
+            confidence=0.9,
+        )
+
+    async def fake_stream(messages, tools=None):
+        session = next(m["content"] for m in messages if m["role"] == "user").split()[-1]
+        # Random pauses interleave the 50 turns at every await point.
+        await asyncio.sleep(rng.uniform(0, 0.02))
+        yield {"type": "usage", "usage": {"prompt_tokens": int(session), "completion_tokens": 1, "total_tokens": int(session) + 1}}
+        if messages[-1]["role"] == "user":
+            yield {
+                "type": "tool_calls",
+                "tool_calls": [
+                    {"id": f"tc-{session}", "name": "search_web", "arguments": json.dumps({"query": f"q-{session}"})}
+                ],
+            }
+        else:
+            await asyncio.sleep(rng.uniform(0, 0.02))
+            yield {"type": "text_delta", "content": f"answer {session}"}
+
+    async def fake_execute(tool_name, parameters):
+        await asyncio.sleep(rng.uniform(0, 0.02))
+        return f"result for {parameters['query']}"
+
+    monkeypatch.setattr(agent.router, "route_async", fake_route_async)
+    monkeypatch.setattr(
+        ToolRegistry,
+        "get_tool_definitions",
+        classmethod(lambda cls: [{"function": {"name": "search_web"}}, {"function": {"name": "super_search"}}]),
+    )
+    monkeypatch.setattr(agent.llm_engine, "chat_with_tools_stream", fake_stream)
+    monkeypatch.setattr(agent, "_execute_tool", fake_execute)
+
+    in_flight = {"now": 0, "peak": 0}
+
+    async def run_session(i: int) -> tuple[str, dict]:
+        text = ""
+        done = {}
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        async for event in agent.process_message_stream([{"role": "user", "content": f"查一下 {i}"}]):
+            assert event["type"] != "error", event
+            if event["type"] == "text":
+                text += event["content"]
+            elif event["type"] == "done":
+                done = event
+        in_flight["now"] -= 1
+        return text, done
+
+    outcomes = await asyncio.gather(*(run_session(i) for i in range(1, SESSIONS + 1)))
+
+    for i, (text, done) in enumerate(outcomes, 1):
+        assert text.startswith(f"answer {i}\n\n[Evidence]")
+        evidence_lines = [line for line in text.splitlines() if line.startswith("- ")]
+        assert evidence_lines == [f"- search_web | query=q-{i} | snippet=result for q-{i}"]
+        assert done["usage"] == {"prompt_tokens": 2 * i, "completion_tokens": 2, "total_tokens": 2 * i + 2}
+    assert len({done["request_id"] for _, done in outcomes}) == SESSIONS
+    # All turns were in flight at once, so they really shared the core.
+    assert in_flight["peak"] == SESSIONS
@@ -221,3 +221,97 @@ async def test_agent_core_appends_evidence_block_when_tools_used(monkeypatch):
     full_text = "".join(text_chunks)
     assert "[Evidence]" in full_text
     assert "search_web" in full_text
+
+
+class SpeculativeConfig(MockConfig):
+    agent = SimpleNamespace(max_tool_iterations=4, orchestration={"speculative_routing": True})
+
+
+def _slow_classifier(intent: str, delay: float, state: dict):
+    async def fake_route_llm(messages, tools=None, tool_choice=None, temperature=None, max_tokens=None):
+        await asyncio.sleep(delay)
+        state["classified"] = True
+        return {
+            "type": "tool_calls",
+            "tool_calls": [
+                {
+                    "id": "tc-intent",
+                    "name": "classify_intent",
+                    "arguments": f'{{"intent":"{intent}","reason":"test","confidence":0.9}}',
+                }
+            ],
+        }
+
+    return fake_route_llm
+
+
+@pytest.mark.asyncio
+async def test_speculative_routing_overlaps_classifier_and_keeps_agreeing_stream(monkeypatch):
+    agent = AgentCore(SpeculativeConfig())
+    state = {"classified": False}
+    started_before_classified = []
+
+    async def fake_stream(messages, tools=None):
+        started_before_classified.append(not state["classified"])
+        yield {"type": "text_delta", "content": "已查询"}
+
+    monkeypatch.setattr(
+        ToolRegistry,
+        "get_tool_definitions",
+        classmethod(lambda cls: [{"function": {"name": "search_web"}}, {"function": {"name": "read_file"}}]),
+    )
+    monkeypatch.setattr(agent.llm_engine, "chat_with_tools", _slow_classifier("realtime_info", 0.05, state))
+    monkeypatch.setattr(agent.llm_engine, "chat_with_tools_stream", fake_stream)
+
+    events = [
+        event
+        async for event in agent.process_message_stream([{"role": "user", "content": "帮我查一下今天的汇率"}])
+    ]
+
+    assert started_before_classified == [True]
+    assert [e["content"] for e in events if e["type"] == "text"] == ["已查询"]
+    timings = events[-1]["timings"]
+    assert timings["mode"] == "speculative" and not timings["rerouted"]
+    # Text is held until the classifier confirms the allowlist.
+    assert timings["ttft_ms"] >= timings["route_ms"]
+    assert agent.get_latency_stats()["speculative"]["turns"] == 1
+
+
+@pytest.mark.asyncio
+async def test_speculative_routing_restarts_stream_when_classifier_changes_allowlist(monkeypatch):
+    agent = AgentCore(SpeculativeConfig())
+    state = {"classified": False, "cancelled": False}
+    captured_tools = []
+
+    async def fake_stream(messages, tools=None):
+        captured_tools.append(tools)
+        if tools is None:
+            try:
+                yield {"type": "text_delta", "content": "随便聊聊"}
+                await asyncio.sleep(5)
+                yield {"type": "text_delta", "content": "……"}
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+        else:
+            yield {"type": "text_delta", "content": "我来读一下文件"}
+
+    monkeypatch.setattr(
+        ToolRegistry,
+        "get_tool_definitions",
+        classmethod(lambda cls: [{"function": {"name": "search_web"}}, {"function": {"name": "read_file"}}]),
+    )
+    monkeypatch.setattr(agent.llm_engine, "chat_with_tools", _slow_classifier("workspace_action", 0.05, state))
+    monkeypatch.setattr(agent.llm_engine, "chat_with_tools_stream", fake_stream)
+
+    events = [
+        event
+        async for event in agent.process_message_stream([{"role": "user", "content": "帮我看看那个东西"}])
+    ]
+
+    assert captured_tools[0] is None
+    assert sorted(t["function"]["name"] for t in captured_tools[1]) == ["read_file", "search_web"]
+    assert state["cancelled"]
+    assert [e["content"] for e in events if e["type"] == "text"] == ["我来读一下文件"]
+    assert events[-1]["timings"]["rerouted"]
+    assert agent.get_latency_stats()["reroutes"] == 1
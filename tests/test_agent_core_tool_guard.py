@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+import json
 from types import SimpleNamespace
 
 import pytest
@@ -128,3 +130,91 @@ async def test_memory_intent_blocks_write_file_even_if_model_calls_it(monkeypatc
 
     assert executed == []
     assert any("策略限制" in r for r in tool_results)
+
+
+def _workspace_turn(agent, monkeypatch, tool_calls, delays, parallel_unsafe=()):
+    """Route to workspace_action, emit ``tool_calls`` once, then answer; returns (log, second-turn messages)."""
+
+    async def fake_route_async(messages):
+        return IntentRoute(intent=IntentType.WORKSPACE_ACTION, user_query="q", reason="test", confidence=0.9)
+
+    seen_messages = []
+
+    async def fake_stream(messages, tools=None):
+        if not seen_messages:
+            seen_messages.append(None)
+            yield {"type": "tool_calls", "tool_calls": tool_calls}
+        else:
+            seen_messages.append(list(messages))
+            yield {"type": "text_delta", "content": "完成"}
+
+    log = {"running": 0, "peak": 0, "unsafe_overlap": False}
+
+    async def fake_execute(tool_name, parameters):
+        log["running"] += 1
+        log["peak"] = max(log["peak"], log["running"])
+        if tool_name in parallel_unsafe and log["running"] > 1:
+            log["unsafe_overlap"] = True
+        try:
+            await asyncio.sleep(delays[parameters["path"]])
+        finally:
+            log["running"] -= 1
+        return f"{tool_name}:{parameters['path']}"
+
+    names = {tc["name"] for tc in tool_calls}
+    monkeypatch.setattr(agent.router, "route_async", fake_route_async)
+    monkeypatch.setattr(
+        ToolRegistry, "get_tool_definitions", classmethod(lambda cls: [{"function": {"name": n}} for n in names])
+    )
+    monkeypatch.setattr(
+        ToolRegistry, "_tools", {n: SimpleNamespace(parallel_safe=n not in parallel_unsafe) for n in names}
+    )
+    monkeypatch.setattr(agent.llm_engine, "chat_with_tools_stream", fake_stream)
+    monkeypatch.setattr(agent, "_execute_tool", fake_execute)
+    return log, seen_messages
+
+
+def _call(i, name, path):
+    return {"id": f"tc-{i}", "name": name, "arguments": json.dumps({"path": path})}
+
+
+@pytest.mark.asyncio
+async def test_independent_tool_calls_run_concurrently_and_keep_call_order(monkeypatch):
+    agent = AgentCore(_MockConfig())
+    calls = [_call(1, "read_file", "slow"), _call(2, "read_file", "mid"), _call(3, "read_file", "fast")]
+    log, seen = _workspace_turn(agent, monkeypatch, calls, {"slow": 0.15, "mid": 0.08, "fast": 0.0})
+
+    events = [e async for e in agent.process_message_stream([{"role": "user", "content": "q"}])]
+
+    assert log["peak"] == 3
+    # Results stream as they complete...
+    assert [e["result"] for e in events if e["type"] == "tool_result"] == [
+        "read_file:fast", "read_file:mid", "read_file:slow",
+    ]
+    # ...but are fed back to the model in call order.
+    tool_messages = [m for m in seen[-1] if m["role"] == "tool"]
+    assert [m["tool_call_id"] for m in tool_messages] == ["tc-1", "tc-2", "tc-3"]
+    assert [m["content"] for m in tool_messages] == ["read_file:slow", "read_file:mid", "read_file:fast"]
+
+
+@pytest.mark.asyncio
+async def test_non_parallel_safe_tools_run_alone_and_slow_tools_time_out(monkeypatch):
+    agent = AgentCore(_MockConfig())
+    agent.tool_timeouts = {"read_file": 0.05}
+    calls = [
+        _call(1, "read_file", "a"),
+        _call(2, "write_file", "b"),
+        _call(3, "read_file", "c"),
+        _call(4, "read_file", "hang"),
+    ]
+    log, seen = _workspace_turn(
+        agent, monkeypatch, calls, {"a": 0.01, "b": 0.01, "c": 0.01, "hang": 1.0}, parallel_unsafe={"write_file"}
+    )
+
+    events = [e async for e in agent.process_message_stream([{"role": "user", "content": "q"}])]
+
+    assert not log["unsafe_overlap"] and log["peak"] == 2
+    assert [e["tool"] for e in events if e["type"] == "tool_call"][:2] == ["read_file", "write_file"]
+    contents = [m["content"] for m in seen[-1] if m["role"] == "tool"]
+    assert contents[:3] == ["read_file:a", "write_file:b", "read_file:c"]
+    assert "超时" in contents[3]
@@ -0,0 +1,138 @@
+import numpy as np
+import pytest
+
+from memory.ann_index import IVFFlatIndex
+from memory.storage import MemoryStorage
+from memory.vector_index import VectorIndex
+
+
+def _clustered(count: int, dim: int = 32, clusters: int = 20, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.integers(0, clusters, size=count)
+    return (centers[labels] + 0.3 * rng.normal(size=(count, dim))).astype(np.float32)
+
+
+def test_ivf_recall_tracks_exact_search():
+    """IVF top-k should mostly agree with the exact flat index on clustered data."""
+    vectors = _clustered(3000)
+    exact = VectorIndex(32)
+    ann = IVFFlatIndex(32, nlist=24, nprobe=6, min_train_size=1000)
+    rows = [(f"e{i}", "message", f"m{i}", v) for i, v in enumerate(vectors)]
+    exact.load(rows)
+    ann.load(rows)
+    assert ann.is_trained
+
+    queries = _clustered(50, seed=11)
+    overlap = 0
+    for query in queries:
+        truth = {eid for eid, _ in exact.search(query, limit=10)}
+        found = {eid for eid, _ in ann.search(query, limit=10)}
+        overlap += len(truth & found)
+    assert overlap / (len(queries) * 10) >= 0.9
+
+    # Probing every list must be exact.
+    query = queries[0]
+    assert [e for e, _ in ann.search(query, 10, nprobe=24)] == [e for e, _ in exact.search(query, 10)]
+
+    assert ann.remove("message", "m0")
+    assert "e0" not in {eid for eid, _ in ann.search(vectors[0], limit=5, nprobe=24)}
+
+
+@pytest.mark.asyncio
+async def test_ann_snapshot_is_restored_and_reconciled(tmp_path):
+    """Snapshot restore must drop rows deleted after it and pick up newer rows."""
+    from memory.embeddings import LocalEmbeddingEngine
+
+    engine = LocalEmbeddingEngine()
+    db_path = str(tmp_path / "sessions.db")
+    options = {"nlist": 2, "nprobe": 2, "min_train_size": 4}
+
+    storage = MemoryStorage(db_path=db_path, ann_options=options)
+    await storage.initialize()
+    session_id = await storage.create_session({})
+    texts = ["Redis timeout 排查", "网关报错 502", "今天吃了牛肉面", "Python asyncio 任务取消"]
+    for content in texts:
+        message_id = await storage.save_message(session_id, "user", content)
+        await storage.save_memory_embedding("message", message_id, content, engine.embed(content))
+    await storage.save_memory_embedding("fact", "f1", "网关超时", engine.embed("网关超时"))
+    await storage.cleanup()
+    assert storage.vector_index_path.exists()
+
+    # Out-of-band changes after the snapshot was written.
+    from sqlalchemy import text
+
+    writer = MemoryStorage(db_path=db_path, use_vector_index=False)
+    await writer.initialize()
+    await writer.delete_session(session_id)
+    await writer.save_memory_embedding("fact", "f2", "Bad Gateway", engine.embed("Bad Gateway"))
+    async with writer.session_factory() as session:
+        remaining = (await session.execute(text("SELECT COUNT(*) FROM memory_embeddings"))).scalar()
+    await writer.cleanup()
+    assert remaining == 2
+
+    storage = MemoryStorage(db_path=db_path, ann_options=options)
+    await storage.initialize()
+    assert storage.vector_index.is_trained
+    assert sorted(item[2] for item in storage.vector_index.items()) == ["f1", "f2"]
+    hits = await storage.search_memory_embeddings(engine.embed("Bad Gateway"), limit=1)
+    assert hits and hits[0]["source_id"] == "f2"
+
+    await storage.reset_all_memory()
+    assert not storage.vector_index_path.exists()
+    await storage.cleanup()
+
+
+def test_ivf_writes_during_background_build_are_replayed():
+    """upsert never trains inline; rows written while build() runs survive install()."""
+    vectors = _clustered(600)
+    ann = IVFFlatIndex(32, nlist=8, nprobe=8, min_train_size=500)
+    for i, vector in enumerate(vectors[:500]):
+        ann.upsert(f"e{i}", "message", f"m{i}", vector)
+    assert not ann.is_trained and ann.needs_training
+
+    rows = ann.training_snapshot()
+    layout = ann.build(rows)
+    # Concurrent writes between snapshot and install.
+    for i, vector in enumerate(vectors[500:], start=500):
+        ann.upsert(f"e{i}", "message", f"m{i}", vector)
+    ann.remove("message", "m0")
+    ann.upsert("e1b", "message", "m1", vectors[599])
+    assert not ann.is_trained
+
+    assert ann.install(layout)
+    assert ann.is_trained and not ann.is_training
+    assert len(ann) == 599 and not ann.contains("message", "m0")
+    top = ann.search(vectors[599], limit=2, nprobe=8)
+    assert {eid for eid, _ in top} == {"e599", "e1b"}
+
+    # clear() abandons an in-flight build.
+    layout = ann.build(ann.training_snapshot())
+    ann.clear()
+    assert not ann.install(layout) and len(ann) == 0
+
+
+@pytest.mark.asyncio
+async def test_storage_trains_ivf_off_the_event_loop(monkeypatch):
+    """Crossing min_train_size schedules build() in a worker thread, not inside the write."""
+    import threading
+
+    options = {"nlist": 4, "min_train_size": 8}
+    storage = MemoryStorage(db_path=":memory:", embedding_dimension=32, ann_options=options)
+    await storage.initialize()
+    build_threads = []
+    original_build = storage.vector_index.build
+
+    def tracking_build(rows):
+        build_threads.append(threading.current_thread())
+        return original_build(rows)
+
+    monkeypatch.setattr(storage.vector_index, "build", tracking_build)
+    for i, vector in enumerate(_clustered(8)):
+        await storage.save_memory_embedding("fact", f"f{i}", "x", vector.tolist())
+    assert not storage.vector_index.is_trained
+
+    await storage.wait_for_index_training()
+    assert storage.vector_index.is_trained
+    assert build_threads and build_threads[0] is not threading.main_thread()
+    await storage.cleanup()
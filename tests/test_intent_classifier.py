@@ -0,0 +1,130 @@
+import json
+
+import pytest
+
+from core.agent_orchestration import IntentType, OrchestrationRouter
+from core.intent_classifier import IntentRouteCache, LocalIntentClassifier
+
+_TEMPLATES = {
+    IntentType.REALTIME_INFO: ["查一下今天{}的天气", "{}最新的新闻", "{}股价今天怎么样"],
+    IntentType.WORKSPACE_ACTION: ["帮我看下{}这个报错", "读取{}文件", "运行{}脚本"],
+    IntentType.MEMORY: ["你还记得{}吗", "上次我说的{}", "我之前提过{}"],
+    IntentType.CHAT: ["你觉得{}有意思吗", "给我讲个{}笑话", "{}好无聊啊"],
+}
+_WORDS = ["上海", "北京", "项目", "咖啡", "会议", "周末", "猫咪", "火锅"]
+
+
+class CountingEngine:
+    def __init__(self, intents):
+        self.intents = intents
+        self.calls = 0
+
+    async def chat_with_tools(self, messages, tools=None, tool_choice=None, temperature=None, max_tokens=None):
+        self.calls += 1
+        payload = {"intent": self.intents[messages[-1]["content"]], "reason": "llm", "confidence": 0.9}
+        return {
+            "type": "tool_calls",
+            "tool_calls": [{"id": "c", "name": "classify_intent", "arguments": json.dumps(payload)}],
+        }
+
+
+def _user(*texts):
+    return [{"role": "user", "content": text} for text in texts]
+
+
+@pytest.mark.asyncio
+async def test_route_cache_serves_normalized_repeats_and_keys_followups_by_context():
+    engine = CountingEngine(
+        {"帮我查一下今天的汇率": "realtime_info", "继续": "realtime_info", "修一下这个报错": "workspace_action"}
+    )
+    router = OrchestrationRouter(llm_engine=engine, route_cache=IntentRouteCache(16))
+
+    first = await router.route_async(_user("帮我查一下今天的汇率"))
+    again = await router.route_async(_user("帮我查一下 今天的汇率！"))
+    assert first.intent == again.intent == IntentType.REALTIME_INFO
+    assert again.reason.startswith("cache:") and engine.calls == 1
+
+    # "继续" inherits the previous turn's intent, so it is cached per context.
+    await router.route_async(_user("帮我查一下今天的汇率", "继续"))
+    await router.route_async(_user("帮我查一下今天的汇率", "继续"))
+    assert engine.calls == 2
+    engine.intents["继续"] = "workspace_action"
+    await router.route_async(_user("修一下这个报错"))
+    followup = await router.route_async(_user("修一下这个报错", "继续"))
+    assert followup.intent == IntentType.WORKSPACE_ACTION and engine.calls == 4
+
+    stats = router.stats()
+    assert (stats["lookups"], stats["cache_hits"], stats["llm_calls"]) == (6, 2, 4)
+    assert stats["fast_path_hit_rate"] == pytest.approx(2 / 6, abs=1e-3)
+
+
+@pytest.mark.asyncio
+async def test_local_classifier_learns_from_llm_decisions_and_reloads_from_log(tmp_path):
+    log_path = tmp_path / "intent_decisions.jsonl"
+    train = {t.format(w): intent for w in _WORDS[:6] for intent, ts in _TEMPLATES.items() for t in ts}
+    held_out = {t.format(w): intent for w in _WORDS[6:] for intent, ts in _TEMPLATES.items() for t in ts}
+    engine = CountingEngine({q: i.value for q, i in {**train, **held_out}.items()})
+    classifier = LocalIntentClassifier(min_samples=len(train), log_path=str(log_path))
+    router = OrchestrationRouter(llm_engine=engine, local_classifier=classifier, local_threshold=0.8)
+
+    for query in train:
+        await router.route_async(_user(query))
+    # The refit runs in a worker thread; the model abstains until it lands.
+    assert engine.calls == len(train) and not classifier.ready
+    await classifier.wait_for_fit()
+    assert classifier.ready
+    assert len(log_path.read_text(encoding="utf-8").splitlines()) == len(train)
+
+    routes = [await router.route_async(_user(query)) for query in held_out]
+    local = [r for r in routes if r.reason == "local_classifier"]
+    assert len(local) >= len(held_out) * 0.75
+    assert all(r.intent == held_out[r.user_query] for r in local)
+    assert router.stats()["local_hits"] == len(local)
+
+    # A fresh classifier rebuilds the same model from the decision log.
+    reloaded = LocalIntentClassifier(min_samples=len(train), log_path=str(log_path))
+    assert reloaded.sample_count == engine.calls == len(train) + len(held_out) - len(local)
+    assert reloaded.predict("你还记得火锅吗") is None  # startup fit is off the loop
+    await reloaded.wait_for_fit()
+    # Rows embedded by the startup fit are cached for later refits.
+    assert all(row is not None for row in reloaded._features)
+    assert reloaded.predict("你还记得火锅吗")[0] == IntentType.MEMORY
+    assert reloaded.predict("继续") is None
+
+
+def test_decision_log_is_trimmed_to_max_samples(tmp_path):
+    log_path = tmp_path / "intent_decisions.jsonl"
+    train = [(t.format(w), intent) for w in _WORDS for intent, ts in _TEMPLATES.items() for t in ts]
+    classifier = LocalIntentClassifier(min_samples=20, log_path=str(log_path), max_samples=40)
+    for query, intent in train:
+        classifier.observe(query, intent)
+
+    lines = log_path.read_text(encoding="utf-8").splitlines()
+    assert len(train) > 2 * 40 >= len(lines)
+    assert json.loads(lines[-1])["query"] == train[-1][0]
+    reloaded = LocalIntentClassifier(min_samples=20, log_path=str(log_path), max_samples=40)
+    assert reloaded.sample_count == 40
+    # A log longer than max_samples is trimmed on load as well.
+    assert len(log_path.read_text(encoding="utf-8").splitlines()) == 40
+
+
+@pytest.mark.asyncio
+async def test_local_guesses_are_not_cached(tmp_path):
+    train = {t.format(w): intent for w in _WORDS[:6] for intent, ts in _TEMPLATES.items() for t in ts}
+    engine = CountingEngine({q: i.value for q, i in train.items()})
+    classifier = LocalIntentClassifier(min_samples=len(train))
+    cache = IntentRouteCache(256)
+    router = OrchestrationRouter(
+        llm_engine=engine, route_cache=cache, local_classifier=classifier, local_threshold=0.0
+    )
+    for query in train:
+        await router.route_async(_user(query))
+    await classifier.wait_for_fit()
+    assert cache.stats()["size"] == len(train)
+
+    # A local guess answers, but only LLM decisions are cached.
+    query = "帮我看下火锅这个报错"
+    first = await router.route_async(_user(query))
+    second = await router.route_async(_user(query))
+    assert first.reason == second.reason == "local_classifier"
+    assert cache.stats()["size"] == len(train)
@@ -0,0 +1,123 @@
+import pytest
+
+from memory.kuzu_retriever import KuzuRetriever
+from memory.kuzu_store import KuzuStore, execute_sync
+from memory.kuzu_text_index import COPY_MIN_POSTINGS
+from memory.kuzu_writer import KuzuWriter
+
+
+def _count(store: KuzuStore, query: str) -> int:
+    return execute_sync(store.conn, query)[0][0]
+
+
+@pytest.mark.asyncio
+async def test_ingest_buffer_commits_batches_and_flushes_on_close(tmp_path):
+    """Buffered events, entities and edges land in one transaction per flush."""
+    store = KuzuStore(db_path=str(tmp_path / "kuzu"), vector_index=False)
+    await store.initialize()
+    writer = KuzuWriter(store, flush_interval_ms=10_000, max_batch=10_000)
+    ingest = writer.ingest
+
+    first = ingest.add_event("s1", "user", "Redis 连接池打满导致超时")
+    second = ingest.add_event("s1", "assistant", "把 max_connections 调到 50")
+    ingest.add_event("s2", "user", "周末去爬山")
+    ingest.add_entity("Redis", "tech")
+    ingest.add_mention(first, "Redis")
+    ingest.add_mention(first, "Redis")
+    assert len(ingest) == 6 and store.event_count == 0
+
+    assert await ingest.flush() == 6
+    assert ingest.stats() == {"pending": 0, "committed_events": 3, "commits": 1, "dropped_rows": 0}
+    assert store.event_count == 3
+    assert writer._known_sessions == {"s1", "s2"}
+    assert _count(store, "MATCH (:Event)-[:IN_SESSION]->(:Session) RETURN count(*)") == 3
+    assert _count(store, "MATCH (:Event)-[:MENTIONS]->(:Entity {name: 'Redis'}) RETURN count(*)") == 1
+    assert _count(store, "MATCH (:Event)-[:NEXT]->(:Event) RETURN count(*)") == 1
+
+    # Consecutive events of a session are chained without an explicit call.
+    assert execute_sync(store.conn, "MATCH (a:Event)-[:NEXT]->(b:Event) RETURN a.id, b.id") == [[first, second]]
+
+    # Known sessions skip the per-message MERGE.
+    submitted = store.stats()["writes_done"]
+    await writer.ensure_session("s1")
+    assert store.stats()["writes_done"] == submitted
+
+    # Large batches switch the postings write to COPY FROM.
+    for i in range(COPY_MIN_POSTINGS // 4):
+        ingest.add_event("s1", "user", f"网关 502 第 {i} 次 upstream timeout")
+    await ingest.close()
+    assert store.event_count == 3 + COPY_MIN_POSTINGS // 4
+    assert _count(store, "MATCH (:Event)-[:NEXT]->(:Event) RETURN count(*)") == 1 + COPY_MIN_POSTINGS // 4
+
+    hits = await KuzuRetriever(store).search("连接池 超时", mode="hybrid", top_k=3)
+    assert hits[0].event_id == first
+    await store.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_ingest_buffer_falls_back_to_rows_and_drops_poison_event(tmp_path):
+    """A poison event between good ones no longer wedges the buffer: rows commit one by one."""
+    store = KuzuStore(db_path=str(tmp_path / "kuzu"), vector_index=False)
+    await store.initialize()
+    writer = KuzuWriter(store, flush_interval_ms=10_000)
+    ingest = writer.ingest
+    ingest.add_event("s1", "user", "第一条", event_id="dup")
+    await ingest.flush()
+
+    ingest.add_event("s1", "user", "第二条", event_id="good-1")
+    ingest.add_event("s1", "user", "主键冲突", event_id="dup")
+    ingest.add_event("s1", "user", "第三条", event_id="good-2")
+    ingest.add_entity("Redis", "tech")
+    ingest.add_mention("good-2", "Redis")
+    assert await ingest.flush() == 4
+    assert len(ingest) == 1 and ingest.stats()["dropped_rows"] == 0
+    assert store.event_count == 3
+    assert _count(store, "MATCH (:Event {id: 'good-2'})-[:MENTIONS]->(:Entity) RETURN count(*)") == 1
+    assert execute_sync(
+        store.conn, "MATCH (a:Event)-[:NEXT]->(b:Event) RETURN a.id, b.id ORDER BY a.timestamp"
+    ) == [["dup", "good-1"], ["good-1", "good-2"]]
+
+    # The poison row alone makes no progress, so flush surfaces the error until it is dropped.
+    with pytest.raises(RuntimeError):
+        await ingest.flush()
+    assert len(ingest) == 1
+    ingest.add_event("s1", "user", "第四条", event_id="good-3")
+    assert await ingest.flush() == 1
+    assert len(ingest) == 0 and ingest.stats()["dropped_rows"] == 1
+    assert _count(store, "MATCH (e:Event) RETURN count(e)") == 4
+    assert _count(store, "MATCH (:Event {id: 'good-2'})-[:NEXT]->(:Event {id: 'good-3'}) RETURN count(*)") == 1
+
+    # Shutdown drains a stuck row instead of raising on the first failed flush.
+    ingest.add_event("s1", "user", "又一次冲突", event_id="dup")
+    await ingest.close()
+    assert len(ingest) == 0 and ingest.stats()["dropped_rows"] == 2
+    await store.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_writer_edges_are_idempotent_and_chain_resumes_after_restart(tmp_path):
+    """Repeated edge writes hit the writer cache; a new writer finds the session tail in the graph."""
+    store = KuzuStore(db_path=str(tmp_path / "kuzu"), vector_index=False)
+    await store.initialize()
+    writer = KuzuWriter(store)
+    await writer.upsert_entity("Rust", "tech")
+    await writer.upsert_entity("Cargo", "tech")
+    await writer.ensure_session("s1")
+    first = await writer.write_event("s1", "user", "Rust 的包管理用 Cargo")
+    for _ in range(3):
+        await writer.upsert_entity_relation("Rust", "Cargo", "uses")
+        await writer.upsert_fact("user", "preferred_tech", "Rust", 0.9, linked_entity="Rust")
+        await writer.link_event_to_entity(first, "Rust")
+    assert writer.edge_cache_hits == 6
+    assert _count(store, "MATCH ()-[r:RELATED_TO]->() RETURN count(r)") == 1
+    assert _count(store, "MATCH ()-[r:ABOUT]->() RETURN count(r)") == 1
+    assert _count(store, "MATCH ()-[r:MENTIONS]->() RETURN count(r)") == 1
+
+    restarted = KuzuWriter(store)
+    await restarted.link_event_to_entity(first, "Rust")
+    assert _count(store, "MATCH ()-[r:MENTIONS]->() RETURN count(r)") == 1
+    second = await restarted.write_event("s1", "assistant", "Cargo.toml 里声明依赖")
+    third = await restarted.write_event("s1", "user", "好的")
+    rows = execute_sync(store.conn, "MATCH (a:Event)-[:NEXT]->(b:Event) RETURN a.id, b.id ORDER BY a.timestamp")
+    assert rows == [[first, second], [second, third]]
+    await store.cleanup()
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+
+from memory.kuzu_rebuild import KuzuRebuilder
+from memory.kuzu_retriever import KuzuRetriever
+from memory.kuzu_store import KuzuStore, execute_sync
+from memory.kuzu_writer import KuzuWriter
+from memory.storage import MemoryStorage
+
+
+async def _seed_sqlite(path: str) -> list[str]:
+    storage = MemoryStorage(db_path=path, use_vector_index=False)
+    await storage.initialize()
+    start = datetime.now() - timedelta(minutes=10)
+    messages = []
+    for s, session_id in enumerate(["sa", "sb"]):
+        for i in range(4):
+            messages.append({
+                "id": str(uuid4()),
+                "session_id": session_id,
+                "role": "user" if i % 2 == 0 else "assistant",
+                "content": f"会话 {session_id} 第 {i} 条，网关 502 排查" if i else 'nginx 配置\n"upstream", 超时',
+                "metadata": {},
+                "timestamp": start + timedelta(seconds=s * 100 + i),
+            })
+    await storage.save_messages_batch(messages, [])
+    await storage.save_memory_embedding("message", messages[1]["id"], "x", [0.5] * 128)
+    await storage.upsert_memory_fact("user", "preference", "preferred_tech", "Python", 0.9)
+    await storage.upsert_memory_fact("user", "preference", "preferred_tech", "Rust", 0.9)
+    await storage.cleanup()
+    return [m["id"] for m in messages]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_loads_sqlite_into_fresh_graph_and_resumes(tmp_path):
+    """Rebuild streams SQLite into CSV chunks, COPYs them in, and resumes after a crash."""
+    sqlite_path = str(tmp_path / "sessions.db")
+    kuzu_path = str(tmp_path / "kuzu")
+    message_ids = await _seed_sqlite(sqlite_path)
+
+    # The old graph carries an LLM-extracted entity layer worth keeping.
+    old = KuzuStore(db_path=kuzu_path, vector_index=False)
+    await old.initialize()
+    writer = KuzuWriter(old)
+    await writer.upsert_entity("Rust", "tech")
+    await writer.upsert_entity("Cargo", "tech")
+    await writer.upsert_entity_relation("Rust", "Cargo", "uses")
+    await writer.upsert_fact("user", "preferred_tech", "Rust", 0.9, linked_entity="Rust")
+    writer.ingest.add_event("old", "user", "旧图里的事件")
+    await writer.ingest.close()
+    await old.cleanup()
+
+    progress: list[str] = []
+    rebuilder = KuzuRebuilder(sqlite_path, kuzu_path, chunk_rows=3, progress=progress.append)
+    rebuilder._swap = lambda: (_ for _ in ()).throw(RuntimeError("crash before swap"))
+    with pytest.raises(RuntimeError):
+        rebuilder.run()
+    assert (tmp_path / "kuzu.rebuild" / "manifest.json").exists()
+
+    progress.clear()
+    report = KuzuRebuilder(sqlite_path, kuzu_path, chunk_rows=3, progress=progress.append).run()
+    assert report.resumed
+    assert not any("导出事件" in line for line in progress)
+    assert (report.events, report.sessions, report.facts, report.entities) == (8, 2, 1, 2)
+    assert report.embeddings_reused == 1
+    assert not (tmp_path / "kuzu.rebuild").exists()
+    assert (tmp_path / "kuzu.bak").exists() and (tmp_path / "kuzu.migrated").exists()
+
+    store = KuzuStore(db_path=kuzu_path, vector_index=False)
+    await store.initialize()
+    count = lambda q: execute_sync(store.conn, q)[0][0]  # noqa: E731
+    assert count("MATCH (e:Event) RETURN count(e)") == 8
+    assert count("MATCH (:Event)-[:IN_SESSION]->(:Session) RETURN count(*)") == 8
+    assert count("MATCH (:Event)-[:NEXT]->(:Event) RETURN count(*)") == 6
+    assert count("MATCH (:Entity)-[:RELATED_TO]->(:Entity) RETURN count(*)") == 1
+    assert count("MATCH (:Fact {id: 'user:preferred_tech'})-[:ABOUT]->(:Entity) RETURN count(*)") == 1
+    first = execute_sync(store.conn, "MATCH (e:Event {id: $id}) RETURN e.content", {"id": message_ids[0]})
+    assert first[0][0] == 'nginx 配置\n"upstream", 超时'
+
+    retriever = KuzuRetriever(store)
+    assert [f["value"] for f in await retriever.keyword_prefetch("rust")] == ["Rust"]
+    hits = await retriever.search("网关 502", mode="hybrid", top_k=3)
+    assert hits and all("网关" in h.content for h in hits)
+    await store.cleanup()
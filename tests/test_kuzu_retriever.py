@@ -0,0 +1,301 @@
+import asyncio
+import threading
+
+import pytest
+
+from memory.kuzu_graph import KuzuGraphCache
+from memory.kuzu_retriever import KuzuRetriever
+from memory.kuzu_store import KuzuStore
+from memory.kuzu_writer import KuzuWriter
+
+
+async def _seed(store: KuzuStore) -> None:
+    writer = KuzuWriter(store)
+    await writer.ensure_session("s1")
+    await writer.write_event("s1", "user", "nginx 网关 502 报错，排查 upstream 超时")
+    await writer.write_event("s1", "assistant", "Redis 连接池 max_connections 调到 50")
+    await writer.write_event("s1", "user", "周末去爬山，天气不错")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("min_events", [10**6, 0], ids=["scan", "hnsw"])
+async def test_semantic_search_binds_query_vector(tmp_path, min_events):
+    """Semantic search returns the same best hit via prepared scan and HNSW index."""
+    store = KuzuStore(
+        db_path=str(tmp_path / "kuzu"), vector_index_min_events=min_events, read_connections=1
+    )
+    await store.initialize()
+    await _seed(store)
+    assert store.event_count == 3
+    assert store.use_vector_index is (min_events == 0)
+
+    retriever = KuzuRetriever(store)
+    hits = await retriever.search("网关 502 超时", mode="semantic", top_k=2)
+    assert hits and "网关" in hits[0].content
+    assert hits[0].score > 0.3
+
+    # Statements are prepared once per connection and reused across calls.
+    cached = store.stats()["prepared_statements"]
+    await retriever.search("Redis 连接池", mode="semantic", top_k=2)
+    assert store.stats()["prepared_statements"] == cached
+
+    await store.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_batches_graph_expansion(tmp_path):
+    """Hybrid search expands all entities with a fixed number of set-based queries."""
+    store = KuzuStore(db_path=str(tmp_path / "kuzu"), vector_index=False)
+    await store.initialize()
+    writer = KuzuWriter(store)
+    await writer.ensure_session("s1")
+    eids = []
+    for content in ["Redis 连接池打满导致超时", "Redis 改成哨兵模式", "Nginx 网关 502 排查"]:
+        eids.append(await writer.write_event("s1", "user", content))
+    await writer.upsert_entity("Redis", "tech")
+    await writer.upsert_entity("Nginx", "tech")
+    for eid in eids[:2]:
+        await writer.link_event_to_entity(eid, "Redis")
+    await writer.link_event_to_entity(eids[2], "Nginx")
+    await writer.upsert_fact("user", "cache", "Redis", 0.9, linked_entity="Redis")
+
+    retriever = KuzuRetriever(store)
+    calls = []
+    run = retriever._run
+    retriever._run = lambda query, params=None: calls.append(query) or run(query, params)
+
+    hits = await retriever.search("Redis 连接池 Nginx", mode="hybrid", top_k=5)
+
+    # semantic + mentions + facts + mention refs + event contents + keyword
+    assert len(calls) <= 6
+    assert {"semantic_ms", "graph_ms", "keyword_ms", "total_ms"} <= set(hits.timings_ms)
+    assert {h.event_id for h in hits} >= set(eids)
+
+    graph_hits = await retriever.search("Redis", mode="graph", top_k=5)
+    assert {h.event_id for h in graph_hits} == set(eids[:2])
+    assert all(h.facts[0]["value"] == "Redis" for h in graph_hits)
+
+    await store.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_graph_expansion_limits_rows_per_entity_in_cypher(tmp_path):
+    """A popular entity contributes only its newest 3 events and top 5 facts to the result sets."""
+    store = KuzuStore(db_path=str(tmp_path / "kuzu"), vector_index=False)
+    await store.initialize()
+    writer = KuzuWriter(store)
+    await writer.ensure_session("s1")
+    await writer.upsert_entity("Redis", "tech")
+    await writer.upsert_entity("Nginx", "tech")
+    eids = []
+    for i in range(12):
+        eids.append(await writer.write_event("s1", "user", f"Redis 第 {i} 次排查"))
+        await writer.link_event_to_entity(eids[-1], "Redis")
+    nginx_eid = await writer.write_event("s1", "user", "Nginx 网关 502")
+    await writer.link_event_to_entity(nginx_eid, "Nginx")
+    for i in range(8):
+        await writer.upsert_fact("user", f"redis_{i}", f"v{i}", 0.1 * (i + 1), linked_entity="Redis")
+
+    retriever = KuzuRetriever(store)
+    row_counts = []
+    run = retriever._run
+
+    def counting_run(query, params=None):
+        rows = run(query, params)
+        row_counts.append(len(rows))
+        return rows
+
+    retriever._run = counting_run
+    hits = await retriever.search("Redis Nginx", mode="graph", top_k=10)
+
+    facts_rows, mention_rows = row_counts[:2]
+    assert facts_rows == 5 and mention_rows == 4
+    redis_hits = [h for h in hits if h.entities == ["Redis"]]
+    assert {h.event_id for h in redis_hits} <= set(eids[-3:])
+    assert [f["key"] for f in redis_hits[0].facts] == [f"redis_{i}" for i in range(7, 2, -1)]
+    assert nginx_eid in {h.event_id for h in hits}
+
+    await store.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_ppr_search_recalls_multi_hop_and_refreshes_incrementally(tmp_path):
+    """PPR walks Entity -> Entity -> Event hops from query entities and sees new edges without reloading."""
+    store = KuzuStore(db_path=str(tmp_path / "kuzu"), vector_index=False)
+    await store.initialize()
+    graph = KuzuGraphCache(store)
+    writer = KuzuWriter(store, graph=graph)
+    await writer.ensure_session("s1")
+    for name in ("Redis", "Sentinel", "Nginx"):
+        await writer.upsert_entity(name, "tech")
+    cache = await writer.write_event("s1", "user", "Redis 做缓存，命中率不错")
+    failover = await writer.write_event("s1", "user", "主从切换时客户端一直连旧主库")
+    await writer.write_event("s1", "user", "周末去爬山，天气不错")
+    await writer.link_event_to_entity(cache, "Redis")
+    await writer.link_event_to_entity(failover, "Sentinel")
+    await writer.upsert_entity_relation("Redis", "Sentinel", "uses")
+    await writer.upsert_fact("user", "ha_mode", "哨兵三节点", 0.9, linked_entity="Sentinel")
+
+    retriever = KuzuRetriever(store, graph=graph)
+    hits = await retriever.search("Redis", mode="ppr", top_k=4)
+    assert {"seeds_ms", "ppr_ms", "fetch_ms", "total_ms"} <= set(hits.timings_ms)
+    by_id = {h.event_id: h for h in hits}
+    assert {cache, failover, "fact:user:ha_mode"} <= set(by_id)
+    assert by_id[failover].entities == ["Sentinel"]
+    assert all(h.source == "ppr" and 0 < h.score <= 1 for h in hits)
+    assert hits[0].score == 1.0
+
+    # Edges committed after the load land in the delta, not a reload.
+    later = await writer.write_event("s1", "user", "Sentinel 的 down-after-milliseconds 调小了")
+    await writer.link_event_to_entity(later, "Sentinel")
+    hits = await retriever.search("Redis", mode="ppr", top_k=5)
+    assert later in {h.event_id for h in hits}
+    stats = graph.stats()
+    assert stats["delta_edges"] == 2 and stats["merges"] == 0
+
+    await store.cleanup()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("min_events", [10**6, 0], ids=["scan", "hnsw"])
+async def test_filters_push_down_into_every_mode(tmp_path, min_events):
+    """Time / session / role filters restrict every mode to matching Events and drop Facts."""
+    from datetime import datetime, timedelta
+
+    from memory.retrieval_filter import RetrievalFilter
+
+    store = KuzuStore(db_path=str(tmp_path / "kuzu"), vector_index_min_events=min_events)
+    await store.initialize()
+    graph = KuzuGraphCache(store)
+    writer = KuzuWriter(store, graph=graph)
+    now = datetime.now()
+    await writer.ensure_session("s1")
+    await writer.ensure_session("s2")
+    await writer.upsert_entity("Redis", "tech")
+    events = [
+        await writer.write_event(sid, role, content, timestamp=int((now - timedelta(days=days)).timestamp() * 1000))
+        for sid, role, days, content in [
+            ("s1", "user", 40, "Redis 连接池超时，上个月"),
+            ("s2", "user", 0, "Redis 连接池超时，今天"),
+            ("s2", "assistant", 0, "Redis 连接池调大到 50"),
+        ]
+    ]
+    for eid in events:
+        await writer.link_event_to_entity(eid, "Redis")
+    await writer.upsert_fact("user", "cache", "Redis", 0.9, linked_entity="Redis")
+
+    retriever = KuzuRetriever(store, graph=graph)
+    today_user = RetrievalFilter(since=now - timedelta(days=1), roles=("user",))
+    for mode, query in [("semantic", "Redis 连接池超时"), ("graph", "Redis"),
+                        ("hybrid", "Redis 连接池超时"), ("ppr", "Redis 连接池超时")]:
+        unscoped = await retriever.search(query, mode=mode, top_k=5)
+        assert events[0] in {h.event_id for h in unscoped}, mode
+        hits = await retriever.search(query, mode=mode, top_k=5, filters=today_user)
+        assert [h.event_id for h in hits] == [events[1]], mode
+
+    session_s1 = RetrievalFilter(session_ids=("s1",))
+    assert [h.event_id for h in await retriever.search("连接池", mode="hybrid", filters=session_s1)] == [events[0]]
+    await store.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_text_index_ranks_events_and_tracks_fact_updates(tmp_path):
+    """Keyword paths use the bigram BM25 index, including Chinese substrings and fact rewrites."""
+    store = KuzuStore(db_path=str(tmp_path / "kuzu"), vector_index=False)
+    await store.initialize()
+    await _seed(store)
+    writer = KuzuWriter(store)
+    await writer.write_event("s1", "user", "网关又 502 了，网关日志里全是 upstream timeout")
+    await writer.upsert_fact("user", "preferred_tech", "Python", 0.9)
+
+    retriever = KuzuRetriever(store)
+    hits = retriever._event_keyword_search_sync("网关 502", top_k=5)
+    assert {h.content for h in hits} == {
+        "网关又 502 了，网关日志里全是 upstream timeout",
+        "nginx 网关 502 报错，排查 upstream 超时",
+    }
+    assert hits[0].score > hits[1].score
+    assert not retriever._event_keyword_search_sync("完全无关", top_k=5)
+
+    assert [f["value"] for f in await retriever.keyword_prefetch("python 项目")] == ["Python"]
+    await writer.upsert_fact("user", "preferred_tech", "Rust", 0.9)
+    assert await retriever.keyword_prefetch("python 项目") == []
+    assert [f["value"] for f in await retriever.keyword_prefetch("rust")] == ["Rust"]
+
+    await store.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_text_index_backfill_retries_after_failed_copy(tmp_path):
+    """A COPY failure leaves no stats rows behind, so the next backfill runs again."""
+    from memory.kuzu_text_index import KuzuTextIndex
+
+    store = KuzuStore(db_path=str(tmp_path / "kuzu"), vector_index=False)
+    await store.initialize()
+    await _seed(store)
+    await KuzuWriter(store).upsert_fact("user", "cache", "Redis", 0.9)
+    # Simulate a graph created before the text index existed.
+    store.conn.execute("MATCH (s:TextIndexStats) DELETE s")
+    store.conn.execute("MATCH (t:Term) DETACH DELETE t")
+
+    real_conn = store._conn
+
+    class FailingFactCopy:
+        def __getattr__(self, name):
+            return getattr(real_conn, name)
+
+        def execute(self, query, *args):
+            if isinstance(query, str) and query.startswith("COPY FACT_TERM"):
+                raise RuntimeError("copy failed")
+            return real_conn.execute(query, *args)
+
+    store._conn = FailingFactCopy()
+    with pytest.raises(RuntimeError):
+        KuzuTextIndex(store).backfill_sync()
+    store._conn = real_conn
+    assert store.conn.execute("MATCH (s:TextIndexStats) RETURN count(s)").get_next()[0] == 0
+    assert store.conn.execute("MATCH (t:Term) RETURN count(t)").get_next()[0] == 0
+
+    KuzuTextIndex(store).backfill_sync()
+    hits = KuzuRetriever(store)._event_keyword_search_sync("网关 502", top_k=5)
+    assert hits and "网关" in hits[0].content
+    assert [f["value"] for f in await KuzuRetriever(store).keyword_prefetch("redis")] == ["Redis"]
+
+    await store.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_store_serializes_writes_and_pools_reads(tmp_path):
+    """Writes run on one writer thread behind a bounded queue; reads use the pool."""
+    store = KuzuStore(
+        db_path=str(tmp_path / "kuzu"), vector_index=False, read_connections=2, write_queue_size=2
+    )
+    await store.initialize()
+    writer = KuzuWriter(store)
+    await writer.ensure_session("s1")
+
+    await asyncio.gather(*(writer.write_event("s1", "user", f"Redis 第 {i} 次超时") for i in range(10)))
+    assert store.event_count == 10
+    stats = store.stats()
+    assert stats["writes_peak"] == 2
+    assert stats["backpressure_waits"] > 0
+    assert stats["writes_pending"] == 0
+
+    writer_threads = await asyncio.gather(
+        *(store.submit_write(lambda: threading.current_thread().name) for _ in range(4))
+    )
+    assert len(set(writer_threads)) == 1 and writer_threads[0].startswith("kuzu-writer")
+    reader_thread = await store.submit_read(lambda: threading.current_thread().name)
+    assert reader_thread.startswith("kuzu-reader")
+
+    retriever = KuzuRetriever(store)
+    results = await asyncio.gather(
+        *(retriever.search("Redis 超时", mode="hybrid", top_k=3) for _ in range(6)),
+        writer.write_event("s1", "assistant", "Redis 超时已修复"),
+    )
+    assert all(len(hits) == 3 for hits in results[:-1])
+    assert store.stats()["reads_done"] >= 7
+
+    await store.cleanup()
+    with pytest.raises(RuntimeError):
+        await store.submit_write(lambda: None)
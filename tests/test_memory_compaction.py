@@ -0,0 +1,154 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pydantic import BaseModel
+
+from core.session_manager import SessionManager
+from memory.compaction import cluster_messages, summarize_cluster
+from memory.kuzu_graph import KuzuGraphCache
+from memory.kuzu_retriever import KuzuRetriever
+from memory.kuzu_store import KuzuStore
+from memory.kuzu_writer import KuzuWriter
+
+
+class MemoryConfig(BaseModel):
+    sqlite_path: str = ":memory:"
+    memory_root: str
+    cache_size: int = 10
+    auto_flush_interval: int = 60
+    compaction_hot_messages: int = 2
+    compaction_min_age_days: float = 1
+
+
+_OLD_TURNS = [
+    ("user", "Redis 连接池总是打满，接口超时。"),
+    ("assistant", "把 Redis 连接池 max_connections 调到 50，并给连接池加超时。"),
+    ("user", "好的，Redis 连接池调完不再超时了。"),
+    ("user", "网关证书过期了怎么办？"),
+    ("assistant", "用 certbot 续签网关证书，再重载 nginx。"),
+]
+
+
+def test_clusters_split_on_gaps_and_summaries_keep_the_topic():
+    start = datetime(2025, 3, 1, 10, 0)
+    rows = [
+        {"role": role, "content": content, "timestamp": start + timedelta(minutes=i * 5 + (120 if i >= 3 else 0))}
+        for i, (role, content) in enumerate(_OLD_TURNS)
+    ]
+    clusters = cluster_messages(rows, gap=timedelta(minutes=30), max_size=40)
+    assert [len(c) for c in clusters] == [3, 2]
+    assert [len(c) for c in cluster_messages(rows, gap=timedelta(hours=9), max_size=2)] == [2, 2, 1]
+
+    summary = summarize_cluster(clusters[0], max_chars=120)
+    assert summary.startswith("对话摘要（2025-03-01 10:00 ~ 10:10，3 条）")
+    assert "用户：Redis 连接池总是打满" in summary
+    assert len(summary) <= 120
+
+
+@pytest.mark.asyncio
+async def test_compaction_folds_old_turns_into_summaries_and_archive(tmp_path):
+    manager = SessionManager(
+        MemoryConfig(sqlite_path=str(tmp_path / "sessions.db"), memory_root=str(tmp_path / "memory"))
+    )
+    await manager.initialize()
+    # The test drives embedding and compaction itself; keep the background worker off the seed rows.
+    manager._embedding_task.cancel()
+    session = await manager.create_session({"channel": "test"})
+    sid = session.session_id
+    old = datetime.now() - timedelta(days=10)
+    await manager.storage.save_messages_batch(
+        [
+            {
+                "id": f"old-{i}",
+                "session_id": sid,
+                "role": role,
+                "content": content,
+                "metadata": {},
+                "timestamp": old + timedelta(minutes=i * 5 + (120 if i >= 3 else 0)),
+            }
+            for i, (role, content) in enumerate(_OLD_TURNS)
+        ],
+        [
+            {"id": f"job-{i}", "source_type": "message", "source_id": f"old-{i}", "content": c, "created_at": old}
+            for i, (_, c) in enumerate(_OLD_TURNS)
+        ],
+    )
+    await manager.save_message(sid, "user", "今天聊点别的：周末去爬山")
+    await manager.save_message(sid, "assistant", "好呀，记得带水")
+    await manager.run_embedding_pipeline(max_jobs=20, ignore_schedule=True)
+
+    report = await manager.compact_memory()
+    assert (report["sessions"], report["messages_archived"], report["summaries_written"]) == (1, 5, 2)
+
+    # History only shows the hot turns; the summaries stand in for the old ones in recall.
+    page, has_older = await manager.storage.get_recent_messages(sid, limit=10)
+    assert [m.content for m in page] == ["今天聊点别的：周末去爬山", "好呀，记得带水"] and not has_older
+
+    hits = await manager.search_memory_hybrid("Redis 连接池超时", limit=5)
+    assert hits[0]["source_type"] == "message" and hits[0]["message_role"] == "summary"
+    assert "Redis 连接池" in hits[0]["content"]
+    assert all(h["source_type"] != "archive" for h in hits)
+
+    # An explicit recall question also drills into the archived raw turns.
+    recall = await manager.search_memory_hybrid("还记得之前 Redis 连接池怎么调的吗", limit=8)
+    archived = [h for h in recall if h["source_type"] == "archive"]
+    assert any("max_connections 调到 50" in h["content"] for h in archived)
+
+    metrics = await manager.get_memory_metrics()
+    assert metrics["compaction"]["runs"] == 1
+    assert metrics["compaction"]["archive"]["messages"] == 5
+
+    # Summaries are never compacted again; nothing left outside the hot set.
+    again = await manager.compact_memory()
+    assert again["messages_archived"] == 0
+
+    await manager.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_kuzu_compaction_rewires_chain_entities_and_text_index(tmp_path):
+    store = KuzuStore(db_path=str(tmp_path / "kuzu"), vector_index=False, read_connections=1)
+    await store.initialize()
+    graph = KuzuGraphCache(store)
+    writer = KuzuWriter(store, graph=graph)
+    await writer.ensure_session("s1")
+    old_ms = int((datetime.now() - timedelta(days=10)).timestamp() * 1000)
+    eids = [
+        await writer.write_event("s1", role, content, timestamp=old_ms + i * 60_000)
+        for i, (role, content) in enumerate(_OLD_TURNS[:3])
+    ]
+    tail = await writer.write_event("s1", "user", "今天聊点别的：周末去爬山")
+    await writer.upsert_entity("Redis", "tech")
+    await writer.link_event_to_entity(eids[1], "Redis")
+    await store.submit_write(graph.load_sync)
+
+    cutoff_ms = int((datetime.now() - timedelta(days=1)).timestamp() * 1000)
+    assert await writer.compact(cutoff_ms) == (3, 1)
+    assert store.event_count == 2
+
+    rows = await store.submit_read(
+        lambda: store.conn.execute(
+            "MATCH (a:Event)-[:NEXT]->(b:Event) RETURN a.role, a.summary, b.id"
+        ).get_all()
+    )
+    assert len(rows) == 1 and rows[0][0] == "summary" and rows[0][2] == tail
+    assert "Redis 连接池" in rows[0][1]
+
+    retriever = KuzuRetriever(store, graph=graph)
+    graph_hits = await retriever.search("Redis", mode="graph", top_k=5)
+    assert [h.role for h in graph_hits] == ["summary"]
+    keyword_hits = await retriever.search("连接池", mode="keyword", top_k=5)
+    assert [h.role for h in keyword_hits] == ["summary"]
+    ppr_hits = await retriever.search("Redis", mode="ppr", top_k=5)
+    assert all(h.event_id not in eids for h in ppr_hits)
+
+    # New turns keep chaining after the real tail.
+    nxt = await writer.write_event("s1", "assistant", "好呀，记得带水")
+    chain = await store.submit_read(
+        lambda: store.conn.execute(
+            "MATCH (a:Event {id: $id})-[:NEXT]->(b:Event) RETURN b.id", {"id": tail}
+        ).get_all()
+    )
+    assert chain == [[nxt]]
+
+    await store.cleanup()
@@ -0,0 +1,55 @@
+"""LocalEmbeddingEngine must stay bit-identical to the original per-text algorithm."""
+
+import hashlib
+import math
+import random
+import re
+
+from memory.embeddings import _SYNONYM_MAP, LocalEmbeddingEngine
+
+
+def _reference_embed(text: str, dimension: int = 128) -> list[float]:
+    """The pre-vectorization implementation, kept verbatim as an oracle."""
+    raw_text = (text or "").strip()
+    if not raw_text:
+        return [0.0] * dimension
+    lowered = raw_text.lower()
+    for key, replacement in _SYNONYM_MAP.items():
+        lowered = lowered.replace(key, f" {replacement} ")
+    lowered = re.sub(r"[^\w\u4e00-\u9fff+#.-]+", " ", lowered)
+    normalized = re.sub(r"\s+", " ", lowered).strip()
+    ascii_tokens = re.findall(r"[a-z0-9_+#.-]{2,}", normalized)
+    chinese_chars = re.findall(r"[\u4e00-\u9fff]", normalized)
+    tokens = [*ascii_tokens, *(a + b for a, b in zip(chinese_chars, chinese_chars[1:]))]
+    if not tokens:
+        return [0.0] * dimension
+
+    vec = [0.0] * dimension
+    for token in tokens:
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+        index = int.from_bytes(digest[:4], "big") % dimension
+        sign = 1.0 if digest[4] % 2 == 0 else -1.0
+        weight = 1.0 + (digest[5] / 255.0) * 0.5
+        vec[index] += sign * weight
+    norm = math.sqrt(sum(v * v for v in vec))
+    if norm == 0:
+        return vec
+    return [v / norm for v in vec]
+
+
+def test_embed_batch_is_bit_identical_to_reference():
+    fragments = ["报", "错", "误", "网关", "层", "bad", "BAD", " ", "gateway", "502",
+                 "超时", "故障", "Redis", "c++", "C#", "，", "v1.2-beta", "中文"]
+    rng = random.Random(0)
+    texts = ["".join(rng.choice(fragments) for _ in range(rng.randint(0, 10))) for _ in range(2000)]
+    # Chained and overlapping synonym cases.
+    texts += ["bad网关", "报错误", "网关层超时", "Bad Gateway 502", "", "   "]
+
+    engine = LocalEmbeddingEngine()
+    matrix = engine.embed_batch(texts)
+
+    assert matrix.shape == (len(texts), 128)
+    for row, text in zip(matrix, texts):
+        expected = _reference_embed(text)
+        assert row.tolist() == expected
+        assert engine.embed(text) == expected
@@ -96,6 +96,161 @@ async def test_embedding_retry_dead_letter_flow(tmp_path):
     await manager.cleanup()
 
 
+@pytest.mark.asyncio
+async def test_embedding_batch_isolates_failing_job(tmp_path):
+    """A failing job in a batch should retry alone while the rest complete."""
+    manager = SessionManager(MemoryConfig(memory_root=str(tmp_path / "memory")))
+    await manager.initialize()
+    # Only the explicit run below may attempt the jobs, so retry counts are exact.
+    manager._embedding_task.cancel()
+
+    ok_ids = [
+        await manager.enqueue_embedding_job("message", f"msg-{i}", f"网关超时排查 {i}")
+        for i in range(3)
+    ]
+    bad_id = await manager.enqueue_embedding_job("message", "msg-bad", "[[force_embedding_error]]")
+
+    await manager.run_embedding_pipeline(max_jobs=10, ignore_schedule=True)
+
+    completed = {job.id for job in await manager.list_embedding_jobs(status="completed")}
+    assert completed == set(ok_ids)
+    pending = await manager.list_embedding_jobs(status="pending")
+    assert [(job.id, job.retry_count) for job in pending] == [(bad_id, 1)]
+    assert len(manager.storage.vector_index) == 3
+
+    metrics = await manager.get_memory_metrics()
+    assert metrics["embedding_pipeline"]["jobs"] >= 4
+    assert metrics["embedding_pipeline"]["batch_size"] == 32
+
+    await manager.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_embedding_batch_commit_failure_falls_back_to_per_job(tmp_path):
+    """A batch whose commit raises is persisted job by job; only the bad row retries."""
+    manager = SessionManager(MemoryConfig(memory_root=str(tmp_path / "memory")))
+    await manager.initialize()
+    manager._embedding_task.cancel()
+
+    original_apply = manager.storage.apply_embedding_batch
+
+    async def apply_rejecting_poison(embeddings, job_updates, events):
+        if any(item["source_id"] == "msg-poison" for item in embeddings):
+            raise RuntimeError("constraint failed")
+        return await original_apply(embeddings, job_updates, events)
+
+    manager.storage.apply_embedding_batch = apply_rejecting_poison
+    ok_ids = [
+        await manager.enqueue_embedding_job("message", f"msg-{i}", f"网关超时排查 {i}")
+        for i in range(3)
+    ]
+    poison_id = await manager.enqueue_embedding_job("message", "msg-poison", "网关超时 poison")
+
+    await manager.run_embedding_pipeline(max_jobs=10, ignore_schedule=True)
+
+    completed = {job.id for job in await manager.list_embedding_jobs(status="completed")}
+    assert completed == set(ok_ids)
+    pending = await manager.list_embedding_jobs(status="pending")
+    assert [(job.id, job.retry_count) for job in pending] == [(poison_id, 1)]
+    assert "constraint failed" in pending[0].last_error
+
+    await manager.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_degrades_when_keyword_branch_times_out(tmp_path):
+    """A slow retrieval branch should time out without blocking the other one."""
+    import asyncio
+
+    manager = SessionManager(MemoryConfig(memory_root=str(tmp_path / "memory")))
+    await manager.initialize()
+    session = await manager.create_session({"channel": "test"})
+    await manager.save_message(session.session_id, "user", "这次故障是 Bad Gateway，核心原因是网关超时。")
+    await manager.run_embedding_pipeline(max_jobs=20, ignore_schedule=True)
+
+    async def slow_keyword_search(**_kwargs):
+        await asyncio.sleep(5)
+        return []
+
+    manager.storage.search_messages_by_keyword = slow_keyword_search
+    manager.retrieval_branch_timeout = 0.05
+
+    results = await manager.search_memory_hybrid("网关错误怎么定位", limit=5)
+    assert any("Bad Gateway" in item["content"] for item in results)
+
+    failures = await manager.list_memory_events(event_type="retrieval_fail")
+    assert any(event.payload.get("reason") == "keyword_timeout" for event in failures)
+    successes = await manager.list_memory_events(event_type="retrieval_success")
+    timings = successes[0].payload["timings_ms"]
+    assert {"semantic_ms", "keyword_ms", "metadata_ms", "rank_ms", "total_ms"} <= set(timings)
+    assert timings["keyword_ms"] < 1000
+
+    await manager.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_cache_invalidates_on_write(tmp_path):
+    """Repeated queries hit the cache until an embedding write bumps the generation."""
+    manager = SessionManager(MemoryConfig(memory_root=str(tmp_path / "memory")))
+    await manager.initialize()
+    session = await manager.create_session({"channel": "test"})
+    await manager.save_message(session.session_id, "user", "这次故障是 Bad Gateway，核心原因是网关超时。")
+    await manager.run_embedding_pipeline(max_jobs=20, ignore_schedule=True)
+
+    first = await manager.search_memory_hybrid("网关错误怎么定位", limit=5)
+    second = await manager.search_memory_hybrid("  网关错误怎么定位 ", limit=5)
+    assert [h["source_id"] for h in first] == [h["source_id"] for h in second]
+    stats = (await manager.get_memory_metrics())["query_cache"]
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+    await manager.storage.save_memory_embedding(
+        "fact", "f-gw", "网关错误先查 upstream 超时", manager.embedding_engine.embed("网关错误先查 upstream 超时")
+    )
+    third = await manager.search_memory_hybrid("网关错误怎么定位", limit=5)
+    assert any(h["source_id"] == "f-gw" for h in third)
+    assert (await manager.get_memory_metrics())["query_cache"]["misses"] == 2
+
+    await manager.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_infers_time_scope_and_falls_back(tmp_path):
+    """Recall questions with a date phrase are scoped in storage; an empty scope retries unscoped."""
+    from datetime import datetime, timedelta
+
+    from memory.retrieval_filter import RetrievalFilter
+
+    manager = SessionManager(MemoryConfig(memory_root=str(tmp_path / "memory")))
+    await manager.initialize()
+    session = await manager.create_session({"channel": "test"})
+    await manager.save_message(session.session_id, "user", "网关 502 今天的排查：upstream 超时")
+    await manager.run_embedding_pipeline(max_jobs=20, ignore_schedule=True)
+    await manager.storage.save_messages_batch(
+        [{
+            "id": "old-gw",
+            "session_id": session.session_id,
+            "role": "user",
+            "content": "网关 502 十天前的排查：证书过期",
+            "metadata": {},
+            "timestamp": datetime.now() - timedelta(days=10),
+        }],
+        [],
+    )
+
+    today = await manager.search_memory_hybrid("我今天聊过网关 502 吗", limit=5)
+    assert today and all("今天" in h["content"] for h in today)
+
+    scoped = await manager.search_memory_hybrid(
+        "网关 502", limit=5, filters=RetrievalFilter(until=datetime.now() - timedelta(days=5))
+    )
+    assert [h["source_id"] for h in scoped] == ["old-gw"]
+
+    # Nothing was said last year, so the inferred scope is dropped rather than returning nothing.
+    assert await manager.search_memory_hybrid("我去年聊过网关 502 吗", limit=5)
+
+    await manager.cleanup()
+
+
 def test_markdown_metabolism_for_project_and_insights(tmp_path: Path):
     """Project uses rolling summary; insights keep a 10-item hot pool."""
     store = MemoryDocumentStore(str(tmp_path / "memory"))
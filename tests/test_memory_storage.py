@@ -60,3 +60,162 @@ async def test_keyword_search_messages_with_fts():
     assert results[0]["session_id"] == session_id
 
     await storage.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_vector_index_matches_full_scan():
+    """Resident vector index should rank the same hits as the legacy scan."""
+    from memory.embeddings import LocalEmbeddingEngine
+
+    engine = LocalEmbeddingEngine()
+    storage = MemoryStorage(db_path=":memory:")
+    await storage.initialize()
+
+    texts = [
+        "Redis timeout 排查",
+        "网关报错 502",
+        "今天吃了牛肉面",
+        "Python asyncio 任务取消",
+        "网关超时导致 Bad Gateway",
+    ]
+    for i, content in enumerate(texts):
+        await storage.save_memory_embedding("message", f"m{i}", content, engine.embed(content))
+    # Upsert must replace the row instead of adding a duplicate.
+    await storage.save_memory_embedding("message", "m2", "网关错误", engine.embed("网关错误"))
+
+    query = engine.embed("网关错误怎么定位")
+    indexed = await storage.search_memory_embeddings(query, limit=3)
+    scanned = await storage._scan_memory_embeddings(query, limit=3)
+
+    assert len(storage.vector_index) == len(texts)
+    assert [h["source_id"] for h in indexed] == [h["source_id"] for h in scanned]
+    for left, right in zip(indexed, scanned):
+        assert left["semantic_score"] == pytest.approx(right["semantic_score"], abs=1e-5)
+        assert left["content"] == right["content"]
+
+    await storage.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_legacy_json_embeddings_migrate_to_float32_blobs(tmp_path):
+    """Existing JSON-text vectors should be converted to packed blobs on startup."""
+    import json
+    from datetime import datetime
+
+    from sqlalchemy import text
+
+    from memory.embeddings import LocalEmbeddingEngine
+    from memory.vector_codec import unpack_embedding
+
+    db_path = str(tmp_path / "sessions.db")
+    vector = LocalEmbeddingEngine().embed("网关超时导致 Bad Gateway")
+
+    storage = MemoryStorage(db_path=db_path)
+    await storage.initialize()
+    async with storage.session_factory() as session:
+        now = datetime.now()
+        await session.execute(
+            text(
+                "INSERT INTO memory_embeddings "
+                "(id, source_type, source_id, content, embedding, created_at, updated_at) "
+                "VALUES ('e1', 'message', 'm1', '网关超时', :embedding, :now, :now)"
+            ),
+            {"embedding": json.dumps(vector), "now": now},
+        )
+        await session.commit()
+    await storage.cleanup()
+
+    storage = MemoryStorage(db_path=db_path)
+    await storage.initialize()
+    async with storage.session_factory() as session:
+        row = (
+            await session.execute(
+                text("SELECT typeof(embedding), embedding FROM memory_embeddings WHERE id = 'e1'")
+            )
+        ).one()
+    assert row[0] == "blob"
+    assert unpack_embedding(row[1]).tolist() == pytest.approx(vector, abs=1e-6)
+
+    hits = await storage.search_memory_embeddings(vector, limit=1)
+    assert hits and hits[0]["source_id"] == "m1"
+    await storage.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_profile_applies_pragmas_and_read_only_pool(tmp_path):
+    """File-backed storage should run in WAL and serve retrieval from a read-only pool."""
+    from sqlalchemy import text
+
+    storage = MemoryStorage(db_path=str(tmp_path / "sessions.db"))
+    await storage.initialize()
+    assert storage.read_engine is not None
+
+    async with storage.session_factory() as session:
+        assert (await session.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+        assert (await session.execute(text("PRAGMA synchronous"))).scalar() == 1  # NORMAL
+
+    session_id = await storage.create_session({})
+    await storage.save_message(session_id, "user", "Redis timeout 排查")
+    hits = await storage.search_messages_by_keyword("Redis", limit=5)
+    assert hits and hits[0]["session_id"] == session_id
+
+    async with storage.read_session_factory() as session:
+        with pytest.raises(Exception):
+            await session.execute(text("DELETE FROM messages"))
+
+    await storage.cleanup()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("use_vector_index", [False, True], ids=["scan", "index"])
+async def test_filtered_search_pushes_scope_into_sql(tmp_path, monkeypatch, use_vector_index):
+    """Time / session / role filters apply inside both keyword and embedding search."""
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import text
+
+    import memory.storage as storage_module
+    from memory.embeddings import EmbeddingConfig, LocalEmbeddingEngine
+    from memory.retrieval_filter import RetrievalFilter
+
+    storage = MemoryStorage(db_path=str(tmp_path / "sessions.db"), use_vector_index=use_vector_index)
+    await storage.initialize()
+    engine = LocalEmbeddingEngine(EmbeddingConfig(dimension=128))
+    now = datetime.now()
+    rows = [
+        ("m0", "s1", "user", 0, "网关 502 今天又出现"),
+        ("m1", "s1", "assistant", 0, "先看 upstream 网关超时"),
+        ("m2", "s2", "user", 3, "网关 502 三天前排查过"),
+        ("m3", "s2", "user", 40, "网关超时 上个月的记录"),
+    ]
+    await storage.save_messages_batch(
+        [
+            {"id": mid, "session_id": sid, "role": role, "content": content,
+             "metadata": {}, "timestamp": now - timedelta(days=days)}
+            for mid, sid, role, days, content in rows
+        ],
+        [],
+    )
+    for mid, *_, content in rows:
+        await storage.save_memory_embedding("message", mid, content, engine.embed(content))
+    await storage.save_memory_embedding("fact", "f1", "网关", engine.embed("网关"))
+    query = engine.embed("网关 502")
+
+    recent = RetrievalFilter(since=now - timedelta(days=1))
+    assert {h["source_id"] for h in await storage.search_messages_by_keyword("网关", 10, recent)} == {"m0", "m1"}
+    assert {h["source_id"] for h in await storage.search_memory_embeddings(query, 10, recent)} == {"m0", "m1"}
+
+    scoped = RetrievalFilter(session_ids=("s2",), roles=("user",), until=now - timedelta(days=2))
+    assert {h["source_id"] for h in await storage.search_memory_embeddings(query, 10, scoped)} == {"m2", "m3"}
+    # A wide filter over-fetches from the index and re-checks hits in SQL instead.
+    monkeypatch.setattr(storage_module, "FILTERED_EXACT_MAX", 1)
+    assert {h["source_id"] for h in await storage.search_memory_embeddings(query, 10, scoped)} == {"m2", "m3"}
+    assert "f1" in {h["source_id"] for h in await storage.search_memory_embeddings(query, 10)}
+
+    predicate, params = recent.sql_predicate("m")
+    async with storage.read_session_factory() as session:
+        plan = (
+            await session.execute(text(f"EXPLAIN QUERY PLAN SELECT m.id FROM messages m WHERE {predicate}"), params)
+        ).all()
+    assert "ix_messages_timestamp" in str(plan)
+    await storage.cleanup()
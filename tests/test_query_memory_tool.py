@@ -15,7 +15,11 @@ class _FakeHit:
 
 
 class _FakeRetriever:
-    async def search(self, query: str, mode: str, top_k: int):
+    def __init__(self):
+        self.filters = None
+
+    async def search(self, query: str, mode: str, top_k: int, filters=None):
+        self.filters = filters
         return [_FakeHit("user:identity:display_name:腿哥", 0.83)]
 
 
@@ -23,7 +27,8 @@ class _FakeRetriever:
 async def test_query_memory_output_uses_plain_header_without_bracket_markup(monkeypatch):
     import memory.kuzu_manager as kuzu_manager
 
-    monkeypatch.setattr(kuzu_manager, "get_retriever", lambda: _FakeRetriever())
+    retriever = _FakeRetriever()
+    monkeypatch.setattr(kuzu_manager, "get_retriever", lambda: retriever)
 
     tool = Tool()
     result = await tool.execute(query="腿哥今天吃了什么 饮食记录", mode="hybrid", top_k=5)
@@ -32,3 +37,22 @@ async def test_query_memory_output_uses_plain_header_without_bracket_markup(monk
     assert first_line.startswith("记忆查询结果")
     assert "[" not in first_line
     assert "]" not in first_line
+    # "今天" in the query scopes the search to today.
+    assert retriever.filters.since is not None and retriever.filters.until is not None
+    assert (retriever.filters.until - retriever.filters.since).days == 1
+
+
+@pytest.mark.asyncio
+async def test_query_memory_passes_explicit_scope_and_rejects_bad_dates(monkeypatch):
+    import memory.kuzu_manager as kuzu_manager
+
+    retriever = _FakeRetriever()
+    monkeypatch.setattr(kuzu_manager, "get_retriever", lambda: retriever)
+
+    tool = Tool()
+    await tool.execute(query="网关", since="2025-03-01", until="2025-03-02", role="user")
+    assert retriever.filters.roles == ("user",)
+    assert str(retriever.filters.until) == "2025-03-03 00:00:00"
+
+    result = await tool.execute(query="网关", since="上周三")
+    assert result.startswith("记忆查询参数错误")
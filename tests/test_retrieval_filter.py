@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import pytest
+
+from memory.retrieval_filter import RetrievalFilter, infer_filter, parse_time_range
+
+NOW = datetime(2026, 1, 14, 15, 30)  # 周三
+
+
+@pytest.mark.parametrize(
+    "text, since, until",
+    [
+        ("我昨天说过什么", "2026-01-13", "2026-01-14"),
+        ("前天聊的", "2026-01-12", "2026-01-13"),
+        ("上周讨论了什么", "2026-01-05", "2026-01-12"),
+        ("这周", "2026-01-12", None),
+        ("最近三天", "2026-01-12", None),
+        ("过去两周", "2026-01-01", None),
+        ("3天前", "2026-01-11", "2026-01-12"),
+        ("上个月", "2025-12-01", "2026-01-01"),
+        ("去年", "2025-01-01", "2026-01-01"),
+        ("12月30日", "2025-12-30", "2025-12-31"),
+        ("2025-03-01 那天", "2025-03-01", "2025-03-02"),
+        ("2025年3月", "2025-03-01", "2025-04-01"),
+        ("what did I say yesterday", "2026-01-13", "2026-01-14"),
+        ("in the last 10 days", "2026-01-05", None),
+    ],
+)
+def test_parse_time_range(text, since, until):
+    parsed = parse_time_range(text, NOW)
+    assert parsed is not None
+    assert parsed[0].strftime("%Y-%m-%d") == since
+    assert (parsed[1].strftime("%Y-%m-%d") if parsed[1] else None) == until
+
+
+def test_infer_filter_requires_recall_cue():
+    assert infer_filter("今天天气怎么样", NOW) is None
+    assert infer_filter("今天天气怎么样", NOW, require_cue=False).since == datetime(2026, 1, 14)
+    assert infer_filter("我们今天聊了哪些", NOW).until == datetime(2026, 1, 15)
+    assert infer_filter("你还记得 Redis 吗", NOW) is None
+
+
+def test_filter_renders_only_active_predicates():
+    assert not RetrievalFilter()
+    scope = RetrievalFilter.build(until="2025-03-01", session_ids="s1, s2", roles=["user"])
+    sql, params = scope.sql_predicate("m")
+    assert sql == "m.timestamp < :f_until AND m.session_id IN (:f_s0, :f_s1) AND m.role IN (:f_r0)"
+    assert params["f_until"] == "2025-03-02 00:00:00.000000"
+    cypher, params = scope.cypher_predicate("e")
+    assert cypher == "e.timestamp < $f_until AND e.session_id IN $f_sessions AND e.role IN $f_roles"
+    assert set(params) == {"f_until", "f_sessions", "f_roles"}
+    with pytest.raises(ValueError):
+        RetrievalFilter.build(since="上周")
@@ -55,6 +55,113 @@ async def test_save_and_load_messages():
     await manager.cleanup()
 
 
+@pytest.mark.asyncio
+async def test_write_behind_group_commits_and_survives_cleanup(tmp_path):
+    """Buffered messages commit together and are durable after cleanup()."""
+    config = MemoryConfig(sqlite_path=str(tmp_path / "sessions.db"), memory_root=str(tmp_path / "memory"))
+    manager = SessionManager(config)
+    await manager.initialize()
+    manager.write_behind.flush_interval = 60  # only explicit flushes commit
+
+    session_id = (await manager.create_session({})).session_id
+    for i in range(5):
+        await manager.save_message(session_id, "user", f"消息 {i}")
+    assert len(manager.write_behind) == 5
+    assert await manager.storage.get_messages(session_id) == []
+
+    # Read paths act as a barrier.
+    jobs = await manager.list_embedding_jobs(status="pending")
+    assert len(jobs) == 5
+    assert manager.write_behind.stats()["commits"] == 1
+    assert (await manager.storage.get_session(session_id)).message_count == 5
+
+    await manager.save_message(session_id, "assistant", "收到")
+    await manager.cleanup()
+
+    manager = SessionManager(config)
+    await manager.initialize()
+    loaded = await manager.get_session(session_id)
+    assert [m["content"] for m in loaded.messages][-1] == "收到"
+    assert len(loaded.messages) == 6
+    await manager.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_write_behind_isolates_bad_rows(tmp_path):
+    """One unwritable row neither blocks later messages nor breaks read barriers."""
+    from datetime import datetime
+
+    config = MemoryConfig(sqlite_path=str(tmp_path / "sessions.db"), memory_root=str(tmp_path / "memory"))
+    manager = SessionManager(config)
+    await manager.initialize()
+    manager.write_behind.flush_interval = 60  # only explicit flushes commit
+    session_id = (await manager.create_session({})).session_id
+
+    # Non-JSON metadata is coerced instead of failing the batch.
+    await manager.save_message(session_id, "user", "带时间", metadata={"at": datetime(2026, 1, 1)})
+
+    original_batch = manager.storage.save_messages_batch
+
+    async def reject_poison(messages, jobs=None):
+        if any(item["content"] == "坏行" for item in messages):
+            raise ValueError("bad row")
+        return await original_batch(messages, jobs)
+
+    manager.storage.save_messages_batch = reject_poison
+    await manager.save_message(session_id, "user", "坏行")
+    await manager.save_message(session_id, "user", "之后的消息")
+
+    await manager.flush()  # must not raise
+    stored = await manager.storage.get_messages(session_id)
+    assert [m.content for m in stored] == ["带时间", "之后的消息"]
+    assert stored[0].message_metadata["at"] == "2026-01-01 00:00:00"
+    assert len(manager.write_behind) == 1
+
+    for _ in range(manager.write_behind.max_row_attempts):
+        await manager.flush()
+    assert len(manager.write_behind) == 0
+    assert manager.write_behind.stats()["dropped_messages"] == 1
+
+    await manager.save_message(session_id, "user", "恢复正常")
+    await manager.flush()
+    assert (await manager.storage.get_session(session_id)).message_count == 3
+    await manager.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_cold_session_loads_newest_page_and_backfills(tmp_path):
+    """Cold loads read only the newest page; older pages are backfilled in order."""
+    config = MemoryConfig(sqlite_path=str(tmp_path / "sessions.db"), memory_root=str(tmp_path / "memory"))
+    manager = SessionManager(config)
+    await manager.initialize()
+    manager.session_page_size = 50
+
+    session_id = (await manager.create_session({})).session_id
+    for i in range(120):
+        await manager.save_message(session_id, "user", f"第 {i} 条")
+    await manager.flush()
+    manager.cache.clear()
+
+    loaded = await manager.get_session(session_id)
+    assert [m["content"] for m in loaded.messages] == [f"第 {i} 条" for i in range(70, 120)]
+    assert loaded.has_older is True
+
+    assert await manager.load_older_messages(session_id) == 50
+    assert await manager.load_older_messages(session_id) == 20
+    assert loaded.has_older is False
+    assert await manager.load_older_messages(session_id) == 0
+    assert [m["content"] for m in loaded.messages] == [f"第 {i} 条" for i in range(120)]
+
+    # The context build path backfills cold sessions up to its history budget.
+    manager.cache.clear()
+    manager.context_history_messages = 80
+    history = await manager.get_context_messages(session_id)
+    assert [m["content"] for m in history] == [f"第 {i} 条" for i in range(40, 120)]
+    assert (await manager.get_session(session_id)).has_older is True
+
+    await manager.cleanup()
+
+
 @pytest.mark.asyncio
 async def test_complete_identity_onboarding_updates_state_and_documents(tmp_path):
     """First-time onboarding should persist state and markdown identity docs."""
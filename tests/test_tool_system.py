@@ -1,7 +1,8 @@
 """Tests for tool system"""
 import pytest
-from tools.base import BaseTool, ToolDefinition, ToolParameter
+from tools.base import BaseTool, ToolCachePolicy, ToolDefinition, ToolParameter
 from tools.registry import ToolRegistry
+from tools.result_cache import ToolResultCache, fold_query
 
 
 class DummyTool(BaseTool):
@@ -58,3 +59,82 @@ def test_tool_registry():
 
     tools = ToolRegistry.list_tools()
     assert "dummy_tool" in tools
+
+
+class CountingTool(BaseTool):
+    """Cacheable tool that counts real executions"""
+
+    cache_policy = ToolCachePolicy(
+        ttl_seconds=60,
+        normalize=lambda args: fold_query(args["text"]),
+        cacheable=lambda result: not result.startswith("失败"),
+    )
+
+    def __init__(self, name: str = "counting_tool", parallel_safe: bool = True):
+        self._name = name
+        self.parallel_safe = parallel_safe
+        self.calls = 0
+
+    @property
+    def definition(self) -> ToolDefinition:
+        return ToolDefinition(name=self._name, description="counts", parameters={})
+
+    async def execute(self, text: str) -> str:
+        self.calls += 1
+        return f"失败 {text}" if "boom" in text else f"{self.calls}: {text}"
+
+
+@pytest.fixture
+def isolated_registry(monkeypatch):
+    monkeypatch.setattr(ToolRegistry, "_tools", {})
+    monkeypatch.setattr(ToolRegistry, "_result_cache", ToolResultCache())
+    monkeypatch.setattr(ToolRegistry, "_cache_ttl_overrides", {})
+    return ToolRegistry
+
+
+@pytest.mark.asyncio
+async def test_registry_caches_by_policy_and_never_caches_side_effects(isolated_registry):
+    clock = [0.0]
+    isolated_registry._result_cache = ToolResultCache(max_entries=2, clock=lambda: clock[0])
+    reader = CountingTool()
+    writer = CountingTool("side_effect_tool", parallel_safe=False)
+    isolated_registry.register(reader)
+    isolated_registry.register(writer)
+
+    assert await isolated_registry.execute("counting_tool", {"text": "Hello  World"}) == "1: Hello  World"
+    assert await isolated_registry.execute("counting_tool", {"text": "hello world"}) == "1: Hello  World"
+    await isolated_registry.execute("side_effect_tool", {"text": "x"})
+    await isolated_registry.execute("side_effect_tool", {"text": "x"})
+    assert (reader.calls, writer.calls) == (1, 2)
+
+    # Failures are not stored; TTL expiry and the entry bound both evict.
+    await isolated_registry.execute("counting_tool", {"text": "boom"})
+    await isolated_registry.execute("counting_tool", {"text": "boom"})
+    assert reader.calls == 3
+    clock[0] = 61.0
+    await isolated_registry.execute("counting_tool", {"text": "hello world"})
+    await isolated_registry.execute("counting_tool", {"text": "a"})
+    await isolated_registry.execute("counting_tool", {"text": "b"})
+    assert reader.calls == 6 and isolated_registry.cache_stats()["entries"] == 2
+
+    stats = isolated_registry.cache_stats()["tools"]
+    assert "side_effect_tool" not in stats
+    assert stats["counting_tool"]["hits"] == 1 and stats["counting_tool"]["hit_rate"] == pytest.approx(1 / 7, abs=1e-3)
+
+
+@pytest.mark.asyncio
+async def test_read_file_cache_is_invalidated_by_file_changes(isolated_registry, monkeypatch, tmp_path):
+    from tools.builtin import read_file
+
+    monkeypatch.setattr(read_file, "_WORKDIR", tmp_path)
+    isolated_registry.register(read_file.Tool())
+    target = tmp_path / "notes.md"
+    target.write_text("v1", encoding="utf-8")
+
+    assert await isolated_registry.execute("read_file", {"path": "notes.md"}) == "v1"
+    assert await isolated_registry.execute("read_file", {"path": "./notes.md"}) == "v1"
+    assert isolated_registry.cache_stats()["tools"]["read_file"]["hits"] == 1
+
+    target.write_text("version 2", encoding="utf-8")
+    assert await isolated_registry.execute("read_file", {"path": "notes.md"}) == "version 2"
+    assert isolated_registry.cache_stats()["tools"]["read_file"]["invalidations"] == 1
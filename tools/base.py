@@ -1,6 +1,7 @@
 """Tool base classes"""
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable
 from pydantic import BaseModel
 
 
@@ -48,9 +49,34 @@ class ToolDefinition(BaseModel):
         }
 
 
+@dataclass(frozen=True, slots=True)
+class ToolCachePolicy:
+    """How ToolRegistry may reuse a tool's results across turns and sessions.
+
+    ``normalize`` maps call arguments to the cache key (defaults filled in,
+    whitespace/case folded). ``version`` is evaluated on every lookup and an
+    entry only hits while it returns the same value, e.g. a file's mtime.
+    ``cacheable`` rejects results that must not be stored (error messages).
+    """
+    ttl_seconds: float
+    normalize: Callable[[dict], Hashable] | None = None
+    version: Callable[[dict], Hashable] | None = None
+    cacheable: Callable[[Any], bool] | None = None
+
+
 class BaseTool(ABC):
     """Tool base class"""
 
+    # Whether calls may run concurrently with other calls in the same turn.
+    # Tools with side effects on shared state (shell, file writes) opt out.
+    # 是否允许与同一轮的其他工具调用并发执行；有副作用的工具（shell、写文件）设为 False
+    parallel_safe: bool = True
+
+    # Cross-turn result caching; None (default) means never cached.
+    # Side-effecting tools (parallel_safe = False) are never cached regardless.
+    # 跨轮次结果缓存策略；None 表示不缓存。有副作用的工具无论如何都不缓存
+    cache_policy: ToolCachePolicy | None = None
+
     @property
     @abstractmethod
     def definition(self) -> ToolDefinition:
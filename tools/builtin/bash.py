@@ -26,6 +26,8 @@ _MAX_OUTPUT = 50_000  # chars
 class Tool(BaseTool):
     """Run a shell command with the project root as cwd."""
 
+    parallel_safe = False
+
     @property
     def definition(self) -> ToolDefinition:
         return ToolDefinition(
@@ -16,6 +16,8 @@ def _safe_path(p: str) -> Path:
 class Tool(BaseTool):
     """Replace exact text in a file (first occurrence only)."""
 
+    parallel_safe = False
+
     @property
     def definition(self) -> ToolDefinition:
         return ToolDefinition(
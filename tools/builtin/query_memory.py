@@ -2,21 +2,55 @@
 
 from __future__ import annotations
 
+from dataclasses import replace
+
 from loguru import logger
 
-from tools.base import BaseTool, ToolDefinition, ToolParameter
+from tools.base import BaseTool, ToolCachePolicy, ToolDefinition, ToolParameter
+from tools.result_cache import fold_query
+
+_FAILURE_PREFIXES = ("记忆系统尚未初始化", "记忆查询参数错误", "记忆查询失败")
+
+
+def _cache_key(args: dict) -> tuple:
+    return (
+        fold_query(args.get("query")),
+        args.get("mode") or "hybrid",
+        int(args.get("top_k") or 5),
+        args.get("since"),
+        args.get("until"),
+        args.get("role"),
+    )
+
+
+def _memory_version(args: dict) -> tuple[int, int] | None:
+    # 图每次写入都会改变版本，新记忆写入后旧结果立即失效
+    from memory.kuzu_manager import get_retriever
+
+    retriever = get_retriever()
+    return retriever.data_version if retriever is not None else None
 
 
 class Tool(BaseTool):
     """LLM 主动查询 Kuzu 记忆图谱的工具。"""
 
+    # TTL 兜住"昨天""上周"等相对时间词随时间推移的变化
+    cache_policy = ToolCachePolicy(
+        ttl_seconds=30,
+        normalize=_cache_key,
+        version=_memory_version,
+        cacheable=lambda result: not str(result).startswith(_FAILURE_PREFIXES),
+    )
+
     @property
     def definition(self) -> ToolDefinition:
         return ToolDefinition(
             name="query_memory",
             description=(
                 "查询长期记忆。当需要回忆过去的对话、用户信息、项目进展或实体关系时调用此工具。"
-                "支持三种模式：hybrid（默认，语义+图谱混合）、semantic（模糊回忆）、graph（实体推理）。"
+                "支持四种模式：hybrid（默认，语义+图谱混合）、semantic（模糊回忆）、graph（实体推理）、"
+                "ppr（多跳关联：从相关对话和实体出发沿图扩散，适合间接相关的回忆）。"
+                "可用 since/until/role 限定范围；不传时会从 query 中的“昨天”“上周”等时间词自动推断。"
             ),
             parameters={
                 "query": ToolParameter(
@@ -26,15 +60,31 @@ class Tool(BaseTool):
                 ),
                 "mode": ToolParameter(
                     type="string",
-                    description="检索模式：hybrid（默认）| semantic | graph",
+                    description="检索模式：hybrid（默认）| semantic | graph | ppr",
                     required=False,
-                    enum=["hybrid", "semantic", "graph"],
+                    enum=["hybrid", "semantic", "graph", "ppr"],
                 ),
                 "top_k": ToolParameter(
                     type="integer",
                     description="返回结果数量，默认 5，最大 10",
                     required=False,
                 ),
+                "since": ToolParameter(
+                    type="string",
+                    description="只查该时间之后的对话，ISO 格式，如 2025-03-01 或 2025-03-01T08:00",
+                    required=False,
+                ),
+                "until": ToolParameter(
+                    type="string",
+                    description="只查该时间之前的对话，ISO 格式；只写日期时包含当天",
+                    required=False,
+                ),
+                "role": ToolParameter(
+                    type="string",
+                    description="只查某一方说的话：user | assistant",
+                    required=False,
+                    enum=["user", "assistant"],
+                ),
             },
         )
 
@@ -43,28 +93,43 @@ class Tool(BaseTool):
         query: str,
         mode: str = "hybrid",
         top_k: int = 5,
+        since: str | None = None,
+        until: str | None = None,
+        role: str | None = None,
         **kwargs,
     ) -> str:
         """执行记忆查询，返回格式化文本结果。"""
         from memory.kuzu_manager import get_retriever
+        from memory.retrieval_filter import RetrievalFilter, infer_filter
 
         retriever = get_retriever()
         if retriever is None:
             return "记忆系统尚未初始化，无法查询。"
 
         top_k = min(max(1, int(top_k)), 10)
-        mode = mode if mode in ("hybrid", "semantic", "graph") else "hybrid"
+        mode = mode if mode in ("hybrid", "semantic", "graph", "ppr") else "hybrid"
+        try:
+            filters = RetrievalFilter.build(since=since, until=until, roles=role)
+        except ValueError as e:
+            return f"记忆查询参数错误: {e}"
+        if not (filters.since or filters.until):
+            # 调用本工具本身就是回忆意图，不要求 query 里再出现"说过"之类的词
+            inferred = infer_filter(query, require_cue=False)
+            if inferred:
+                filters = replace(filters, since=inferred.since, until=inferred.until)
 
         try:
-            hits = await retriever.search(query=query, mode=mode, top_k=top_k)
+            hits = await retriever.search(query=query, mode=mode, top_k=top_k, filters=filters)
         except Exception as e:
             logger.error(f"query_memory 查询失败: {e}")
             return f"记忆查询失败: {e}"
+        logger.debug(f"query_memory 各阶段耗时(ms): {getattr(hits, 'timings_ms', {})}")
 
         if not hits:
             return "未找到相关记忆。"
 
-        lines = [f"记忆查询结果 (mode={mode}, query={query[:50]})"]
+        scope = f", 范围={filters.describe()}" if filters else ""
+        lines = [f"记忆查询结果 (mode={mode}, query={query[:50]}{scope})"]
         for i, hit in enumerate(hits, 1):
             lines.append(f"{i}. {hit.to_text(max_chars=200)} (score={hit.score:.2f})")
 
@@ -1,7 +1,7 @@
 """Read file tool — read file or list directory contents."""
 from pathlib import Path
 
-from tools.base import BaseTool, ToolDefinition, ToolParameter
+from tools.base import BaseTool, ToolCachePolicy, ToolDefinition, ToolParameter
 
 _WORKDIR = Path.cwd()
 _MAX_CHARS = 50_000
@@ -14,9 +14,32 @@ def _safe_path(p: str) -> Path:
     return path
 
 
+def _cache_key(args: dict) -> tuple:
+    limit = args.get("limit")
+    return str(_safe_path(args["path"])), int(limit) if limit else None
+
+
+def _cache_version(args: dict) -> tuple | None:
+    # Any write (write_file / edit_file / bash) changes mtime or size; a
+    # directory's mtime changes when entries are added or removed.
+    # 任何写入都会改变 mtime 或大小；目录增删条目也会更新目录 mtime
+    try:
+        st = _safe_path(args["path"]).stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
 class Tool(BaseTool):
     """Read a file or list a directory, paths relative to project root."""
 
+    cache_policy = ToolCachePolicy(
+        ttl_seconds=600,
+        normalize=_cache_key,
+        version=_cache_version,
+        cacheable=lambda result: not str(result).startswith(("错误:", "读取失败")),
+    )
+
     @property
     def definition(self) -> ToolDefinition:
         return ToolDefinition(
@@ -4,12 +4,25 @@ import os
 
 from loguru import logger
 
-from tools.base import BaseTool, ToolDefinition, ToolParameter
+from tools.base import BaseTool, ToolCachePolicy, ToolDefinition, ToolParameter
+from tools.result_cache import fold_query
+
+_FAILURE_PREFIXES = ("搜索不可用", "搜索超时", "搜索失败")
 
 
 class Tool(BaseTool):
     """Web search tool (Tavily API, DuckDuckGo fallback)"""
 
+    cache_policy = ToolCachePolicy(
+        ttl_seconds=300,
+        normalize=lambda args: (
+            fold_query(args.get("query")),
+            int(args.get("max_results") or 5),
+            args.get("search_depth") or "basic",
+        ),
+        cacheable=lambda result: not str(result).startswith(_FAILURE_PREFIXES),
+    )
+
     @property
     def definition(self) -> ToolDefinition:
         return ToolDefinition(
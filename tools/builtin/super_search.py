@@ -16,12 +16,21 @@ from datetime import datetime
 from loguru import logger
 from openai import AsyncOpenAI
 
-from tools.base import BaseTool, ToolDefinition, ToolParameter
+from tools.base import BaseTool, ToolCachePolicy, ToolDefinition, ToolParameter
+from tools.result_cache import fold_query
+
+_FAILURE_PREFIXES = ("Tavily API Key 未配置", "LLM API Key 未配置", "Tavily 未安装", "超级搜索失败")
 
 
 class Tool(BaseTool):
     """高质量多阶段智能搜索工具 (Tavily + LLM 编排)"""
 
+    cache_policy = ToolCachePolicy(
+        ttl_seconds=300,
+        normalize=lambda args: fold_query(args.get("query")),
+        cacheable=lambda result: not str(result).startswith(_FAILURE_PREFIXES),
+    )
+
     @property
     def definition(self) -> ToolDefinition:
         return ToolDefinition(
@@ -16,6 +16,8 @@ def _safe_path(p: str) -> Path:
 class Tool(BaseTool):
     """Write or append content to a file, creating parent dirs as needed."""
 
+    parallel_safe = False
+
     @property
     def definition(self) -> ToolDefinition:
         return ToolDefinition(
@@ -11,6 +11,10 @@ class MCPTool(BaseTool):
     def __init__(self, server_url: str, tool_schema: dict):
         self._server_url = server_url
         self._definition = self._parse_schema(tool_schema)
+        # Only tools the server marks read-only may run concurrently
+        # 仅服务端声明只读（readOnlyHint）的工具允许并发执行
+        annotations = tool_schema.get("annotations") or {}
+        self.parallel_safe = bool(annotations.get("readOnlyHint", False))
 
     def _parse_schema(self, schema: dict) -> ToolDefinition:
         """Parse MCP tool schema into ToolDefinition"""
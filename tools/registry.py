@@ -1,14 +1,20 @@
 """Tool registry"""
-from typing import Dict, List
+from dataclasses import replace
+from typing import Any, Dict, List
 from loguru import logger
 
-from tools.base import BaseTool
+from tools.base import BaseTool, ToolCachePolicy
+from tools.result_cache import ToolResultCache
 
 
 class ToolRegistry:
     """Tool registry"""
     _tools: Dict[str, BaseTool] = {}
     _initialized = False
+    # Results shared across turns and sessions, per each tool's cache_policy
+    # 跨轮次、跨会话共享的工具结果缓存（按各工具声明的 cache_policy）
+    _result_cache = ToolResultCache()
+    _cache_ttl_overrides: Dict[str, float] = {}
 
     @classmethod
     async def initialize(cls, tools_config: dict):
@@ -16,6 +22,8 @@ class ToolRegistry:
         if cls._initialized:
             return
 
+        cls.configure_cache(getattr(tools_config, "cache", None))
+
         # Load built-in tools
         # 加载内置工具
         builtin_tools = tools_config.builtin
@@ -69,6 +77,74 @@ class ToolRegistry:
         """List all tool names"""
         return list(cls._tools.keys())
 
+    @classmethod
+    def configure_cache(cls, cache_config: Any) -> None:
+        """Rebuild the result cache from ``tools.cache`` (dict or object)."""
+        if cache_config is None:
+            return
+        read = cache_config.get if isinstance(cache_config, dict) else (
+            lambda key, default: getattr(cache_config, key, default)
+        )
+        enabled = bool(read("enabled", True))
+        cls._result_cache = ToolResultCache(
+            max_entries=int(read("max_entries", 512)) if enabled else 0,
+            max_chars=int(read("max_chars", 4_000_000)),
+        )
+        cls._cache_ttl_overrides = {
+            str(name): float(ttl) for name, ttl in (read("ttl_seconds", None) or {}).items()
+        }
+
+    @classmethod
+    def _cache_policy(cls, name: str, tool: BaseTool) -> ToolCachePolicy | None:
+        policy = getattr(tool, "cache_policy", None)
+        # Side-effecting tools are never cached, whatever they declare
+        # 有副作用（不可并发）的工具一律不缓存
+        if policy is None or not getattr(tool, "parallel_safe", True):
+            return None
+        if name in cls._cache_ttl_overrides:
+            policy = replace(policy, ttl_seconds=cls._cache_ttl_overrides[name])
+        return policy if policy.ttl_seconds > 0 else None
+
+    @classmethod
+    async def execute(cls, name: str, arguments: dict) -> Any:
+        """Execute a tool by name, serving repeat calls from the shared result cache."""
+        tool = cls._tools.get(name)
+        if not tool:
+            raise ValueError(f"工具不存在: {name}")
+
+        policy = cls._cache_policy(name, tool)
+        cache = cls._result_cache
+        if policy is None or not cache.enabled:
+            return await tool.execute(**arguments)
+
+        try:
+            key = cache.key(name, policy, arguments)
+            version = policy.version(arguments) if policy.version else None
+        except Exception as e:
+            # Arguments the policy cannot normalize: let the tool report the error
+            # 策略无法归一化的参数：不走缓存，交给工具自己报错
+            logger.debug(f"工具缓存键计算失败，跳过缓存: {name}: {e}")
+            return await tool.execute(**arguments)
+
+        hit, result = cache.get(key, version)
+        if hit:
+            logger.debug(f"工具结果缓存命中: {name}")
+            return result
+
+        result = await tool.execute(**arguments)
+        if policy.cacheable is None or policy.cacheable(result):
+            cache.put(key, version, result, policy.ttl_seconds)
+        return result
+
+    @classmethod
+    def cache_stats(cls) -> dict:
+        """Result-cache size and per-tool hit rates."""
+        return cls._result_cache.stats()
+
+    @classmethod
+    def clear_cache(cls, tool_name: str | None = None) -> None:
+        cls._result_cache.invalidate(tool_name)
+
     @classmethod
     def get_tool_definitions(cls) -> List[dict]:
         """Get all tool definitions (OpenAI format)"""
@@ -0,0 +1,103 @@
+"""Shared, bounded tool-result cache used by ToolRegistry."""
+from __future__ import annotations
+
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+from tools.base import ToolCachePolicy
+
+
+def default_cache_key(arguments: dict) -> Hashable:
+    """Canonical JSON of the arguments (key order does not matter)."""
+    return json.dumps(arguments, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def fold_query(text: Any) -> str:
+    """Case- and whitespace-insensitive form of a free-text query argument."""
+    return " ".join(str(text or "").split()).lower()
+
+
+def _result_size(result: Any) -> int:
+    return len(result) if isinstance(result, str) else len(str(result))
+
+
+class ToolResultCache:
+    """LRU + TTL cache of tool results, bounded by entry count and total result size.
+
+    Entries are keyed by ``(tool name, normalized arguments)`` and remember the
+    policy ``version`` they were computed at; a lookup whose version differs is
+    a miss and drops the entry. Hits and misses are counted per tool.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        max_chars: int = 4_000_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max(0, int(max_entries))
+        self.max_chars = max(0, int(max_chars))
+        self._clock = clock
+        self._entries: OrderedDict[tuple[str, Hashable], tuple[float, Hashable, Any, int]] = OrderedDict()
+        self._chars = 0
+        self._stats: dict[str, dict[str, int]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_chars > 0
+
+    def _tool_stats(self, tool_name: str) -> dict[str, int]:
+        return self._stats.setdefault(tool_name, {"hits": 0, "misses": 0, "invalidations": 0})
+
+    @staticmethod
+    def key(tool_name: str, policy: ToolCachePolicy, arguments: dict) -> tuple[str, Hashable]:
+        normalize = policy.normalize or default_cache_key
+        return tool_name, normalize(arguments)
+
+    def get(self, key: tuple[str, Hashable], version: Hashable) -> tuple[bool, Any]:
+        """Return ``(hit, result)``."""
+        stats = self._tool_stats(key[0])
+        entry = self._entries.get(key)
+        if entry is None:
+            stats["misses"] += 1
+            return False, None
+        expires_at, entry_version, result, _ = entry
+        if self._clock() >= expires_at or entry_version != version:
+            if entry_version != version:
+                stats["invalidations"] += 1
+            self._drop(key)
+            stats["misses"] += 1
+            return False, None
+        self._entries.move_to_end(key)
+        stats["hits"] += 1
+        return True, result
+
+    def put(self, key: tuple[str, Hashable], version: Hashable, result: Any, ttl_seconds: float) -> None:
+        size = _result_size(result)
+        if not self.enabled or ttl_seconds <= 0 or size > self.max_chars:
+            return
+        self._drop(key)
+        self._entries[key] = (self._clock() + ttl_seconds, version, result, size)
+        self._chars += size
+        while len(self._entries) > self.max_entries or self._chars > self.max_chars:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+
+    def _drop(self, key: tuple[str, Hashable]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._chars -= entry[3]
+
+    def invalidate(self, tool_name: str | None = None) -> None:
+        """Drop every entry, or only the entries of one tool."""
+        for key in [k for k in self._entries if tool_name is None or k[0] == tool_name]:
+            self._drop(key)
+
+    def stats(self) -> dict:
+        per_tool = {}
+        for name, counts in self._stats.items():
+            lookups = counts["hits"] + counts["misses"]
+            per_tool[name] = {**counts, "hit_rate": round(counts["hits"] / lookups, 4) if lookups else 0.0}
+        return {"entries": len(self._entries), "chars": self._chars, "tools": per_tool}